@@ -0,0 +1,349 @@
+"""AppCore を asyncio のサービスから呼び出すための非同期APIモジュール。
+
+AppCore の処理 [パース、検証、レンダリング] は同期的でCPUを使うため、asyncio のサービスに
+組み込むとイベントループを止めてしまいます。このモジュールは、処理をエグゼキューターに
+移して待つ非同期版の読み込み/適用/ダウンロードを提供します。
+
+主な機能:
+- エグゼキューター: AsyncRuntime にスレッドプールまたはプロセスプールを指定できます [既定は AsyncRuntime が
+  持つスレッドプール]。状態を持つ AppCore はプロセス間で共有できないため、AsyncAppCore の各操作は
+  プロセスプールを指定した場合もスレッドプールで実行し、入力をすべて受け取って
+  1回で生成する AsyncRuntime.generate だけをプロセスプールで実行します。
+- 同時実行数の制限: 同じ AsyncRuntime を使うすべての呼び出しで、1つのセマフォを共有します。
+  セマフォは呼び出し元ではなくエグゼキューターでの処理が終わった時点で解放するため、
+  キャンセルやタイムアウトの後も、実行中の処理の数が上限を超えることはありません。
+- 共有のキャッシュ: スレッドで実行する AppCore も、既定ではモジュール共通の DETECTION_CACHE と RENDER_MEMO を
+  共有します [どちらも参照と更新はスレッドセーフです]。
+- タイムアウト: 呼び出しごと、または AsyncRuntime の既定のタイムアウトを指定できます [超えた場合は TimeoutError]。
+- キャンセル: 待っているタスクがキャンセルされた場合、まだ始まっていない処理は取り消します。
+  始まっている処理は中断できないため、終わるまで同じ AsyncAppCore の次の操作を待たせ、状態が混ざらないようにします。
+
+典型的な使用方法:
+```python
+runtime = AsyncRuntime(executor=ThreadPoolExecutor(max_workers=4), max_concurrency=4, timeout_seconds=30)
+core = AsyncAppCore(runtime=runtime, core=AppCore("config error", "template error"))
+await core.load_config_file(config, "csv_rows", True)
+await core.load_template_file(template, True)
+await core.apply(0, True)
+content = await core.get_download_content("utf-8")
+
+result = await runtime.generate(GenerationRequest(config=config_bytes, template=template_bytes, config_name="inventory.csv"))
+```
+"""
+
+import asyncio
+import os
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from typing import Annotated, Final, Optional, TypeVar
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .cli import BatchOptions
+from .core import AppCore
+from .csv_incremental import IncrementalCSVParser
+from .encoded_writer import DestinationLike, EncodedWriteError, UnencodablePolicy
+from .file_source import SourceLike
+from .profiling import capture_profile, profile_settings_from_env
+
+R = TypeVar("R")
+
+# 同時実行数の既定の上限 [CPU数]
+DEFAULT_MAX_CONCURRENCY: Final[int] = os.cpu_count() or 1
+
+
+class GenerationRequest(BaseModel):
+    """入力をすべて含む、1回の生成の依頼 [プロセスプールに渡せるようにバイト列で持つ]。
+
+    Attributes:
+        config: 設定ファイルの内容
+        template: テンプレートの内容
+        config_name: 設定ファイルのファイル名 [拡張子で形式を判定する]
+        template_name: テンプレートのファイル名
+        options: 生成オプション
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    config: bytes = Field(repr=False)
+    template: bytes = Field(repr=False)
+    config_name: str
+    template_name: str = "template.j2"
+    options: BatchOptions = Field(default_factory=BatchOptions)
+
+
+class GenerationResult(BaseModel):
+    """1回の生成の結果。
+
+    Attributes:
+        content: 出力のエンコーディングでエンコードした生成結果 [失敗した場合はNone]
+        error_message: 失敗した理由 [成功した場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    content: Optional[bytes] = Field(default=None, repr=False)
+    error_message: Optional[str] = None
+
+
+class AsyncRuntime(BaseModel):
+    """非同期の呼び出しで共有するエグゼキューター、同時実行数の上限、既定のタイムアウト。
+
+    Attributes:
+        executor: 処理を実行するエグゼキューター [Noneの場合は、この AsyncRuntime が持つスレッドプール]
+        max_concurrency: 同時に実行する処理の上限
+        timeout_seconds: 呼び出しごとの既定のタイムアウト [秒。Noneの場合は無制限]
+
+    Note:
+        セマフォは最初に使ったイベントループに結び付くため、1つの AsyncRuntime は1つのイベントループで使います。
+        executor に渡したエグゼキューターは呼び出し元で終了し、この AsyncRuntime が持つスレッドプールは shutdown で終了します。
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    executor: Optional[Executor] = None
+    max_concurrency: Annotated[int, Field(gt=0)] = DEFAULT_MAX_CONCURRENCY
+    timeout_seconds: Optional[Annotated[float, Field(gt=0)]] = None
+
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _thread_executor: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _in_flight: int = PrivateAttr(default=0)
+
+    @property
+    def in_flight(self) -> int:
+        """エグゼキューターで実行中 [または実行待ち] の処理の数を返す。"""
+        return self._in_flight
+
+    async def generate(self, request: GenerationRequest, timeout_seconds: Optional[float] = None) -> GenerationResult:
+        """入力の読み込みからエンコードまでを、1回でエグゼキューターに移して実行する [プロセスプールを使える]。
+
+        Args:
+            request: 生成の依頼
+            timeout_seconds: タイムアウト [秒。Noneの場合は既定のタイムアウト]
+
+        Returns:
+            GenerationResult: 生成の結果
+
+        Raises:
+            TimeoutError: タイムアウトした場合
+            asyncio.CancelledError: 待っているタスクがキャンセルされた場合
+        """
+        return await self.run(partial(generate_sync, request), timeout_seconds, is_stateless=True)
+
+    async def run(
+        self,
+        func: Callable[[], R],
+        timeout_seconds: Optional[float] = None,
+        is_stateless: bool = False,
+        lock: Optional[asyncio.Lock] = None,
+    ) -> R:
+        """同時実行数の上限の中で、処理をエグゼキューターに移して待つ。
+
+        Args:
+            func: 実行する処理
+            timeout_seconds: タイムアウト [秒。Noneの場合は既定のタイムアウト]
+            is_stateless: プロセスプールで実行できるかどうか [Falseの場合、プロセスプールの代わりにスレッドプールを使う]
+            lock: 処理が終わるまで保持するロック [同じ AppCore の操作を直列にするため]
+
+        Returns:
+            R: 処理の戻り値
+
+        Raises:
+            TimeoutError: タイムアウトした場合
+            asyncio.CancelledError: 待っているタスクがキャンセルされた場合
+        """
+        # ロックを先に取得し、同じ AppCore の前の操作を待つ間は同時実行数の枠を使わない
+        if lock is not None:
+            await lock.acquire()
+        semaphore: Final[asyncio.Semaphore] = self._get_semaphore()
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            if lock is not None:
+                lock.release()
+            raise
+
+        def release() -> None:
+            self._in_flight -= 1
+            if lock is not None:
+                lock.release()
+            semaphore.release()
+
+        try:
+            # concurrent.futures の Future は、実行中の処理を取り消せない [cancel がFalseを返す] ため、終了を正しく待てる
+            work: Final[Future[R]] = self._get_executor(is_stateless).submit(func)
+        except BaseException:
+            release()
+            raise
+        self._in_flight += 1
+        loop: Final[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        work.add_done_callback(lambda _: _call_soon_threadsafe(loop, release))
+
+        timeout: Final[Optional[float]] = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+        try:
+            # shield で包み、呼び出し元のキャンセルやタイムアウトで処理の結果の受け取りを取り消さないようにする
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(work)), timeout)
+        except (asyncio.CancelledError, TimeoutError):
+            # 始まっていない処理は取り消す [始まっている処理は終わった時点で release が呼ばれる]
+            work.cancel()
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """この AsyncRuntime が持つスレッドプールを終了する [executor に渡したエグゼキューターは終了しない]。"""
+        if self._thread_executor is not None:
+            self._thread_executor.shutdown(wait=wait)
+            self._thread_executor = None
+
+    def _get_executor(self, is_stateless: bool) -> Executor:
+        """処理を実行するエグゼキューターを返す。"""
+        if self.executor is not None and (is_stateless or not isinstance(self.executor, ProcessPoolExecutor)):
+            return self.executor
+        if self._thread_executor is None:
+            self._thread_executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="cg-async")
+        return self._thread_executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """セマフォを返す [実行中のイベントループの中で初めて使うときに作る]。"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
+class AsyncAppCore(BaseModel):
+    """AppCore の各操作を、AsyncRuntime のエグゼキューターに移して待つ非同期版。
+
+    Attributes:
+        runtime: 共有するエグゼキューター、同時実行数の上限、既定のタイムアウト
+        core: 操作する AppCore [結果やエラーメッセージはこの AppCore から参照する]
+
+    Note:
+        同じ AsyncAppCore の操作は、呼び出した順に1つずつ実行します。
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    runtime: AsyncRuntime
+    core: AppCore
+
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+
+    async def load_config_file(
+        self,
+        config_file: Optional[SourceLike],
+        csv_rows_name: str,
+        enable_auto_transcoding: bool,
+        enable_fill_nan: bool = False,
+        fill_nan_with: str = "#",
+        csv_session: Optional[IncrementalCSVParser] = None,
+        source_name: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> "AsyncAppCore":
+        """AppCore.load_config_file の非同期版 [timeout_seconds 以外の引数は同じ]。"""
+        await self._run(
+            partial(
+                self.core.load_config_file,
+                config_file,
+                csv_rows_name,
+                enable_auto_transcoding,
+                enable_fill_nan,
+                fill_nan_with,
+                csv_session=csv_session,
+                source_name=source_name,
+            ),
+            timeout_seconds,
+        )
+        return self
+
+    async def load_template_file(
+        self,
+        template_file: Optional[SourceLike],
+        enable_auto_transcoding: bool,
+        source_name: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> "AsyncAppCore":
+        """AppCore.load_template_file の非同期版 [timeout_seconds 以外の引数は同じ]。"""
+        await self._run(
+            partial(self.core.load_template_file, template_file, enable_auto_transcoding, source_name=source_name), timeout_seconds
+        )
+        return self
+
+    async def apply(self, format_type: int, is_strict_undefined: bool, timeout_seconds: Optional[float] = None) -> "AsyncAppCore":
+        """AppCore.apply の非同期版 [timeout_seconds 以外の引数は同じ]。"""
+        await self._run(partial(self.core.apply, format_type, is_strict_undefined), timeout_seconds)
+        return self
+
+    async def get_download_content(self, encode: str, timeout_seconds: Optional[float] = None) -> Optional[bytes]:
+        """AppCore.get_download_content の非同期版 [timeout_seconds 以外の引数は同じ]。"""
+        return await self._run(partial(self.core.get_download_content, encode), timeout_seconds)
+
+    async def write_download_content(
+        self,
+        destination: DestinationLike,
+        encode: str,
+        errors: UnencodablePolicy = "strict",
+        timeout_seconds: Optional[float] = None,
+    ) -> Optional[int]:
+        """AppCore.write_download_content の非同期版 [timeout_seconds 以外の引数は同じ]。"""
+        return await self._run(partial(self.core.write_download_content, destination, encode, errors), timeout_seconds)
+
+    async def _run(self, func: Callable[[], R], timeout_seconds: Optional[float]) -> R:
+        """AppCore の操作を、この AsyncAppCore のロックを保持したまま実行する。"""
+        return await self.runtime.run(func, timeout_seconds, lock=self._lock)
+
+
+def generate_sync(request: GenerationRequest) -> GenerationResult:
+    """生成の依頼を同期的に処理する [プロセスプールのワーカーから呼ばれる]。
+
+    Args:
+        request: 生成の依頼
+
+    Returns:
+        GenerationResult: 生成の結果 [例外は送出せず、失敗の理由を結果に含める]
+
+    Note:
+        環境変数 CG_PROFILE_DIR などが設定されている場合は、遅かった生成のプロファイルを保存します [profiling を参照]。
+    """
+    core: Final[AppCore] = AppCore("Config file error", "Template file error")
+    with capture_profile(core, profile_settings_from_env(), label=Path(request.config_name).stem):
+        return _generate(core, request)
+
+
+def _generate(core: AppCore, request: GenerationRequest) -> GenerationResult:
+    """generate_sync の生成の手順 [プロファイルの対象]。"""
+    options: Final[BatchOptions] = request.options
+    core.load_config_file(
+        memoryview(request.config),
+        options.csv_rows_name,
+        options.enable_auto_transcoding,
+        options.enable_fill_nan,
+        options.fill_nan_with,
+        source_name=request.config_name,
+    )
+    if core.config_error_message is not None:
+        return GenerationResult(error_message=core.config_error_message)
+    core.load_template_file(memoryview(request.template), options.enable_auto_transcoding, source_name=request.template_name)
+    if core.template_error_message is not None:
+        return GenerationResult(error_message=core.template_error_message)
+    core.apply(options.format_type, options.is_strict_undefined)
+    if not core.is_ready_formatted:
+        return GenerationResult(error_message=core.template_error_message or "Template file error: nothing was rendered")
+
+    output: Final[BytesIO] = BytesIO()
+    try:
+        output_bytes: Final[Optional[int]] = core.write_download_content(output, options.output_encoding, options.unencodable)
+    except EncodedWriteError as e:
+        return GenerationResult(error_message=f"Output error: {e}")
+    if output_bytes is None:
+        return GenerationResult(error_message=f"Output error: unknown encoding '{options.output_encoding}'")
+    return GenerationResult(content=output.getvalue())
+
+
+def _call_soon_threadsafe(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]) -> None:
+    """ワーカーのスレッドから、イベントループのスレッドでコールバックを呼ぶ [ループが閉じている場合は何もしない]。"""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
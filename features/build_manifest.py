@@ -0,0 +1,274 @@
+"""一括生成の差分ビルドで、出力ごとの入力の内容ハッシュを記録するマニフェストのモジュール。
+
+CSVの1行や共有テンプレートを1つ変えただけでも、一括生成は全出力を生成し直していました。
+このモジュールは、出力ごとに次の入力の内容ハッシュを記録し、変化のない出力の生成を省略します
+[make と同じ考え方で、時刻ではなく内容で判定します]。
+
+- 設定ファイル
+- テンプレート
+- 生成オプション [BatchOptions]
+- エンジン [features 配下のソースと、出力に影響するライブラリのバージョン]
+- 出力ファイル自身 [手作業での変更や削除を検出]
+
+主な機能:
+- 再生成の理由: 変化した入力を "config changed" などの文字列で返します。
+- 中断からの再開: マニフェストは追記型のJSONLです。ジョブが終わるたびに1行を追記するため、
+  中断しても完了したジョブは次回省略されます。末尾の書きかけの行は読み込み時に無視します。
+- 圧縮: ビルドの終わりに、出力ごとに最新の1行だけを残して書き直します [一時ファイルからの置き換え]。
+
+典型的な使用方法:
+```python
+manifest = BuildManifest.load(output_dir / MANIFEST_FILE_NAME)
+inputs = BuildInputs(config_hash=hash_file(config), template_hash=hash_file(template), options_hash=..., engine=engine_fingerprint())
+reasons = manifest.stale_reasons(output_path, inputs)
+if reasons:
+    ...  # 生成して書き出す
+    manifest.record(output_path, ManifestEntry(**inputs.model_dump(), output_size=size, output_hash=hash_file(output_path)))
+manifest.compact()
+```
+"""
+
+import json
+import os
+import sys
+from functools import cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final, List, Optional, TextIO
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr, ValidationError
+
+from .detection_cache import new_content_hasher
+
+if TYPE_CHECKING:
+    import hashlib
+
+# 出力先ディレクトリに置くマニフェストの既定のファイル名 [ドットで始まるため入力の探索からは除外される]
+MANIFEST_FILE_NAME: Final[str] = ".cg-build-manifest.jsonl"
+# マニフェストの形式のバージョン [異なる場合は記録を破棄して全出力を生成する]
+MANIFEST_FORMAT: Final[int] = 1
+# ファイルのハッシュを求める1回あたりの読み取りバイト数
+HASH_CHUNK_SIZE: Final[int] = 1024 * 1024
+
+# 出力に影響する外部ライブラリ [エンジンのフィンガープリントに含める]
+_ENGINE_DISTRIBUTIONS: Final[List[str]] = ["Jinja2", "MarkupSafe", "PyYAML", "chardet"]
+
+
+class BuildInputs(BaseModel):
+    """1つの出力を生成した入力の内容ハッシュ。
+
+    Attributes:
+        config_hash: 設定ファイルの内容ハッシュ
+        template_hash: テンプレートの内容ハッシュ
+        options_hash: 生成オプションのハッシュ
+        engine: エンジンのフィンガープリント
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    config_hash: str
+    template_hash: str
+    options_hash: str
+    engine: str
+
+
+class ManifestEntry(BuildInputs):
+    """マニフェストの1つの記録 [入力と、書き出した出力の内容ハッシュ]。
+
+    Attributes:
+        output_size: 書き出した出力のバイト数
+        output_hash: 書き出した出力の内容ハッシュ
+    """
+
+    output_size: int
+    output_hash: str
+
+
+class BuildManifest(BaseModel):
+    """出力ごとの記録を保持し、追記型のJSONLとして保存するマニフェスト。
+
+    Attributes:
+        path: マニフェストのパス
+
+    Note:
+        記録のキーは出力の絶対パスです。出力先ディレクトリを移動した場合は全出力を生成し直します。
+    """
+
+    path: Path
+
+    _entries: dict[str, ManifestEntry] = PrivateAttr(default_factory=dict)
+    _journal: Optional[TextIO] = PrivateAttr(default=None)
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        """マニフェストを読み込む [存在しない、または形式が異なる場合は空のマニフェスト]。
+
+        Args:
+            path: マニフェストのパス
+
+        Returns:
+            BuildManifest: 読み込んだマニフェスト
+        """
+        manifest: Final[BuildManifest] = cls(path=path)
+        manifest.reload()
+        return manifest
+
+    def reload(self) -> None:
+        """マニフェストのファイルから記録を読み直す。"""
+        self._entries.clear()
+        try:
+            with self.path.open(encoding="utf-8") as journal:
+                self._replay(journal.readlines())
+        except FileNotFoundError:
+            return
+
+    def __len__(self) -> int:
+        """記録している出力の数を返す。"""
+        return len(self._entries)
+
+    def get(self, output_path: Path) -> Optional[ManifestEntry]:
+        """出力の記録を返す [記録がない場合はNone]。"""
+        return self._entries.get(_entry_key(output_path))
+
+    def stale_reasons(self, output_path: Path, inputs: BuildInputs) -> List[str]:
+        """出力を生成し直す理由を返す。
+
+        Args:
+            output_path: 出力のパス
+            inputs: 今回の入力の内容ハッシュ
+
+        Returns:
+            List[str]: 生成し直す理由 [空の場合は最新で、生成を省略できる]
+        """
+        entry: Final[Optional[ManifestEntry]] = self.get(output_path)
+        if entry is None:
+            return ["not built before"]
+        try:
+            output_size: Final[int] = output_path.stat().st_size
+        except FileNotFoundError:
+            return ["output missing"]
+
+        reasons: Final[List[str]] = [
+            reason
+            for reason, is_changed in (
+                ("engine changed", entry.engine != inputs.engine),
+                ("options changed", entry.options_hash != inputs.options_hash),
+                ("config changed", entry.config_hash != inputs.config_hash),
+                ("template changed", entry.template_hash != inputs.template_hash),
+            )
+            if is_changed
+        ]
+        # 入力が変わった場合や、サイズで判定できる場合は出力のハッシュを求めない
+        if not reasons and (output_size != entry.output_size or hash_file(output_path) != entry.output_hash):
+            reasons.append("output modified")
+        return reasons
+
+    def record(self, output_path: Path, entry: ManifestEntry) -> None:
+        """出力の記録を更新し、マニフェストに1行を追記する。"""
+        key: Final[str] = _entry_key(output_path)
+        self._entries[key] = entry
+        self._append({"output": key, **entry.model_dump()})
+
+    def discard(self, output_path: Path) -> None:
+        """出力の記録を削除し、削除をマニフェストに追記する [生成に失敗した出力]。"""
+        key: Final[str] = _entry_key(output_path)
+        if self._entries.pop(key, None) is not None:
+            self._append({"output": key, "removed": True})
+
+    def compact(self) -> None:
+        """出力ごとに最新の記録だけを残してマニフェストを書き直す。"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary: Final[Path] = self.path.with_name(f"{self.path.name}.tmp")
+        with temporary.open("w", encoding="utf-8") as journal:
+            journal.write(json.dumps({"format": MANIFEST_FORMAT}) + "\n")
+            for key, entry in sorted(self._entries.items()):
+                journal.write(json.dumps({"output": key, **entry.model_dump()}, ensure_ascii=False) + "\n")
+        os.replace(temporary, self.path)
+
+    def close(self) -> None:
+        """追記中のマニフェストを閉じる。"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _replay(self, lines: List[str]) -> None:
+        """マニフェストの各行を先頭から適用する [形式が異なる場合は何もしない]。"""
+        if not lines or _parse_line(lines[0]) != {"format": MANIFEST_FORMAT}:
+            return
+        for line in lines[1:]:
+            record: Optional[dict[str, Any]] = _parse_line(line)
+            if record is None or not isinstance(record.get("output"), str):
+                continue  # 中断で書きかけになった行
+            output: str = record.pop("output")
+            if record.get("removed") is True:
+                self._entries.pop(output, None)
+                continue
+            try:
+                self._entries[output] = ManifestEntry.model_validate(record)
+            except ValidationError:
+                continue
+
+    def _append(self, record: dict[str, Any]) -> None:
+        """マニフェストに1行を追記する [初回は形式の行から書き直す]。"""
+        if self._journal is None:
+            self.compact()
+            self._journal = self.path.open("a", encoding="utf-8")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # 中断に備えて、ジョブごとにOSへ書き出す
+        self._journal.flush()
+
+
+def hash_file(path: Path) -> str:
+    """ファイルの内容ハッシュを返す [content_key と同じ値]。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        str: 内容のハッシュ値 [16進数]
+
+    Raises:
+        OSError: ファイルを読み取れない場合
+    """
+    hasher: Final["hashlib.blake2b"] = new_content_hasher()
+    with path.open("rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@cache
+def engine_fingerprint() -> str:
+    """生成結果に影響するエンジンのフィンガープリントを返す。
+
+    features 配下のソース、Pythonのバージョン、出力に影響するライブラリのバージョンから求めます。
+
+    Returns:
+        str: フィンガープリント [16進数]
+    """
+    hasher: Final["hashlib.blake2b"] = new_content_hasher()
+    hasher.update(f"python {sys.version_info.major}.{sys.version_info.minor}\n".encode())
+    for distribution in _ENGINE_DISTRIBUTIONS:
+        try:
+            hasher.update(f"{distribution} {version(distribution)}\n".encode())
+        except PackageNotFoundError:
+            hasher.update(f"{distribution} missing\n".encode())
+    for source in sorted(Path(__file__).parent.glob("*.py")):
+        hasher.update(f"{source.name}\n".encode())
+        hasher.update(source.read_bytes())
+    return hasher.hexdigest()
+
+
+def _entry_key(output_path: Path) -> str:
+    """出力のパスから記録のキーを作る。"""
+    return str(output_path.resolve())
+
+
+def _parse_line(line: str) -> Optional[dict[str, Any]]:
+    """マニフェストの1行を読む [書きかけの行や辞書でない行はNone]。"""
+    try:
+        record: Final[Any] = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return record if isinstance(record, dict) else None
@@ -0,0 +1,619 @@
+"""AppCore をコマンドラインから一括実行するモジュール。
+
+Webアプリ [Pyodide上の `_cg_generate`] と同じ AppCore を、保守作業のパイプラインなどから
+ヘッドレスに呼び出します。設定ファイルとテンプレートの組み合わせごとに1つのジョブを作り、
+`--jobs N` のプロセスプールで並列に実行します。
+
+主な機能:
+- 入力の指定: ファイルパス、globパターン、ディレクトリ [配下を再帰的に探索] を複数指定できます。
+  設定ファイルとテンプレートの全組み合わせをジョブにします。
+- 出力: `--output-dir` に `{設定ファイル名}.{拡張子}` [テンプレートが複数の場合は
+  `{設定ファイル名}_{テンプレート名}.{拡張子}`] として、指定したエンコーディングでチャンク単位に書き出します。
+- オプション: Webアプリの設定 [format_type/未定義変数の厳密チェック/CSV行名/NaN補完/自動トランスコーディング]
+  と、出力のエンコーディング/変換できない文字の扱いをすべて指定できます。
+- レポート: ジョブごとに成否と所要時間を1行ずつ出力します [text または jsonl]。
+- 差分ビルド: `--incremental` では、出力ごとの入力の内容ハッシュをマニフェストに記録し、
+  入力が変わっていない出力の生成を省略します。生成し直した出力には理由を添えて報告します
+  [build_manifest を参照]。
+- プロファイル: `--profile-dir` [または環境変数 CG_PROFILE_DIR] を指定すると、閾値を超えて遅かった
+  ジョブのプロファイルを保存します [profiling を参照]。
+
+終了コード:
+- 0: すべてのジョブが成功
+- 1: 失敗したジョブがある
+- 2: 引数が不正、または入力が見つからない
+
+典型的な使用方法:
+```console
+python -m features.cli --config 'inventory/*.csv' --template templates/ --output-dir out --jobs 8
+python -m features.cli --config inventory/ --template templates/ --output-dir out --incremental
+python -m features.cli --config inventory/ --template templates/ --output-dir out --profile-dir profiles --profile-threshold-ms 500
+```
+"""
+
+import argparse
+import codecs
+import json
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from glob import glob
+from pathlib import Path
+from typing import Annotated, Final, List, Literal, Optional, TextIO, TypeAlias
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .build_manifest import MANIFEST_FILE_NAME, BuildInputs, BuildManifest, ManifestEntry, engine_fingerprint, hash_file
+from .config_parser import ConfigParser
+from .core import AppCore
+from .detection_cache import content_key
+from .document_render import MAX_FORMAT_TYPE, MIN_FORMAT_TYPE
+from .encoded_writer import EncodedWriteError, UnencodablePolicy
+from .profiling import (
+    PROFILE_DIR_ENV_VAR,
+    PROFILE_MODE_ENV_VAR,
+    PROFILE_THRESHOLD_ENV_VAR,
+    ProfileCapture,
+    ProfileSettings,
+    capture_profile,
+)
+
+ReportFormat: TypeAlias = Literal["text", "jsonl"]
+
+EXIT_SUCCESS: Final[int] = 0
+EXIT_JOB_FAILED: Final[int] = 1
+EXIT_USAGE: Final[int] = 2
+
+_UNENCODABLE_POLICIES: Final[List[str]] = ["strict", "replace", "ignore", "xmlcharrefreplace", "backslashreplace"]
+
+
+class BatchOptions(BaseModel):
+    """全ジョブに共通の生成オプション [既定値はWebアプリの既定の設定と同じ]。
+
+    Attributes:
+        format_type: 出力のフォーマットの種類 [0-4]
+        is_strict_undefined: 未定義の変数を厳密にチェックするかどうか
+        csv_rows_name: CSVの行を格納するキー名
+        enable_fill_nan: CSVの空欄を補完するかどうか
+        fill_nan_with: CSVの空欄を補完する文字列
+        enable_auto_transcoding: 入力のエンコーディングを自動で検出するかどうか
+        output_encoding: 出力のエンコーディング
+        unencodable: 出力のエンコーディングで表現できない文字の扱い
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    format_type: Annotated[int, Field(ge=MIN_FORMAT_TYPE, le=MAX_FORMAT_TYPE)] = 0
+    is_strict_undefined: bool = True
+    csv_rows_name: Annotated[str, Field(min_length=1)] = "csv_rows"
+    enable_fill_nan: bool = True
+    fill_nan_with: str = "#"
+    enable_auto_transcoding: bool = True
+    output_encoding: str = "utf-8"
+    unencodable: UnencodablePolicy = "strict"
+
+
+class BatchJob(BaseModel):
+    """設定ファイルとテンプレートの1つの組み合わせ。
+
+    Attributes:
+        config_path: 設定ファイルのパス
+        template_path: テンプレートのパス
+        output_path: 出力先のパス
+        rebuild_reason: 差分ビルドで生成し直す理由 [差分ビルドでない場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    config_path: Path
+    template_path: Path
+    output_path: Path
+    rebuild_reason: Optional[str] = None
+
+
+class JobResult(BaseModel):
+    """1つのジョブの実行結果。
+
+    Attributes:
+        job: 実行したジョブ
+        is_success: 出力を書き出せたかどうか
+        error_message: 失敗した理由 [成功した場合はNone]
+        elapsed_seconds: 読み込みから書き出しまでの所要時間 [秒]
+        output_bytes: 書き出したバイト数 [失敗した場合はNone]
+        profile_path: 保存したプロファイルのパス [プロファイルしなかった場合、または閾値以下の場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    job: BatchJob
+    is_success: bool
+    error_message: Optional[str] = None
+    elapsed_seconds: float
+    output_bytes: Optional[int] = None
+    profile_path: Optional[Path] = None
+
+
+def collect_inputs(patterns: Sequence[str], suffixes: Optional[Sequence[str]] = None) -> List[Path]:
+    """ファイルパス/globパターン/ディレクトリから、入力ファイルの一覧を作る。
+
+    Args:
+        patterns: ファイルパス、globパターン [`**` は再帰]、またはディレクトリ
+        suffixes: ディレクトリの探索で対象にする拡張子 [ドットなし。Noneの場合はすべてのファイル]
+
+    Returns:
+        List[Path]: 重複を除いた入力ファイル [指定順、各パターン内はパス順]
+    """
+    found: Final[dict[Path, None]] = {}
+    for pattern in patterns:
+        for match in sorted(glob(pattern, recursive=True)) or [pattern]:
+            path = Path(match)
+            if path.is_dir():
+                for child in sorted(path.rglob("*")):
+                    if child.is_file() and not child.name.startswith(".") and (suffixes is None or child.suffix[1:] in suffixes):
+                        found[child] = None
+            elif path.is_file():
+                found[path] = None
+    return list(found)
+
+
+def plan_jobs(config_paths: Sequence[Path], template_paths: Sequence[Path], output_dir: Path, output_ext: str) -> List[BatchJob]:
+    """設定ファイルとテンプレートの全組み合わせのジョブを作る。
+
+    Args:
+        config_paths: 設定ファイルのパス
+        template_paths: テンプレートのパス
+        output_dir: 出力先のディレクトリ
+        output_ext: 出力ファイルの拡張子 [ドットなし]
+
+    Returns:
+        List[BatchJob]: ジョブの一覧 [設定ファイルごとにテンプレート順]
+
+    Raises:
+        ValueError: 出力先のファイル名が重複する場合
+    """
+    jobs: Final[List[BatchJob]] = []
+    outputs: Final[dict[Path, BatchJob]] = {}
+    for config_path in config_paths:
+        for template_path in template_paths:
+            stem = config_path.stem if len(template_paths) == 1 else f"{config_path.stem}_{template_path.stem}"
+            job = BatchJob(config_path=config_path, template_path=template_path, output_path=output_dir / f"{stem}.{output_ext}")
+            previous = outputs.get(job.output_path)
+            if previous is not None:
+                raise ValueError(
+                    f"Output '{job.output_path}' would be written by both "
+                    f"'{previous.config_path}' + '{previous.template_path}' and '{config_path}' + '{template_path}'"
+                )
+            outputs[job.output_path] = job
+            jobs.append(job)
+    return jobs
+
+
+def select_stale_jobs(
+    jobs: Sequence[BatchJob], options: BatchOptions, manifest: BuildManifest
+) -> tuple[List[BatchJob], dict[Path, BuildInputs]]:
+    """マニフェストと比べて、生成し直す必要のあるジョブを選ぶ。
+
+    Args:
+        jobs: 計画したすべてのジョブ
+        options: 生成オプション
+        manifest: 前回までのマニフェスト
+
+    Returns:
+        tuple[List[BatchJob], dict[Path, BuildInputs]]:
+            理由を設定した生成し直すジョブと、出力ごとの今回の入力 [記録に使用]
+    """
+    engine: Final[str] = engine_fingerprint()
+    options_hash: Final[str] = content_key(options.model_dump_json().encode())
+    file_hashes: Final[dict[Path, str]] = {}
+
+    def file_hash(path: Path) -> str:
+        # 共有テンプレートは1回だけハッシュする
+        if path not in file_hashes:
+            file_hashes[path] = hash_file(path)
+        return file_hashes[path]
+
+    stale_jobs: Final[List[BatchJob]] = []
+    inputs_by_output: Final[dict[Path, BuildInputs]] = {}
+    for job in jobs:
+        try:
+            inputs = BuildInputs(
+                config_hash=file_hash(job.config_path),
+                template_hash=file_hash(job.template_path),
+                options_hash=options_hash,
+                engine=engine,
+            )
+        except OSError:
+            # 読み取れない入力はジョブとして実行し、失敗として報告する
+            stale_jobs.append(job.model_copy(update={"rebuild_reason": "input unreadable"}))
+            continue
+        reasons = manifest.stale_reasons(job.output_path, inputs)
+        if reasons:
+            stale_jobs.append(job.model_copy(update={"rebuild_reason": ", ".join(reasons)}))
+            inputs_by_output[job.output_path] = inputs
+    return stale_jobs, inputs_by_output
+
+
+def run_job(job: BatchJob, options: BatchOptions, profile: Optional[ProfileSettings] = None) -> JobResult:
+    """1つのジョブを実行し、出力を書き出す [プロセスプールのワーカーから呼ばれる]。
+
+    Args:
+        job: 実行するジョブ
+        options: 生成オプション
+        profile: プロファイルの設定 [Noneの場合はプロファイルしない]
+
+    Returns:
+        JobResult: 実行結果 [例外は送出せず、失敗の理由を結果に含める]
+    """
+    started: Final[float] = time.perf_counter()
+    core: Final[AppCore] = AppCore("Config file error", "Template file error")
+    with capture_profile(core, profile, label=job.output_path.stem) as capture:
+        error_message, output_bytes = _generate(core, job, options)
+    return JobResult(
+        job=job,
+        is_success=error_message is None,
+        error_message=error_message,
+        elapsed_seconds=time.perf_counter() - started,
+        output_bytes=output_bytes,
+        profile_path=_profile_path(capture),
+    )
+
+
+def _profile_path(capture: ProfileCapture) -> Optional[Path]:
+    """保存したプロファイルのパスを返す [保存しなかった場合はNone]。"""
+    return None if capture.artifact is None else capture.artifact.profile_path
+
+
+def _generate(core: AppCore, job: BatchJob, options: BatchOptions) -> tuple[Optional[str], Optional[int]]:
+    """ジョブの入力を読み込んで生成し、出力を書き出す。
+
+    パーサーなどが送出した想定外の例外も、その時点の段階の失敗として返す [バッチ全体を止めないため]。
+
+    Returns:
+        tuple[Optional[str], Optional[int]]: 失敗した理由 [成功した場合はNone] と、書き出したバイト数
+    """
+    stage: str = "Config file error"
+    try:
+        core.load_config_file(
+            job.config_path, options.csv_rows_name, options.enable_auto_transcoding, options.enable_fill_nan, options.fill_nan_with
+        )
+        if core.config_error_message is not None:
+            return core.config_error_message, None
+        stage = "Template file error"
+        core.load_template_file(job.template_path, options.enable_auto_transcoding)
+        if core.template_error_message is not None:
+            return core.template_error_message, None
+        core.apply(options.format_type, options.is_strict_undefined)
+        if not core.is_ready_formatted:
+            return core.template_error_message or "Template file error: nothing was rendered", None
+
+        stage = "Output error"
+        try:
+            job.output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_bytes: Final[Optional[int]] = core.write_download_content(job.output_path, options.output_encoding, options.unencodable)
+        except (EncodedWriteError, OSError) as e:
+            return f"Output error: {e}", None
+    except Exception as e:
+        return f"{stage}: {type(e).__name__}: {e}", None
+    if output_bytes is None:
+        return f"Output error: unknown encoding '{options.output_encoding}'", None
+    return None, output_bytes
+
+
+def run_batch(
+    jobs: Sequence[BatchJob],
+    options: BatchOptions,
+    max_workers: int = 1,
+    on_result: Optional[Callable[[JobResult], None]] = None,
+    profile: Optional[ProfileSettings] = None,
+) -> List[JobResult]:
+    """ジョブを実行する [max_workersが2以上の場合はプロセスプールで並列に実行]。
+
+    Args:
+        jobs: 実行するジョブ
+        options: 生成オプション
+        max_workers: 並列に実行するプロセス数
+        on_result: ジョブが終わるたびに呼ぶコールバック [完了順]
+        profile: ジョブごとのプロファイルの設定 [Noneの場合はプロファイルしない]
+
+    Returns:
+        List[JobResult]: 実行結果 [jobsと同じ順]
+
+    Note:
+        ワーカーが異常終了してプールが壊れた場合は、実行中だったジョブを失敗として報告し、
+        残りのジョブは新しいプールで実行します [投入はワーカー数までに抑え、巻き添えを実行中のジョブに限る]。
+    """
+    results: Final[dict[BatchJob, JobResult]] = {}
+
+    def finish(job_result: JobResult) -> None:
+        results[job_result.job] = job_result
+        if on_result is not None:
+            on_result(job_result)
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            finish(run_job(job, options, profile))
+    else:
+        pending: Final[deque[BatchJob]] = deque(jobs)
+        while pending:
+            _run_pool(pending, options, min(max_workers, len(pending)), profile, finish)
+
+    return [results[job] for job in jobs]
+
+
+def _run_pool(
+    pending: deque[BatchJob],
+    options: BatchOptions,
+    max_workers: int,
+    profile: Optional[ProfileSettings],
+    finish: Callable[[JobResult], None],
+) -> None:
+    """1つのプロセスプールで、壊れるまでpendingのジョブを取り出して実行する。
+
+    Args:
+        pending: 未投入のジョブ [投入したものから取り除く]
+        options: 生成オプション
+        max_workers: 並列に実行するプロセス数 [同時に投入するジョブ数の上限]
+        profile: ジョブごとのプロファイルの設定
+        finish: ジョブが終わるたびに呼ぶコールバック
+    """
+    # 各ワーカーはモジュール共通の検出キャッシュを持つため、同じテンプレートの検出は1回で済む
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        running: Final[dict[Future[JobResult], BatchJob]] = {}
+        is_broken: bool = False
+        while running or (pending and not is_broken):
+            while pending and not is_broken and len(running) < max_workers:
+                job: BatchJob = pending.popleft()
+                running[executor.submit(run_job, job, options, profile)] = job
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished_job: BatchJob = running.pop(future)
+                try:
+                    finish(future.result())
+                except BrokenProcessPool as e:
+                    # どのジョブが原因かは区別できないため、実行中だったジョブをすべて失敗として報告する
+                    is_broken = True
+                    finish(JobResult(job=finished_job, is_success=False, error_message=str(e), elapsed_seconds=0.0))
+
+
+def format_result(job_result: JobResult, report_format: ReportFormat) -> str:
+    """ジョブの実行結果をレポートの1行に整形する。
+
+    Args:
+        job_result: 実行結果
+        report_format: "text" [タブ区切り] または "jsonl"
+
+    Returns:
+        str: 改行を含まない1行
+    """
+    job: Final[BatchJob] = job_result.job
+    elapsed_ms: Final[float] = round(job_result.elapsed_seconds * 1000, 1)
+    if report_format == "jsonl":
+        return json.dumps(
+            {
+                "status": "ok" if job_result.is_success else "error",
+                "config": str(job.config_path),
+                "template": str(job.template_path),
+                "output": str(job.output_path),
+                "elapsed_ms": elapsed_ms,
+                "output_bytes": job_result.output_bytes,
+                "error": job_result.error_message,
+                "reason": job.rebuild_reason,
+            },
+            ensure_ascii=False,
+        )
+
+    status: Final[str] = "ok" if job_result.is_success else "error"
+    detail: Final[str] = str(job.output_path) if job_result.is_success else str(job_result.error_message).replace("\n", " ")
+    line: Final[str] = f"{status}\t{elapsed_ms:.1f}ms\t{job.config_path}\t{job.template_path}\t{detail}"
+    return line if job.rebuild_reason is None else f"{line}\t{job.rebuild_reason}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作る。"""
+    parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m features.cli",
+        description="Render every (config, template) pair with AppCore and write the outputs.",
+    )
+    parser.add_argument("--config", nargs="+", required=True, metavar="PATH", help="config files, glob patterns or directories")
+    parser.add_argument("--template", nargs="+", required=True, metavar="PATH", help="template files, glob patterns or directories")
+    parser.add_argument("--output-dir", required=True, type=Path, help="directory the outputs are written to")
+    parser.add_argument("--output-ext", default="txt", help="extension of the output files (default: %(default)s)")
+    add_generation_arguments(parser)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip outputs whose config, template, options and engine are unchanged since the last build",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help=f"manifest of the incremental build (default: OUTPUT_DIR/{MANIFEST_FILE_NAME})",
+    )
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="number of worker processes, 0 for one per CPU (default: %(default)s)")
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        help=f"save profiles of slow jobs to this directory (default: ${PROFILE_DIR_ENV_VAR}, disabled if unset)",
+    )
+    parser.add_argument(
+        "--profile-threshold-ms",
+        type=float,
+        help=f"save a profile only when a job takes longer than this (default: ${PROFILE_THRESHOLD_ENV_VAR} or 1000)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=["deterministic", "sampling"],
+        help=f"cProfile (pstats) or stack sampling (collapsed stacks) (default: ${PROFILE_MODE_ENV_VAR} or deterministic)",
+    )
+    parser.add_argument("--report-format", choices=["text", "jsonl"], default="text", help="per-job report format (default: %(default)s)")
+    return parser
+
+
+def add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    """生成オプション [BatchOptions] の引数をパーサーに追加する [watch と共通]。"""
+    defaults: Final[BatchOptions] = BatchOptions()
+    parser.add_argument(
+        "--format-type",
+        type=int,
+        choices=range(MIN_FORMAT_TYPE, MAX_FORMAT_TYPE + 1),
+        default=defaults.format_type,
+        help="0/2: keep blank lines, 1/3: compress blank lines, 4: remove blank lines (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--strict-undefined",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.is_strict_undefined,
+        help="fail on undefined template variables (default: %(default)s)",
+    )
+    parser.add_argument("--csv-rows-name", default=defaults.csv_rows_name, help="key of the CSV rows (default: %(default)s)")
+    parser.add_argument(
+        "--fill-nan",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.enable_fill_nan,
+        help="fill empty CSV cells (default: %(default)s)",
+    )
+    parser.add_argument("--fill-nan-with", default=defaults.fill_nan_with, help="value for empty CSV cells (default: %(default)s)")
+    parser.add_argument(
+        "--auto-transcoding",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.enable_auto_transcoding,
+        help="detect the input encoding instead of requiring UTF-8 (default: %(default)s)",
+    )
+    parser.add_argument("--output-encoding", default=defaults.output_encoding, help="encoding of the outputs (default: %(default)s)")
+    parser.add_argument(
+        "--unencodable",
+        choices=_UNENCODABLE_POLICIES,
+        default=defaults.unencodable,
+        help="handling of characters the output encoding cannot represent (default: %(default)s)",
+    )
+
+
+def options_from_args(args: argparse.Namespace) -> BatchOptions:
+    """add_generation_arguments で追加した引数から生成オプションを作る。"""
+    return BatchOptions(
+        format_type=args.format_type,
+        is_strict_undefined=args.strict_undefined,
+        csv_rows_name=args.csv_rows_name,
+        enable_fill_nan=args.fill_nan,
+        fill_nan_with=args.fill_nan_with,
+        enable_auto_transcoding=args.auto_transcoding,
+        output_encoding=args.output_encoding,
+        unencodable=args.unencodable,
+    )
+
+
+def profile_settings_from_args(args: argparse.Namespace, environ: Mapping[str, str] = os.environ) -> Optional[ProfileSettings]:
+    """プロファイルの引数と環境変数からプロファイルの設定を作る [引数を優先する]。
+
+    Returns:
+        Optional[ProfileSettings]: 設定 [保存先の指定がない場合はNone]
+
+    Raises:
+        ValueError: 閾値または種類が不正な場合
+    """
+    overrides: Final[dict[str, str]] = {
+        name: str(value)
+        for name, value in (
+            (PROFILE_DIR_ENV_VAR, args.profile_dir),
+            (PROFILE_THRESHOLD_ENV_VAR, args.profile_threshold_ms),
+            (PROFILE_MODE_ENV_VAR, args.profile_mode),
+        )
+        if value is not None
+    }
+    return ProfileSettings.from_env({**environ, **overrides})
+
+
+def main(argv: Optional[Sequence[str]] = None, stdout: TextIO = sys.stdout, stderr: TextIO = sys.stderr) -> int:
+    """コマンドラインのエントリポイント。
+
+    Args:
+        argv: コマンドライン引数 [Noneの場合は sys.argv]
+        stdout: ジョブごとのレポートの出力先
+        stderr: 集計と引数エラーの出力先
+
+    Returns:
+        int: 終了コード [EXIT_SUCCESS/EXIT_JOB_FAILED/EXIT_USAGE]
+    """
+    parser: Final[argparse.ArgumentParser] = build_parser()
+    try:
+        args: Final[argparse.Namespace] = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_SUCCESS if e.code == 0 else EXIT_USAGE
+
+    def usage_error(message: str) -> int:
+        print(f"{parser.prog}: error: {message}", file=stderr)
+        return EXIT_USAGE
+
+    try:
+        codecs.lookup(args.output_encoding)
+    except LookupError:
+        return usage_error(f"unknown output encoding '{args.output_encoding}'")
+    if args.jobs < 0:
+        return usage_error("--jobs must be 0 or a positive number")
+
+    config_paths: Final[List[Path]] = collect_inputs(args.config, ConfigParser.SUPPORTED_EXTENSIONS)
+    template_paths: Final[List[Path]] = collect_inputs(args.template)
+    if not config_paths:
+        return usage_error(f"no config files matched {args.config}")
+    if not template_paths:
+        return usage_error(f"no template files matched {args.template}")
+    try:
+        jobs: Final[List[BatchJob]] = plan_jobs(config_paths, template_paths, args.output_dir, args.output_ext)
+    except ValueError as e:
+        return usage_error(str(e))
+
+    try:
+        profile: Final[Optional[ProfileSettings]] = profile_settings_from_args(args)
+    except ValueError as e:
+        return usage_error(f"invalid profile settings: {e}")
+
+    options: Final[BatchOptions] = options_from_args(args)
+    max_workers: Final[int] = args.jobs or os.cpu_count() or 1
+    started: Final[float] = time.perf_counter()
+
+    manifest: Optional[BuildManifest] = None
+    inputs_by_output: dict[Path, BuildInputs] = {}
+    stale_jobs: List[BatchJob] = jobs
+    if args.incremental:
+        manifest = BuildManifest.load(args.manifest or args.output_dir / MANIFEST_FILE_NAME)
+        stale_jobs, inputs_by_output = select_stale_jobs(jobs, options, manifest)
+
+    def report(job_result: JobResult) -> None:
+        if manifest is not None:
+            _update_manifest(manifest, job_result, inputs_by_output.get(job_result.job.output_path))
+        print(format_result(job_result, args.report_format), file=stdout, flush=True)
+
+    try:
+        results: Final[List[JobResult]] = run_batch(stale_jobs, options, max_workers, report, profile)
+    finally:
+        if manifest is not None:
+            manifest.compact()
+
+    failed: Final[int] = sum(1 for job_result in results if not job_result.is_success)
+    summary: str = f"{len(results) - failed} succeeded, {failed} failed"
+    if manifest is not None:
+        summary += f", {len(jobs) - len(stale_jobs)} up to date"
+    print(f"{summary} in {time.perf_counter() - started:.2f}s", file=stderr)
+    return EXIT_JOB_FAILED if failed else EXIT_SUCCESS
+
+
+def _update_manifest(manifest: BuildManifest, job_result: JobResult, inputs: Optional[BuildInputs]) -> None:
+    """ジョブの結果をマニフェストに記録する [失敗した出力は記録を削除して次回も生成する]。"""
+    output_path: Final[Path] = job_result.job.output_path
+    if not job_result.is_success or inputs is None or job_result.output_bytes is None:
+        manifest.discard(output_path)
+        return
+    try:
+        output_hash: Final[str] = hash_file(output_path)
+    except OSError:
+        manifest.discard(output_path)
+        return
+    manifest.record(output_path, ManifestEntry(**inputs.model_dump(), output_size=job_result.output_bytes, output_hash=output_hash))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""パース済み設定のデバッグ表示を行うモジュール。
+
+このモジュールは、`ConfigParser` のパース結果をデバッグペイン向けに文字列化する
+機能を提供します。従来は生成のたびに設定全体を `json.dumps` / `pprint.pformat`
+していたため、大きなインベントリではレンダリングと同程度のコストが発生していました。
+
+主な機能:
+- 遅延評価: 文字列化は `render` が呼ばれた時点で初めて実行します。
+- キャッシュ: パース結果ごとに、表示オプション単位で結果を保持します。
+- 切り詰め: ネストの深さ [max_depth] と要素数 [max_items] で出力を制限します。
+- ページング: `path` で指定したノードの要素を `page` / `page_size` で分割表示します。
+
+切り詰め後の出力は、JSON形式の場合も有効なJSONのまま保たれます。
+- 深さ上限を超えたコンテナ: `"<dict: N keys>"` / `"<list: N items>"` に置換
+- 要素数上限を超えたリスト: 末尾に `"... N more items"` を追加
+- 要素数上限を超えた辞書: キー `"..."` に `"N more keys"` を追加
+
+典型的な使用方法:
+```python
+view = ConfigDebugView(parser.parsed_dict)
+head = view.render(max_depth=2, max_items=50)
+rows = view.render(path=("csv_rows",), page=3, page_size=100)
+```
+"""
+
+import json
+import pprint
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from itertools import islice
+from typing import Annotated, Any, ClassVar, Dict, Final, List, Literal, Optional, Tuple, TypeAlias, Union, cast
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+DebugPath: TypeAlias = Tuple[Union[str, int], ...]
+DebugStyle: TypeAlias = Literal["json", "pprint"]
+
+
+def _is_row_sequence(value: object) -> bool:
+    """文字列/バイト列以外のシーケンスかどうかを判定する。"""
+    return isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray))
+
+
+def _json_default(value: object) -> object:
+    """json.dumps が扱えない値を変換する。list 以外のシーケンスは配列として出力する。"""
+    if _is_row_sequence(value):
+        return list(cast("Sequence[object]", value))
+    return str(value)
+
+
+class DebugViewOptions(BaseModel):
+    """デバッグ表示オプションのバリデーションモデル。
+
+    Attributes:
+        path: 表示対象ノードへのキー/インデックスの経路 [空ならルート]
+        page: 0始まりのページ番号
+        page_size: 1ページあたりの要素数 [Noneならページングしない]
+        max_depth: 展開するネストの深さ [Noneなら無制限]
+        max_items: コンテナごとに表示する要素数 [Noneなら無制限]
+        style: 出力形式 [json/pprint]
+    """
+
+    model_config = ConfigDict(strict=True, frozen=True)
+
+    path: DebugPath = Field(default=())
+    page: Annotated[int, Field(ge=0)] = 0
+    page_size: Optional[Annotated[int, Field(gt=0)]] = None
+    max_depth: Optional[Annotated[int, Field(ge=0)]] = None
+    max_items: Optional[Annotated[int, Field(gt=0)]] = None
+    style: DebugStyle = "json"
+
+    @property
+    def is_truncating(self) -> bool:
+        """切り詰めやページングが必要かどうかを返す。"""
+        return self.page_size is not None or self.max_depth is not None or self.max_items is not None
+
+
+class ConfigDebugView(BaseModel):
+    """パース結果を遅延・キャッシュ付きで文字列化するビュー。
+
+    1つのインスタンスは1つのパース結果に対応します。パース結果が変わった場合は、
+    新しいインスタンスを生成してください [キャッシュの無効化はインスタンスの破棄で行う]。
+
+    Attributes:
+        MAX_CACHE_ENTRIES: 表示オプションごとのキャッシュ上限数
+    """
+
+    MAX_CACHE_ENTRIES: ClassVar[int] = 16
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _source: Any = PrivateAttr(default=None)
+    _cache: "OrderedDict[DebugViewOptions, str]" = PrivateAttr(default_factory=OrderedDict)
+
+    def __init__(self, source: Optional[Mapping[str, Any]]) -> None:
+        """ConfigDebugViewの初期化メソッド。
+
+        Args:
+            source: パース済みの設定辞書 [Noneの場合は空表示]
+        """
+        super().__init__()
+        self._source = source
+
+    def render(
+        self,
+        path: DebugPath = (),
+        page: int = 0,
+        page_size: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        max_items: Optional[int] = None,
+        style: DebugStyle = "json",
+    ) -> str:
+        """指定オプションでパース結果を文字列化する。
+
+        オプションを指定しない場合の出力は、従来の `json.dumps(indent=2, default=str)` /
+        `pprint.pformat` と完全に一致します。
+
+        Args:
+            path: 表示対象ノードへの経路
+            page: 0始まりのページ番号
+            page_size: 1ページあたりの要素数
+            max_depth: 展開するネストの深さ
+            max_items: コンテナごとに表示する要素数
+            style: 出力形式 [json/pprint]
+
+        Returns:
+            str: 文字列化されたパース結果 [source が None の場合は空文字列]
+
+        Raises:
+            KeyError: path が存在しないノードを指す場合
+            pydantic.ValidationError: オプションの値が不正な場合
+        """
+        options: Final[DebugViewOptions] = DebugViewOptions(
+            path=tuple(path), page=page, page_size=page_size, max_depth=max_depth, max_items=max_items, style=style
+        )
+        cached: Optional[str] = self._cache.get(options)
+        if cached is not None:
+            self._cache.move_to_end(options)
+            return cached
+
+        rendered: Final[str] = self._render_uncached(options)
+        self._cache[options] = rendered
+        if len(self._cache) > self.MAX_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+        return rendered
+
+    def count(self, path: DebugPath = ()) -> int:
+        """指定ノードの要素数を返す [ページ数の計算用]。
+
+        Args:
+            path: 対象ノードへの経路
+
+        Returns:
+            int: コンテナの要素数 [スカラーの場合は1、sourceがNoneの場合は0]
+        """
+        if self._source is None:
+            return 0
+        node: Final[object] = self._resolve(tuple(path))
+        if isinstance(node, Mapping) or _is_row_sequence(node):
+            return len(cast("Sequence[object]", node))
+        return 1
+
+    def _render_uncached(self, options: DebugViewOptions) -> str:
+        """キャッシュを介さずに文字列化する。"""
+        if self._source is None:
+            return ""
+
+        node: object = self._resolve(options.path)
+        if options.page_size is not None:
+            node = self._slice_page(node, options.page, options.page_size)
+        if options.is_truncating:
+            node = self._truncate(node, options.max_depth, options.max_items)
+
+        if options.style == "pprint":
+            return pprint.pformat(node)
+        return json.dumps(node, indent=2, ensure_ascii=False, default=_json_default)
+
+    def _resolve(self, path: DebugPath) -> object:
+        """経路をたどって表示対象ノードを取得する。
+
+        Raises:
+            KeyError: path が存在しないノードを指す場合 [範囲外の添字やハッシュできないキーを含む]
+        """
+        node: object = self._source
+        try:
+            for key in path:
+                if isinstance(node, Mapping):
+                    node = node[key]
+                elif _is_row_sequence(node) and isinstance(key, int):
+                    node = cast("Sequence[object]", node)[key]
+                else:
+                    raise KeyError(key)
+        except (KeyError, IndexError, TypeError) as e:
+            raise KeyError(f"Debug path not found: {path!r}") from e
+        return node
+
+    def _slice_page(self, node: object, page: int, page_size: int) -> object:
+        """コンテナから1ページ分の要素だけを取り出す。"""
+        start: Final[int] = page * page_size
+        stop: Final[int] = start + page_size
+        if isinstance(node, Mapping):
+            return {key: node[key] for key in islice(node.keys(), start, stop)}
+        if _is_row_sequence(node):
+            rows: Final[Sequence[object]] = cast("Sequence[object]", node)
+            return [rows[index] for index in range(start, min(stop, len(rows)))]
+        return node
+
+    def _truncate(self, node: object, max_depth: Optional[int], max_items: Optional[int], depth: int = 0) -> object:
+        """深さと要素数の上限に従って、表示に必要な部分だけを複製する。"""
+        if isinstance(node, Mapping):
+            if max_depth is not None and depth >= max_depth:
+                return f"<dict: {len(node)} keys>"
+            shown_keys: Final[List[Any]] = list(islice(node.keys(), max_items))
+            result_dict: Dict[Any, object] = {key: self._truncate(node[key], max_depth, max_items, depth + 1) for key in shown_keys}
+            if len(node) > len(shown_keys):
+                result_dict["..."] = f"{len(node) - len(shown_keys)} more keys"
+            return result_dict
+
+        if not _is_row_sequence(node):
+            return node
+
+        rows: Final[Sequence[object]] = cast("Sequence[object]", node)
+        if max_depth is not None and depth >= max_depth:
+            return f"<list: {len(rows)} items>"
+        shown: Final[int] = len(rows) if max_items is None else min(len(rows), max_items)
+        result_list: List[object] = [self._truncate(rows[index], max_depth, max_items, depth + 1) for index in range(shown)]
+        if len(rows) > shown:
+            result_list.append(f"... {len(rows) - shown} more items")
+        return result_list
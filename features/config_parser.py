@@ -10,6 +10,7 @@
 - ConfigParser: メインのパースクラス (Pydanticモデル)
   - FileValidator: ファイルサイズの検証
   - csv (stdlib): CSVデータの処理
+  - ConfigDebugView: パース結果のデバッグ表示 [遅延評価・切り詰め・ページング]
 
 検証プロセス:
 1. 入力検証
@@ -37,12 +38,16 @@
   - tomllibによるパース
   - 厳密な構文チェック
 - YAML (.yaml, .yml)
-  - PyYAMLによる安全なパース
+  - PyYAMLによる安全なパース [libyamlが利用可能ならC実装を自動選択]
   - 辞書形式の検証
 - CSV (.csv)
   - stdlib csv によるパース
   - NaN値の柔軟な処理
   - カスタム行名の設定
+  - IncrementalCSVParser による差分パース [ライブプレビュー向け、任意]
+- NDJSON (.ndjson, .jsonl) / 複数ドキュメントのYAMLストリーム
+  - レコード単位の逐次検証 [エラーはレコード番号と行番号付き]
+  - CSVと同じくカスタム行名の下に、行のリストとして公開 [各レコードのデコードは1回だけ]
 
 エラー処理:
 - ValidationError: Pydanticによる検証エラー
@@ -82,19 +87,25 @@ with open('data.csv', 'rb') as f:
 ```
 """
 
-import csv
 import math
-import pprint
 import sys
 import tomllib
-from io import BytesIO, StringIO
-from typing import ClassVar, Dict, Final, List, Optional, TypeAlias, Union, cast
+from io import BytesIO
+from typing import TYPE_CHECKING, ClassVar, Dict, Final, List, Optional, TypeAlias, Union, cast
 
 import yaml
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
+from .config_debug import ConfigDebugView
+from .file_source import FileSource
+from .ingestion import IngestedBlob, ingest_upload
+from .parser_backends import PARSER_BACKENDS
+from .record_stream import RecordDict, RecordSpan, scan_ndjson, scan_yaml_documents, split_yaml_documents
 from .validate_uploaded_file import FileSizeConfig, FileValidator
 
+if TYPE_CHECKING:
+    from .csv_incremental import IncrementalCSVParser
+
 # Type aliases for complex types
 JSONScalarValue: TypeAlias = Union[str, int, float, bool, None]
 # Revert to recursive definition without Any
@@ -165,7 +176,7 @@ def _coerce_cell(cell: str, fill_value: Optional[str]) -> JSONScalarValue:
     return _infer_scalar(cell)
 
 
-def _build_csv_row(header: List[str], raw_row: List[str], index: int, fill_value: Optional[str]) -> CSVRow:
+def build_csv_row(header: List[str], raw_row: List[str], index: int, fill_value: Optional[str]) -> CSVRow:
     """1データ行を {列名: 値} に変換する。短い行はパッド、列超過は loud エラー。"""
     if len(raw_row) > len(header):
         raise ValueError(f"Failed to parse CSV: row {index + 1} has more fields than the header.")
@@ -173,9 +184,13 @@ def _build_csv_row(header: List[str], raw_row: List[str], index: int, fill_value
     return {column: _coerce_cell(cell, fill_value) for column, cell in zip(header, cells, strict=True)}
 
 
-def _read_csv_table(config_data: str) -> tuple[List[str], List[List[str]]]:
+def read_csv_table(config_data: str, backend_name: Optional[str] = None) -> tuple[List[str], List[List[str]]]:
     """CSVテキストを (ヘッダ, データ行群) に分解する。pandasが拒否していた入力をloud化する。
 
+    Args:
+        config_data: CSVテキスト
+        backend_name: 固定するCSVバックエンド名 [Noneの場合は自動選択]
+
     Raises:
         ValueError: NULLバイト/未終端クォート/カラム無し[空・空白のみ]/データ行無し。
     """
@@ -184,7 +199,7 @@ def _read_csv_table(config_data: str) -> tuple[List[str], List[List[str]]]:
     if _has_unterminated_quote(config_data):
         raise ValueError("Failed to parse CSV: unterminated quoted field.")
 
-    rows: List[List[str]] = [row for row in csv.reader(StringIO(config_data)) if row]
+    rows: List[List[str]] = cast("List[List[str]]", PARSER_BACKENDS.loads("csv", config_data, backend_name))
     if not rows or all(cell.strip() == "" for cell in rows[0]):
         raise ValueError("No columns to parse from file")
     if len(rows) < 2:
@@ -206,7 +221,7 @@ class ConfigParser(BaseModel):
 
     2. パース処理
        - TOML: tomllibによる厳密なパース
-       - YAML: safe_loadによる安全なパース
+       - YAML: SafeLoaderによる安全なパース [parser_backends で実装を自動選択]
        - CSV: stdlib csv によるパースとセル単位型推論
          - NaN値の柔軟な処理
          - カスタム行名の設定
@@ -223,7 +238,7 @@ class ConfigParser(BaseModel):
         MAX_MEMORY_SIZE_BYTES: メモリ使用量の上限 [バイト]
             デフォルト: 150MB
         SUPPORTED_EXTENSIONS: サポートされているファイル拡張子
-            [toml, yaml, yml, csv]
+            [toml, yaml, yml, csv, ndjson, jsonl]
 
     Properties:
         parsed_dict: パース結果の辞書 (エラー時はNone)
@@ -246,27 +261,31 @@ class ConfigParser(BaseModel):
     # Constants for size limits as class variables
     MAX_FILE_SIZE_BYTES: ClassVar[int] = 30 * 1024 * 1024  # 30MB
     MAX_MEMORY_SIZE_BYTES: ClassVar[int] = 150 * 1024 * 1024  # 150MB
-    SUPPORTED_EXTENSIONS: ClassVar[List[str]] = ["toml", "yaml", "yml", "csv"]
+    SUPPORTED_EXTENSIONS: ClassVar[List[str]] = ["toml", "yaml", "yml", "csv", "ndjson", "jsonl"]
 
     # Public fields for validation
-    config_file: BytesIO = Field(..., description="設定ファイルのバイナリデータ")
+    config_file: Union[BytesIO, FileSource, IngestedBlob] = Field(..., description="設定ファイルのバイナリデータ、または取り込み済みの記録")
     csv_rows_name: str = Field("csv_rows", min_length=1, description="CSV行のキー名")
 
     # Private attributes
     _file_extension: str = PrivateAttr()
     _config_data: Optional[str] = PrivateAttr(default=None)
     _parsed_dict: Optional[JSONDict] = PrivateAttr(default=None)
+    _debug_view: Optional[ConfigDebugView] = PrivateAttr(default=None)
     _error_message: Optional[str] = PrivateAttr(default=None)
     _is_enable_fill_nan: bool = PrivateAttr(default=False)
     _fill_nan_with: Optional[str] = PrivateAttr(default=None)
+    _parser_backend_name: Optional[str] = PrivateAttr(default=None)
+    _incremental_csv: Optional["IncrementalCSVParser"] = PrivateAttr(default=None)
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
-    def __init__(self, config_file: BytesIO) -> None:
+    def __init__(self, config_file: Union[BytesIO, FileSource, IngestedBlob]) -> None:
         """ConfigParserの初期化メソッド。
 
         Args:
-            config_file: 設定ファイルのバイナリデータ
+            config_file: 設定ファイルのバイナリデータ [FileSourceの場合はバッファから直接デコード]、
+                または取り込み済みの IngestedBlob [デコード済みの文字列をそのまま使う]
         """
 
         # Pydanticモデルの初期化
@@ -284,10 +303,11 @@ class ConfigParser(BaseModel):
             self._error_message = "Unsupported file type"
             return
 
-        try:
-            self._config_data = self.config_file.read().decode("utf-8")
-        except UnicodeDecodeError as e:
-            self._error_message = str(e)
+        ingested: Final[IngestedBlob] = self.config_file if isinstance(self.config_file, IngestedBlob) else ingest_upload(self.config_file)
+        if ingested.text is None:
+            self._error_message = ingested.decode_error
+            return
+        self._config_data = ingested.text
 
     def parse(self) -> bool:
         """設定ファイルをパースして辞書に変換します。
@@ -298,6 +318,8 @@ class ConfigParser(BaseModel):
         if self._config_data is None:
             return False
 
+        # パース結果が変わるため、前回のデバッグ表示キャッシュを破棄する
+        self._debug_view = None
         try:
             self._parsed_dict = self._parse_by_file_type(self._config_data)
             return True
@@ -322,15 +344,23 @@ class ConfigParser(BaseModel):
         Raises:
             SyntaxError: YAMLファイルが辞書形式でない場合
             ValueError: CSV行名が1文字未満の場合または設定データがNoneの場合
+            RecordStreamError: NDJSON/YAMLストリームのレコードが不正な場合 [ValueErrorの派生]
         """
 
         match self._file_extension:
             case "toml":
                 # tomllib.loads is assumed to return a structure compatible with JSONDict
-                return tomllib.loads(config_data)
+                return cast("JSONDict", PARSER_BACKENDS.loads("toml", config_data, self._backend_name_for("toml")))
             case "yaml" | "yml":
+                yaml_backend_name: Final[Optional[str]] = self._backend_name_for("yaml")
+                # 内容を持つドキュメントが2つ以上ある場合だけ、レコードのストリームとして扱う
+                document_spans: Final[List[RecordSpan]] = split_yaml_documents(config_data)
+                if len(document_spans) > 1:
+                    return self._wrap_records(
+                        scan_yaml_documents(config_data, document_spans, self.MAX_MEMORY_SIZE_BYTES, yaml_backend_name)
+                    )
                 try:
-                    parsed_data: Final[JSONValue] = yaml.safe_load(config_data)
+                    parsed_data: Final[JSONValue] = cast("JSONValue", PARSER_BACKENDS.loads("yaml", config_data, yaml_backend_name))
                     if not isinstance(parsed_data, dict):
                         raise SyntaxError("Invalid YAML file loaded.")
                     # Type checker knows it's a dict here, no cast needed.
@@ -340,9 +370,22 @@ class ConfigParser(BaseModel):
                     raise e from e
             case "csv":
                 return self._parse_csv_data(config_data)
+            case "ndjson" | "jsonl":
+                return self._wrap_records(scan_ndjson(config_data, self.MAX_MEMORY_SIZE_BYTES))
 
         return {}
 
+    def _backend_name_for(self, file_format: str) -> Optional[str]:
+        """形式に属する場合だけ、固定されたバックエンド名を返す [他の形式のバックエンド名は無視して自動選択]。"""
+        backend_name: Final[Optional[str]] = self._parser_backend_name
+        if backend_name is None or all(backend.name != backend_name for backend in PARSER_BACKENDS.backends(file_format)):
+            return None
+        return backend_name
+
+    def _wrap_records(self, records: List[RecordDict]) -> JSONDict:
+        """レコードのシーケンスを、CSVと同じ行名の下に配置する。"""
+        return {self.csv_rows_name: cast("JSONValue", records)}
+
     def _parse_csv_data(self, config_data: str) -> JSONDict:
         """CSVテキストを stdlib csv で {csv_rows_name: [{col: value}, ...]} にパースする。
 
@@ -350,14 +393,18 @@ class ConfigParser(BaseModel):
             ValueError: NULLバイト/未終端クォート/カラム無し/データ行無し/
                 ヘッダより列数が多い行 のいずれかで送出。
         """
-        header, body = _read_csv_table(config_data)
-
         # 補完値: 有効かつ非None のときだけ採用。無効/None のとき空セルは float('nan')。
         fill_value: Final[Optional[str]] = (
             self._fill_nan_with if (self._is_enable_fill_nan and self._fill_nan_with is not None) else None
         )
 
-        mapped_list: CSVData = [_build_csv_row(header, raw_row, index, fill_value) for index, raw_row in enumerate(body)]
+        if self._incremental_csv is not None:
+            # 前回のパース結果との差分だけを再パースする [結果は全体パースと同一]
+            incremental_list: Final[CSVData] = self._incremental_csv.parse(config_data, fill_value, self._backend_name_for("csv"))
+            return {self.csv_rows_name: cast("JSONValue", incremental_list)}
+
+        header, body = read_csv_table(config_data, self._backend_name_for("csv"))
+        mapped_list: CSVData = [build_csv_row(header, raw_row, index, fill_value) for index, raw_row in enumerate(body)]
         return {self.csv_rows_name: cast("JSONValue", mapped_list)}
 
     def _validate_memory_size(self, obj: Union[JSONDict, str]) -> bool:
@@ -395,6 +442,23 @@ class ConfigParser(BaseModel):
 
         return self._parsed_dict
 
+    @property
+    def debug_view(self) -> Optional[ConfigDebugView]:
+        """パース結果のデバッグ表示ビューを返します。パース前またはエラー時はNoneを返します。
+
+        ビューはパース結果ごとに1つだけ生成され、表示オプション単位の文字列化結果を
+        キャッシュします。
+
+        Returns:
+            パース結果のデバッグ表示ビュー
+        """
+        if self._parsed_dict is None:
+            return None
+
+        if self._debug_view is None:
+            self._debug_view = ConfigDebugView(self._parsed_dict)
+        return self._debug_view
+
     @property
     def parsed_str(self) -> str:
         """パースされた辞書を文字列として返します。エラーが発生した場合は"None"を返します。
@@ -403,12 +467,13 @@ class ConfigParser(BaseModel):
         Returns:
             パースされた辞書の文字列表現
         """
-        if self._parsed_dict is None:
+        debug_view: Final[Optional[ConfigDebugView]] = self.debug_view
+        if debug_view is None:
             return "None"
 
         try:
-            # Format the dictionary to string
-            formatted_str = pprint.pformat(self._parsed_dict)
+            # Format the dictionary to string (cached per parse result)
+            formatted_str = debug_view.render(style="pprint")
 
             # Validate memory size
             if not self._validate_memory_size(formatted_str):
@@ -463,3 +528,44 @@ class ConfigParser(BaseModel):
             fillna_value: NaNを埋める際の値
         """
         self._fill_nan_with = fillna_value
+
+    @property
+    def parser_backend_name(self) -> Optional[str]:
+        """固定するパーサーバックエンド名を取得します。
+
+        Returns:
+            バックエンド名 [Noneの場合は利用可能な最速の実装を自動選択]
+        """
+        return self._parser_backend_name
+
+    @parser_backend_name.setter
+    def parser_backend_name(self, backend_name: Optional[str]) -> None:
+        """パーサーバックエンド名を固定します。
+
+        固定はそのバックエンドが登録されている形式にだけ適用されます
+        [例: "pyyaml" を固定しても、TOML/CSVは自動選択のままパースする]。
+
+        Args:
+            backend_name: バックエンド名 [Noneの場合は自動選択]
+        """
+        self._parser_backend_name = backend_name
+
+    @property
+    def incremental_csv(self) -> Optional["IncrementalCSVParser"]:
+        """CSVの差分パースに使用するセッションを取得します。
+
+        Returns:
+            差分パースのセッション [Noneの場合は毎回全体パース]
+        """
+        return self._incremental_csv
+
+    @incremental_csv.setter
+    def incremental_csv(self, session: Optional["IncrementalCSVParser"]) -> None:
+        """CSVの差分パースに使用するセッションを設定します。
+
+        同じセッションを複数のConfigParserで共有すると、前回のテキストとの差分だけを再パースします。
+
+        Args:
+            session: 差分パースのセッション [Noneの場合は毎回全体パース]
+        """
+        self._incremental_csv = session
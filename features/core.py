@@ -1,54 +1,190 @@
 #! /usr/bin/env python
+import os
+import sys
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import wraps
 from io import BytesIO
-from typing import Any, Dict, Final, Optional
+from typing import TYPE_CHECKING, Any, Concatenate, Dict, Final, Optional, ParamSpec, Tuple, TypeVar, Union
 
 from pydantic import BaseModel, PrivateAttr
 
+from .config_debug import ConfigDebugView
 from .config_parser import ConfigParser
-from .document_render import DocumentRender
-from .transcoder import TextTranscoder
+from .csv_incremental import IncrementalCSVParser
+from .detection_cache import DETECTION_CACHE, DetectionCache, content_key
+from .document_render import MAX_FORMAT_TYPE, MIN_FORMAT_TYPE, ContentFormatter, DocumentRender
+from .encoded_writer import DestinationLike, UnencodablePolicy, iter_text_chunks, write_encoded
+from .file_source import FileSource, FileSourceError, SourceLike, resolve_source_name
+from .ingestion import IngestedBlob, ingest_upload
+from .pipeline_metrics import MetricsHook, MetricsRecorder, PipelineMetrics, measure_stage, record_stage
+from .render_memo import RENDER_MEMO, RenderMemo, RenderMemoEntry, render_memo_key
+from .validate_uploaded_file import FileValidator
+
+if TYPE_CHECKING:
+    # 子プロセスを使うモジュールは、隔離を使う場合だけ呼び出し側で読み込む [Pyodide では使わない]
+    from .isolation import IsolationPool
+
+
+def _open_source(source: SourceLike, source_name: Optional[str], max_size_bytes: int) -> Union[BytesIO, FileSource]:
+    """BytesIOはそのまま、それ以外の入力はサイズを検証した FileSource として開く。
+
+    Raises:
+        FileSourceError: サイズが上限を超えた場合、またはファイルを読み取れない場合
+    """
+    if isinstance(source, BytesIO):
+        return source
+    return FileSource.open(source, max_size_bytes, source_name)
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# load_files でテンプレートを読み込むスレッドの数 [設定ファイルは呼び出し元のスレッドで読み込む]
+LOAD_WORKERS: Final[int] = 4
+
+
+class _LoadExecutor:
+    """load_files が使う、モジュール共通のスレッドプール [初回に作る]。"""
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self) -> Executor:
+        """スレッドプールを返す。"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="appcore-load")
+            return self._executor
+
+    def forget(self) -> None:
+        """フォークした子プロセスでは親のスレッドが動いていないため、次の get で作り直させる。"""
+        self._lock = threading.Lock()
+        self._executor = None
+
+
+_LOAD_EXECUTOR: Final[_LoadExecutor] = _LoadExecutor()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_LOAD_EXECUTOR.forget)
+
+
+def _instrumented(operation: str) -> Callable[[Callable[Concatenate["AppCore", P], R]], Callable[Concatenate["AppCore", P], R]]:
+    """AppCoreの操作を1回の計測として、段階ごとの計測結果を記録するデコレーター。"""
+
+    def decorator(method: Callable[Concatenate["AppCore", P], R]) -> Callable[Concatenate["AppCore", P], R]:
+        @wraps(method)
+        def wrapper(self: "AppCore", *args: P.args, **kwargs: P.kwargs) -> R:
+            recorder: Final[MetricsRecorder] = MetricsRecorder(
+                operation=operation, trace_allocations=self._trace_allocations, hooks=self._metrics_hooks
+            )
+            try:
+                with recorder.activate():
+                    return method(self, *args, **kwargs)
+            finally:
+                # 同じ操作を繰り返した場合は、最後の計測結果だけを残す
+                self._operation_metrics.pop(operation, None)
+                self._operation_metrics[operation] = recorder.result()
+
+        return wrapper
+
+    return decorator
+
+
+def _close_owned(source: object, loaded: Optional[Union[BytesIO, FileSource]]) -> None:
+    """呼び出し元から受け取った入力ではなく、自身で開いた FileSource だけを閉じる。"""
+    if isinstance(loaded, FileSource) and loaded is not source:
+        loaded.close()
 
 
 class AppCore(BaseModel):
     _config_dict: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _config_key: Optional[str] = PrivateAttr(default=None)
+    _config_debug_view: Optional[ConfigDebugView] = PrivateAttr(default=None)
     _config_error_header: Optional[str] = PrivateAttr(default=None)
     _config_error_message: Optional[str] = PrivateAttr(default=None)
+    _detection_cache: Optional[DetectionCache] = PrivateAttr(default=None)
     _formatted_text: Optional[str] = PrivateAttr(default=None)
+    _isolation: Optional["IsolationPool"] = PrivateAttr(default=None)
+    _metrics_hooks: Sequence[MetricsHook] = PrivateAttr(default=())
+    _operation_metrics: Dict[str, PipelineMetrics] = PrivateAttr(default_factory=dict)
     _render: Optional[DocumentRender] = PrivateAttr(default=None)
+    _render_memo: Optional[RenderMemo] = PrivateAttr(default=None)
+    _speculative_render: bool = PrivateAttr(default=False)
     _template_filename: Optional[str] = PrivateAttr(default=None)
+    _template_ingested: Optional[IngestedBlob] = PrivateAttr(default=None)
+    _template_key: Optional[str] = PrivateAttr(default=None)
     _template_error_header: Optional[str] = PrivateAttr(default=None)
     _template_error_message: Optional[str] = PrivateAttr(default=None)
+    _trace_allocations: bool = PrivateAttr(default=False)
 
-    def __init__(self: "AppCore", config_error_header: Optional[str] = None, template_error_header: Optional[str] = None) -> None:
+    def __init__(
+        self: "AppCore",
+        config_error_header: Optional[str] = None,
+        template_error_header: Optional[str] = None,
+        detection_cache: Optional[DetectionCache] = DETECTION_CACHE,
+        render_memo: Optional[RenderMemo] = RENDER_MEMO,
+        metrics_hooks: Sequence[MetricsHook] = (),
+        trace_allocations: bool = False,
+        isolation: Optional["IsolationPool"] = None,
+        speculative_render: bool = False,
+    ) -> None:
         """
         AppCoreの初期化メソッド。
 
         Args:
             config_error_header (Optional[str]): 設定エラーのヘッダー(デフォルトはNone)
             template_error_header (Optional[str]): テンプレートエラーのヘッダー(デフォルトはNone)
+            detection_cache (Optional[DetectionCache]): 自動トランスコーディングの検出結果のキャッシュ
+                (デフォルトはインスタンス間で共有する DETECTION_CACHE)。Noneの場合は毎回検出する。
+            render_memo (Optional[RenderMemo]): applyの結果のメモ
+                (デフォルトはインスタンス間で共有する RENDER_MEMO)。Noneの場合は毎回レンダリングする。
+            metrics_hooks (Sequence[MetricsHook]): 段階の計測結果を受け取るコールバック(デフォルトはなし)。
+                add_metrics_hook で登録したモジュール共通のフックの後に呼ばれる。
+            trace_allocations (bool): 段階ごとのメモリ確保のピークを tracemalloc で計測するかどうか(デフォルトはFalse)。
+            isolation (Optional[IsolationPool]): 設定ファイルのパースとテンプレートの適用を、資源の上限を設けた
+                子プロセスで実行するプール(デフォルトはNone)。Noneの場合は同じプロセスで実行する。
+            speculative_render (bool): 実行時の検証と並行してレンダリングを始めるかどうか(デフォルトはFalse)。
+                検証に失敗した場合は結果を捨てる。隔離する場合と、メモリ確保のピークを計測する場合は順に処理する。
         """
 
         super().__init__()
         object.__setattr__(self, "_config_error_header", config_error_header)
         object.__setattr__(self, "_template_error_header", template_error_header)
-
+        object.__setattr__(self, "_detection_cache", detection_cache)
+        object.__setattr__(self, "_render_memo", render_memo)
+        object.__setattr__(self, "_metrics_hooks", tuple(metrics_hooks))
+        object.__setattr__(self, "_trace_allocations", trace_allocations)
+        object.__setattr__(self, "_isolation", isolation)
+        object.__setattr__(self, "_speculative_render", speculative_render)
+
+    @_instrumented("load_config_file")
     def load_config_file(
         self: "AppCore",
-        config_file: Optional[BytesIO],
+        config_file: Optional[SourceLike],
         csv_rows_name: str,
         enable_auto_transcoding: bool,
         enable_fill_nan: bool = False,
         fill_nan_with: str = "#",
+        csv_session: Optional[IncrementalCSVParser] = None,
+        source_name: Optional[str] = None,
     ) -> "AppCore":
         """Load config file for template args.
 
         Args:
-            config_file (Optional[BytesIO]): 設定ファイルのバイナリデータ。
+            config_file (Optional[SourceLike]): 設定ファイルのバイナリデータ。BytesIOのほか、ファイルパス、
+                mmap、memoryview、チャンク列、FileSourceを受け付ける。BytesIO以外はサイズ上限を超えた時点で拒否し、
+                バッファから直接デコードする。
             csv_rows_name (str): CSVの行名。
             enable_auto_transcoding (bool): 自動トランスコーディングを有効にするかどうか。
             enable_fill_nan (bool): NaNを埋めるかどうか(デフォルトはFalse)
             fill_nan_with (str): NaNを埋める際の文字列(デフォルトは"#")
+            csv_session (Optional[IncrementalCSVParser]): CSVの差分パースのセッション(デフォルトはNone)。
+                呼び出しをまたいで同じセッションを渡すと、前回のCSVとの差分だけを再パースする。
+                隔離したパースでは使わない [セッションが親プロセスにあるため]。
+            source_name (Optional[str]): ファイル名(デフォルトはNone)。名前を持たないmemoryviewなどの形式判定に使う。
 
         Returns:
             AppCore: 自身のインスタンス。
@@ -56,37 +192,78 @@ class AppCore(BaseModel):
 
         # 呼び出しされるたびに、前回の結果をリセットする
         self._config_dict = None
+        self._config_debug_view = None
+        self._config_error_message = None
+        self._config_key = None
 
-        if not (isinstance(config_file, BytesIO) and hasattr(config_file, "name")):
+        if config_file is None or (isinstance(config_file, BytesIO) and not hasattr(config_file, "name")):
             return self
 
-        config_filename: Final[str] = config_file.name
-        if enable_auto_transcoding is True:
-            config_file = TextTranscoder(config_file).convert(is_allow_fallback=False)
+        try:
+            with measure_stage("validate_size") as open_sizes:
+                loaded_file: Final[Union[BytesIO, FileSource]] = _open_source(config_file, source_name, FileValidator.DEFAULT_MAX_SIZE)
+                open_sizes.bytes_out = loaded_file.size if isinstance(loaded_file, FileSource) else None
+        except FileSourceError as e:
+            self._config_error_message = f"{self._config_error_header}: {e} in '{resolve_source_name(config_file, source_name)}'"
+            return self
 
-        if config_file is None:
+        config_filename: Final[str] = loaded_file.name
+        try:
+            # サイズ/NULバイト/BOM/内容ハッシュ/デコードを1回の取り込みで済ませ、以降は記録だけを参照する
+            with measure_stage("ingest") as ingest_sizes:
+                ingested: Final[IngestedBlob] = ingest_upload(loaded_file, enable_auto_transcoding, self._detection_cache)
+                ingest_sizes.bytes_in = ingested.size
+                ingest_sizes.chars_out = None if ingested.text is None else len(ingested.text)
+        finally:
+            # 取り込み後はデコード済みの文字列を使うため、自身で開いたバッファはここで解放できる
+            _close_owned(config_file, loaded_file)
+
+        if enable_auto_transcoding is True and ingested.encoding is None:
             self._config_error_message = f"{self._template_error_header}: Failed auto decoding in '{config_filename}'"
             return self
 
-        parser = ConfigParser(config_file)
-        parser.csv_rows_name = csv_rows_name
-        parser.fill_nan_with = fill_nan_with
-        parser.enable_fill_nan = enable_fill_nan
-        parser.parse()
-
-        if parser.error_message is None:
-            self._config_dict = parser.parsed_dict
+        parsed_dict: Optional[Dict[str, Any]]
+        parse_error_message: Optional[str]
+        if self._isolation is not None:
+            outcome: Final = self._isolation.parse(ingested, csv_rows_name, enable_fill_nan, fill_nan_with)
+            record_stage("parse", outcome.child_seconds)
+            record_stage("isolation_overhead", outcome.overhead_seconds)
+            parsed_dict, parse_error_message = outcome.parsed_dict, outcome.error_message
+        else:
+            with measure_stage("parse", chars_in=None if ingested.text is None else len(ingested.text)):
+                parser = ConfigParser(ingested)
+                parser.csv_rows_name = csv_rows_name
+                parser.fill_nan_with = fill_nan_with
+                parser.enable_fill_nan = enable_fill_nan
+                if csv_session is not None:
+                    parser.incremental_csv = csv_session
+                parser.parse()
+            parsed_dict, parse_error_message = parser.parsed_dict, parser.error_message
+
+        if parse_error_message is None:
+            self._config_dict = parsed_dict
+            # 同じ内容と読み込みオプションからは同じ設定辞書ができるため、applyのメモのキーに使う
+            self._config_key = content_key(
+                "\0".join(
+                    [ingested.content_hash, str(ingested.encoding), config_filename, csv_rows_name, str(enable_fill_nan), fill_nan_with]
+                ).encode()
+            )
             return self
 
-        self._config_error_message = f"{self._config_error_header}: {parser.error_message} in '{config_filename}'"
+        self._config_error_message = f"{self._config_error_header}: {parse_error_message} in '{config_filename}'"
         return self
 
-    def load_template_file(self: "AppCore", template_file: Optional[BytesIO], enable_auto_transcoding: bool) -> "AppCore":
+    @_instrumented("load_template_file")
+    def load_template_file(
+        self: "AppCore", template_file: Optional[SourceLike], enable_auto_transcoding: bool, source_name: Optional[str] = None
+    ) -> "AppCore":
         """Load jinja template file.
 
         Args:
-            template_file (Optional[BytesIO]): テンプレートファイルのバイナリデータ。
+            template_file (Optional[SourceLike]): テンプレートファイルのバイナリデータ。BytesIOのほか、ファイルパス、
+                mmap、memoryview、チャンク列、FileSourceを受け付ける。
             enable_auto_transcoding (bool): 自動トランスコーディングを有効にするかどうか。
+            source_name (Optional[str]): ファイル名(デフォルトはNone)。
 
         Returns:
             AppCore: 自身のインスタンス。
@@ -95,23 +272,110 @@ class AppCore(BaseModel):
         if template_file is None:
             return self
 
-        template_filename: Final[str] = template_file.name
-        if enable_auto_transcoding is True:
-            template_file = TextTranscoder(template_file).convert(is_allow_fallback=False)
+        # 同じインスタンスで読み込み直す場合に、前回のテンプレートとエラーを持ち越さない
+        self._render = None
+        self._template_error_message = None
+        self._template_ingested = None
+        self._template_key = None
 
-        if template_file is None:
+        try:
+            with measure_stage("validate_size") as open_sizes:
+                loaded_file: Final[Union[BytesIO, FileSource]] = _open_source(template_file, source_name, FileValidator.DEFAULT_MAX_SIZE)
+                open_sizes.bytes_out = loaded_file.size if isinstance(loaded_file, FileSource) else None
+        except FileSourceError as e:
+            self._template_error_message = f"{self._template_error_header}: {e} in '{resolve_source_name(template_file, source_name)}'"
+            return self
+
+        template_filename: Final[str] = loaded_file.name
+        try:
+            with measure_stage("ingest") as ingest_sizes:
+                ingested: Final[IngestedBlob] = ingest_upload(loaded_file, enable_auto_transcoding, self._detection_cache)
+                ingest_sizes.bytes_in = ingested.size
+                ingest_sizes.chars_out = None if ingested.text is None else len(ingested.text)
+        finally:
+            # 取り込み後はデコード済みの文字列を使うため、自身で開いたバッファはここで解放できる
+            _close_owned(template_file, loaded_file)
+
+        if enable_auto_transcoding is True and ingested.encoding is None:
             self._template_error_message = f"{self._template_error_header}: Failed auto decoding in '{template_filename}'"
             return self
 
-        render = DocumentRender(template_file)
+        with measure_stage("static_validation", chars_in=None if ingested.text is None else len(ingested.text)):
+            render = DocumentRender(ingested)
         if render.is_valid_template is False:
             self._template_error_message = f"{self._template_error_header}: {render.error_message} in '{template_filename}'"
 
         self._template_filename = template_filename
         self._render = render
+        # 隔離した適用では、子プロセスでテンプレートを読み込み直すために取り込み結果を渡す
+        self._template_ingested = ingested if self._isolation is not None else None
+        self._template_key = f"{ingested.content_hash}:{ingested.encoding}"
+
+        return self
+
+    def load_files(
+        self: "AppCore",
+        config_file: Optional[SourceLike],
+        template_file: Optional[SourceLike],
+        csv_rows_name: str,
+        enable_auto_transcoding: bool,
+        enable_fill_nan: bool = False,
+        fill_nan_with: str = "#",
+        csv_session: Optional[IncrementalCSVParser] = None,
+        config_source_name: Optional[str] = None,
+        template_source_name: Optional[str] = None,
+        executor: Optional[Executor] = None,
+    ) -> "AppCore":
+        """Load config file and jinja template file concurrently.
+
+        load_config_file と load_template_file を続けて呼んだ場合と同じ結果とエラーメッセージになる。
+        2つの読み込み [取り込み/パース/静的検証] は互いに独立しているため、テンプレートをスレッドで読み込み、
+        その間に呼び出し元のスレッドで設定ファイルを読み込む。GILを手放す処理 [ファイルの読み込み、ハッシュ、
+        隔離した子プロセスでのパース] が重なるため、所要時間は2つの合計ではなく長い方に近づく。
+        Pyodide と、メモリ確保のピークを計測する場合 [tracemalloc はプロセス全体で1つのため] は順に読み込む。
+
+        Args:
+            config_file (Optional[SourceLike]): 設定ファイル(load_config_file を参照)。
+            template_file (Optional[SourceLike]): テンプレートファイル(load_template_file を参照)。
+            csv_rows_name (str): CSVの行名。
+            enable_auto_transcoding (bool): 自動トランスコーディングを有効にするかどうか。
+            enable_fill_nan (bool): NaNを埋めるかどうか(デフォルトはFalse)
+            fill_nan_with (str): NaNを埋める際の文字列(デフォルトは"#")
+            csv_session (Optional[IncrementalCSVParser]): CSVの差分パースのセッション(デフォルトはNone)。
+            config_source_name (Optional[str]): 設定ファイルのファイル名(デフォルトはNone)。
+            template_source_name (Optional[str]): テンプレートファイルのファイル名(デフォルトはNone)。
+            executor (Optional[Executor]): テンプレートを読み込むエグゼキューター(デフォルトはNone)。
+                Noneの場合はモジュール共通のスレッドプールを使う。AppCore の状態を更新するため、スレッドプールに限る。
+
+        Returns:
+            AppCore: 自身のインスタンス。
+        """
+
+        if config_file is None or template_file is None or self._trace_allocations or sys.platform == "emscripten":
+            self.load_config_file(
+                config_file, csv_rows_name, enable_auto_transcoding, enable_fill_nan, fill_nan_with, csv_session, config_source_name
+            )
+            return self.load_template_file(template_file, enable_auto_transcoding, template_source_name)
 
+        template_loaded: Final[Future["AppCore"]] = (executor or _LOAD_EXECUTOR.get()).submit(
+            self.load_template_file, template_file, enable_auto_transcoding, template_source_name
+        )
+        try:
+            self.load_config_file(
+                config_file, csv_rows_name, enable_auto_transcoding, enable_fill_nan, fill_nan_with, csv_session, config_source_name
+            )
+        finally:
+            # 設定ファイルで例外が発生した場合も、テンプレートの読み込みが終わってから戻る [状態の更新を残さない]
+            wait([template_loaded])
+        template_loaded.result()
+
+        # 計測結果の順序を、続けて呼んだ場合と揃える
+        template_metrics: Final[Optional[PipelineMetrics]] = self._operation_metrics.pop("load_template_file", None)
+        if template_metrics is not None:
+            self._operation_metrics["load_template_file"] = template_metrics
         return self
 
+    @_instrumented("apply")
     def apply(self: "AppCore", format_type: int, is_strict_undefined: bool) -> "AppCore":
         """Apply context-dict for loaded template.
 
@@ -133,18 +397,81 @@ class AppCore(BaseModel):
         # Assign to a local variable after the None check for type refinement
         render_instance = self._render
 
-        if (
-            render_instance.apply_context(config_dict, format_type, is_strict_undefined) is False
-            and render_instance.error_message is not None
-        ):
-            self._template_error_message = f"{self._template_error_header}: {render_instance.error_message} in '{self._template_filename}'"
+        memo_key: Final[Optional[str]] = self._get_memo_key(format_type, is_strict_undefined)
+        entry: Optional[RenderMemoEntry] = None
+        if memo_key is not None and self._render_memo is not None:
+            with measure_stage("memo_lookup"):
+                entry = self._render_memo.get(memo_key)
+
+        if entry is None:
+            is_applied, render_content, raw_content, error_message, is_isolation_failure = self._apply_context(
+                render_instance, config_dict, format_type, is_strict_undefined
+            )
+            if is_applied is False:
+                if error_message is None:
+                    self._formatted_text = render_content
+                    self._template_error_message = None
+                    return self
+                entry = RenderMemoEntry(error_message=error_message)
+            else:
+                entry = RenderMemoEntry(raw_text=raw_content)
+                if render_content is not None:
+                    entry.formatted[format_type] = render_content
+            # 上限の超過は入力だけでは決まらない [負荷や上限の設定による] ため、メモしない
+            if memo_key is not None and self._render_memo is not None and not is_isolation_failure:
+                self._render_memo.put(memo_key, entry)
+
+        if entry.error_message is not None:
+            self._template_error_message = f"{self._template_error_header}: {entry.error_message} in '{self._template_filename}'"
             return self
 
-        self._formatted_text = render_instance.render_content
+        formatted_text: Optional[str] = entry.formatted.get(format_type)
+        if formatted_text is None and entry.raw_text is not None:
+            # フォーマットの種類だけが変わった場合は、レンダリングせずにフォーマットだけをやり直す
+            with measure_stage("format", chars_in=len(entry.raw_text)) as format_sizes:
+                formatted_text = ContentFormatter().format(entry.raw_text, format_type)
+                format_sizes.chars_out = len(formatted_text)
+            if memo_key is not None and self._render_memo is not None:
+                self._render_memo.put_formatted(memo_key, format_type, formatted_text)
+
+        self._formatted_text = formatted_text
         self._template_error_message = None
 
         return self
 
+    def _apply_context(
+        self: "AppCore", render: DocumentRender, config_dict: Dict[str, Any], format_type: int, is_strict_undefined: bool
+    ) -> Tuple[bool, Optional[str], Optional[str], Optional[str], bool]:
+        """テンプレートにコンテキストを適用する [隔離する場合は子プロセスで適用する]。
+
+        Returns:
+            Tuple[bool, Optional[str], Optional[str], Optional[str], bool]: 適用できたかどうか、フォーマット後の結果、
+                フォーマット前の結果、エラーメッセージ、上限の超過または子プロセスの異常終了で失敗したかどうか
+        """
+        if self._isolation is None or self._template_ingested is None:
+            # 並行する段階のメモリ確保のピークは区別できないため、計測する場合は投機しない
+            is_speculative: Final[bool] = self._speculative_render and not self._trace_allocations
+            is_applied: Final[bool] = render.apply_context(config_dict, format_type, is_strict_undefined, is_speculative=is_speculative)
+            return is_applied, render.render_content, render.raw_content, render.error_message, False
+
+        outcome: Final = self._isolation.render(self._template_ingested, config_dict, format_type, is_strict_undefined)
+        record_stage("render", outcome.child_seconds)
+        record_stage("isolation_overhead", outcome.overhead_seconds)
+        return outcome.is_applied, outcome.render_content, outcome.raw_content, outcome.error_message, outcome.is_isolation_failure
+
+    def _get_memo_key(self: "AppCore", format_type: int, is_strict_undefined: bool) -> Optional[str]:
+        """applyのメモのキーを返す。
+
+        Returns:
+            Optional[str]: メモのキー。設定辞書を直接設定した場合や、フォーマットの種類が範囲外で
+                検証エラーになる場合はNone [メモ化しない]。
+        """
+        if self._config_key is None or self._template_key is None:
+            return None
+        if type(format_type) is not int or not MIN_FORMAT_TYPE <= format_type <= MAX_FORMAT_TYPE or type(is_strict_undefined) is not bool:
+            return None
+        return render_memo_key(self._config_key, self._template_key, is_strict_undefined)
+
     def get_download_filename(
         self: "AppCore", filename: Optional[str], file_ext: Optional[str], is_append_timestamp: bool
     ) -> Optional[str]:
@@ -167,6 +494,7 @@ class AppCore(BaseModel):
 
         return f"{filename}{suffix}.{file_ext!s}"
 
+    @_instrumented("get_download_content")
     def get_download_content(self: "AppCore", encode: str) -> Optional[bytes]:
         """Get the content for download.
 
@@ -180,7 +508,39 @@ class AppCore(BaseModel):
             return None
 
         try:
-            return self._formatted_text.encode(encode)
+            with measure_stage("encode", chars_in=len(self._formatted_text)) as encode_sizes:
+                content: Final[bytes] = self._formatted_text.encode(encode)
+                encode_sizes.bytes_out = len(content)
+            return content
+        except LookupError:
+            return None
+
+    @_instrumented("write_download_content")
+    def write_download_content(
+        self: "AppCore", destination: DestinationLike, encode: str, errors: UnencodablePolicy = "strict"
+    ) -> Optional[int]:
+        """Write the content for download to a file or binary stream, chunk by chunk.
+
+        Args:
+            destination (DestinationLike): 書き出し先のファイルパス、またはバイナリストリーム。
+            encode (str): エンコーディング形式。
+            errors (UnencodablePolicy): 変換できない文字の扱い(デフォルトは"strict")。
+
+        Returns:
+            Optional[int]: 書き出したバイト数、またはNone [未レンダリング、またはエンコーディングが不明な場合]。
+
+        Raises:
+            EncodedWriteError: errorsが"strict"で、変換できない文字があった場合。
+        """
+        if self._formatted_text is None:
+            return None
+
+        try:
+            # エンコード後のバイト列全体を作らずに、チャンクごとに書き出す
+            with measure_stage("encode", chars_in=len(self._formatted_text)) as encode_sizes:
+                written: Final[int] = write_encoded(iter_text_chunks(self._formatted_text), destination, encode, errors)
+                encode_sizes.bytes_out = written
+            return written
         except LookupError:
             return None
 
@@ -201,6 +561,62 @@ class AppCore(BaseModel):
             config (Optional[Dict[str, Any]]): 設定辞書。
         """
         self._config_dict = config
+        self._config_debug_view = None
+        self._config_key = None
+
+    @property
+    def config_debug_view(self: "AppCore") -> Optional[ConfigDebugView]:
+        """Get the lazy debug view of the configuration dictionary.
+
+        Returns:
+            Optional[ConfigDebugView]: 設定辞書のデバッグ表示ビュー。設定が未ロードの場合はNone。
+        """
+        if self._config_dict is None:
+            return None
+
+        if self._config_debug_view is None:
+            self._config_debug_view = ConfigDebugView(self._config_dict)
+        return self._config_debug_view
+
+    @property
+    def config_fingerprint(self: "AppCore") -> Optional[str]:
+        """Get the fingerprint of the loaded configuration.
+
+        Returns:
+            Optional[str]: 設定ファイルの内容ハッシュと読み込みオプションから求めたキー、
+                または未読み込みか辞書を直接設定した場合はNone。
+        """
+        return self._config_key
+
+    @property
+    def template_fingerprint(self: "AppCore") -> Optional[str]:
+        """Get the fingerprint of the loaded template.
+
+        Returns:
+            Optional[str]: テンプレートの内容ハッシュとエンコーディング、または未読み込みの場合はNone。
+        """
+        return self._template_key
+
+    @property
+    def metrics(self: "AppCore") -> PipelineMetrics:
+        """Get the per-stage metrics of the last call of each operation.
+
+        Returns:
+            PipelineMetrics: 操作ごとに最後の呼び出しの段階の計測結果 [操作を呼んだ順]。
+        """
+        return PipelineMetrics(stages=[metric for metrics in self._operation_metrics.values() for metric in metrics.stages])
+
+    def operation_metrics(self: "AppCore", operation: str) -> Optional[PipelineMetrics]:
+        """Get the per-stage metrics of the last call of an operation.
+
+        Args:
+            operation (str): 操作名 ("load_config_file"、"load_template_file"、"apply"、"get_download_content"、
+                "write_download_content")。
+
+        Returns:
+            Optional[PipelineMetrics]: 段階の計測結果、または未実行の場合はNone。
+        """
+        return self._operation_metrics.get(operation)
 
     @property
     def formatted_text(self: "AppCore") -> Optional[str]:
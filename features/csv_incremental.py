@@ -0,0 +1,298 @@
+"""ライブプレビュー向けに、CSVを差分だけ再パースするモジュール。
+
+エディタで大きなCSVの1行だけを編集した場合でも、ConfigParserは通常ファイル全体を
+`read_csv_table` と `build_csv_row` に通し直します。このモジュールは前回のパース結果と
+レコード開始位置の索引を保持し、新しい版のテキストとの差分に該当するレコードだけを
+再トークン化して、行リストに差し込みます。
+
+主な機能:
+- 差分検出: 前回のテキストとの共通接頭辞/共通接尾辞をブロック単位の比較で求めます。
+- クォート対応のレコード境界: クォート内の改行 [複数行フィールド] をレコード境界とみなしません。
+- 再同期: 変更範囲の後ろで、新旧のレコード境界が一致した時点で走査を打ち切り、
+  以降の行は前回の結果を再利用します。クォートの開閉が変わった場合は一致するまで走査を続けます。
+- 同一結果の保証: ヘッダの変更、補完値/バックエンドの変更、エラーを含む入力は
+  全体パースに切り替え、全体パースと同じ結果・同じ例外文言を返します。
+
+計算量:
+トークン化・型推論・行辞書の生成は変更範囲のレコード数に比例します。
+差分検出 [memcmp] と行リストの差し込み、後続レコードの開始位置のずらしのみがファイル長に比例します。
+
+典型的な使用方法:
+```python
+session = IncrementalCSVParser()
+rows = session.parse(text, fill_value=None)          # 初回は全体パース
+rows = session.parse(edited_text, fill_value=None)   # 2回目以降は差分だけ再パース
+session.reparsed_record_count                         # 直前に再トークン化したレコード数
+```
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Final, List, Optional, Pattern, Tuple, cast
+
+from pydantic import BaseModel, PrivateAttr
+
+from .config_parser import CSVData, build_csv_row, read_csv_table
+from .parser_backends import PARSER_BACKENDS
+
+# クォート外でレコードの走査に影響する文字 [区切り文字はクォートの開始判定で直前の1文字だけを見る]
+_RECORD_TOKEN: Final[Pattern[str]] = re.compile(r'["\r\n]')
+
+# 共通接頭辞/接尾辞の比較単位 [文字数]
+_COMPARE_BLOCK_SIZE: Final[int] = 64 * 1024
+
+
+def _next_record_start(text: str, start: int) -> int:
+    """start から始まる1レコードを走査し、次のレコードの開始位置を返す。
+
+    stdlib csv [excel方言] と同じく、クォートはフィールド先頭でのみ開始し、
+    クォート内の改行はフィールドの一部として扱う。`\\r\\n` は1つの改行とみなす。
+
+    Returns:
+        int: 次のレコードの開始位置 [クォート途中で終端した場合、境界を決められない場合は -1]
+    """
+    position: int = start
+    while True:
+        match = _RECORD_TOKEN.search(text, position)
+        if match is None:
+            return len(text)
+
+        index: int = match.start()
+        if match.group() == "\n":
+            return index + 1
+        if match.group() == "\r":
+            if text.startswith("\r\n", index):
+                return index + 2
+            # クォート外の単独の \r は stdlib csv では末尾以外エラーになるため、境界を決めずに全体パースに委ねる
+            return len(text) if index + 1 == len(text) else -1
+        if index != start and text[index - 1] != ",":
+            # フィールド途中のクォートはリテラル文字
+            position = index + 1
+            continue
+
+        # クォート内: 連続する "" はエスケープ、単独の " で閉じる
+        position = index + 1
+        while True:
+            quote = text.find('"', position)
+            if quote == -1:
+                return -1
+            if not text.startswith('"', quote + 1):
+                position = quote + 1
+                break
+            position = quote + 2
+
+
+def _index_records(text: str) -> Optional[List[int]]:
+    """空でないレコードの開始位置を返す [境界を決められない場合は None]。"""
+    starts: Final[List[int]] = []
+    position: int = 0
+    while position < len(text):
+        next_start = _next_record_start(text, position)
+        if next_start == -1:
+            return None
+        if text[position] not in "\r\n":
+            starts.append(position)
+        position = next_start
+    return starts
+
+
+def _common_prefix_length(old: str, new: str) -> int:
+    """2つのテキストの共通接頭辞の長さを、ブロック単位の比較で求める。"""
+    limit: Final[int] = min(len(old), len(new))
+    position: int = 0
+    while position < limit:
+        end = min(position + _COMPARE_BLOCK_SIZE, limit)
+        if old[position:end] != new[position:end]:
+            while old[position] == new[position]:
+                position += 1
+            return position
+        position = end
+    return limit
+
+
+def _common_suffix_length(old: str, new: str, limit: int) -> int:
+    """2つのテキストの共通接尾辞の長さを、limit を上限にブロック単位の比較で求める。"""
+    length: int = 0
+    while length < limit:
+        end = min(length + _COMPARE_BLOCK_SIZE, limit)
+        if old[len(old) - end : len(old) - length] != new[len(new) - end : len(new) - length]:
+            while old[len(old) - length - 1] == new[len(new) - length - 1]:
+                length += 1
+            return length
+        length = end
+    return limit
+
+
+def _copy_rows(rows: CSVData) -> CSVData:
+    """保持している行を、呼び出し側に渡すために行辞書ごとコピーする [次回の差分パースに変更を持ち込まない]。"""
+    return [dict(row) for row in rows]
+
+
+class IncrementalCSVParser(BaseModel):
+    """前回のパース結果を保持し、編集後のCSVを差分だけ再パースするクラス。
+
+    保持する状態は最後に成功したパースのものだけです。エラーになった版は状態を更新しないため、
+    次の版は最後に成功した版との差分として再パースされます。
+
+    Properties:
+        reparsed_record_count: 直前のparseで再トークン化したレコード数 [ヘッダを含む]
+        is_last_parse_incremental: 直前のparseが差分パースだったかどうか
+    """
+
+    _text: Optional[str] = PrivateAttr(default=None)
+    _starts: List[int] = PrivateAttr(default_factory=list)
+    _header: List[str] = PrivateAttr(default_factory=list)
+    _rows: CSVData = PrivateAttr(default_factory=list)
+    _fill_value: Optional[str] = PrivateAttr(default=None)
+    _backend_name: Optional[str] = PrivateAttr(default=None)
+    _reparsed_record_count: int = PrivateAttr(default=0)
+    _is_last_parse_incremental: bool = PrivateAttr(default=False)
+
+    def parse(self, config_data: str, fill_value: Optional[str], backend_name: Optional[str] = None) -> CSVData:
+        """CSVテキストを行辞書のリストにパースする。
+
+        結果は `ConfigParser` の全体パースと同一です。
+
+        Args:
+            config_data: CSVテキスト
+            fill_value: 空セルの補完値 [Noneの場合は float('nan')]
+            backend_name: 固定するCSVバックエンド名 [Noneの場合は自動選択]
+
+        Returns:
+            CSVData: データ行の辞書のリスト [呼び出し側が変更しても内部状態に影響しない]
+
+        Raises:
+            ValueError: 全体パースと同じ条件で送出
+        """
+        if self._text is not None and fill_value == self._fill_value and backend_name == self._backend_name:
+            rows: Optional[CSVData] = self._parse_incremental(config_data)
+            if rows is not None:
+                self._is_last_parse_incremental = True
+                return _copy_rows(rows)
+
+        self._is_last_parse_incremental = False
+        return _copy_rows(self._parse_full(config_data, fill_value, backend_name))
+
+    def reset(self) -> None:
+        """保持しているパース結果を破棄する [次のparseは全体パースになる]。"""
+        self._text = None
+        self._starts = []
+        self._header = []
+        self._rows = []
+
+    @property
+    def reparsed_record_count(self) -> int:
+        """直前のparseで再トークン化したレコード数を返す。"""
+        return self._reparsed_record_count
+
+    @property
+    def is_last_parse_incremental(self) -> bool:
+        """直前のparseが差分パースだったかどうかを返す。"""
+        return self._is_last_parse_incremental
+
+    def _parse_full(self, config_data: str, fill_value: Optional[str], backend_name: Optional[str]) -> CSVData:
+        """ファイル全体をパースし、成功した場合は索引を作り直す。"""
+        header, body = read_csv_table(config_data, backend_name)
+        rows: Final[CSVData] = [build_csv_row(header, raw_row, index, fill_value) for index, raw_row in enumerate(body)]
+        self._reparsed_record_count = len(body) + 1
+
+        starts: Final[Optional[List[int]]] = _index_records(config_data)
+        if starts is None or len(starts) != len(rows) + 1:
+            # 索引が行と対応しない入力 [stdlib csv と境界判定が異なる特殊な改行など] は差分パースの対象外
+            self.reset()
+            return rows
+
+        self._text = config_data
+        self._starts = starts
+        self._header = header
+        self._rows = rows
+        self._fill_value = fill_value
+        self._backend_name = backend_name
+        return rows
+
+    def _parse_incremental(self, config_data: str) -> Optional[CSVData]:
+        """前回のテキストとの差分に該当するレコードだけを再パースする。
+
+        Returns:
+            Optional[CSVData]: 差し込み後の行 [全体パースが必要な場合はNone]
+        """
+        old_text: Final[str] = cast("str", self._text)
+        if config_data == old_text:
+            self._reparsed_record_count = 0
+            return self._rows
+
+        prefix: Final[int] = _common_prefix_length(old_text, config_data)
+        suffix: Final[int] = _common_suffix_length(old_text, config_data, min(len(old_text), len(config_data)) - prefix)
+        new_change_end: Final[int] = len(config_data) - suffix
+        if "\x00" in config_data[prefix:new_change_end]:
+            return None
+
+        region: Final[Optional[Tuple[int, int, List[int], int, int]]] = self._scan_region(config_data, prefix, new_change_end)
+        if region is None:
+            return None
+        first, last, region_starts, region_start, region_end = region
+        return self._splice(config_data, first, last, region_starts, config_data[region_start:region_end])
+
+    def _scan_region(self, config_data: str, prefix: int, new_change_end: int) -> Optional[Tuple[int, int, List[int], int, int]]:
+        """変更範囲を含むレコードを走査し、旧レコードとの境界が一致するまでの範囲を求める。
+
+        Returns:
+            Optional[Tuple[int, int, List[int], int, int]]: (置き換える旧レコードの開始番号, 終了番号 [排他],
+                新しいテキストでの空でないレコードの開始位置, 走査の開始位置, 走査の終端位置)
+                [境界を決められない場合はNone]
+        """
+        delta: Final[int] = len(config_data) - len(cast("str", self._text))
+        # 変更位置の直前の文字を含むレコードから走査する [直前のレコードの改行が変わる場合に備える]
+        first: Final[int] = max(bisect_right(self._starts, prefix - 1) - 1, 0)
+        region_starts: Final[List[int]] = []
+        # ヘッダから走査する場合は、ヘッダより前の空行の変更も含めるためテキストの先頭から走査する
+        region_start: Final[int] = 0 if first == 0 else self._starts[first]
+        position: int = region_start
+        while True:
+            if position >= new_change_end:
+                # 変更範囲より後ろで、旧テキストのレコード境界と一致すれば以降は前回と同一
+                old_position = position - delta
+                last = bisect_left(self._starts, old_position)
+                if last < len(self._starts) and self._starts[last] == old_position:
+                    return first, last, region_starts, region_start, position
+                if position == len(config_data):
+                    return first, len(self._starts), region_starts, region_start, position
+
+            next_start = _next_record_start(config_data, position)
+            if next_start == -1:
+                return None
+            if config_data[position] not in "\r\n":
+                region_starts.append(position)
+            position = next_start
+
+    def _splice(self, config_data: str, first: int, last: int, region_starts: List[int], region_text: str) -> Optional[CSVData]:
+        """再パースしたレコードを行リストと索引に差し込む。
+
+        Returns:
+            Optional[CSVData]: 差し込み後の行 [全体パースが必要な場合はNone]
+        """
+        raw_rows: Final[List[List[str]]] = cast("List[List[str]]", PARSER_BACKENDS.loads("csv", region_text, self._backend_name))
+        if len(raw_rows) != len(region_starts):
+            return None
+
+        body_start: int = first - 1
+        if first == 0:
+            # ヘッダは全行の列名を決めるため、変わった場合 [旧ヘッダがデータ行になる場合を含む] は全体パースで作り直す
+            if last == 0 or not raw_rows or raw_rows[0] != self._header:
+                return None
+            raw_rows.pop(0)
+            body_start = 0
+
+        region_rows: Final[CSVData] = [
+            build_csv_row(self._header, raw_row, body_start + offset, self._fill_value) for offset, raw_row in enumerate(raw_rows)
+        ]
+        body_count: Final[int] = len(self._rows) - (last - 1 - body_start) + len(region_rows)
+        if body_count == 0:
+            raise ValueError("CSV file must contain at least one data row.")
+
+        delta: Final[int] = len(config_data) - len(cast("str", self._text))
+        self._rows[body_start : last - 1] = region_rows
+        self._starts[first:] = [*region_starts, *map(delta.__add__, self._starts[last:])]
+        self._text = config_data
+        self._reparsed_record_count = len(region_starts)
+        return self._rows
@@ -0,0 +1,167 @@
+"""エンコーディング検出結果を、入力の内容ハッシュで再利用するキャッシュモジュール。
+
+ライブプレビューは、変更のない設定ファイル/テンプレートを何度も送り直します。
+`TextTranscoder` はそのたびにバイナリ判定とエンコーディング検出をやり直し、UTF-8への変換も
+繰り返します。このモジュールは、入力の内容ハッシュをキーに次の値を保持します。
+
+- 検出したエンコーディング名
+- バイナリ判定の結果
+- UTF-8へ変換済みのバイト列 [任意。合計サイズの上限内でのみ保持]
+
+設定ファイルとテンプレートは同じキャッシュを共有します。キャッシュはモジュール共通の
+`DETECTION_CACHE` として、AppCoreのインスタンスをまたいで保持されます
+[AppCore.load_files は2つの入力を並行して読み込むため、参照と更新はスレッドセーフです]。
+
+典型的な使用方法:
+```python
+cache = DetectionCache(max_entries=32, max_buffer_bytes=64 * 1024 * 1024)
+transcoder = TextTranscoder(import_file, detection_cache=cache)
+transcoder.convert()  # 同じ内容の2回目以降は検出と変換を省略
+```
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Annotated, Final, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .file_source import BufferLike
+
+# 内容ハッシュのダイジェスト長 [バイト]
+_DIGEST_SIZE: Final[int] = 16
+
+
+def content_key(data: BufferLike) -> str:
+    """入力の内容からキャッシュのキーを生成する [コピーせずにハッシュする]。
+
+    Args:
+        data: 入力のバッファ
+
+    Returns:
+        str: 内容のハッシュ値 [16進数]
+    """
+    hasher: Final["hashlib.blake2b"] = new_content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def new_content_hasher() -> "hashlib.blake2b":
+    """content_key と同じハッシュ値をチャンク単位で計算するハッシュオブジェクトを返す。
+
+    Returns:
+        hashlib.blake2b: update で入力を与え、hexdigest でキーを得るハッシュオブジェクト
+    """
+    return hashlib.blake2b(digest_size=_DIGEST_SIZE)
+
+
+class DetectionCacheEntry(BaseModel):
+    """1つの入力に対する検出結果。
+
+    Attributes:
+        encoding: 検出したエンコーディング名 [バイナリ、または検出できない場合はNone]
+        is_binary: バイナリデータと判定したかどうか
+        utf8_buffer: UTF-8へ変換済みのバイト列 [保持していない場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    encoding: Optional[str]
+    is_binary: bool
+    utf8_buffer: Optional[bytes] = None
+
+
+class DetectionCache(BaseModel):
+    """内容ハッシュをキーに検出結果を保持する、件数とバッファサイズに上限のあるLRUキャッシュ。
+
+    Attributes:
+        max_entries: 保持する最大件数
+        max_buffer_bytes: 保持するUTF-8変換済みバイト列の合計の上限 [0の場合は保持しない]
+
+    Properties:
+        hits: キャッシュから結果を返した回数
+        misses: キャッシュに結果がなかった回数
+    """
+
+    max_entries: Annotated[int, Field(gt=0)] = 32
+    max_buffer_bytes: Annotated[int, Field(ge=0)] = 64 * 1024 * 1024
+
+    _entries: "OrderedDict[str, DetectionCacheEntry]" = PrivateAttr(default_factory=OrderedDict)
+    _buffer_bytes: int = PrivateAttr(default=0)
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def get(self, key: str) -> Optional[DetectionCacheEntry]:
+        """キーに対応する検出結果を返す。
+
+        Args:
+            key: content_key で生成したキー
+
+        Returns:
+            Optional[DetectionCacheEntry]: 検出結果 [キャッシュにない場合はNone]
+        """
+        with self._lock:
+            entry: Final[Optional[DetectionCacheEntry]] = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: DetectionCacheEntry) -> None:
+        """検出結果を保存する。
+
+        UTF-8変換済みのバイト列が上限を超える場合はバイト列を除いて保存し、
+        合計の上限を超えた場合は古い結果から破棄します。
+
+        Args:
+            key: content_key で生成したキー
+            entry: 保存する検出結果
+        """
+        stored: DetectionCacheEntry = entry
+        if entry.utf8_buffer is not None and len(entry.utf8_buffer) > self.max_buffer_bytes:
+            stored = entry.model_copy(update={"utf8_buffer": None})
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = stored
+            self._buffer_bytes += _buffer_size(stored)
+            while len(self._entries) > self.max_entries or self._buffer_bytes > self.max_buffer_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """保持している結果をすべて破棄する。"""
+        with self._lock:
+            self._entries.clear()
+            self._buffer_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        """キャッシュから結果を返した回数を返す。"""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """キャッシュに結果がなかった回数を返す。"""
+        return self._misses
+
+    def _remove(self, key: str) -> None:
+        """キーの結果を破棄し、バッファの合計サイズから差し引く。"""
+        removed: Final[Optional[DetectionCacheEntry]] = self._entries.pop(key, None)
+        if removed is not None:
+            self._buffer_bytes -= _buffer_size(removed)
+
+
+def _buffer_size(entry: DetectionCacheEntry) -> int:
+    """検出結果が保持するUTF-8変換済みバイト列のサイズを返す。"""
+    return 0 if entry.utf8_buffer is None else len(entry.utf8_buffer)
+
+
+DETECTION_CACHE: Final[DetectionCache] = DetectionCache()
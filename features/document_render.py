@@ -5,6 +5,7 @@
 - テンプレートファイルの構文とセキュリティの検証
 - コンテキストデータの適用とレンダリング
 - レンダリング結果のフォーマット処理
+- 投機的なレンダリング: 実行時の検証と並行してレンダリングを始め、検証に失敗した場合は結果を捨てる
 
 クラス階層:
 - ValidationModels: バリデーションモデル
@@ -71,6 +72,10 @@ with open('template.txt', 'rb') as f:
 ```
 """
 
+import sys
+import threading
+import time
+from contextvars import ContextVar
 from datetime import datetime
 from decimal import Decimal
 from functools import wraps
@@ -84,6 +89,8 @@ from typing import (
     Final,
     List,
     Optional,
+    Tuple,
+    Type,
     TypeAlias,
     TypeVar,
     Union,
@@ -95,6 +102,10 @@ from jinja2.runtime import StrictUndefined, Undefined
 from jinja2.sandbox import SandboxedEnvironment
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError
 
+from .file_source import FileSource
+from .ingestion import IngestedBlob
+from .pipeline_metrics import measure_stage, record_stage
+from .template_profiler import TemplateProfile, profile_render
 from .validate_template import TemplateSecurityValidator, ValidationState
 from .validate_uploaded_file import FileSizeConfig, FileValidator
 
@@ -226,6 +237,103 @@ OperandType = Union[str, int, float, bool, Undefined, CustomUndefined]
 # ---------------------------------------------------------------------------
 
 
+class _RenderStoppedError(Exception):
+    """ガバナーの指示でレンダリングを中断したことを表す例外 [投機的なレンダリングの結果は捨てる]。"""
+
+
+# 実行中のレンダリングを止めるためのイベント [投機的なレンダリングのスレッドでのみ設定する]
+_RENDER_STOP: Final[ContextVar[Optional[threading.Event]]] = ContextVar("render_stop", default=None)
+
+# 中断を指示した後に、投機的なレンダリングのスレッドの終了を待つ秒数
+_SPECULATIVE_STOP_JOIN_SECONDS: Final[float] = 0.1
+
+
+def _check_render_stop() -> None:
+    """ガバナーが停止を指示していれば、レンダリングを中断する。"""
+    stop: Final[Optional[threading.Event]] = _RENDER_STOP.get()
+    if stop is not None and stop.is_set():
+        raise _RenderStoppedError
+
+
+class _GovernedEnvironment(SandboxedEnvironment):
+    """関数の呼び出しと属性/要素の参照のたびに、ガバナーの停止の指示を確認するサンドボックス環境。
+
+    ループの反復や式の評価はこれらを経由するため、投機的なレンダリングを途中で止められます
+    [投機的なレンダリングでのみ使い、通常のレンダリングは SandboxedEnvironment のままにします]。
+    """
+
+    def call(__self, __context: jinja2.runtime.Context, __obj: Any, *args: Any, **kwargs: Any) -> Any:  # noqa: N805, ANN401
+        _check_render_stop()
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def getattr(self, obj: Any, attribute: str) -> Union[Any, Undefined]:  # noqa: ANN401
+        _check_render_stop()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj: Any, argument: Union[str, Any]) -> Union[Any, Undefined]:  # noqa: ANN401
+        _check_render_stop()
+        return super().getitem(obj, argument)
+
+
+class _SpeculativeRender:
+    """実行時の検証と並行して、別のスレッドで進めるレンダリング。
+
+    結果と例外はスレッドの中で保持し、呼び出し元が検証を終えてから受け取ります
+    [検証状態などの DocumentRender の状態は更新しません]。出力の断片ごとと、_GovernedEnvironment の
+    確認点で停止の指示を確認するため、stop の後は次の確認点で中断します。
+    """
+
+    def __init__(self, template: Template, context: Dict[str, Any]) -> None:
+        self.elapsed_seconds: float = 0.0
+        self._stop: Final[threading.Event] = threading.Event()
+        self._rendered: str = ""
+        self._error: Optional[Exception] = None
+        self._thread: Final[threading.Thread] = threading.Thread(
+            target=self._run, args=(template, context), name="speculative-render", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, template: Template, context: Dict[str, Any]) -> None:
+        token: Final = _RENDER_STOP.set(self._stop)
+        started: Final[float] = time.perf_counter()
+        try:
+            chunks: Final[List[str]] = []
+            for chunk in template.generate(**context):
+                if self._stop.is_set():
+                    raise _RenderStoppedError
+                chunks.append(chunk)
+            self._rendered = "".join(chunks)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.elapsed_seconds = time.perf_counter() - started
+            _RENDER_STOP.reset(token)
+
+    def stop(self, timeout: float = _SPECULATIVE_STOP_JOIN_SECONDS) -> None:
+        """レンダリングの中断を指示し、スレッドの終了を短い時間だけ待つ。
+
+        確認点は Python のコードにしかないため、C で実装された処理 [巨大な文字列の連結や
+        正規表現など] の途中では中断できません。待ち時間を過ぎたスレッドはデーモンとして
+        残り、その処理が終わった後の確認点で終了します [結果は捨てる]。
+
+        Args:
+            timeout: スレッドの終了を待つ最大の秒数
+        """
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def result(self) -> str:
+        """レンダリングの終了を待って結果を返す。
+
+        Raises:
+            Exception: レンダリング中に発生した例外
+        """
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._rendered
+
+
 class FormatConfig(BaseModel):
     """フォーマット設定のバリデーションモデル。"""
 
@@ -347,6 +455,8 @@ class DocumentRender(BaseModel):
         is_valid_template: テンプレートが有効かどうか
         error_message: エラーメッセージ (エラーがない場合はNone)
         render_content: レンダリング結果 (レンダリングが行われていない場合はNone)
+        raw_content: フォーマット前のレンダリング結果 (レンダリングが行われていない場合はNone)
+        render_profile: 行単位のプロファイル (プロファイルを有効にしてレンダリングしていない場合はNone)
 
     エラー処理:
     - ValidationError: 入力値の検証エラー
@@ -361,18 +471,24 @@ class DocumentRender(BaseModel):
     _ast: Optional[nodes.Template] = PrivateAttr(default=None)
     _file_validator = FileValidator(size_config=FileSizeConfig(max_size_bytes=MAX_FILE_SIZE_BYTES))
     _formatter = ContentFormatter()
+    _is_profiling: bool = PrivateAttr(default=False)
     _is_strict_undefined: bool = PrivateAttr(default=True)
+    _raw_content: Optional[str] = PrivateAttr(default=None)
     _render_content: Optional[str] = PrivateAttr(default=None)
+    _render_profile: Optional[TemplateProfile] = PrivateAttr(default=None)
     _template_content: Optional[str] = PrivateAttr(default=None)
-    _template_file: Optional[BytesIO] = PrivateAttr(default=None)
+    _template_file: Optional[Union[BytesIO, FileSource, IngestedBlob]] = PrivateAttr(default=None)
+    # 未定義変数の扱いと停止の確認の有無ごとにコンパイル済みのテンプレートを保持し、同じインスタンスへの再適用ではコンパイルを省略する
+    _templates: Dict[Tuple[bool, bool], Template] = PrivateAttr(default_factory=dict)
     _security_validator = TemplateSecurityValidator(max_file_size_bytes=MAX_FILE_SIZE_BYTES, max_memory_size_bytes=MAX_MEMORY_SIZE_BYTES)
     _validation_state = ValidationState()
 
-    def __init__(self, template_file: BytesIO) -> None:
+    def __init__(self, template_file: Union[BytesIO, FileSource, IngestedBlob]) -> None:
         """DocumentRenderインスタンスを初期化する。
 
         Args:
-            template_file: テンプレートファイル (BytesIO)
+            template_file: テンプレートファイル (BytesIO、FileSource、または取り込み済みの IngestedBlob)
+                IngestedBlobの場合は、NULバイトの検査とデコードを取り込み時の結果で済ませる。
 
         Note:
             初期検証に失敗した場合、エラー状態を保持します。
@@ -418,12 +534,31 @@ class DocumentRender(BaseModel):
         """
         return self._render_content
 
+    @property
+    def raw_content(self) -> Optional[str]:
+        """フォーマット前のレンダリング結果を返す。
+
+        Returns:
+            Optional[str]: フォーマット前のレンダリング結果 (レンダリングが行われていない場合はNone)
+        """
+        return self._raw_content
+
+    @property
+    def render_profile(self) -> Optional[TemplateProfile]:
+        """直前のレンダリングの行単位のプロファイルを返す。
+
+        Returns:
+            Optional[TemplateProfile]: プロファイル (プロファイルを有効にしてレンダリングしていない場合はNone)
+        """
+        return self._render_profile
+
     def _handle_rendering_error(self, e: Exception) -> bool:
         """レンダリングエラーを処理する。
 
         発生した例外の種類に応じて適切なエラーメッセージを設定します。
         - Jinja2の未定義変数エラー
         - Jinja2のテンプレートエラー
+        - メモリ不足 [例外のメッセージが空のため、理由を補う]
         - その他の例外
 
         Args:
@@ -434,6 +569,8 @@ class DocumentRender(BaseModel):
         """
         if isinstance(e, jinja2.UndefinedError):
             self._validation_state.set_error(f"Template runtime error: {e!s}")
+        elif isinstance(e, MemoryError):
+            self._validation_state.set_error("Template runtime error: Memory exhausted while rendering")
         else:
             self._validation_state.set_error(f"Template runtime error: {e!s}")
         return False
@@ -474,20 +611,42 @@ class DocumentRender(BaseModel):
             Optional[str]: レンダリング結果 (エラー時はNone)
         """
         try:
-            env: SandboxedEnvironment = self._create_environment()
-            template: Template = env.from_string(template_content)
+            template: Final[Template] = self._compiled_template(template_content)
+            if self._is_profiling:
+                rendered, self._render_profile = profile_render(template, context, template_content)
+                return rendered
             return template.render(**context)
         except Exception as e:
             self._handle_rendering_error(e)
             return None
 
-    def apply_context(self, context: Dict[str, Any], format_type: int, is_strict_undefined: bool = True) -> bool:
+    def _compiled_template(self, template_content: str, is_governed: bool = False) -> Template:
+        """未定義変数の扱いと停止の確認の有無に応じたコンパイル済みのテンプレートを返す [初回のみコンパイルする]。"""
+        key: Final[Tuple[bool, bool]] = (self._is_strict_undefined, is_governed)
+        template: Optional[Template] = self._templates.get(key)
+        if template is None:
+            template = self._create_environment(is_governed).from_string(template_content)
+            self._templates[key] = template
+        return template
+
+    def apply_context(
+        self,
+        context: Dict[str, Any],
+        format_type: int,
+        is_strict_undefined: bool = True,
+        is_profiling: bool = False,
+        is_speculative: bool = False,
+    ) -> bool:
         """テンプレートにコンテキストを適用する。
 
         Args:
             context: テンプレートに適用するコンテキスト
             format_type: フォーマットタイプ (0-4の整数)
             is_strict_undefined: 未定義変数を厳密にチェックするかどうか
+            is_profiling: 行単位のプロファイルを記録するかどうか (render_profile で参照する。通常より遅くなる)
+            is_speculative: 実行時の検証と並行して、別のスレッドでレンダリングを始めるかどうか
+                (検証に失敗した場合はレンダリングを中断して結果を捨てる。結果とエラーメッセージは
+                順に処理する場合と同じ。プロファイルする場合と Pyodide では順に処理する)
 
         Returns:
             bool: コンテキストの適用が成功したかどうか
@@ -500,26 +659,45 @@ class DocumentRender(BaseModel):
             4. レンダリング処理
             5. メモリ使用量の検証
             6. フォーマット処理
-        """
-        if not self._validation_state.is_valid:
-            return False
 
+            読み込み時の検証に失敗したテンプレートには適用できません。前回の適用が実行時エラーで
+            失敗した場合でも、別のコンテキストで再度適用できます [検証状態は適用のたびに作り直す]。
+        """
         template_content = self._template_content
         if template_content is None:
             return False
 
-        config: Optional[ContextConfig] = self._prepare_context_config(context, format_type, is_strict_undefined)
-        if config is None or not self._validation_state.is_valid:
-            return False
-
-        rendered_content: Optional[str] = self._process_template(config, template_content)
+        self._is_profiling = is_profiling
+        self._render_profile = None
+        config: Optional[ContextConfig] = None
+        rendered_content: Optional[str] = None
+        if is_speculative and not is_profiling and sys.platform != "emscripten":
+            config = self._validate_input_config(context, format_type, is_strict_undefined)
+            if config is None or self._ast is None:
+                return False
+            rendered_content = self._render_speculatively(config, self._ast, template_content)
+        else:
+            # 段階ごとの計測 [AppCoreの操作の中で呼ばれた場合のみ記録される]
+            with measure_stage("runtime_validation"):
+                config = self._prepare_context_config(context, format_type, is_strict_undefined)
+            if config is None or not self._validation_state.is_valid:
+                return False
+
+            with measure_stage("render") as render_sizes:
+                rendered_content = self._process_template(config, template_content)
+                render_sizes.chars_out = None if rendered_content is None else len(rendered_content)
         if rendered_content is None or not self._validation_state.is_valid:
             return False
 
-        if not self._validate_memory_usage(rendered_content):
+        with measure_stage("memory_validation", chars_in=len(rendered_content)):
+            is_within_limit: Final[bool] = self._validate_memory_usage(rendered_content)
+        if not is_within_limit:
             return False
 
-        self._render_content = self._formatter.format(rendered_content, config.format_config.format_type)
+        self._raw_content = rendered_content
+        with measure_stage("format", chars_in=len(rendered_content)) as format_sizes:
+            self._render_content = self._formatter.format(rendered_content, config.format_config.format_type)
+            format_sizes.chars_out = len(self._render_content)
         return True
 
     def _prepare_context_config(self, context: Dict[str, Any], format_type: int, is_strict_undefined: bool) -> Optional[ContextConfig]:
@@ -542,6 +720,53 @@ class DocumentRender(BaseModel):
 
         return config
 
+    def _render_speculatively(self, config: ContextConfig, ast: nodes.Template, template_content: str) -> Optional[str]:
+        """実行時の検証と並行してレンダリングし、検証に失敗した場合は中断して結果を捨てる。
+
+        エラーの優先順位は順に処理する場合と同じです [検証のエラー、コンパイル/レンダリングのエラーの順]。
+
+        Args:
+            config: 入力の検証済みの設定
+            ast: テンプレートのAST
+            template_content: テンプレートの内容
+
+        Returns:
+            Optional[str]: レンダリング結果 (検証またはレンダリングに失敗した場合はNone)
+        """
+        self._is_strict_undefined = config.format_config.is_strict_undefined
+        try:
+            template: Final[Template] = self._compiled_template(template_content, is_governed=True)
+        except Exception as e:
+            # コンパイルできない場合は投機せず、検証に成功した場合にだけエラーにする
+            if self._validate_runtime_security(ast, config.context):
+                self._handle_rendering_error(e)
+            return None
+
+        speculation: Final[_SpeculativeRender] = _SpeculativeRender(template, config.context)
+        if not self._validate_runtime_security(ast, config.context):
+            # ガバナー: 次の確認点で中断させ、終了は短い時間だけ待つ
+            speculation.stop()
+            return None
+
+        try:
+            return speculation.result()
+        except Exception as e:
+            self._handle_rendering_error(e)
+            return None
+        finally:
+            # 検証と重なった時間を含む、レンダリングのスレッドでの経過時間
+            record_stage("render", speculation.elapsed_seconds)
+
+    def _validate_runtime_security(self, ast: nodes.Template, context: Dict[str, Any]) -> bool:
+        """実行時の検証を計測しながら実行し、検証状態を更新する。
+
+        Returns:
+            bool: 検証に成功したかどうか
+        """
+        with measure_stage("runtime_validation"):
+            self._validation_state = self._security_validator.validate_runtime_security(ast, context)
+        return self._validation_state.is_valid
+
     def _process_template(self, config: ContextConfig, template_content: str) -> Optional[str]:
         """テンプレートの処理を行う。
 
@@ -578,17 +803,22 @@ class DocumentRender(BaseModel):
             return False
         return True
 
-    def _create_environment(self) -> SandboxedEnvironment:
+    def _create_environment(self, is_governed: bool = False) -> SandboxedEnvironment:
         """Jinja2環境を作成する。
 
         カスタムフィルターやセキュリティ設定を含む環境を作成します。
         デフォルトでHTMLエスケープを有効化し、安全性を確保します。
         SandboxedEnvironmentを使用して、テンプレート内からの危険な操作を防止します。
 
+        Args:
+            is_governed: 停止の指示を確認する _GovernedEnvironment を使うかどうか
+                [投機的なレンダリングでのみ使い、通常のレンダリングには確認の費用をかけない]
+
         Returns:
             SandboxedEnvironment: 設定済みのJinja2サンドボックス環境
         """
-        env: SandboxedEnvironment = SandboxedEnvironment(
+        environment_class: Final[Type[SandboxedEnvironment]] = _GovernedEnvironment if is_governed else SandboxedEnvironment
+        env: SandboxedEnvironment = environment_class(
             autoescape=True,  # HTMLエスケープをデフォルトで有効化
             undefined=StrictUndefined if self._is_strict_undefined else CustomUndefined,
             extensions=["jinja2.ext.do"],  # 'do'拡張を有効化
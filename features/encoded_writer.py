@@ -0,0 +1,150 @@
+"""レンダリング結果を、指定したエンコーディングでチャンク単位にファイル/ストリームへ書き出すモジュール。
+
+`AppCore.get_download_content` はレンダリング結果の全体を1回でエンコードするため、
+数百MBの手順書では str とエンコード後の bytes の両方を同時に保持します。
+このモジュールは、文字列のチャンク列を増分エンコーダでエンコードしながら書き出します。
+
+主な機能:
+- チャンク単位の書き出し: 細かい文字列は最大 chunk_chars 文字まで連結してからエンコードし、
+  全体の str/bytes を作りません。
+- 変換できない文字の扱い: codecs のエラーハンドラ名 [strict/replace/ignore/xmlcharrefreplace/backslashreplace]
+  で指定します。strictの場合は、文字の位置 [行番号と文字オフセット] を含む EncodedWriteError を送出します。
+- 状態を持つエンコーディング: ISO-2022-JPなどは、末尾でASCIIへ戻すエスケープシーケンスを書き出します。
+
+対応する書き出し先:
+- str / os.PathLike: ファイルパス [一時ファイルに書き出してから置き換え、失敗した場合は既存のファイルを変更しない]
+- BinaryIO: 書き込み可能なバイナリストリーム [閉じずにそのまま返す]
+
+典型的な使用方法:
+```python
+written = write_encoded(template.generate(context), "procedure.txt", "Shift_JIS", errors="replace")
+```
+"""
+
+import codecs
+import os
+import secrets
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO, Final, List, Literal, TypeAlias, Union
+
+DestinationLike: TypeAlias = Union[str, "os.PathLike[str]", BinaryIO]
+UnencodablePolicy: TypeAlias = Literal["strict", "replace", "ignore", "xmlcharrefreplace", "backslashreplace"]
+
+# 1回にエンコードする最大文字数
+DEFAULT_CHUNK_CHARS: Final[int] = 64 * 1024
+
+
+class EncodedWriteError(ValueError):
+    """変換先のエンコーディングで表現できない文字があったことを表す例外。
+
+    Attributes:
+        encoding: 変換先のエンコーディング名
+        position: 変換できなかった文字の、出力全体での文字オフセット [0始まり]
+        line: 変換できなかった文字の行番号 [1始まり]
+    """
+
+    def __init__(self, encoding: str, character: str, position: int, line: int) -> None:
+        super().__init__(f"Character {character!r} cannot be encoded in {encoding} at line {line} (offset {position})")
+        self.encoding = encoding
+        self.position = position
+        self.line = line
+
+
+def iter_text_chunks(text: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """文字列を chunk_chars 文字ごとに分割して返す。
+
+    Args:
+        text: 分割する文字列
+        chunk_chars: 1チャンクの最大文字数
+
+    Yields:
+        str: 分割した文字列 [一度に保持するコピーは1チャンク分のみ]
+    """
+    for position in range(0, len(text), chunk_chars):
+        yield text[position : position + chunk_chars]
+
+
+def write_encoded(
+    chunks: Iterable[str],
+    destination: DestinationLike,
+    encoding: str,
+    errors: UnencodablePolicy = "strict",
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+) -> int:
+    """文字列のチャンク列をエンコードしながら書き出す。
+
+    Args:
+        chunks: 書き出す文字列のチャンク列 [jinja2の Template.generate などをそのまま渡せる]
+        destination: 書き出し先のファイルパス、またはバイナリストリーム
+        encoding: 変換先のエンコーディング名
+        errors: 変換できない文字の扱い [codecs のエラーハンドラ名]
+        chunk_chars: 1回にエンコードする最大文字数
+
+    Returns:
+        int: 書き出したバイト数
+
+    Raises:
+        LookupError: エンコーディング名、またはエラーハンドラ名が不明な場合 [書き出し先を開く前に送出]
+        EncodedWriteError: errorsがstrictで、変換できない文字があった場合
+    """
+    # 書き出し先を開く前に検証し、不明なエンコーディングで空のファイルを作らない
+    codecs.lookup(encoding)
+    codecs.lookup_error(errors)
+
+    if not isinstance(destination, (str, os.PathLike)):
+        return _write_stream(chunks, destination, encoding, errors, chunk_chars)
+
+    path: Final[Path] = Path(destination)
+    # 同じディレクトリの一時ファイルに書き出し、成功した場合だけ置き換えて、失敗時に既存のファイルを残す
+    # [umask に従った権限で作るため、mkstemp ではなく排他モードで開く]
+    temp_path: Final[Path] = path.with_name(f".{path.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    try:
+        with temp_path.open("xb") as stream:
+            written: Final[int] = _write_stream(chunks, stream, encoding, errors, chunk_chars)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def _write_stream(chunks: Iterable[str], stream: BinaryIO, encoding: str, errors: str, chunk_chars: int) -> int:
+    """チャンク列を連結しながら増分エンコーダでエンコードし、ストリームへ書き出す。"""
+    encoder: Final[codecs.IncrementalEncoder] = codecs.getincrementalencoder(encoding)(errors)
+    pending: Final[List[str]] = []
+    pending_chars: int = 0
+    # 変換できない文字の位置を報告するための、書き出し済みの文字数と行数
+    position: int = 0
+    line: int = 1
+    written: int = 0
+
+    def flush(text: str, final: bool = False) -> None:
+        nonlocal position, line, written
+        # 1つのチャンクが大きい場合も、エンコード後のバイト列は chunk_chars 文字分にとどめる
+        for piece in iter_text_chunks(text, chunk_chars):
+            try:
+                data: bytes = encoder.encode(piece)
+            except UnicodeEncodeError as e:
+                error_line: int = line + piece.count("\n", 0, e.start)
+                raise EncodedWriteError(encoding, piece[e.start : e.end], position + e.start, error_line) from None
+            stream.write(data)
+            written += len(data)
+            position += len(piece)
+            line += piece.count("\n")
+        if final:
+            # 状態を持つエンコーダ [ISO-2022-JPなど] の終端処理
+            tail: Final[bytes] = encoder.encode("", True)
+            stream.write(tail)
+            written += len(tail)
+
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_chars += len(chunk)
+        if pending_chars >= chunk_chars:
+            flush("".join(pending))
+            pending.clear()
+            pending_chars = 0
+
+    flush("".join(pending), final=True)
+    return written
@@ -0,0 +1,275 @@
+"""ファイル全体を chardet に通さずにエンコーディングを推定するモジュール。
+
+`chardet.detect` はファイル全体を純Pythonの各プローバに通すため、30MBのShift_JIS CSVでは
+CPythonで数秒、Pyodideではさらに長い時間がかかります。このモジュールは、次の3段階で
+`chardet.detect` と同じ結果 [エンコーディング名] を返します。
+
+1. 高速判定 [chardet を呼ばない]
+   - BOM: chardet と同じ順序・同じ名前で判定します。
+   - ASCII: エスケープシーケンス [ESC, `~{`] を含まない純ASCIIは "ascii" です。
+   - UTF-8: Cの厳密デコードに成功し、非ASCII文字を5文字以上含む場合は "utf-8" です
+     [chardet の UTF8Prober が確定する条件と同じ]。
+2. サンプル判定: 先頭からチャンク単位で `UniversalDetector` に与え、プローバが確定した時点、
+   またはマルチバイトのプローバ [Shift_JIS/EUC-JPなど] が信頼度の上限に達した時点で打ち切ります。
+   そのエンコーディングでファイル全体を厳密にデコードできた場合のみ採用します。
+3. 全体走査: 上記で決まらない場合のみ `chardet.detect` でファイル全体を走査します。
+
+chardet の判定との差分:
+- chardet の UTF-8 状態機械は U+10000〜U+1FFFF [`F0 90`〜`F0 9F`] を不正とみなすため、
+  これらを含む入力は高速判定の対象外とし、chardet の判定に委ねます。
+- NULバイトを含む入力は UTF-16/32 のBOMなし判定に影響するため、高速判定・サンプル判定の対象外です。
+
+候補エンコーディングの並行検証:
+`classify_known_encoding` は、候補 [TextTranscoder.KNOWN_ENCODES] ごとにファイル全体をデコードし直す代わりに、
+チャンク単位の1回の走査で全候補の増分デコーダ [各コーデックのバイト単位の状態機械] を並行に進め、
+不正なバイト列で脱落させます。ASCIIはバイトの範囲だけで判定します。
+
+典型的な使用方法:
+```python
+detection = detect_raw_encoding(data)
+detection.encoding  # chardet.detect(data)["encoding"] と同じ値
+detection.stage     # 判定した段階 ["bom", "ascii", "utf-8", "sampled", "full"]
+
+classify_known_encoding(data, ["ASCII", "Shift_JIS", "EUC-JP", "ISO-2022-JP", "utf-8"])
+# 全体を厳密にデコードできる最初の候補 [どれもデコードできない場合はNone]
+```
+"""
+
+import codecs
+import re
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Final, List, Literal, Match, Optional, Pattern, Tuple, Union
+
+import chardet
+from chardet.enums import InputState
+from chardet.universaldetector import UniversalDetector
+from pydantic import BaseModel, ConfigDict, Field
+
+from .file_source import BufferLike, contains_nul
+
+if TYPE_CHECKING:
+    from chardet.charsetprober import CharSetProber
+
+DetectionStage = Literal["bom", "ascii", "utf-8", "sampled", "full"]
+
+# サンプル判定でUniversalDetectorに与える1回あたりのバイト数
+DEFAULT_CHUNK_SIZE: Final[int] = 16 * 1024
+# サンプル判定で走査する最大バイト数 [超えても確定しない場合は全体走査]
+DEFAULT_SAMPLE_SIZE: Final[int] = 256 * 1024
+
+# 候補の並行検証で1回にデコードするバイト数
+DEFAULT_CLASSIFY_CHUNK_SIZE: Final[int] = 64 * 1024
+
+# サンプル判定で、確定 [done] 前のマルチバイトのプローバを採用する信頼度 [文字分布による信頼度の上限]
+_SAMPLED_MIN_CONFIDENCE: Final[float] = 0.99
+
+# UTF8Prober が FOUND_IT になる最小の非ASCII文字数 [信頼度 1 - 0.99 * 0.5^n > 0.95]
+_UTF8_MIN_MULTIBYTE_CHARS: Final[int] = 5
+
+# chardet.UniversalDetector と同じ判定順のBOM
+_BOMS: Final[List[Tuple[Tuple[bytes, ...], str]]] = [
+    ((codecs.BOM_UTF8,), "UTF-8-SIG"),
+    ((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE), "UTF-32"),
+    ((b"\xfe\xff\x00\x00",), "X-ISO-10646-UCS-4-3412"),
+    ((b"\x00\x00\xff\xfe",), "X-ISO-10646-UCS-4-2143"),
+    ((codecs.BOM_LE, codecs.BOM_BE), "UTF-16"),
+]
+
+_HIGH_BYTE: Final[Pattern[bytes]] = re.compile(b"[\x80-\xff]")
+_ESCAPE: Final[Pattern[bytes]] = re.compile(b"\x1b|~{")
+# 妥当なUTF-8での非ASCII文字の先頭バイト
+_UTF8_LEAD_BYTE: Final[Pattern[bytes]] = re.compile(b"[\xc0-\xff]")
+# chardet の UTF-8 状態機械が不正とみなす U+10000〜U+1FFFF の先頭2バイト
+_UTF8_UNSUPPORTED_BY_CHARDET: Final[Pattern[bytes]] = re.compile(b"\xf0[\x90-\x9f]")
+
+
+class EncodingDetection(BaseModel):
+    """エンコーディングの推定結果。
+
+    Attributes:
+        encoding: chardet.detect と同じエンコーディング名 [判定できない場合はNone]
+        stage: 判定した段階
+        text: 判定の過程で全体をデコードした文字列 [ASCII/UTF-8/サンプル判定のみ。それ以外はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    encoding: Optional[str]
+    stage: DetectionStage
+    text: Optional[str] = Field(default=None, repr=False)
+
+
+def detect_raw_encoding(
+    data: BufferLike,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    has_nul: Optional[bool] = None,
+) -> EncodingDetection:
+    """chardet.detect と同じエンコーディング名を、可能な限りファイル全体を走査せずに返す。
+
+    Args:
+        data: 判定するバッファ
+        sample_size: サンプル判定で走査する最大バイト数
+        chunk_size: サンプル判定で1回に与えるバイト数
+        has_nul: NULバイトを含むかどうか [取り込み時に走査済みの場合に指定。Noneの場合はここで走査]
+
+    Returns:
+        EncodingDetection: 推定結果
+    """
+    bom_encoding: Final[Optional[str]] = detect_bom(data)
+    if bom_encoding is not None:
+        return EncodingDetection(encoding=bom_encoding, stage="bom")
+
+    if len(data) > 0 and not (contains_nul(data) if has_nul is None else has_nul):
+        fast: Final[Optional[EncodingDetection]] = _detect_utf8(data)
+        if fast is not None:
+            return fast
+
+        sampled: Final[Optional[EncodingDetection]] = _detect_sampled(data, sample_size, chunk_size)
+        if sampled is not None:
+            return sampled
+
+    raw: Final[Union[bytes, bytearray]] = data if isinstance(data, (bytes, bytearray)) else bytes(data)
+    return EncodingDetection(encoding=chardet.detect(raw)["encoding"], stage="full")
+
+
+def detect_bom(data: BufferLike) -> Optional[str]:
+    """先頭のBOMから、chardet.detect と同じエンコーディング名を返す [BOMがない場合はNone]。"""
+    head: Final[bytes] = bytes(data[:4])
+    for boms, encoding in _BOMS:
+        if head.startswith(boms):
+            return encoding
+    return None
+
+
+def _detect_utf8(data: BufferLike) -> Optional[EncodingDetection]:
+    """純ASCII/UTF-8 を chardet を呼ばずに判定する [chardet と結果が一致する入力のみ]。"""
+    try:
+        text: Final[str] = str(data, "utf-8")
+    except UnicodeDecodeError:
+        return None
+
+    if text.isascii():
+        # エスケープシーケンスを含む場合は ISO-2022-JP などの可能性がある
+        return EncodingDetection(encoding="ascii", stage="ascii", text=text) if _ESCAPE.search(data) is None else None
+
+    if _UTF8_UNSUPPORTED_BY_CHARDET.search(data) is not None:
+        return None
+    if len(list(islice(_UTF8_LEAD_BYTE.finditer(data), _UTF8_MIN_MULTIBYTE_CHARS))) < _UTF8_MIN_MULTIBYTE_CHARS:
+        return None
+    return EncodingDetection(encoding="utf-8", stage="utf-8", text=text)
+
+
+def _detect_sampled(data: BufferLike, sample_size: int, chunk_size: int) -> Optional[EncodingDetection]:
+    """先頭からチャンク単位で判定し、確定した時点で打ち切る。
+
+    Returns:
+        Optional[EncodingDetection]: 確定し、かつファイル全体を厳密にデコードできた場合の推定結果 [それ以外はNone]
+    """
+    # chardet は最初に見つかった非ASCII/エスケープより前のASCIIチャンクをプローバに与えないため、
+    # 全体走査と同じバイト列をプローバに与えるよう、最初のチャンクはそこまで含める
+    trigger: Final[Optional[Match[bytes]]] = _HIGH_BYTE.search(data) or _ESCAPE.search(data)
+    if trigger is None or trigger.end() > sample_size:
+        return None
+
+    detector: Final[UniversalDetector] = UniversalDetector()
+    limit: Final[int] = min(len(data), sample_size)
+    position: int = max(chunk_size, trigger.end())
+    detector.feed(bytearray(data[:position]))
+    encoding: Optional[str] = _confident_encoding(detector)
+    while encoding is None and position < limit:
+        detector.feed(bytearray(data[position : position + chunk_size]))
+        position += chunk_size
+        encoding = _confident_encoding(detector)
+
+    if encoding is None:
+        return None
+    # 確定後の範囲にそのエンコーディングで不正なバイト列がある場合は、全体走査の判定と異なりうる
+    try:
+        text: Final[str] = str(data, encoding)
+    except (UnicodeDecodeError, LookupError):
+        return None
+    return EncodingDetection(encoding=encoding, stage="sampled", text=text)
+
+
+def _confident_encoding(detector: UniversalDetector) -> Optional[str]:
+    """プローバが確定した、またはマルチバイトのプローバが最大の信頼度に達したエンコーディング名を返す。
+
+    close と同じく最初に最大の信頼度となったプローバを選ぶ。マルチバイト以外のプローバは
+    close でISO-8859系の名前を置き換えるため、確定 [done] していない限り採用しない。
+    """
+    if detector.done:
+        return detector.result["encoding"]
+    if detector.input_state != InputState.HIGH_BYTE:
+        return None
+
+    probers: Final[List["CharSetProber"]] = detector.charset_probers
+    best: Final["CharSetProber"] = max(probers, key=lambda prober: prober.get_confidence())
+    if best is not probers[0] or best.get_confidence() < _SAMPLED_MIN_CONFIDENCE:
+        return None
+    return best.charset_name
+
+
+def classify_known_encoding(data: BufferLike, encodings: List[str], chunk_size: int = DEFAULT_CLASSIFY_CHUNK_SIZE) -> Optional[str]:
+    """全体を厳密にデコードできる最初の候補を、1回の走査で返す。
+
+    候補を順にデコードし直す場合と同じ結果を返します。未知のエンコーディング名の候補は無視します。
+
+    Args:
+        data: 判定するバッファ
+        encodings: 優先順の候補エンコーディング名
+        chunk_size: 1回にデコードするバイト数
+
+    Returns:
+        Optional[str]: 最初に残った候補 [どの候補もデコードできない場合はNone]
+    """
+    is_ascii: Final[bool] = _is_ascii(data)
+    # 検証中の候補 [ASCIIはバイトの範囲だけで判定が済むため None]
+    decoders: Final[Dict[str, Optional[codecs.IncrementalDecoder]]] = {}
+    for encoding in encodings:
+        try:
+            info = codecs.lookup(encoding)
+        except LookupError:
+            continue
+        if info.name != "ascii":
+            decoders[encoding] = info.incrementaldecoder("strict")
+        elif is_ascii:
+            decoders[encoding] = None
+
+    position: int = 0
+    while decoders:
+        leader: str = next(iter(decoders))
+        if decoders[leader] is None:
+            # 残っている最優先の候補の検証が済んでいれば、以降の走査は結果に影響しない
+            return leader
+        if position >= len(data):
+            break
+        chunk = data[position : position + chunk_size]
+        position += chunk_size
+        _feed_decoders(decoders, chunk, final=False)
+
+    _feed_decoders(decoders, b"", final=True)
+    return next(iter(decoders), None)
+
+
+def _is_ascii(data: BufferLike) -> bool:
+    """バッファが純ASCIIかどうかを返す [bytes.isascii/ASCIIデコードはいずれも正規表現の走査より高速]。"""
+    if isinstance(data, (bytes, bytearray)):
+        return data.isascii()
+    try:
+        str(data, "ascii")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _feed_decoders(decoders: Dict[str, Optional[codecs.IncrementalDecoder]], chunk: BufferLike, final: bool) -> None:
+    """検証中の各増分デコーダにチャンクを与え、デコードできなかった候補を脱落させる。"""
+    for encoding, decoder in list(decoders.items()):
+        if decoder is None:
+            continue
+        try:
+            decoder.decode(chunk, final)
+        except UnicodeError:
+            # UnicodeDecodeError に加え、CJKコーデックは判定できないバイト列が溜まると UnicodeError を送出する
+            del decoders[encoding]
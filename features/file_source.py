@@ -0,0 +1,224 @@
+"""ファイルパス/mmap/memoryview/チャンク列から、コピーを抑えて入力を読み込むモジュール。
+
+このモジュールは、BytesIOに全体をバッファリングする代わりに、入力を読み取り専用の
+memoryviewとして保持する `FileSource` を提供します。設定ファイル/テンプレートの各ローダーは
+このバッファから直接デコードするため、アップロード全体の中間コピーを作りません。
+
+主な機能:
+- 早期のサイズ拒否: ファイルパスは読み込み前に stat で、チャンク列は上限を超えた時点で
+  残りを消費せずに拒否します。
+- ゼロコピーの読み込み: ファイルパスは mmap で読み取り専用に割り当て、mmap/memoryview/bytes は
+  そのまま参照します。チャンク列のみ1つのbytearrayに連結します。
+- バッファからの直接デコード: `decode` は memoryview から直接 str を生成します。
+
+対応する入力:
+- str / os.PathLike: ファイルパス [名前はファイル名]
+- mmap.mmap / memoryview / bytes / bytearray: 既存のバッファ [名前は引数で指定]
+- BytesIO: 既存のアップロード [未変更のBytesIOは内部バッファを共有]
+- Iterable[bytes]: チャンク列 [ストリーミングアップロードなど]
+
+典型的な使用方法:
+```python
+with FileSource.open("inventory.csv", max_size_bytes=30 * 1024 * 1024) as source:
+    text = source.decode("utf-8")
+```
+"""
+
+import mmap
+import os
+import re
+from collections.abc import Iterable
+from io import BytesIO
+from pathlib import Path
+from types import TracebackType
+from typing import Final, Optional, Pattern, Type, TypeAlias, Union
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+BufferLike: TypeAlias = Union[bytes, bytearray, memoryview, mmap.mmap]
+SourceLike: TypeAlias = Union[str, "os.PathLike[str]", BufferLike, BytesIO, Iterable[bytes], "FileSource"]
+
+DEFAULT_SOURCE_NAME: Final[str] = "<memory>"
+
+_NUL_BYTE: Final[Pattern[bytes]] = re.compile(b"\x00")
+
+
+class FileSourceError(ValueError):
+    """入力の読み込みに失敗したこと [サイズ超過/読み取りエラー] を表す例外。"""
+
+
+def contains_nul(data: BufferLike) -> bool:
+    """バッファにNULバイトが含まれるかどうかを、コピーせずに判定する。
+
+    Args:
+        data: 判定するバッファ
+
+    Returns:
+        bool: NULバイトが含まれる場合はTrue
+    """
+    return _NUL_BYTE.search(data) is not None
+
+
+def resolve_source_name(source: object, name: Optional[str] = None) -> str:
+    """入力の表示名を決定する。
+
+    Args:
+        source: 入力
+        name: 明示的な名前 [指定時は優先]
+
+    Returns:
+        str: ファイルパスはファイル名、name属性を持つ入力はその値、それ以外は "<memory>"
+    """
+    if name is not None:
+        return name
+    if isinstance(source, (str, os.PathLike)):
+        return Path(source).name
+    source_name: Final[object] = getattr(source, "name", None)
+    return source_name if isinstance(source_name, str) and source_name else DEFAULT_SOURCE_NAME
+
+
+class FileSource(BaseModel):
+    """読み取り専用のバッファとして保持した入力ファイル。
+
+    Attributes:
+        name: ファイル名 [拡張子による形式判定に使用]
+        buffer: 入力全体を参照する読み取り専用のmemoryview
+
+    Properties:
+        size: 入力のバイト数
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    name: str = Field(..., min_length=1)
+    buffer: memoryview
+
+    _mapping: Optional[mmap.mmap] = PrivateAttr(default=None)
+
+    def __init__(self, name: str, buffer: memoryview, mapping: Optional[mmap.mmap] = None) -> None:
+        """FileSourceの初期化メソッド。
+
+        Args:
+            name: ファイル名
+            buffer: 入力全体を参照する読み取り専用のmemoryview
+            mapping: bufferの元になった、自身で割り当てたmmap [closeで閉じる]
+        """
+        super().__init__(name=name, buffer=buffer)
+        self._mapping = mapping
+
+    @classmethod
+    def open(cls, source: SourceLike, max_size_bytes: int, name: Optional[str] = None) -> "FileSource":
+        """入力を読み込み、サイズを検証したFileSourceを返す。
+
+        Args:
+            source: ファイルパス、mmap、memoryview、bytes、BytesIO、チャンク列、またはFileSource
+            max_size_bytes: 許可される最大サイズ [バイト]
+            name: ファイル名 [省略時は入力から決定]
+
+        Returns:
+            FileSource: 読み込んだ入力
+
+        Raises:
+            FileSourceError: サイズが上限を超えた場合、またはファイルを読み取れない場合
+        """
+        if isinstance(source, FileSource):
+            _check_size(source.size, max_size_bytes)
+            return source
+
+        source_name: Final[str] = resolve_source_name(source, name)
+        if isinstance(source, (str, os.PathLike)):
+            return cls._open_path(Path(source), max_size_bytes, source_name)
+
+        buffer: BufferLike
+        if isinstance(source, BytesIO):
+            # 未変更のBytesIOの getvalue は内部バッファを共有する [コピーしない]
+            buffer = source.getvalue()
+        elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            buffer = source
+        else:
+            buffer = _join_chunks(source, max_size_bytes)
+
+        view: Final[memoryview] = memoryview(buffer).cast("B").toreadonly()
+        _check_size(view.nbytes, max_size_bytes)
+        return cls(name=source_name, buffer=view)
+
+    @classmethod
+    def _open_path(cls, path: Path, max_size_bytes: int, name: str) -> "FileSource":
+        """ファイルパスを stat でサイズ検証した上で、読み取り専用にmmapする。"""
+        try:
+            _check_size(path.stat().st_size, max_size_bytes)
+            with path.open("rb") as file:
+                try:
+                    mapping: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # 空ファイルはmmapできない
+                    return cls(name=name, buffer=memoryview(b""))
+                except OSError:
+                    # mmap非対応のファイルシステム: 上限+1バイトまでに限定して読み込む
+                    data: Final[bytes] = file.read(max_size_bytes + 1)
+                    _check_size(len(data), max_size_bytes)
+                    return cls(name=name, buffer=memoryview(data))
+        except OSError as e:
+            raise FileSourceError(f"Failed to read file: {e!s}") from e
+
+        # stat とmmapの間にファイルが伸びた場合も上限を守る
+        mapped_size: Final[int] = len(mapping)
+        if mapped_size > max_size_bytes:
+            mapping.close()
+            _check_size(mapped_size, max_size_bytes)
+
+        return cls(name=name, buffer=memoryview(mapping), mapping=mapping)
+
+    @property
+    def size(self) -> int:
+        """入力のバイト数を返す。"""
+        return self.buffer.nbytes
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        """バッファから直接デコードした文字列を返す。
+
+        Args:
+            encoding: エンコーディング名
+            errors: デコードエラーの処理方法
+
+        Returns:
+            str: デコードした文字列
+
+        Raises:
+            UnicodeDecodeError: デコードに失敗した場合 [bytes.decode と同じ文言]
+            LookupError: 未知のエンコーディングの場合
+        """
+        return str(self.buffer, encoding, errors)
+
+    def close(self) -> None:
+        """バッファを解放し、自身で割り当てたmmapを閉じる [呼び出し元のバッファは閉じない]。"""
+        self.buffer.release()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # 他に参照中のビューが残っている場合は、ガベージコレクションに委ねる
+                pass
+
+    def __enter__(self) -> "FileSource":
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+
+def _check_size(size: int, max_size_bytes: int) -> None:
+    """サイズが上限を超えていれば FileSourceError を送出する [FileValidator と同じ文言]。"""
+    if size > max_size_bytes:
+        raise FileSourceError(f"File size exceeds maximum limit of {max_size_bytes} bytes")
+
+
+def _join_chunks(chunks: Iterable[bytes], max_size_bytes: int) -> bytearray:
+    """チャンク列を連結する。上限を超えた時点で残りのチャンクを消費せずに拒否する。"""
+    data: bytearray = bytearray()
+    for chunk in chunks:
+        data += chunk
+        _check_size(len(data), max_size_bytes)
+    return data
@@ -0,0 +1,159 @@
+"""アップロードを1回の走査で取り込み、以降の検証/検出/パースが共有する不変の記録を作るモジュール。
+
+これまでは同じアップロードを、次の各処理が別々に走査していました。
+
+- `FileValidator.get_file_size`: サイズ
+- `TextTranscoder.detect_binary` / `detect_encoding`: 先頭1KBのNULバイトとエンコーディング
+- `TemplateSecurityValidator.validate_template_file`: NULバイトとUTF-8デコード
+- `ConfigParser.__init__`: 2回目のUTF-8デコード
+
+このモジュールの `ingest_upload` は、入力を1回だけ走査して `IngestedBlob` を作ります。
+各ローダーとキャッシュは、入力を走査し直さずにこの記録を参照します。
+
+走査の内容:
+1. チャンク単位の1回の走査で、内容ハッシュ [DetectionCache のキー] と最初のNULバイトの位置を求めます。
+2. 先頭のBOMを判定します。
+3. 自動トランスコーディングでは、検出したエンコーディングでバッファから直接デコードします
+   [UTF-8のバイト列を経由しない]。ASCII/UTF-8/サンプル判定では、判定時にデコードした文字列を再利用します。
+   それ以外は、UTF-8で厳密にデコードします。
+
+典型的な使用方法:
+```python
+ingested = ingest_upload(upload, enable_auto_transcoding=True, detection_cache=DETECTION_CACHE)
+parser = ConfigParser(ingested)  # 再デコードしない
+render = DocumentRender(ingested)  # NULバイトの検査とデコードを省略
+```
+"""
+
+import re
+from io import BytesIO
+from typing import TYPE_CHECKING, Final, Match, Optional, Pattern, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .detection_cache import DetectionCache, new_content_hasher
+from .encoding_detector import detect_bom
+from .file_source import FileSource, resolve_source_name
+from .transcoder import TextTranscoder
+
+if TYPE_CHECKING:
+    import hashlib
+
+# バイナリ判定で参照する先頭のバイト数 [TextTranscoder.detect_binary と同じ範囲]
+BINARY_SNIFF_BYTES: Final[int] = 1024
+# 内容ハッシュとNULバイトを求める走査の1回あたりのバイト数
+SCAN_CHUNK_SIZE: Final[int] = 1024 * 1024
+
+_NUL_BYTE: Final[Pattern[bytes]] = re.compile(b"\x00")
+
+
+class IngestedBlob(BaseModel):
+    """1回の走査で取り込んだアップロードの不変の記録。
+
+    Attributes:
+        name: ファイル名 [拡張子による形式判定に使用]
+        size: 入力のバイト数
+        nul_offset: 最初のNULバイトの位置 [含まない場合はNone]
+        bom: 先頭のBOMが示すエンコーディング名 [BOMがない場合はNone]
+        content_hash: 内容のハッシュ値 [content_key と同じ値]
+        encoding: デコードに使用したエンコーディング名 [バイナリ、または検出できない場合はNone]
+        text: デコードした文字列 [デコードできない場合はNone]
+        decode_error: デコードに失敗した理由 [成功した場合、またはデコードしていない場合はNone]
+
+    Properties:
+        has_nul: NULバイトを含むかどうか
+        is_binary: 先頭 BINARY_SNIFF_BYTES バイトにNULバイトを含むかどうか
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str = Field(..., min_length=1)
+    size: int
+    nul_offset: Optional[int]
+    bom: Optional[str]
+    content_hash: str
+    encoding: Optional[str] = None
+    text: Optional[str] = Field(default=None, repr=False)
+    decode_error: Optional[str] = None
+
+    @property
+    def has_nul(self) -> bool:
+        """NULバイトを含むかどうかを返す。"""
+        return self.nul_offset is not None
+
+    @property
+    def is_binary(self) -> bool:
+        """先頭 BINARY_SNIFF_BYTES バイトにNULバイトを含むかどうかを返す。"""
+        return self.nul_offset is not None and self.nul_offset < BINARY_SNIFF_BYTES
+
+
+def scan_upload(source: Union[BytesIO, FileSource], name: Optional[str] = None) -> IngestedBlob:
+    """入力を1回走査し、デコード前の記録 [サイズ/NULバイト/BOM/内容ハッシュ] を作る。
+
+    Args:
+        source: 入力 [BytesIOは内部バッファを共有し、FileSourceはバッファを直接参照する]
+        name: ファイル名 [Noneの場合は入力のname属性]
+
+    Returns:
+        IngestedBlob: encoding/textを含まない記録
+    """
+    buffer: Final[memoryview] = _source_buffer(source)
+    hasher: Final["hashlib.blake2b"] = new_content_hasher()
+    nul_offset: Optional[int] = None
+    for position in range(0, buffer.nbytes, SCAN_CHUNK_SIZE):
+        end: int = min(position + SCAN_CHUNK_SIZE, buffer.nbytes)
+        hasher.update(buffer[position:end])
+        if nul_offset is None:
+            nul: Optional[Match[bytes]] = _NUL_BYTE.search(buffer, position, end)
+            nul_offset = None if nul is None else nul.start()
+
+    return IngestedBlob(
+        name=resolve_source_name(source, name),
+        size=buffer.nbytes,
+        nul_offset=nul_offset,
+        bom=detect_bom(buffer),
+        content_hash=hasher.hexdigest(),
+    )
+
+
+def ingest_upload(
+    source: Union[BytesIO, FileSource],
+    enable_auto_transcoding: bool = False,
+    detection_cache: Optional[DetectionCache] = None,
+    name: Optional[str] = None,
+) -> IngestedBlob:
+    """入力を取り込み、デコードした文字列を含む記録を作る。
+
+    Args:
+        source: 入力
+        enable_auto_transcoding: エンコーディングを検出してデコードするかどうか [Falseの場合はUTF-8]
+        detection_cache: 検出結果のキャッシュ [内容ハッシュをキーに検出を省略]
+        name: ファイル名 [Noneの場合は入力のname属性]
+
+    Returns:
+        IngestedBlob: 取り込んだ記録 [自動トランスコーディングで検出できない場合はencoding/textがNone]
+    """
+    scanned: Final[IngestedBlob] = scan_upload(source, name)
+    encoding: Optional[str] = "utf-8"
+    text: Optional[str] = None
+    decode_error: Optional[str] = None
+
+    try:
+        if enable_auto_transcoding is True:
+            transcoder: Final[TextTranscoder] = TextTranscoder(source, detection_cache, scanned)
+            encoding = transcoder.detect_encoding()
+            text = transcoder.decode()
+        else:
+            text = str(_source_buffer(source), "utf-8")
+    except (UnicodeDecodeError, LookupError) as e:
+        decode_error = str(e)
+
+    return scanned.model_copy(update={"encoding": encoding, "text": text, "decode_error": decode_error})
+
+
+def _source_buffer(source: Union[BytesIO, FileSource]) -> memoryview:
+    """入力全体をコピーせずに参照するmemoryviewを返す。"""
+    if isinstance(source, FileSource):
+        return source.buffer
+    # 未変更のBytesIOの getvalue は内部バッファを共有する
+    return memoryview(source.getvalue())
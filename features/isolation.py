@@ -0,0 +1,483 @@
+"""設定ファイルのパースとテンプレートのレンダリングを、資源の上限を設けた子プロセスで実行するモジュール。
+
+病的なYAML文書やテンプレートは、ConfigParser.parse や DocumentRender.apply_context の中で
+止まらなくなったり、メモリを使い果たしたりします。同じプロセスの中の検査では、どちらも確実には中断できません。
+このモジュールは、パースとレンダリングを子プロセスで実行し、上限を超えた子プロセスを終了させます。
+
+主な機能:
+- 上限: 子プロセスに RLIMIT_AS [アドレス空間。子プロセスの開始時点からの増分] と RLIMIT_CPU [CPU時間] を設定し、
+  親プロセスは wall_clock_seconds を過ぎても結果を返さない子プロセスを強制終了します。
+  resource モジュールがない環境 [Windowsなど] では、wall_clock_seconds だけを適用します。
+- モード: pooled は子プロセスを使い回し [CPU時間の上限は呼び出しごとに設定し直す]、
+  テンプレートの読み込み結果を子プロセスの中でキャッシュします。per_call は呼び出しごとに子プロセスを起動して終了させます。
+  上限を超えた子プロセスや異常終了した子プロセスは、どちらのモードでも破棄します。
+- エラー: 上限を超えた場合や子プロセスが異常終了した場合は、理由を error_message に設定した結果を返します。
+  AppCore は、既存のエラーメッセージの形式 [`{ヘッダー}: {理由} in '{ファイル名}'`] に変換します。
+- 計測: 呼び出しごとに、子プロセスでの処理時間と、それ以外 [起動/受け渡し/シリアライズ] のオーバーヘッドを記録します
+  [IsolationStats。AppCore の計測では parse/render と isolation_overhead の段階]。
+
+子プロセスは forkserver から起動します [使えない環境では spawn]。呼び出し側のプロセスを直接フォークすると、
+確保済みで未使用のヒープを引き継ぐため、メモリの上限が呼び出し側の状態で変わり、スレッドを持つプロセス
+[レンダリングサービスなど] では安全でもないためです。差分パースのセッションは親プロセスにあるため、
+隔離したパースでは使いません。
+
+典型的な使用方法:
+```python
+with IsolationPool(limits=IsolationLimits(cpu_seconds=5, memory_bytes=512 * 1024 * 1024, wall_clock_seconds=10)) as isolation:
+    core = AppCore("config error", "template error", isolation=isolation)
+    core.load_config_file(config, "csv_rows", True).load_template_file(template, True).apply(0, True)
+    print(core.template_error_message, isolation.stats.mean_overhead_seconds)
+```
+"""
+
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from types import TracebackType
+from typing import TYPE_CHECKING, Annotated, Any, Dict, Final, List, Literal, Optional, Tuple, TypeAlias
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .config_parser import ConfigParser
+from .document_render import DocumentRender
+from .ingestion import IngestedBlob
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.process import BaseProcess
+
+if sys.platform != "win32":
+    import resource
+
+IsolationMode: TypeAlias = Literal["pooled", "per_call"]
+
+# 子プロセスの中でキャッシュするテンプレートの数 [pooled の場合]
+CHILD_TEMPLATE_CACHE_SIZE: Final[int] = 8
+
+
+class IsolationLimits(BaseModel):
+    """子プロセスの資源の上限。
+
+    Attributes:
+        cpu_seconds: 1回の呼び出しのCPU時間の上限 [秒。切り上げて整数秒にする。Noneの場合は制限しない]
+        memory_bytes: 子プロセスの開始時点から増やせるアドレス空間の上限 [バイト。Noneの場合は制限しない]
+        wall_clock_seconds: 1回の呼び出しの経過時間の上限 [秒]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    cpu_seconds: Optional[Annotated[float, Field(gt=0)]] = 10.0
+    memory_bytes: Optional[Annotated[int, Field(gt=0)]] = 1024 * 1024 * 1024
+    wall_clock_seconds: Annotated[float, Field(gt=0)] = 30.0
+
+
+class ParseOutcome(BaseModel):
+    """隔離したパースの結果。
+
+    Attributes:
+        parsed_dict: パース結果の辞書 [失敗した場合はNone]
+        error_message: エラーメッセージ [成功した場合はNone]
+        is_isolation_failure: 上限の超過または子プロセスの異常終了で失敗したかどうか
+        child_seconds: 子プロセスでの処理時間 [秒]
+        overhead_seconds: 子プロセスでの処理以外の所要時間 [秒]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    parsed_dict: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    is_isolation_failure: bool = False
+    child_seconds: float = 0.0
+    overhead_seconds: float = 0.0
+
+
+class RenderOutcome(BaseModel):
+    """隔離したレンダリングの結果 [DocumentRender.apply_context の結果と属性]。
+
+    Attributes:
+        is_applied: apply_context が成功したかどうか
+        render_content: フォーマット後のレンダリング結果
+        raw_content: フォーマット前のレンダリング結果
+        error_message: エラーメッセージ [成功した場合はNone]
+        is_isolation_failure: 上限の超過または子プロセスの異常終了で失敗したかどうか
+        child_seconds: 子プロセスでの処理時間 [秒]
+        overhead_seconds: 子プロセスでの処理以外の所要時間 [秒]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    is_applied: bool = False
+    render_content: Optional[str] = None
+    raw_content: Optional[str] = None
+    error_message: Optional[str] = None
+    is_isolation_failure: bool = False
+    child_seconds: float = 0.0
+    overhead_seconds: float = 0.0
+
+
+class IsolationStats(BaseModel):
+    """呼び出しの集計。
+
+    Attributes:
+        calls: 呼び出しの数
+        failures: 上限の超過または子プロセスの異常終了で失敗した呼び出しの数
+        spawned: 起動した子プロセスの数
+        child_seconds: 子プロセスでの処理時間の合計 [秒]
+        overhead_seconds: 子プロセスでの処理以外の所要時間の合計 [秒]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    calls: int = 0
+    failures: int = 0
+    spawned: int = 0
+    child_seconds: float = 0.0
+    overhead_seconds: float = 0.0
+
+    @property
+    def mean_overhead_seconds(self) -> float:
+        """1回の呼び出しあたりのオーバーヘッドの平均を返す [呼び出しがない場合は0]。"""
+        return self.overhead_seconds / self.calls if self.calls else 0.0
+
+
+class IsolationError(Exception):
+    """上限の超過または子プロセスの異常終了を表す例外 [IsolationPool の中だけで使う]。"""
+
+
+class _ChildProcess:
+    """パイプで要求と結果を受け渡す子プロセス。"""
+
+    def __init__(self, limits: IsolationLimits, is_pooled: bool) -> None:
+        context: Final[Any] = _process_context()
+        parent_connection, child_connection = context.Pipe()
+        self.connection: Connection = parent_connection
+        self.process: BaseProcess = context.Process(
+            target=_child_main, args=(child_connection, limits, is_pooled), name="cg-isolated", daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def kill(self) -> Optional[int]:
+        """子プロセスを終了させ、終了コードを返す。"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+        return self.process.exitcode
+
+    def close(self) -> None:
+        """子プロセスに終了を伝え、終了を待つ [終わらない場合は強制終了する]。"""
+        try:
+            # フォークした子プロセスは親側の接続も持っているため、接続を閉じるだけでは終了を伝えられない
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+
+class IsolationPool(BaseModel):
+    """パースとレンダリングを、資源の上限を設けた子プロセスで実行するプール [スレッドセーフ]。
+
+    Attributes:
+        mode: 子プロセスを使い回すかどうか [pooled/per_call]
+        size: 同時に実行する子プロセスの数 [超えた呼び出しは空くまで待つ]
+        limits: 子プロセスの資源の上限
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    mode: IsolationMode = "pooled"
+    size: Annotated[int, Field(ge=1)] = 2
+    limits: IsolationLimits = Field(default_factory=IsolationLimits)
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _slots: Optional[threading.BoundedSemaphore] = PrivateAttr(default=None)
+    _idle: List[_ChildProcess] = PrivateAttr(default_factory=list)
+    _stats: IsolationStats = PrivateAttr(default_factory=IsolationStats)
+
+    def __enter__(self) -> "IsolationPool":
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+    @property
+    def stats(self) -> IsolationStats:
+        """呼び出しの集計を返す。"""
+        with self._lock:
+            return self._stats
+
+    def parse(self, ingested: IngestedBlob, csv_rows_name: str, enable_fill_nan: bool, fill_nan_with: str) -> ParseOutcome:
+        """子プロセスで設定ファイルをパースする。
+
+        Args:
+            ingested: 取り込み済みの設定ファイル
+            csv_rows_name: CSVの行名
+            enable_fill_nan: NaNを埋めるかどうか
+            fill_nan_with: NaNを埋める際の文字列
+
+        Returns:
+            ParseOutcome: パースの結果 [上限を超えた場合は is_isolation_failure が True]
+        """
+        try:
+            (parsed_dict, error_message), child_seconds, overhead_seconds = self._call(
+                "Parsing", _parse_in_child, (ingested, csv_rows_name, enable_fill_nan, fill_nan_with)
+            )
+        except IsolationError as e:
+            return ParseOutcome(error_message=str(e), is_isolation_failure=True)
+        return ParseOutcome(
+            parsed_dict=parsed_dict, error_message=error_message, child_seconds=child_seconds, overhead_seconds=overhead_seconds
+        )
+
+    def render(self, template: IngestedBlob, context: Dict[str, Any], format_type: int, is_strict_undefined: bool) -> RenderOutcome:
+        """子プロセスでテンプレートにコンテキストを適用する。
+
+        Args:
+            template: 取り込み済みのテンプレート [子プロセスで読み込み、静的検証をやり直す]
+            context: テンプレートに適用するコンテキスト
+            format_type: フォーマットの種類
+            is_strict_undefined: 未定義変数を厳密にチェックするかどうか
+
+        Returns:
+            RenderOutcome: レンダリングの結果 [上限を超えた場合は is_isolation_failure が True]
+        """
+        try:
+            (is_applied, render_content, raw_content, error_message), child_seconds, overhead_seconds = self._call(
+                "Rendering", _render_in_child, (template, context, format_type, is_strict_undefined)
+            )
+        except IsolationError as e:
+            return RenderOutcome(error_message=str(e), is_isolation_failure=True)
+        return RenderOutcome(
+            is_applied=is_applied,
+            render_content=render_content,
+            raw_content=raw_content,
+            error_message=error_message,
+            child_seconds=child_seconds,
+            overhead_seconds=overhead_seconds,
+        )
+
+    def close(self) -> None:
+        """待機中の子プロセスを終了させる。"""
+        with self._lock:
+            idle: Final[List[_ChildProcess]] = list(self._idle)
+            self._idle.clear()
+        for child in idle:
+            child.close()
+
+    def _call(self, label: str, function: Callable[..., Tuple[Any, ...]], args: Tuple[Any, ...]) -> Tuple[Any, float, float]:
+        """子プロセスで関数を呼び、結果と、子プロセスでの処理時間と、オーバーヘッドを返す。
+
+        Raises:
+            IsolationError: 上限を超えた場合、または子プロセスが異常終了した場合
+        """
+        with self._slot_semaphore():
+            started: Final[float] = time.perf_counter()
+            child: Final[_ChildProcess] = self._acquire()
+            try:
+                status, value, child_seconds = self._exchange(label, child, function, args)
+            except IsolationError:
+                self._count(failed=True)
+                raise
+            elapsed: Final[float] = time.perf_counter() - started
+
+        if status != "ok":
+            child.kill()
+            self._count(failed=True)
+            if status == "memory":
+                raise IsolationError(f"{label} exceeded the memory limit of {self._memory_limit_text()}")
+            raise IsolationError(f"{label} failed in the isolated process: {value}")
+        self._release(child)
+        overhead_seconds: Final[float] = max(elapsed - child_seconds, 0.0)
+        self._count(child_seconds=child_seconds, overhead_seconds=overhead_seconds)
+        return value, child_seconds, overhead_seconds
+
+    def _exchange(
+        self, label: str, child: _ChildProcess, function: Callable[..., Tuple[Any, ...]], args: Tuple[Any, ...]
+    ) -> Tuple[str, Any, float]:
+        """子プロセスに要求を送り、経過時間の上限まで結果を待つ。
+
+        Raises:
+            IsolationError: 経過時間の上限を超えた場合、または子プロセスが結果を返さずに終了した場合
+        """
+        try:
+            try:
+                child.connection.send((function, args))
+            except OSError:
+                # 要求を受け取りきれずに終了した子プロセス [メモリの上限など] も、理由を送っていれば読み取れる
+                pass
+            if not child.connection.poll(self.limits.wall_clock_seconds):
+                child.kill()
+                raise IsolationError(f"{label} exceeded the wall-clock limit of {self.limits.wall_clock_seconds:g} seconds")
+            return child.connection.recv()
+        except (EOFError, OSError) as e:
+            # 終了コード [シグナル] で理由を判別するため、終了するのを少し待ってから強制終了する
+            child.process.join(1)
+            raise IsolationError(self._describe_exit(label, child.kill())) from e
+
+    def _slot_semaphore(self) -> threading.BoundedSemaphore:
+        """同時に実行する子プロセスの数の分だけ枠を持つセマフォを返す [初回に作る]。"""
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(self.size)
+            return self._slots
+
+    def _acquire(self) -> _ChildProcess:
+        """待機中の子プロセスを取り出す [ない場合は起動する]。"""
+        with self._lock:
+            while self._idle:
+                child: _ChildProcess = self._idle.pop()
+                if child.process.is_alive():
+                    return child
+                child.kill()
+            self._stats = self._stats.model_copy(update={"spawned": self._stats.spawned + 1})
+        return _ChildProcess(self.limits, self.mode == "pooled")
+
+    def _release(self, child: _ChildProcess) -> None:
+        """pooled の場合は子プロセスを待機させ、per_call の場合は終了させる。"""
+        if self.mode == "pooled":
+            with self._lock:
+                self._idle.append(child)
+            return
+        child.close()
+
+    def _count(self, child_seconds: float = 0.0, overhead_seconds: float = 0.0, failed: bool = False) -> None:
+        """呼び出しを集計に加える。"""
+        with self._lock:
+            stats: Final[IsolationStats] = self._stats
+            self._stats = stats.model_copy(
+                update={
+                    "calls": stats.calls + 1,
+                    "failures": stats.failures + (1 if failed else 0),
+                    "child_seconds": stats.child_seconds + child_seconds,
+                    "overhead_seconds": stats.overhead_seconds + overhead_seconds,
+                }
+            )
+
+    def _describe_exit(self, label: str, exit_code: Optional[int]) -> str:
+        """子プロセスの終了コードから、失敗の理由を作る。"""
+        if sys.platform != "win32" and exit_code == -signal.SIGXCPU and self.limits.cpu_seconds is not None:
+            return f"{label} exceeded the CPU time limit of {self.limits.cpu_seconds:g} seconds"
+        if exit_code == -signal.SIGKILL and self.limits.memory_bytes is not None:
+            return f"{label} was killed, possibly for exceeding the memory limit of {self._memory_limit_text()}"
+        return f"{label} terminated abruptly in the isolated process (exit code {exit_code})"
+
+    def _memory_limit_text(self) -> str:
+        """メモリの上限を表示用の文字列にする。"""
+        return "unlimited memory" if self.limits.memory_bytes is None else f"{self.limits.memory_bytes / (1024 * 1024):g} MiB"
+
+
+def _process_context() -> Any:  # noqa: ANN401
+    """子プロセスを起動するコンテキストを返す [forkserver では、このモジュールを読み込み済みの状態から起動する]。"""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context: Final = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def _parse_in_child(
+    ingested: IngestedBlob, csv_rows_name: str, enable_fill_nan: bool, fill_nan_with: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """子プロセスで設定ファイルをパースする。"""
+    parser: Final[ConfigParser] = ConfigParser(ingested)
+    parser.csv_rows_name = csv_rows_name
+    parser.fill_nan_with = fill_nan_with
+    parser.enable_fill_nan = enable_fill_nan
+    parser.parse()
+    return parser.parsed_dict, parser.error_message
+
+
+# 子プロセスの中でキャッシュする、読み込み済みのテンプレート [キーは内容ハッシュ]
+_CHILD_TEMPLATES: Final["OrderedDict[str, DocumentRender]"] = OrderedDict()
+
+
+def _render_in_child(
+    template: IngestedBlob, context: Dict[str, Any], format_type: int, is_strict_undefined: bool
+) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
+    """子プロセスでテンプレートにコンテキストを適用する。"""
+    key: Final[str] = f"{template.content_hash}:{template.encoding}"
+    render: Optional[DocumentRender] = _CHILD_TEMPLATES.get(key)
+    if render is None:
+        render = DocumentRender(template)
+        _CHILD_TEMPLATES[key] = render
+        while len(_CHILD_TEMPLATES) > CHILD_TEMPLATE_CACHE_SIZE:
+            _CHILD_TEMPLATES.popitem(last=False)
+    else:
+        _CHILD_TEMPLATES.move_to_end(key)
+    is_applied: Final[bool] = render.apply_context(context, format_type, is_strict_undefined)
+    return is_applied, render.render_content, render.raw_content, render.error_message
+
+
+def _child_main(connection: "Connection", limits: IsolationLimits, is_pooled: bool) -> None:
+    """子プロセスの本体。終了を伝えられるまで、要求を受け取って結果を返す。"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _apply_static_limits(limits)
+    while True:
+        try:
+            request: Optional[Tuple[Callable[..., Tuple[Any, ...]], Tuple[Any, ...]]] = connection.recv()
+        except (EOFError, OSError):
+            return
+        except MemoryError:
+            connection.send(("memory", None, 0.0))
+            return
+        if request is None:
+            return
+        function, args = request
+        _apply_cpu_limit(limits)
+        started: float = time.perf_counter()
+        try:
+            outcome: Tuple[str, object, float] = ("ok", function(*args), 0.0)
+        except MemoryError:
+            outcome = ("memory", None, 0.0)
+        except Exception as e:
+            outcome = ("error", f"{type(e).__name__}: {e}", 0.0)
+        outcome = (outcome[0], outcome[1], time.perf_counter() - started)
+        try:
+            connection.send(outcome)
+        except MemoryError:
+            connection.send(("memory", None, outcome[2]))
+        if not is_pooled or outcome[0] != "ok":
+            return
+
+
+def _apply_static_limits(limits: IsolationLimits) -> None:
+    """コアダンプを無効にし、アドレス空間の上限を設定する。"""
+    if sys.platform == "win32":
+        return
+    _set_soft_limit(resource.RLIMIT_CORE, 0)
+    if limits.memory_bytes is not None:
+        _set_soft_limit(resource.RLIMIT_AS, _address_space_bytes() + limits.memory_bytes)
+
+
+def _apply_cpu_limit(limits: IsolationLimits) -> None:
+    """これまでに使ったCPU時間に、1回の呼び出しの上限を加えた値を上限にする。"""
+    if sys.platform == "win32" or limits.cpu_seconds is None:
+        return
+    usage: Final = resource.getrusage(resource.RUSAGE_SELF)
+    _set_soft_limit(resource.RLIMIT_CPU, math.ceil(usage.ru_utime + usage.ru_stime + limits.cpu_seconds))
+
+
+def _set_soft_limit(kind: int, value: int) -> None:
+    """ハードリミットを超えない範囲でソフトリミットを設定する。"""
+    if sys.platform == "win32":
+        return
+    _, hard = resource.getrlimit(kind)
+    resource.setrlimit(kind, (value if hard == resource.RLIM_INFINITY else min(value, hard), hard))
+
+
+def _address_space_bytes() -> int:
+    """現在のアドレス空間の大きさを返す [求められない場合は0]。"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
@@ -0,0 +1,196 @@
+"""設定ファイル形式ごとのパーサーバックエンドを管理するモジュール。
+
+このモジュールは、TOML/YAML/CSVの各形式に対して複数のパーサー実装を登録し、
+利用可能な中で最も高速な実装を自動選択するレジストリを提供します。
+
+主な機能:
+- バックエンドの登録と優先度に基づく自動選択
+- C拡張 [libyaml] が利用できない環境での純Python実装へのフォールバック
+- 高速実装が失敗した場合の参照実装による再パース
+- YAMLのエイリアス展開の予算 [yaml_budget。どちらの実装でも構築前に適用]
+
+参照実装 [reference] について:
+各形式には必ず1つの参照実装を登録します。高速実装は参照実装と同一の結果を返すことが
+前提ですが、エラーメッセージの文言は実装ごとに異なります [例: libyamlは入力行の抜粋を含まない]。
+既存のエラーメッセージ契約を保つため、高速実装が例外を送出した場合は参照実装で再パースし、
+参照実装の結果または例外をそのまま返します。正常系のみが高速化の対象です。
+ただし、実装に依存しない検証のエラー [YAMLの予算超過] は再パースせずにそのまま送出します
+[参照実装でも同じエラーになるため、再パースはパースの費用を倍にするだけ]。
+
+登録済みバックエンド:
+- toml: tomllib [参照]
+- yaml: pyyaml-c [libyaml CSafeLoader, 利用可能な場合のみ], pyyaml [SafeLoader, 参照] [いずれも予算付き]
+- csv: stdlib-csv [C実装の _csv, 参照]
+
+典型的な使用方法:
+```python
+parsed = PARSER_BACKENDS.loads("yaml", text)
+backend = PARSER_BACKENDS.select("yaml")  # 自動選択された実装
+pure = PARSER_BACKENDS.loads("yaml", text, backend_name="pyyaml")  # 実装を固定
+```
+"""
+
+import csv
+import tomllib
+from io import StringIO
+from typing import Any, Callable, Dict, Final, List, Optional, Tuple, Type
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from . import yaml_budget
+
+# 同じ検証をどの実装でも行うため、参照実装でも同じ結果になるエラー
+_BACKEND_INDEPENDENT_ERRORS: Final[Tuple[Type[Exception], ...]] = (yaml_budget.YAMLBudgetError,)
+
+
+class ParserBackend(BaseModel):
+    """1つのパーサー実装を表すモデル。
+
+    Attributes:
+        name: バックエンド名 [形式内で一意]
+        file_format: 対象の形式 [toml/yaml/csv]
+        loads: テキストをパースする関数
+        priority: 自動選択の優先度 [大きいほど優先]
+        is_accelerated: C拡張などによる高速実装かどうか
+        is_reference: 参照実装かどうか [エラーメッセージと結果の正]
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    name: str = Field(..., min_length=1)
+    file_format: str = Field(..., min_length=1)
+    loads: Callable[[str], Any]
+    priority: int = Field(default=0)
+    is_accelerated: bool = Field(default=False)
+    is_reference: bool = Field(default=False)
+
+
+class ParserBackendRegistry(BaseModel):
+    """形式ごとのパーサーバックエンドを管理するレジストリ。"""
+
+    _backends: Dict[str, List[ParserBackend]] = PrivateAttr(default_factory=dict)
+
+    def register(self, backend: ParserBackend) -> None:
+        """バックエンドを登録する。
+
+        Args:
+            backend: 登録するバックエンド
+
+        Raises:
+            ValueError: 同名のバックエンド、または2つ目の参照実装を登録しようとした場合
+        """
+        registered: Final[List[ParserBackend]] = self._backends.setdefault(backend.file_format, [])
+        if any(existing.name == backend.name for existing in registered):
+            raise ValueError(f"Parser backend '{backend.name}' is already registered for '{backend.file_format}'")
+        if backend.is_reference and any(existing.is_reference for existing in registered):
+            raise ValueError(f"Reference parser backend is already registered for '{backend.file_format}'")
+
+        registered.append(backend)
+        registered.sort(key=lambda item: item.priority, reverse=True)
+
+    def backends(self, file_format: str) -> List[ParserBackend]:
+        """形式に登録済みのバックエンドを優先度順に返す。
+
+        Args:
+            file_format: 対象の形式
+
+        Returns:
+            List[ParserBackend]: 優先度の高い順のバックエンド一覧
+        """
+        return list(self._backends.get(file_format, []))
+
+    def select(self, file_format: str, backend_name: Optional[str] = None) -> ParserBackend:
+        """使用するバックエンドを選択する。
+
+        Args:
+            file_format: 対象の形式
+            backend_name: 固定するバックエンド名 [Noneの場合は最優先の実装]
+
+        Returns:
+            ParserBackend: 選択されたバックエンド
+
+        Raises:
+            ValueError: 形式または指定名のバックエンドが登録されていない場合
+        """
+        candidates: Final[List[ParserBackend]] = self.backends(file_format)
+        if not candidates:
+            raise ValueError(f"No parser backend registered for '{file_format}'")
+        if backend_name is None:
+            return candidates[0]
+        for backend in candidates:
+            if backend.name == backend_name:
+                return backend
+        raise ValueError(f"Parser backend '{backend_name}' is not available for '{file_format}'")
+
+    def reference(self, file_format: str) -> ParserBackend:
+        """形式の参照実装を返す。
+
+        Args:
+            file_format: 対象の形式
+
+        Returns:
+            ParserBackend: 参照実装
+
+        Raises:
+            ValueError: 参照実装が登録されていない場合
+        """
+        for backend in self.backends(file_format):
+            if backend.is_reference:
+                return backend
+        raise ValueError(f"No reference parser backend registered for '{file_format}'")
+
+    def loads(self, file_format: str, data: str, backend_name: Optional[str] = None) -> object:
+        """選択したバックエンドでテキストをパースする。
+
+        高速実装が失敗した場合は参照実装で再パースし、参照実装の例外文言を保ちます
+        [実装に依存しない検証のエラーは再パースせずに送出する]。
+
+        Args:
+            file_format: 対象の形式
+            data: パースするテキスト
+            backend_name: 固定するバックエンド名 [Noneの場合は自動選択]
+
+        Returns:
+            object: パース結果
+        """
+        backend: Final[ParserBackend] = self.select(file_format, backend_name)
+        if backend.is_reference:
+            return backend.loads(data)
+
+        try:
+            return backend.loads(data)
+        except _BACKEND_INDEPENDENT_ERRORS:
+            raise
+        except Exception:
+            # 例外の種類と文言は参照実装に委ねる [高速実装のエラー文言は契約外]
+            return self.reference(file_format).loads(data)
+
+
+def _load_yaml_pure(data: str) -> object:
+    """純Python実装の SafeLoader でYAMLをパースする [エイリアス展開の予算付き]。"""
+    return yaml.load(data, Loader=yaml_budget.BudgetedSafeLoader)  # noqa: S506
+
+
+def _load_yaml_libyaml(data: str) -> object:
+    """libyaml の CSafeLoader でYAMLをパースする [エイリアス展開の予算付き]。"""
+    return yaml.load(data, Loader=yaml_budget.BudgetedCSafeLoader)  # noqa: S506
+
+
+def _load_csv_rows(data: str) -> List[List[str]]:
+    """stdlib csv でCSVテキストを行単位に分解する [空行は除外]。"""
+    return [row for row in csv.reader(StringIO(data)) if row]
+
+
+def _create_default_registry() -> ParserBackendRegistry:
+    """標準のバックエンドを登録したレジストリを生成する。"""
+    registry: Final[ParserBackendRegistry] = ParserBackendRegistry()
+    registry.register(ParserBackend(name="tomllib", file_format="toml", loads=tomllib.loads, is_reference=True))
+    registry.register(ParserBackend(name="pyyaml", file_format="yaml", loads=_load_yaml_pure, is_reference=True))
+    if getattr(yaml, "__with_libyaml__", False):
+        registry.register(ParserBackend(name="pyyaml-c", file_format="yaml", loads=_load_yaml_libyaml, priority=10, is_accelerated=True))
+    registry.register(ParserBackend(name="stdlib-csv", file_format="csv", loads=_load_csv_rows, is_accelerated=True, is_reference=True))
+    return registry
+
+
+PARSER_BACKENDS: Final[ParserBackendRegistry] = _create_default_registry()
@@ -0,0 +1,243 @@
+"""AppCore の処理を段階ごとに計測し、所要時間/入出力サイズ/メモリ確保のピークを記録するモジュール。
+
+生成が遅い場合に、時間がトランスコーディング、サイズ検証、パース、静的検証、実行時の検証、
+レンダリング、フォーマット、エンコードのどこで使われたのかを判別できませんでした。
+このモジュールは、AppCore の各操作 [load_config_file/load_template_file/apply/get_download_content
+/write_download_content] を段階に分けて計測します。
+
+主な機能:
+- 計測: `measure_stage` で囲んだ区間の経過時間と、入出力のバイト数/文字数を記録します。
+  計測中の操作がない場合は何もしないため、DocumentRender などの内部から呼んでも単体の利用には影響しません。
+- メモリ: `trace_allocations` を有効にすると、tracemalloc で段階ごとのメモリ確保のピークを記録します
+  [段階の開始時点からの増分。計測のオーバーヘッドがあるため既定では無効]。
+- 記録: 連続した区間として囲めない時間は `record_stage` で、求めた経過時間をそのまま記録します。
+- フック: 段階が終わるたびに、登録したコールバックへ StageMetric を渡します [独自のエクスポーター向け]。
+  AppCore ごとのフックと、モジュール共通のフック [add_metrics_hook] を使えます。
+  フックが例外を送出しても無視し、残りのフックと処理はそのまま続けます。
+
+段階は入れ子にしません [入れ子にするとメモリ確保のピークが外側の段階から失われるため]。
+
+典型的な使用方法:
+```python
+add_metrics_hook(lambda metric: exporter.observe(metric.operation, metric.stage, metric.elapsed_seconds))
+core = AppCore("config error", "template error", trace_allocations=True)
+core.load_config_file(config, "csv_rows", True).load_template_file(template, True).apply(0, True)
+for metric in core.metrics.stages:
+    print(metric.operation, metric.stage, metric.elapsed_seconds, metric.peak_allocated_bytes)
+```
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Final, List, Optional, TypeAlias
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+
+class StageMetric(BaseModel):
+    """1つの段階の計測結果。
+
+    Attributes:
+        operation: AppCore の操作名 [例: "load_config_file"]
+        stage: 段階名 [例: "ingest"、"render"]
+        elapsed_seconds: 経過時間 [秒]
+        bytes_in: 入力のバイト数 [該当しない場合はNone]
+        bytes_out: 出力のバイト数 [該当しない場合はNone]
+        chars_in: 入力の文字数 [該当しない場合はNone]
+        chars_out: 出力の文字数 [該当しない場合はNone]
+        peak_allocated_bytes: 段階の開始時点から増えたメモリ確保のピーク [計測しない場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    operation: str
+    stage: str
+    elapsed_seconds: float
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    chars_in: Optional[int] = None
+    chars_out: Optional[int] = None
+    peak_allocated_bytes: Optional[int] = None
+
+
+MetricsHook: TypeAlias = Callable[[StageMetric], None]
+
+
+class StageSizes(BaseModel):
+    """計測中の段階で、処理の結果に応じて設定する入出力のサイズ。
+
+    Attributes:
+        bytes_in: 入力のバイト数
+        bytes_out: 出力のバイト数
+        chars_in: 入力の文字数
+        chars_out: 出力の文字数
+    """
+
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    chars_in: Optional[int] = None
+    chars_out: Optional[int] = None
+
+
+class PipelineMetrics(BaseModel):
+    """段階ごとの計測結果の一覧。
+
+    Attributes:
+        stages: 計測した段階 [実行順]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    stages: List[StageMetric] = Field(default_factory=list)
+
+    @property
+    def total_seconds(self) -> float:
+        """全段階の経過時間の合計を返す。"""
+        return sum(metric.elapsed_seconds for metric in self.stages)
+
+    def stage(self, name: str, operation: Optional[str] = None) -> Optional[StageMetric]:
+        """段階名 [と操作名] が一致する最後の計測結果を返す [ない場合はNone]。"""
+        for metric in reversed(self.stages):
+            if metric.stage == name and (operation is None or metric.operation == operation):
+                return metric
+        return None
+
+
+class MetricsRecorder(BaseModel):
+    """1回の操作の間、段階ごとの計測結果を集めるクラス。
+
+    Attributes:
+        operation: AppCore の操作名
+        trace_allocations: メモリ確保のピークを計測するかどうか
+        hooks: 段階が終わるたびに呼ぶコールバック [モジュール共通のフックの後に呼ぶ]
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    operation: str
+    trace_allocations: bool = False
+    hooks: Sequence[MetricsHook] = ()
+
+    _stages: List[StageMetric] = PrivateAttr(default_factory=list)
+
+    @contextmanager
+    def activate(self) -> Iterator["MetricsRecorder"]:
+        """この記録を計測中の操作にする [measure_stage の計測先になる]。"""
+        token = _ACTIVE_RECORDER.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_RECORDER.reset(token)
+
+    @contextmanager
+    def measure(self, stage: str, sizes: StageSizes) -> Iterator[StageSizes]:
+        """区間の経過時間 [とメモリ確保のピーク] を計測し、終了時に記録してフックを呼ぶ。
+
+        Args:
+            stage: 段階名
+            sizes: 入出力のサイズ [区間の中で設定できる]
+
+        Yields:
+            StageSizes: sizes そのもの
+        """
+        is_tracing_started: bool = False
+        allocated_at_start: int = 0
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                is_tracing_started = True
+            tracemalloc.reset_peak()
+            allocated_at_start = tracemalloc.get_traced_memory()[0]
+
+        started: Final[float] = time.perf_counter()
+        try:
+            yield sizes
+        finally:
+            elapsed_seconds: float = time.perf_counter() - started
+            peak_allocated_bytes: Optional[int] = None
+            if self.trace_allocations:
+                peak_allocated_bytes = max(tracemalloc.get_traced_memory()[1] - allocated_at_start, 0)
+                if is_tracing_started:
+                    tracemalloc.stop()
+            self.record(
+                StageMetric(
+                    operation=self.operation,
+                    stage=stage,
+                    elapsed_seconds=elapsed_seconds,
+                    peak_allocated_bytes=peak_allocated_bytes,
+                    **sizes.model_dump(),
+                )
+            )
+
+    def result(self) -> PipelineMetrics:
+        """集めた計測結果を返す。"""
+        return PipelineMetrics(stages=list(self._stages))
+
+    def record(self, metric: StageMetric) -> None:
+        """計測結果を追加し、フックを呼ぶ [フックが送出した例外は無視する]。"""
+        self._stages.append(metric)
+        for hook in [*_METRICS_HOOKS, *self.hooks]:
+            # エクスポーターの停止などで計測が失敗しても、パイプラインの結果は変えない
+            with suppress(Exception):
+                hook(metric)
+
+
+@contextmanager
+def measure_stage(
+    stage: str,
+    bytes_in: Optional[int] = None,
+    bytes_out: Optional[int] = None,
+    chars_in: Optional[int] = None,
+    chars_out: Optional[int] = None,
+) -> Iterator[StageSizes]:
+    """計測中の操作があれば、区間を1つの段階として計測する [ない場合は何もしない]。
+
+    Args:
+        stage: 段階名
+        bytes_in: 入力のバイト数
+        bytes_out: 出力のバイト数
+        chars_in: 入力の文字数
+        chars_out: 出力の文字数
+
+    Yields:
+        StageSizes: 区間の中で出力のサイズなどを設定するためのオブジェクト
+    """
+    sizes: Final[StageSizes] = StageSizes(bytes_in=bytes_in, bytes_out=bytes_out, chars_in=chars_in, chars_out=chars_out)
+    recorder: Final[Optional[MetricsRecorder]] = _ACTIVE_RECORDER.get()
+    if recorder is None:
+        yield sizes
+        return
+    with recorder.measure(stage, sizes):
+        yield sizes
+
+
+def record_stage(stage: str, elapsed_seconds: float) -> None:
+    """計測中の操作があれば、別に求めた経過時間を1つの段階として記録する [ない場合は何もしない]。
+
+    連続した区間として囲めない時間 [例: 子プロセスとの受け渡しのオーバーヘッド] の記録に使います。
+
+    Args:
+        stage: 段階名
+        elapsed_seconds: 経過時間 [秒]
+    """
+    recorder: Final[Optional[MetricsRecorder]] = _ACTIVE_RECORDER.get()
+    if recorder is not None:
+        recorder.record(StageMetric(operation=recorder.operation, stage=stage, elapsed_seconds=elapsed_seconds))
+
+
+def add_metrics_hook(hook: MetricsHook) -> None:
+    """すべての AppCore の段階の計測結果を受け取るフックを登録する。"""
+    _METRICS_HOOKS.append(hook)
+
+
+def remove_metrics_hook(hook: MetricsHook) -> None:
+    """add_metrics_hook で登録したフックを解除する [登録されていない場合は何もしない]。"""
+    if hook in _METRICS_HOOKS:
+        _METRICS_HOOKS.remove(hook)
+
+
+_ACTIVE_RECORDER: Final[ContextVar[Optional[MetricsRecorder]]] = ContextVar("active_metrics_recorder", default=None)
+_METRICS_HOOKS: Final[List[MetricsHook]] = []
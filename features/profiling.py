@@ -0,0 +1,305 @@
+"""遅い生成だけをプロファイルし、調査用の成果物として保存するモジュール。
+
+本番環境で生成が遅くなった場合に、同じ入力で再現しなくてもバグ報告にプロファイルを
+添付できるよう、AppCore の生成をプロファイラーで包みます。生成が閾値を超えた場合だけ、
+プロファイルと、入力のフィンガープリントおよび段階ごとの所要時間を保存します。
+
+主な機能:
+- プロファイラー: 決定的プロファイラー [cProfile。pstats 形式で保存] と、
+  サンプリングプロファイラー [別スレッドで一定間隔ごとにスタックを採取し、collapsed-stack 形式で保存] を選べます。
+  サンプリングは外部の依存なしに標準ライブラリだけで実装しており、オーバーヘッドが小さい代わりに短い生成では粗くなります。
+- 有効化: 呼び出しごとに ProfileSettings を渡すか、環境変数 `CG_PROFILE_DIR` [保存先]、
+  `CG_PROFILE_THRESHOLD_MS` [閾値。既定は1000]、`CG_PROFILE_MODE` [deterministic/sampling] で有効にします。
+  環境変数は、バッチCLI [features.cli] に加えて、共有の生成の入口 [render_service.generate と
+  async_core.generate_sync] でも呼び出しごとに読みます。
+- 成果物: `{時刻}-{ラベル}-{プロセスID}.pstats` または `.collapsed` と、同じ名前の `.json`
+  [ラベル、所要時間、閾値、設定ファイル/テンプレートのフィンガープリント、段階ごとの所要時間] を保存します。
+
+典型的な使用方法:
+```python
+settings = ProfileSettings.from_env() or ProfileSettings(output_dir=Path("profiles"), threshold_seconds=0.5)
+core = AppCore("config error", "template error")
+with capture_profile(core, settings, label="inventory") as capture:
+    core.load_config_file(config, "csv_rows", True).load_template_file(template, True).apply(0, True)
+if capture.artifact is not None:
+    print(f"slow generation profiled: {capture.artifact.profile_path}")
+```
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Final, List, Literal, Optional, TypeAlias
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .core import AppCore
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+ProfileMode: TypeAlias = Literal["deterministic", "sampling"]
+
+PROFILE_DIR_ENV_VAR: Final[str] = "CG_PROFILE_DIR"
+PROFILE_THRESHOLD_ENV_VAR: Final[str] = "CG_PROFILE_THRESHOLD_MS"
+PROFILE_MODE_ENV_VAR: Final[str] = "CG_PROFILE_MODE"
+
+# サンプリングの既定の間隔 [秒]
+DEFAULT_SAMPLE_INTERVAL_SECONDS: Final[float] = 0.005
+# 1つのスタックに含める最大のフレーム数 [深い再帰で成果物が肥大化しないように]
+MAX_STACK_DEPTH: Final[int] = 128
+# 決定的プロファイラーはプロセス内で同時に1つだけ [保持できない場合はプロファイルを省略する]
+_DETERMINISTIC_PROFILER_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+class ProfileSettings(BaseModel):
+    """プロファイルの設定。
+
+    Attributes:
+        output_dir: 成果物の保存先のディレクトリ
+        threshold_seconds: 成果物を保存する所要時間の閾値 [秒。0の場合は常に保存]
+        mode: プロファイラーの種類
+        sample_interval_seconds: サンプリングの間隔 [秒。sampling の場合だけ使う]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    output_dir: Path
+    threshold_seconds: Annotated[float, Field(ge=0)] = 1.0
+    mode: ProfileMode = "deterministic"
+    sample_interval_seconds: Annotated[float, Field(gt=0)] = DEFAULT_SAMPLE_INTERVAL_SECONDS
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> Optional["ProfileSettings"]:
+        """環境変数から設定を作る。
+
+        Args:
+            environ: 環境変数 [既定は os.environ]
+
+        Returns:
+            Optional[ProfileSettings]: 設定 [CG_PROFILE_DIR が未設定または空の場合はNone]
+
+        Raises:
+            ValueError: 閾値または種類が不正な場合
+        """
+        output_dir: Final[str] = environ.get(PROFILE_DIR_ENV_VAR, "")
+        if not output_dir:
+            return None
+        threshold_ms: Final[float] = float(environ.get(PROFILE_THRESHOLD_ENV_VAR, "1000"))
+        return cls.model_validate(
+            {
+                "output_dir": Path(output_dir),
+                "threshold_seconds": threshold_ms / 1000,
+                "mode": environ.get(PROFILE_MODE_ENV_VAR, "deterministic"),
+            }
+        )
+
+
+def profile_settings_from_env(environ: Mapping[str, str] = os.environ) -> Optional[ProfileSettings]:
+    """共有の生成の入口で使う、環境変数からの設定を返す [未設定または不正な場合はNone]。
+
+    不正な値で生成そのものを失敗させないよう、検証のエラーはプロファイルしないものとして扱います
+    [バッチCLIは、使用方法のエラーとして報告します]。
+
+    Args:
+        environ: 環境変数 [既定は os.environ]
+
+    Returns:
+        Optional[ProfileSettings]: 設定
+    """
+    try:
+        return ProfileSettings.from_env(environ)
+    except ValueError:
+        return None
+
+
+class ProfileArtifact(BaseModel):
+    """保存した成果物。
+
+    Attributes:
+        profile_path: プロファイルのパス [.pstats または .collapsed]
+        metadata_path: フィンガープリントと段階ごとの所要時間のパス [.json]
+        elapsed_seconds: 生成の所要時間 [秒]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    profile_path: Path
+    metadata_path: Path
+    elapsed_seconds: float
+
+
+class ProfileCapture(BaseModel):
+    """capture_profile の結果。
+
+    Attributes:
+        elapsed_seconds: 生成の所要時間 [秒。ブロックを抜けた後に設定される]
+        artifact: 保存した成果物 [閾値以下の場合、または保存できなかった場合はNone]
+        error_message: 成果物を保存できなかった理由、またはプロファイルを省略した理由 [それ以外はNone]
+    """
+
+    elapsed_seconds: Optional[float] = None
+    artifact: Optional[ProfileArtifact] = None
+    error_message: Optional[str] = None
+
+
+class StackSampler(BaseModel):
+    """別スレッドから対象のスレッドのスタックを一定間隔で採取するサンプリングプロファイラー。
+
+    Attributes:
+        interval_seconds: 採取の間隔 [秒]
+    """
+
+    interval_seconds: Annotated[float, Field(gt=0)] = DEFAULT_SAMPLE_INTERVAL_SECONDS
+
+    _samples: "Counter[str]" = PrivateAttr(default_factory=Counter)
+    _stop: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _thread: Optional[threading.Thread] = PrivateAttr(default=None)
+
+    def start(self) -> None:
+        """呼び出したスレッドを対象に採取を始める。"""
+        target_id: Final[int] = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(target_id,), name="cg-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """採取を止め、採取スレッドの終了を待つ。"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        """採取したスタックを collapsed-stack 形式 [`外側;...;内側 回数` の行] で返す。"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self._samples.items()))
+
+    @property
+    def sample_count(self) -> int:
+        """採取した回数を返す。"""
+        return sum(self._samples.values())
+
+    def _run(self, target_id: int) -> None:
+        """停止するまで、対象のスレッドのスタックを採取する。"""
+        while not self._stop.wait(self.interval_seconds):
+            frame: Optional["FrameType"] = sys._current_frames().get(target_id)  # noqa: SLF001
+            stack: List[str] = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self._samples[";".join(reversed(stack))] += 1
+
+
+@contextmanager
+def capture_profile(core: AppCore, settings: Optional[ProfileSettings], label: str = "generation") -> Iterator[ProfileCapture]:
+    """ブロック内の AppCore の生成をプロファイルし、閾値を超えた場合に成果物を保存する。
+
+    Args:
+        core: プロファイルする AppCore [フィンガープリントと段階ごとの所要時間を取得する]
+        settings: プロファイルの設定 [Noneの場合はプロファイルしない]
+        label: 成果物のファイル名に含めるラベル [例: 設定ファイル名]
+
+    Yields:
+        ProfileCapture: ブロックを抜けた後に、所要時間と成果物が設定される結果
+
+    Note:
+        成果物を保存できなかった場合も生成は失敗させず、理由を error_message に設定します。
+        cProfile のプロファイラーはプロセス内で同時に1つしか有効にできないため [Python 3.12以降は
+        enable が ValueError を送出する]、決定的プロファイラーが既に有効な場合はプロファイルを省略し、
+        理由を error_message に設定します [生成は通常どおり行う]。
+    """
+    capture: Final[ProfileCapture] = ProfileCapture()
+    if settings is None:
+        yield capture
+        return
+
+    profiler: Optional[cProfile.Profile] = None
+    sampler: Optional[StackSampler] = None
+    if settings.mode == "sampling":
+        sampler = StackSampler(interval_seconds=settings.sample_interval_seconds)
+        sampler.start()
+    else:
+        profiler = _enable_deterministic_profiler()
+        if profiler is None:
+            capture.error_message = "Profile skipped: another deterministic profiler is already active"
+    started: Final[float] = time.perf_counter()
+    try:
+        yield capture
+    finally:
+        capture.elapsed_seconds = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+            _DETERMINISTIC_PROFILER_LOCK.release()
+        if sampler is not None:
+            sampler.stop()
+
+    if capture.elapsed_seconds < settings.threshold_seconds or (profiler is None and sampler is None):
+        return
+    try:
+        capture.artifact = _save_artifact(core, settings, label, capture.elapsed_seconds, profiler, sampler)
+    except OSError as e:
+        capture.error_message = f"Profile error: {e}"
+
+
+def _enable_deterministic_profiler() -> Optional[cProfile.Profile]:
+    """他のプロファイラーが有効でなければ、決定的プロファイラーを有効にして返す [有効な場合はNone]。
+
+    有効にしたプロファイラーは、無効にした後で _DETERMINISTIC_PROFILER_LOCK を解放する必要があります。
+    """
+    if not _DETERMINISTIC_PROFILER_LOCK.acquire(blocking=False):
+        return None
+    profiler: Final[cProfile.Profile] = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # このモジュールの外で有効にされたプロファイラー [Python 3.12以降]
+        _DETERMINISTIC_PROFILER_LOCK.release()
+        return None
+    return profiler
+
+
+def _save_artifact(
+    core: AppCore,
+    settings: ProfileSettings,
+    label: str,
+    elapsed_seconds: float,
+    profiler: Optional[cProfile.Profile],
+    sampler: Optional[StackSampler],
+) -> ProfileArtifact:
+    """プロファイルとメタデータを保存する。"""
+    settings.output_dir.mkdir(parents=True, exist_ok=True)
+    safe_label: Final[str] = re.sub(r"[^0-9A-Za-z_.-]+", "_", label).strip("._") or "generation"
+    stem: Final[str] = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{safe_label}-{os.getpid()}"
+    metadata_path: Final[Path] = settings.output_dir / f"{stem}.json"
+
+    profile_path: Path
+    if profiler is not None:
+        profile_path = settings.output_dir / f"{stem}.pstats"
+        profiler.dump_stats(profile_path)
+    else:
+        profile_path = settings.output_dir / f"{stem}.collapsed"
+        profile_path.write_text(sampler.collapsed() if sampler is not None else "", encoding="utf-8")
+
+    metadata: Final[dict[str, object]] = {
+        "label": label,
+        "mode": settings.mode,
+        "elapsed_seconds": elapsed_seconds,
+        "threshold_seconds": settings.threshold_seconds,
+        "config_fingerprint": core.config_fingerprint,
+        "template_fingerprint": core.template_fingerprint,
+        "stages": [metric.model_dump(mode="json") for metric in core.metrics.stages],
+        "profile": profile_path.name,
+    }
+    metadata_path.write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+    return ProfileArtifact(profile_path=profile_path, metadata_path=metadata_path, elapsed_seconds=elapsed_seconds)
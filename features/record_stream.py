@@ -0,0 +1,193 @@
+"""レコード単位の入力形式 [NDJSON/複数ドキュメントYAML] を扱うモジュール。
+
+このモジュールは、1行1レコードのNDJSON [.ndjson/.jsonl] と、1ドキュメント1レコードの
+YAMLストリームを、レコード単位で逐次検証し、CSVと同じ行のリストとして公開します。
+
+主な機能:
+- 逐次スキャン: 入力全体を分割コピーせず、レコード境界を1パスで走査します。
+- レコード単位の検証: 構文エラーや非マッピングのレコードを、レコード番号と行番号付きで報告します。
+- 1回のデコード: 検証のためにデコードしたレコードをそのまま保持し、参照時に再びデコードしません。
+- メモリ予算: デコードしたレコードのメモリ使用量の見積もりを、レコードごとに累計して上限と比較します
+  [小さなレコードが多い入力は、テキストより大きなオブジェクトになるため]。
+
+レコード境界:
+- NDJSON: 改行区切り。空行 [空白のみの行を含む] は読み飛ばします。
+- YAML: 行頭の `---` [ドキュメント開始] および `...` [ドキュメント終了] マーカー。
+  コメントと空行のみのドキュメントは読み飛ばします。
+
+典型的な使用方法:
+```python
+rows = scan_ndjson(text, max_bytes=150 * 1024 * 1024)
+rows[0]          # 最初のレコード [デコード済み]
+for row in rows: # テンプレートからの参照
+    ...
+```
+"""
+
+import json
+import re
+import sys
+from collections.abc import Iterator
+from typing import Any, Dict, Final, List, Optional, Pattern, Tuple
+
+import yaml
+
+from .parser_backends import PARSER_BACKENDS
+from .yaml_budget import YAMLBudgetError
+
+RecordDict = Dict[str, Any]
+RecordSpan = Tuple[int, int, int]  # (開始オフセット, 終了オフセット, 開始行番号 [1始まり])
+
+YAML_DOCUMENT_MARKER: Final[Pattern[str]] = re.compile(r"^(?:---|\.\.\.)(?=[ \t\r\n]|$)", re.MULTILINE)
+
+
+class RecordStreamError(ValueError):
+    """レコード単位の入力で、特定のレコードのパースに失敗したことを表す例外。
+
+    Attributes:
+        record_index: 失敗したレコードの番号 [1始まり]
+        line: 失敗した位置の行番号 [1始まり]
+    """
+
+    def __init__(self, format_name: str, record_index: int, line: int, detail: str) -> None:
+        self.record_index = record_index
+        self.line = line
+        super().__init__(f"Failed to parse {format_name}: record {record_index} (line {line}): {detail}")
+
+
+def _iter_lines(text: str, start: int = 0, stop: Optional[int] = None, line: int = 1) -> Iterator[Tuple[int, int, int]]:
+    """テキストを分割コピーせずに (開始, 終了 [改行を除く], 行番号) を順に返す。"""
+    limit: Final[int] = len(text) if stop is None else stop
+    while start < limit:
+        newline = text.find("\n", start, limit)
+        end = limit if newline == -1 else newline
+        yield start, end, line
+        start = end + 1
+        line += 1
+
+
+def scan_ndjson(text: str, max_bytes: Optional[int] = None) -> List[RecordDict]:
+    """NDJSONテキストを逐次検証し、レコードのリストを返す。
+
+    Args:
+        text: NDJSONテキスト
+        max_bytes: デコードしたレコードのメモリ使用量の上限 [Noneの場合は無制限]
+
+    Returns:
+        List[RecordDict]: レコードのリスト
+
+    Raises:
+        RecordStreamError: JSONとして不正なレコード、またはオブジェクト以外のレコードがある場合
+        ValueError: レコードが1件もない場合、またはメモリ予算を超えた場合
+    """
+    records: Final[List[RecordDict]] = []
+    total: int = 0
+    for start, end, line in _iter_lines(text):
+        record_text = text[start:end]
+        if not record_text.strip():
+            continue
+        try:
+            record = json.loads(record_text)
+        except json.JSONDecodeError as e:
+            raise RecordStreamError("NDJSON", len(records) + 1, line, f"{e.msg} at column {e.colno}") from e
+        if not isinstance(record, dict):
+            raise RecordStreamError("NDJSON", len(records) + 1, line, "record is not a JSON object")
+
+        records.append(record)
+        total += _record_size(record)
+        _check_budget(total, max_bytes)
+
+    if not records:
+        raise ValueError("NDJSON file must contain at least one record.")
+    return records
+
+
+def split_yaml_documents(text: str) -> List[RecordSpan]:
+    """YAMLストリームを、内容を持つドキュメントの位置に分割する。
+
+    Args:
+        text: YAMLテキスト
+
+    Returns:
+        List[RecordSpan]: 空でない各ドキュメントの (開始, 終了, 開始行番号)
+    """
+    spans: List[RecordSpan] = []
+    doc_start: int = 0
+    doc_line: int = 1
+    scanned_pos: int = 0
+    scanned_line: int = 1
+    for marker in YAML_DOCUMENT_MARKER.finditer(text):
+        _append_yaml_document(text, doc_start, marker.start(), doc_line, spans)
+        scanned_line += text.count("\n", scanned_pos, marker.start())
+        scanned_pos = marker.start()
+        if marker.group(0) == "---":
+            # `--- value` のようにマーカー行が内容を持つ場合があるため、ドキュメントはマーカー行から始める
+            doc_start, doc_line = marker.start(), scanned_line
+        else:
+            line_end = text.find("\n", marker.end())
+            doc_start = len(text) if line_end == -1 else line_end + 1
+            doc_line = scanned_line + 1
+    _append_yaml_document(text, doc_start, len(text), doc_line, spans)
+    return spans
+
+
+def _append_yaml_document(text: str, start: int, end: int, line: int, spans: List[RecordSpan]) -> None:
+    """コメント/ディレクティブ/空行以外の内容を持つ場合だけ、ドキュメントの位置を追加する。"""
+    for line_start, line_end, _ in _iter_lines(text, start, end, line):
+        content = text[line_start:line_end].strip()
+        if content.startswith("---"):
+            content = content[3:].strip()
+        if content and not content.startswith(("#", "%")):
+            spans.append((start, end, line))
+            return
+
+
+def scan_yaml_documents(
+    text: str, spans: List[RecordSpan], max_bytes: Optional[int] = None, backend_name: Optional[str] = None
+) -> List[RecordDict]:
+    """YAMLストリームの各ドキュメントを逐次検証し、レコードのリストを返す。
+
+    Args:
+        text: YAMLテキスト
+        spans: `split_yaml_documents` が返したドキュメントの位置
+        max_bytes: デコードしたドキュメントのメモリ使用量の上限 [Noneの場合は無制限]
+        backend_name: 固定するYAMLバックエンド名 [Noneの場合は自動選択]
+
+    Returns:
+        List[RecordDict]: ドキュメントのリスト
+
+    Raises:
+        RecordStreamError: YAMLとして不正なドキュメント、マッピング以外のドキュメント、
+            またはエイリアス展開の予算を超えるドキュメントがある場合
+        ValueError: メモリ予算を超えた場合
+    """
+    records: Final[List[RecordDict]] = []
+    total: int = 0
+    for index, (start, end, line) in enumerate(spans):
+        try:
+            document = PARSER_BACKENDS.loads("yaml", text[start:end], backend_name)
+        except yaml.MarkedYAMLError as e:
+            mark = e.problem_mark or e.context_mark
+            error_line = line + mark.line if mark is not None else line
+            raise RecordStreamError("YAML stream", index + 1, error_line, str(e.problem or e.context)) from e
+        except YAMLBudgetError as e:
+            raise RecordStreamError("YAML stream", index + 1, line + e.line - 1, e.detail) from e
+        if not isinstance(document, dict):
+            raise RecordStreamError("YAML stream", index + 1, line, "document is not a mapping")
+
+        records.append(document)
+        total += _record_size(document)
+        _check_budget(total, max_bytes)
+
+    return records
+
+
+def _record_size(record: RecordDict) -> int:
+    """レコードのメモリ使用量を、辞書とその直下のキー/値の大きさから見積もる。"""
+    return sys.getsizeof(record) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in record.items())
+
+
+def _check_budget(total: int, max_bytes: Optional[int]) -> None:
+    """デコードしたレコードのメモリ使用量の累計が、メモリ予算を超えていないか確認する。"""
+    if max_bytes is not None and total > max_bytes:
+        raise ValueError(f"Memory consumption exceeds the maximum limit of {max_bytes // (1024 * 1024)}MB")
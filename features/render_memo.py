@@ -0,0 +1,184 @@
+"""AppCore.apply の結果を、入力の内容から求めたキーで再利用するメモ化モジュール。
+
+ライブプレビューは、フォーカスの移動や設定の切り替えのたびに、同じ設定ファイルと
+テンプレートで生成を依頼し直します。`AppCore.apply` はそのたびに実行時の検証、
+レンダリング、フォーマットをやり直していました。このモジュールは次の値をキーに、
+レンダリングの結果を保持します。
+
+- 設定ファイルのキー [内容ハッシュ、エンコーディング、ファイル名、CSVの読み込みオプション]
+- テンプレートのキー [内容ハッシュとエンコーディング]
+- 未定義変数を厳密にチェックするかどうか
+
+フォーマットの種類はキーに含めません。フォーマット前のレンダリング結果を保持し、
+フォーマットの種類だけが変わった場合はフォーマットだけをやり直します。
+実行時エラーも結果として保持し、同じ入力では同じエラーを返します。
+
+キャッシュはモジュール共通の `RENDER_MEMO` として、AppCoreのインスタンスをまたいで保持されます
+[スレッドで実行する AppCore も共有するため、参照と更新はスレッドセーフです。保存した結果は変更しません]。
+
+典型的な使用方法:
+```python
+memo = RenderMemo(max_entries=8, max_text_chars=64 * 1024 * 1024)
+core = AppCore("config error", "template error", render_memo=memo)
+core.load_config_file(config, "csv_rows", True).load_template_file(template, True)
+core.apply(0, True)  # レンダリングしてメモ化
+core.apply(4, True)  # フォーマットだけをやり直す
+```
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Annotated, Final, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .detection_cache import content_key
+
+
+def render_memo_key(config_key: str, template_key: str, is_strict_undefined: bool) -> str:
+    """設定ファイル/テンプレートのキーと未定義変数の扱いから、メモのキーを生成する。
+
+    Args:
+        config_key: 設定ファイルのキー
+        template_key: テンプレートのキー
+        is_strict_undefined: 未定義変数を厳密にチェックするかどうか
+
+    Returns:
+        str: メモのキー [16進数]
+    """
+    return content_key(f"{config_key}\0{template_key}\0{is_strict_undefined}".encode())
+
+
+class RenderMemoEntry(BaseModel):
+    """1つの入力に対するレンダリングの結果。
+
+    Attributes:
+        raw_text: フォーマット前のレンダリング結果 [エラーの場合はNone]
+        error_message: レンダリングのエラーメッセージ [成功した場合はNone]
+        formatted: フォーマットの種類ごとのフォーマット済みの結果
+    """
+
+    raw_text: Optional[str] = Field(default=None, repr=False)
+    error_message: Optional[str] = None
+    formatted: dict[int, str] = Field(default_factory=dict, repr=False)
+
+    @property
+    def text_chars(self) -> int:
+        """保持している文字列の合計の文字数を返す [レンダリング結果と同じ文字列は数えない]。"""
+        raw_text: Final[Optional[str]] = self.raw_text
+        return (0 if raw_text is None else len(raw_text)) + sum(len(text) for text in self.formatted.values() if text is not raw_text)
+
+
+class RenderMemo(BaseModel):
+    """メモのキーをキーにレンダリングの結果を保持する、件数と文字数に上限のあるLRUキャッシュ。
+
+    Attributes:
+        max_entries: 保持する最大件数
+        max_text_chars: 保持する文字列の合計の上限 [文字数]
+
+    Properties:
+        hits: メモから結果を返した回数
+        misses: メモに結果がなかった回数
+    """
+
+    max_entries: Annotated[int, Field(gt=0)] = 8
+    max_text_chars: Annotated[int, Field(ge=0)] = 64 * 1024 * 1024
+
+    _entries: "OrderedDict[str, RenderMemoEntry]" = PrivateAttr(default_factory=OrderedDict)
+    _text_chars: int = PrivateAttr(default=0)
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def get(self, key: str) -> Optional[RenderMemoEntry]:
+        """キーに対応する結果を返す。
+
+        Args:
+            key: render_memo_key で生成したキー
+
+        Returns:
+            Optional[RenderMemoEntry]: レンダリングの結果 [メモにない場合はNone]
+        """
+        with self._lock:
+            entry: Final[Optional[RenderMemoEntry]] = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: RenderMemoEntry) -> None:
+        """結果を保存する [上限を超える結果は保存せず、合計の上限を超えた場合は古い結果から破棄する]。
+
+        Args:
+            key: render_memo_key で生成したキー
+            entry: 保存する結果
+        """
+        with self._lock:
+            self._remove(key)
+            if entry.text_chars > self.max_text_chars:
+                return
+
+            self._entries[key] = entry
+            self._text_chars += entry.text_chars
+            self._evict()
+
+    def put_formatted(self, key: str, format_type: int, text: str) -> None:
+        """保存済みの結果に、フォーマット済みの結果を追加する。
+
+        他のスレッドが参照している結果は変更せず、追加した複製に置き換える。
+
+        Args:
+            key: render_memo_key で生成したキー
+            format_type: フォーマットの種類
+            text: フォーマット済みの結果
+        """
+        with self._lock:
+            entry: Final[Optional[RenderMemoEntry]] = self._entries.get(key)
+            if entry is None:
+                return
+
+            updated: Final[RenderMemoEntry] = entry.model_copy(update={"formatted": {**entry.formatted, format_type: text}})
+            if updated.text_chars > self.max_text_chars:
+                self._remove(key)
+                return
+            # 既存のキーへの代入は、LRUの順序を変えない
+            self._entries[key] = updated
+            self._text_chars += updated.text_chars - entry.text_chars
+            self._evict()
+
+    def clear(self) -> None:
+        """保持している結果をすべて破棄する。"""
+        with self._lock:
+            self._entries.clear()
+            self._text_chars = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        """メモから結果を返した回数を返す。"""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """メモに結果がなかった回数を返す。"""
+        return self._misses
+
+    def _evict(self) -> None:
+        """件数または文字数の上限を超えている間、古い結果から破棄する [ロックを取得して呼ぶ]。"""
+        while len(self._entries) > self.max_entries or self._text_chars > self.max_text_chars:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        """結果を破棄し、文字数の合計から差し引く [ロックを取得して呼ぶ]。"""
+        entry: Final[Optional[RenderMemoEntry]] = self._entries.pop(key, None)
+        if entry is not None:
+            self._text_chars -= entry.text_chars
+
+
+# AppCoreのインスタンスをまたいで共有するメモ [Webアプリは生成のたびにAppCoreを作り直すため]
+RENDER_MEMO: Final[RenderMemo] = RenderMemo()
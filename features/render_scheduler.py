@@ -0,0 +1,315 @@
+"""レンダリングサービスの生成を、見積もったコストに基づいて公平に実行する順序を決めるモジュール。
+
+1人の利用者が100万行のCSVを生成すると、ワーカーが埋まり、他の利用者のプレビューが待たされていました。
+このモジュールは、AppCore で生成する前に要求のコストを見積もり、実行を始める順序と、
+受け付けるかどうかを決めます [render_service の `--schedule` で使う]。
+
+主な機能:
+- コストの見積もり: 入力の大きさと、テンプレートのループの構造 [for の数と入れ子の深さ] から、
+  処理する文字数のおおよその量 [単位] を見積もります。ループ1回で設定ファイル全体を1回走査するとみなし、
+  入れ子のループは深さの分だけ重く数えます。相対的な大小の比較だけに使う目安です。
+- 優先度: 見積もりが interactive_max_units 以下の要求を対話的な要求とし、バッチの要求より先に実行します。
+  バッチの要求は、最後の1つの実行枠を使いません [対話的な要求がバッチの後ろで待たないように]。
+- 公平性: 同じ優先度の中では、実行中の要求が少ない利用者を先にし、同じ場合は先に届いた要求を先にします。
+  利用者ごとの同時実行数は per_client_concurrency までです。
+- 受け付けの制御: 実行中のバッチの見積もりの合計は capacity_units までです。超える場合は待たせ、
+  待っているバッチの見積もりの合計が max_queue_units を超える場合、利用者ごとの待ち数が上限を超える場合、
+  queue_timeout_seconds 待っても実行できない場合は、AdmissionRejectedError で断ります [HTTPの503]。
+
+1つの要求の見積もりが capacity_units を超える場合は capacity_units として数えます
+[他のバッチがすべて終われば実行でき、いつまでも断られることはありません]。
+同じ優先度の中では後の要求が先の要求を追い越さないため、大きなバッチが小さなバッチに埋もれ続けることもありません。
+
+典型的な使用方法:
+```python
+scheduler = RenderScheduler(slots=4)
+cost = estimate_cost(request.config_text, request.template_text)
+try:
+    with scheduler.slot(client_id, cost):
+        result = generate(request)
+except AdmissionRejectedError as e:
+    respond_503(retry_after=e.retry_after_seconds)
+```
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Annotated, Final, List, Literal, Optional, Tuple, TypeAlias
+
+from jinja2 import Environment, TemplateSyntaxError, nodes
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+SchedulingClass: TypeAlias = Literal["interactive", "batch"]
+
+# 対話的な要求とみなす見積もりの上限の既定値 [単位。数千行のCSVに1段のループ程度]
+DEFAULT_INTERACTIVE_MAX_UNITS: Final[int] = 1024 * 1024
+# 同時に実行するバッチの見積もりの合計の既定値 [単位]
+DEFAULT_CAPACITY_UNITS: Final[int] = 256 * 1024 * 1024
+# 待っているバッチの見積もりの合計の既定値 [単位]
+DEFAULT_MAX_QUEUE_UNITS: Final[int] = 1024 * 1024 * 1024
+# 断った要求に返す、再試行までの秒数
+DEFAULT_RETRY_AFTER_SECONDS: Final[int] = 2
+
+# ループの構造を求めるためだけに使う環境 [拡張はレンダリングと同じ]
+_PARSE_ENVIRONMENT: Final[Environment] = Environment(autoescape=True, extensions=["jinja2.ext.do"])
+
+
+class RequestCost(BaseModel):
+    """要求のコストの見積もり。
+
+    Attributes:
+        config_size: 設定ファイルの文字数
+        template_size: テンプレートの文字数
+        estimated_rows: 設定ファイルの行数 [CSVのレコード数の目安]
+        loop_count: テンプレートの for の数
+        max_loop_depth: テンプレートの for の入れ子の最大の深さ
+        units: 見積もり [単位]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    config_size: int
+    template_size: int
+    estimated_rows: int
+    loop_count: int
+    max_loop_depth: int
+    units: int
+
+
+def estimate_cost(config_text: str, template_text: str) -> RequestCost:
+    """入力の大きさとテンプレートのループの構造から、要求のコストを見積もる。
+
+    Args:
+        config_text: 設定ファイルの内容
+        template_text: テンプレートの内容 [構文エラーの場合はループがないとみなす]
+
+    Returns:
+        RequestCost: コストの見積もり
+    """
+    loop_depths: Final[Tuple[int, ...]] = _loop_depths(template_text)
+    config_size: Final[int] = len(config_text)
+    template_size: Final[int] = len(template_text)
+    return RequestCost(
+        config_size=config_size,
+        template_size=template_size,
+        estimated_rows=config_text.count("\n") + (1 if config_text and not config_text.endswith("\n") else 0),
+        loop_count=len(loop_depths),
+        max_loop_depth=max(loop_depths, default=0),
+        units=template_size + config_size * (1 + sum(loop_depths)),
+    )
+
+
+@lru_cache(maxsize=64)
+def _loop_depths(template_text: str) -> Tuple[int, ...]:
+    """テンプレートの for ごとの入れ子の深さ [最も外側が1] を返す。"""
+    try:
+        tree: Final[nodes.Template] = _PARSE_ENVIRONMENT.parse(template_text)
+    except TemplateSyntaxError:
+        return ()
+    depths: Final[List[int]] = []
+
+    def walk(node: nodes.Node, depth: int) -> None:
+        for child in node.iter_child_nodes():
+            if isinstance(child, nodes.For):
+                depths.append(depth + 1)
+                walk(child, depth + 1)
+            else:
+                walk(child, depth)
+
+    walk(tree, 0)
+    return tuple(depths)
+
+
+class AdmissionRejectedError(Exception):
+    """要求を受け付けなかったことを表す例外。
+
+    Attributes:
+        reason: 断った理由
+        retry_after_seconds: 再試行までの秒数の目安
+    """
+
+    def __init__(self, reason: str, retry_after_seconds: int = DEFAULT_RETRY_AFTER_SECONDS) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class SchedulerSnapshot(BaseModel):
+    """スケジューラーの状態。
+
+    Attributes:
+        running: 実行中の要求の数
+        running_batch_units: 実行中のバッチの見積もりの合計 [単位]
+        queued_interactive: 待っている対話的な要求の数
+        queued_batch: 待っているバッチの要求の数
+        queued_batch_units: 待っているバッチの見積もりの合計 [単位]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    running: int
+    running_batch_units: int
+    queued_interactive: int
+    queued_batch: int
+    queued_batch_units: int
+
+
+class ScheduledTicket(BaseModel):
+    """実行を待っている、または実行中の要求。
+
+    Attributes:
+        client_id: 利用者の識別子
+        scheduling_class: 優先度
+        units: スケジューラーが数える見積もり [capacity_units を上限とする]
+        sequence: 届いた順の通し番号
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    client_id: str
+    scheduling_class: SchedulingClass
+    units: int
+    sequence: int
+
+
+class RenderScheduler(BaseModel):
+    """要求の実行を始める順序と、受け付けるかどうかを決めるスケジューラー [スレッドセーフ]。
+
+    Attributes:
+        slots: 同時に実行する要求の数 [ワーカーの数]
+        capacity_units: 同時に実行するバッチの見積もりの合計の上限 [単位]
+        interactive_max_units: 対話的な要求とみなす見積もりの上限 [単位]
+        per_client_concurrency: 利用者ごとの同時実行数の上限
+        max_queued_per_client: 利用者ごとの待っている要求の数の上限
+        max_queue_units: 待っているバッチの見積もりの合計の上限 [単位]
+        queue_timeout_seconds: 実行を待つ時間の上限 [秒]
+    """
+
+    slots: Annotated[int, Field(ge=1)]
+    capacity_units: Annotated[int, Field(gt=0)] = DEFAULT_CAPACITY_UNITS
+    interactive_max_units: Annotated[int, Field(ge=0)] = DEFAULT_INTERACTIVE_MAX_UNITS
+    per_client_concurrency: Annotated[int, Field(ge=1)] = 2
+    max_queued_per_client: Annotated[int, Field(ge=0)] = 16
+    max_queue_units: Annotated[int, Field(ge=0)] = DEFAULT_MAX_QUEUE_UNITS
+    queue_timeout_seconds: Annotated[float, Field(gt=0)] = 30.0
+
+    _condition: threading.Condition = PrivateAttr(default_factory=threading.Condition)
+    _queue: List[ScheduledTicket] = PrivateAttr(default_factory=list)
+    _running_by_client: "Counter[str]" = PrivateAttr(default_factory=Counter)
+    _running: int = PrivateAttr(default=0)
+    _running_batch_units: int = PrivateAttr(default=0)
+    _sequence: int = PrivateAttr(default=0)
+
+    def classify(self, cost: RequestCost) -> SchedulingClass:
+        """見積もりから優先度を決める。"""
+        return "interactive" if cost.units <= self.interactive_max_units else "batch"
+
+    @contextmanager
+    def slot(self, client_id: str, cost: RequestCost) -> Iterator[ScheduledTicket]:
+        """実行できる順番まで待ち、ブロックを抜けるまで実行枠を確保する。
+
+        Args:
+            client_id: 利用者の識別子 [同時実行数と公平性の単位]
+            cost: 要求のコストの見積もり
+
+        Yields:
+            ScheduledTicket: 実行中の要求
+
+        Raises:
+            AdmissionRejectedError: 待ち行列が上限を超える場合、または queue_timeout_seconds 待っても実行できない場合
+        """
+        ticket: Final[ScheduledTicket] = self._admit(client_id, cost)
+        self._wait(ticket)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def snapshot(self) -> SchedulerSnapshot:
+        """現在の状態を返す。"""
+        with self._condition:
+            batch: Final[List[ScheduledTicket]] = [ticket for ticket in self._queue if ticket.scheduling_class == "batch"]
+            return SchedulerSnapshot(
+                running=self._running,
+                running_batch_units=self._running_batch_units,
+                queued_interactive=len(self._queue) - len(batch),
+                queued_batch=len(batch),
+                queued_batch_units=sum(ticket.units for ticket in batch),
+            )
+
+    def _admit(self, client_id: str, cost: RequestCost) -> ScheduledTicket:
+        """待ち行列の上限を確かめてから、要求を待ち行列に加える。"""
+        scheduling_class: Final[SchedulingClass] = self.classify(cost)
+        units: Final[int] = min(cost.units, self.capacity_units)
+        with self._condition:
+            if sum(1 for ticket in self._queue if ticket.client_id == client_id) >= self.max_queued_per_client:
+                raise AdmissionRejectedError(f"too many queued requests for client {client_id!r}")
+            if scheduling_class == "batch":
+                queued_units: Final[int] = sum(ticket.units for ticket in self._queue if ticket.scheduling_class == "batch")
+                if queued_units + units > self.max_queue_units:
+                    raise AdmissionRejectedError(f"batch queue is full ({queued_units} of {self.max_queue_units} units queued)")
+            self._sequence += 1
+            ticket: Final[ScheduledTicket] = ScheduledTicket(
+                client_id=client_id, scheduling_class=scheduling_class, units=units, sequence=self._sequence
+            )
+            self._queue.append(ticket)
+            return ticket
+
+    def _wait(self, ticket: ScheduledTicket) -> None:
+        """要求が次に実行する要求になるまで待ち、実行中にする。"""
+        deadline: Final[float] = time.monotonic() + self.queue_timeout_seconds
+        with self._condition:
+            while self._select() is not ticket:
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._condition.notify_all()
+                    raise AdmissionRejectedError(f"not scheduled within {self.queue_timeout_seconds:g} seconds")
+                self._condition.wait(remaining)
+            self._queue.remove(ticket)
+            self._running += 1
+            self._running_by_client[ticket.client_id] += 1
+            if ticket.scheduling_class == "batch":
+                self._running_batch_units += ticket.units
+            # 空いている実行枠が残っていれば、次の要求も始められる
+            self._condition.notify_all()
+
+    def _release(self, ticket: ScheduledTicket) -> None:
+        """実行枠を返し、待っている要求を起こす。"""
+        with self._condition:
+            self._running -= 1
+            self._running_by_client[ticket.client_id] -= 1
+            if self._running_by_client[ticket.client_id] <= 0:
+                del self._running_by_client[ticket.client_id]
+            if ticket.scheduling_class == "batch":
+                self._running_batch_units -= ticket.units
+            self._condition.notify_all()
+
+    def _select(self) -> Optional[ScheduledTicket]:
+        """次に実行する要求を返す [実行できる要求がない場合はNone。ロックを取得した状態で呼ぶ]。"""
+        free_slots: Final[int] = self.slots - self._running
+        if free_slots <= 0:
+            return None
+        interactive: Final[Optional[ScheduledTicket]] = self._fairest("interactive")
+        if interactive is not None:
+            return interactive
+        # 最後の1つの実行枠は、対話的な要求のために残す
+        if self.slots > 1 and free_slots <= 1:
+            return None
+        batch: Final[Optional[ScheduledTicket]] = self._fairest("batch")
+        if batch is None or self._running_batch_units + batch.units > self.capacity_units:
+            return None
+        return batch
+
+    def _fairest(self, scheduling_class: SchedulingClass) -> Optional[ScheduledTicket]:
+        """同時実行数の上限に達していない利用者の要求のうち、実行中の要求が最も少ない利用者の最も古い要求を返す。"""
+        candidates: Final[List[ScheduledTicket]] = [
+            ticket
+            for ticket in self._queue
+            if ticket.scheduling_class == scheduling_class and self._running_by_client[ticket.client_id] < self.per_client_concurrency
+        ]
+        return min(candidates, key=lambda ticket: (self._running_by_client[ticket.client_id], ticket.sequence), default=None)
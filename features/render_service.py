@@ -0,0 +1,746 @@
+"""Webアプリの `_cg_generate` と同じ要求/応答を、ローカルのHTTPサービスとして提供するモジュール。
+
+Webアプリ以外のツール [エディタの拡張、保守作業のスクリプトなど] から生成を呼ぶたびにプロセスを起動すると、
+jinja2/PyYAML/pydantic の読み込みと、キャッシュが空の状態からの生成が毎回発生します。
+このモジュールは、外部の依存なしに標準ライブラリの http.server だけで、常駐するサービスを提供します。
+
+主な機能:
+- API: `POST /generate` は、Webアプリのワーカーと同じJSON [GenerateRequest] を受け取り、
+  同じJSON [GenerateResult] を返します。`POST /generate/stream` は、出力だけを
+  `Transfer-Encoding: chunked` でチャンク単位に返します [大きな出力の全体をJSONにしないため]。
+  `GET /health` は、ワーカーのプロセスIDと処理した要求の数を返します。
+- プリフォーク: 親プロセスがソケットを開き、ウォームアップの要求を生成してから、ワーカーのプロセスをフォークします。
+  ワーカーは、読み込み済みのモジュールと温まったキャッシュ [DETECTION_CACHE/RENDER_MEMO] を
+  コピーオンライトで共有したまま、同じソケットで要求を受け付けます。異常終了したワーカーは起動し直します。
+- 常駐: ワーカーごとに、CSVの差分パースのセッション [IncrementalCSVParser] とキャッシュを使い続けます。
+  ワーカーは1つずつ要求を処理し、応答ごとに接続を閉じます [keep-alive の接続がワーカーを占有しないように]。
+- スケジューリング: `--schedule` では、親プロセスがすべての要求を受け付け、見積もったコストに基づいて
+  実行の順序を決めてから、フォークしたワーカーのプロセスプールで生成します [render_scheduler を参照]。
+  利用者は `X-Client-Id` ヘッダー [ない場合は接続元のアドレス] で区別し、断った要求には
+  503 と Retry-After を返します。
+
+os.fork がない環境 [Windowsなど] では、フォークせずに1つのプロセスで要求を処理します。
+負荷試験には scripts/render_service_loadtest.py [p50/p99 の遅延とスループットを出力] を使います。
+
+典型的な使用方法:
+```console
+python -m features.render_service --port 8765 --workers 4 --warm request.json
+python -m features.render_service --port 8765 --workers 4 --schedule --client-concurrency 2
+curl -s http://127.0.0.1:8765/generate -H 'Content-Type: application/json' -d @request.json
+python scripts/render_service_loadtest.py --url http://127.0.0.1:8765/generate --request request.json
+```
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from typing import Annotated, Final, List, Optional, Set, TextIO, Tuple
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError, model_validator
+from pydantic.alias_generators import to_camel
+
+from .cli import EXIT_SUCCESS, EXIT_USAGE
+from .config_debug import DebugPath
+from .core import AppCore
+from .csv_incremental import IncrementalCSVParser
+from .document_render import MAX_FORMAT_TYPE, MIN_FORMAT_TYPE
+from .encoded_writer import DEFAULT_CHUNK_CHARS, iter_text_chunks
+from .profiling import capture_profile, profile_settings_from_env
+from .render_scheduler import (
+    DEFAULT_CAPACITY_UNITS,
+    DEFAULT_INTERACTIVE_MAX_UNITS,
+    DEFAULT_MAX_QUEUE_UNITS,
+    AdmissionRejectedError,
+    RenderScheduler,
+    estimate_cost,
+)
+
+DEFAULT_HOST: Final[str] = "127.0.0.1"
+DEFAULT_PORT: Final[int] = 8765
+
+GENERATE_PATH: Final[str] = "/generate"
+STREAM_PATH: Final[str] = "/generate/stream"
+HEALTH_PATH: Final[str] = "/health"
+CLIENT_ID_HEADER: Final[str] = "X-Client-Id"
+
+# 要求の本文の上限 [バイト。設定ファイルとテンプレートをJSONにした分の余裕を含む]
+MAX_REQUEST_BYTES: Final[int] = 64 * 1024 * 1024
+# 接続ごとの読み書きのタイムアウト [秒。遅いクライアントがワーカーを占有し続けないように]
+REQUEST_TIMEOUT_SECONDS: Final[float] = 30.0
+# 受け付け待ちの接続の上限 [負荷試験の同時接続で接続を取りこぼさないように]
+LISTEN_BACKLOG: Final[int] = 128
+
+
+class GenerateSettings(BaseModel):
+    """Webアプリの設定 [web/src/worker/types.ts の GenerateSettings]。
+
+    Attributes:
+        csv_rows_name: CSVの行名
+        enable_auto_transcoding: 自動トランスコーディングを有効にするかどうか
+        enable_fill_nan: NaNを埋めるかどうか
+        fill_nan_with: NaNを埋める際の文字列
+        format_type: 出力のフォーマットの種類
+        is_strict_undefined: 未定義変数を厳密にチェックするかどうか
+    """
+
+    model_config = ConfigDict(frozen=True, alias_generator=to_camel, populate_by_name=True)
+
+    csv_rows_name: str = "csv_rows"
+    enable_auto_transcoding: bool = True
+    enable_fill_nan: bool = True
+    fill_nan_with: str = "#"
+    format_type: Annotated[int, Field(ge=MIN_FORMAT_TYPE, le=MAX_FORMAT_TYPE)] = 0
+    is_strict_undefined: bool = True
+
+
+class DebugViewRequest(BaseModel):
+    """パース結果の表示オプション [web/src/worker/types.ts の DebugViewRequest]。
+
+    Attributes:
+        path: 表示対象ノードへの経路
+        page: 0始まりのページ番号
+        page_size: 1ページあたりの要素数
+        max_depth: 展開するネストの深さ
+        max_items: コンテナごとに表示する要素数
+    """
+
+    model_config = ConfigDict(frozen=True, alias_generator=to_camel, populate_by_name=True)
+
+    path: DebugPath = ()
+    page: Annotated[int, Field(ge=0)] = 0
+    page_size: Optional[Annotated[int, Field(gt=0)]] = None
+    max_depth: Optional[Annotated[int, Field(ge=0)]] = None
+    max_items: Optional[Annotated[int, Field(gt=0)]] = None
+
+
+class GenerateRequest(BaseModel):
+    """生成の要求 [web/src/worker/types.ts の GenerateRequest]。
+
+    Attributes:
+        config_text: 設定ファイルの内容
+        config_name: 設定ファイル名 [拡張子で形式を判定する]
+        template_text: テンプレートの内容
+        template_name: テンプレートのファイル名
+        settings: Webアプリの設定
+        debug: パース結果の表示オプション [省略した場合は全体、Noneの場合は表示しない]
+    """
+
+    model_config = ConfigDict(frozen=True, alias_generator=to_camel, populate_by_name=True)
+
+    config_text: str
+    config_name: str
+    template_text: str
+    template_name: str = "template.j2"
+    settings: GenerateSettings = Field(default_factory=GenerateSettings)
+    debug: Optional[DebugViewRequest] = Field(default_factory=DebugViewRequest)
+
+
+class GenerateResult(BaseModel):
+    """生成の結果 [web/src/worker/types.ts の GenerateResult]。
+
+    Attributes:
+        output: 生成した文字列 [生成できなかった場合はNone]
+        config_error: 設定ファイルのエラーメッセージ
+        template_error: テンプレートのエラーメッセージ
+        config_debug: パース結果の表示 [表示しない場合は空文字列]
+    """
+
+    model_config = ConfigDict(frozen=True, alias_generator=to_camel, populate_by_name=True)
+
+    output: Optional[str] = None
+    config_error: Optional[str] = None
+    template_error: Optional[str] = None
+    config_debug: str = ""
+
+    def to_json(self) -> str:
+        """Webアプリと同じキー [camelCase] のJSONを返す。"""
+        return json.dumps(self.model_dump(by_alias=True))
+
+
+def generate(request: GenerateRequest, csv_session: Optional[IncrementalCSVParser] = None) -> GenerateResult:
+    """Webアプリの `_cg_generate` と同じ手順で生成する。
+
+    環境変数 CG_PROFILE_DIR などが設定されている場合は、遅かった生成のプロファイルを保存します [profiling を参照]。
+
+    Args:
+        request: 生成の要求
+        csv_session: CSVの差分パースのセッション [呼び出しをまたいで使い続ける]
+
+    Returns:
+        GenerateResult: 生成の結果
+
+    Raises:
+        KeyError: debug.path が存在しないノードを指す場合
+    """
+    settings: Final[GenerateSettings] = request.settings
+    core: Final[AppCore] = AppCore("config load failed", "template load failed")
+    with capture_profile(core, profile_settings_from_env(), label=Path(request.config_name).stem):
+        core.load_config_file(
+            memoryview(request.config_text.encode("utf-8")),
+            settings.csv_rows_name,
+            settings.enable_auto_transcoding,
+            settings.enable_fill_nan,
+            settings.fill_nan_with,
+            csv_session,
+            source_name=request.config_name,
+        ).load_template_file(
+            memoryview(request.template_text.encode("utf-8")), settings.enable_auto_transcoding, source_name=request.template_name
+        ).apply(settings.format_type, settings.is_strict_undefined)
+
+    config_debug: str = ""
+    view: Final = core.config_debug_view
+    if view is not None and request.debug is not None:
+        debug: Final[DebugViewRequest] = request.debug
+        config_debug = view.render(debug.path, debug.page, debug.page_size, debug.max_depth, debug.max_items)
+    return GenerateResult(
+        output=core.formatted_text,
+        config_error=core.config_error_message,
+        template_error=core.template_error_message,
+        config_debug=config_debug,
+    )
+
+
+class RenderHTTPServer(HTTPServer):
+    """1つのワーカーの、常駐するCSVの差分パースのセッションを持つHTTPサーバー。
+
+    Attributes:
+        csv_session: CSVの差分パースのセッション
+        max_request_bytes: 要求の本文の上限 [バイト]
+        is_access_log: 要求ごとのアクセスログを標準エラー出力へ出力するかどうか
+        request_count: このプロセスで処理した生成の要求の数
+    """
+
+    allow_reuse_address = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address: Tuple[str, int], max_request_bytes: int = MAX_REQUEST_BYTES, is_access_log: bool = False) -> None:
+        """RenderHTTPServerの初期化メソッド [ソケットを開いて待ち受けを始める]。
+
+        Args:
+            address: 待ち受けるホストとポート [ポートが0の場合は空いているポート]
+            max_request_bytes: 要求の本文の上限 [バイト]
+            is_access_log: 要求ごとのアクセスログを出力するかどうか
+        """
+        super().__init__(address, RenderRequestHandler)
+        self.csv_session: IncrementalCSVParser = IncrementalCSVParser()
+        self.max_request_bytes = max_request_bytes
+        self.is_access_log = is_access_log
+        self.request_count = 0
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """待ち受けているホストとポートを返す。"""
+        host, port = self.socket.getsockname()[:2]
+        return str(host), int(port)
+
+    @property
+    def scheduler(self) -> Optional[RenderScheduler]:
+        """生成の順序を決めるスケジューラーを返す [スケジューリングしない場合はNone]。"""
+        return None
+
+    def execute(self, request: GenerateRequest) -> GenerateResult:
+        """このプロセスで生成する。"""
+        return generate(request, self.csv_session)
+
+
+class ScheduledRenderServer(ThreadingMixIn, RenderHTTPServer):
+    """すべての要求をスレッドで受け付け、スケジューラーが決めた順序でワーカーのプロセスプールに生成させるHTTPサーバー。
+
+    Attributes:
+        executor: 生成するワーカーのプロセスプール [ワーカーが異常終了した場合は作り直す]
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        scheduler: RenderScheduler,
+        executor_factory: Callable[[], ProcessPoolExecutor],
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        is_access_log: bool = False,
+    ) -> None:
+        """ScheduledRenderServerの初期化メソッド [ソケットを開いて待ち受けを始める]。
+
+        Args:
+            address: 待ち受けるホストとポート [ポートが0の場合は空いているポート]
+            scheduler: 生成の順序を決めるスケジューラー [slots はワーカーの数に合わせる]
+            executor_factory: ワーカーのプロセスプールを作る関数
+            max_request_bytes: 要求の本文の上限 [バイト]
+            is_access_log: 要求ごとのアクセスログを出力するかどうか
+        """
+        super().__init__(address, max_request_bytes, is_access_log)
+        self._scheduler: Final[RenderScheduler] = scheduler
+        self._executor_factory: Final[Callable[[], ProcessPoolExecutor]] = executor_factory
+        self._executor_lock: Final[threading.Lock] = threading.Lock()
+        self.executor: ProcessPoolExecutor = executor_factory()
+
+    @property
+    def scheduler(self) -> Optional[RenderScheduler]:
+        """生成の順序を決めるスケジューラーを返す。"""
+        return self._scheduler
+
+    def execute(self, request: GenerateRequest) -> GenerateResult:
+        """ワーカーのプロセスで生成する。
+
+        Raises:
+            BrokenProcessPool: ワーカーが異常終了した場合 [プロセスプールは作り直す]
+        """
+        executor: Final[ProcessPoolExecutor] = self.executor
+        try:
+            return executor.submit(_generate_in_worker, request).result()
+        except BrokenProcessPool:
+            with self._executor_lock:
+                if self.executor is executor:
+                    self.executor = self._executor_factory()
+                    executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def server_close(self) -> None:
+        """ソケットを閉じ、ワーカーのプロセスプールを終了させる。"""
+        super().server_close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ワーカーのプロセスで使い続ける、CSVの差分パースのセッション
+_WORKER_CSV_SESSION: Final[IncrementalCSVParser] = IncrementalCSVParser()
+
+
+def _generate_in_worker(request: GenerateRequest) -> GenerateResult:
+    """ワーカーのプロセスで生成する。"""
+    return generate(request, _WORKER_CSV_SESSION)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """生成/ストリーミング/ヘルスチェックの要求を処理するハンドラ。"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "cg-render-service/1"
+    timeout = REQUEST_TIMEOUT_SECONDS
+    server: RenderHTTPServer
+
+    def do_GET(self) -> None:
+        """ヘルスチェックの要求を処理する。"""
+        if urlsplit(self.path).path != HEALTH_PATH:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"not found: {self.path}"})
+            return
+        health: Final[dict[str, object]] = {"status": "ok", "pid": os.getpid(), "requests": self.server.request_count}
+        scheduler: Final[Optional[RenderScheduler]] = self.server.scheduler
+        if scheduler is not None:
+            health["scheduler"] = scheduler.snapshot().model_dump()
+        self._send_json(HTTPStatus.OK, health)
+
+    def do_POST(self) -> None:
+        """生成の要求を処理する。"""
+        path: Final[str] = urlsplit(self.path).path
+        if path not in (GENERATE_PATH, STREAM_PATH):
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"not found: {self.path}"})
+            return
+        request: Final[Optional[GenerateRequest]] = self._read_request()
+        if request is None:
+            return
+
+        self.server.request_count += 1
+        try:
+            result: Final[GenerateResult] = self._execute(request)
+        except KeyError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"debug path not found: {e}"})
+            return
+        except AdmissionRejectedError as e:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": e.reason}, {"Retry-After": str(e.retry_after_seconds)})
+            return
+        except BrokenProcessPool:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "worker process terminated abruptly"}, {"Retry-After": "1"})
+            return
+        except Exception as e:
+            # パーサーなどの想定外の例外でも、接続を切らずにエラーを応答する
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"generation failed: {type(e).__name__}: {e}"})
+            return
+        if path == GENERATE_PATH:
+            self._send_body(HTTPStatus.OK, "application/json", result.to_json().encode("utf-8"))
+        elif result.output is None:
+            self._send_body(HTTPStatus.UNPROCESSABLE_ENTITY, "application/json", result.to_json().encode("utf-8"))
+        else:
+            self._send_chunked(result.output)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """アクセスログが有効な場合だけ出力する。"""
+        if self.server.is_access_log:
+            super().log_message(format, *args)
+
+    def _execute(self, request: GenerateRequest) -> GenerateResult:
+        """スケジューラーがあれば順番を待ってから生成する。"""
+        scheduler: Final[Optional[RenderScheduler]] = self.server.scheduler
+        if scheduler is None:
+            return self.server.execute(request)
+        client_id: Final[str] = self.headers.get(CLIENT_ID_HEADER) or self.client_address[0]
+        with scheduler.slot(client_id, estimate_cost(request.config_text, request.template_text)):
+            return self.server.execute(request)
+
+    def _read_request(self) -> Optional[GenerateRequest]:
+        """本文を読み込んで検証する [不正な場合はエラーを応答してNoneを返す]。"""
+        length_header: Final[Optional[str]] = self.headers.get("Content-Length")
+        if length_header is None:
+            self._send_json(HTTPStatus.LENGTH_REQUIRED, {"error": "Content-Length is required"})
+            return None
+        try:
+            length: Final[int] = int(length_header)
+        except ValueError:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"invalid Content-Length: {length_header!r}"})
+            return None
+        if length < 0 or length > self.server.max_request_bytes:
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": f"request body exceeds {self.server.max_request_bytes} bytes"})
+            return None
+        try:
+            return GenerateRequest.model_validate_json(self.rfile.read(length))
+        except ValidationError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"invalid request: {e}"})
+            return None
+
+    def _send_json(self, status: HTTPStatus, payload: object, headers: Optional[Mapping[str, str]] = None) -> None:
+        """JSONを応答する。"""
+        self._send_body(status, "application/json", json.dumps(payload).encode("utf-8"), headers)
+
+    def _send_body(self, status: HTTPStatus, content_type: str, body: bytes, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Content-Length を付けて応答し、接続を閉じる。"""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = True
+
+    def _send_chunked(self, output: str) -> None:
+        """出力を Transfer-Encoding: chunked でチャンク単位に応答し、接続を閉じる。"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for chunk in iter_text_chunks(output, DEFAULT_CHUNK_CHARS):
+                # 孤立したサロゲートはヘッダーの送信後に失敗させられないため、置き換える
+                data: bytes = chunk.encode("utf-8", "replace")
+                self.wfile.write(b"%X\r\n%b\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # クライアントが途中で切断した場合は、残りを送らずに終える
+            pass
+
+
+class PreforkServer(BaseModel):
+    """ソケットを開いてから、同じソケットで要求を受け付けるワーカーのプロセスをフォークするサーバー。
+
+    Attributes:
+        host: 待ち受けるホスト
+        port: 待ち受けるポート [0の場合は空いているポート]
+        workers: ワーカーのプロセス数
+        warm_requests: フォークする前に生成してキャッシュを温める要求
+        max_request_bytes: 要求の本文の上限 [バイト]
+        is_access_log: 要求ごとのアクセスログを出力するかどうか
+        scheduler: 生成の順序を決めるスケジューラー [Noneの場合はワーカーが直接要求を受け付ける。
+            指定した場合は、このプロセスが要求を受け付け、workers 個のワーカーのプロセスプールに生成させる]
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    host: str = DEFAULT_HOST
+    port: Annotated[int, Field(ge=0, le=65535)] = DEFAULT_PORT
+    workers: Annotated[int, Field(ge=1)] = Field(default_factory=lambda: os.cpu_count() or 1)
+    warm_requests: Sequence[GenerateRequest] = ()
+    max_request_bytes: Annotated[int, Field(gt=0)] = MAX_REQUEST_BYTES
+    is_access_log: bool = False
+    scheduler: Optional[RenderScheduler] = None
+
+    _server: Optional[RenderHTTPServer] = PrivateAttr(default=None)
+    _worker_pids: Set[int] = PrivateAttr(default_factory=set)
+    _is_stopping: bool = PrivateAttr(default=False)
+    _is_serving: bool = PrivateAttr(default=False)
+
+    @model_validator(mode="after")
+    def _check_scheduler_slots(self) -> "PreforkServer":
+        """スケジューラーの実行枠の数がワーカーの数と同じことを確かめる。"""
+        if self.scheduler is not None and self.scheduler.slots != self.workers:
+            raise ValueError(f"scheduler.slots ({self.scheduler.slots}) must equal workers ({self.workers})")
+        return self
+
+    @property
+    def is_forking(self) -> bool:
+        """ワーカーのプロセスをフォークするかどうかを返す [os.fork がない環境ではFalse]。"""
+        return hasattr(os, "fork")
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """待ち受けているホストとポートを返す [start の後だけ]。"""
+        if self._server is None:
+            raise RuntimeError("server is not started")
+        return self._server.address
+
+    @property
+    def worker_pids(self) -> List[int]:
+        """動作中のワーカーのプロセスIDを返す。"""
+        return sorted(self._worker_pids)
+
+    def start(self) -> Tuple[str, int]:
+        """ソケットを開き、キャッシュを温めてから、ワーカーのプロセスをフォークする。
+
+        Returns:
+            Tuple[str, int]: 待ち受けているホストとポート
+
+        Raises:
+            OSError: ソケットを開けない場合
+        """
+        server: Final[RenderHTTPServer] = (
+            RenderHTTPServer((self.host, self.port), self.max_request_bytes, self.is_access_log)
+            if self.scheduler is None
+            else ScheduledRenderServer(
+                (self.host, self.port), self.scheduler, self._new_executor, self.max_request_bytes, self.is_access_log
+            )
+        )
+        self._server = server
+        self._is_stopping = False
+        for request in self.warm_requests:
+            generate(request, server.csv_session)
+        if isinstance(server, ScheduledRenderServer):
+            # 要求を受け付けるスレッドが動き出す前に、温まったこのプロセスからワーカーをフォークさせる
+            server.executor.submit(os.getpid).result()
+        elif self.is_forking:
+            # 他のワーカーが先に accept した場合に、待ち続けずに select へ戻るように
+            server.socket.setblocking(False)
+            for _ in range(self.workers):
+                self._spawn_worker()
+        return server.address
+
+    def supervise(self) -> None:
+        """stop が呼ばれるまで、異常終了したワーカーを起動し直す [スケジューリングする場合と、
+        フォークしない場合は、このプロセスで要求を受け付ける]。
+        """
+        if self._server is None:
+            raise RuntimeError("server is not started")
+        if self.scheduler is not None or not self.is_forking:
+            self._is_serving = True
+            try:
+                self._server.serve_forever()
+            finally:
+                self._is_serving = False
+            return
+        while self._worker_pids and not self._is_stopping:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid in self._worker_pids:
+                self._worker_pids.discard(pid)
+                if not self._is_stopping:
+                    self._spawn_worker()
+
+    def stop(self) -> None:
+        """ワーカーを終了させ、ソケットを閉じる。"""
+        self._is_stopping = True
+        for pid in list(self._worker_pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self._worker_pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self._worker_pids.discard(pid)
+        if self._server is not None:
+            if self._is_serving:
+                self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        """ワーカーのプロセスプールを作る [フォークできる環境では、このプロセスの温まったキャッシュを引き継ぐ]。"""
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork") if self.is_forking else None,
+            initializer=_ignore_interrupt,
+        )
+
+    def _spawn_worker(self) -> None:
+        """ワーカーのプロセスをフォークする。"""
+        if self._server is None:
+            raise RuntimeError("server is not started")
+        pid: Final[int] = os.fork()
+        if pid != 0:
+            self._worker_pids.add(pid)
+            return
+        exit_code: int = 0
+        try:
+            # Ctrl+C は親プロセスだけが受け取り、SIGTERM でワーカーを終了させる
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self._server.serve_forever()
+        except BaseException:
+            exit_code = 1
+        finally:
+            # 親プロセスから引き継いだ後始末 [atexit など] を実行しないように
+            os._exit(exit_code)
+
+
+def _ignore_interrupt() -> None:
+    """Ctrl+C は親プロセスだけが受け取るように、ワーカーでは無視する。"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def load_request(path: Path) -> GenerateRequest:
+    """JSONファイルから生成の要求を読み込む。
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        pydantic.ValidationError: 要求が不正な場合
+    """
+    return GenerateRequest.model_validate_json(path.read_bytes())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作る。"""
+    parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m features.render_service",
+        description="Serve the web worker's generate API over local HTTP from a pre-forked pool of warm workers.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on, 0 for any (default: %(default)s)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of pre-forked worker processes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--warm",
+        action="append",
+        default=[],
+        type=Path,
+        metavar="REQUEST_JSON",
+        help="request to generate before forking so that every worker starts with warm caches (repeatable)",
+    )
+    parser.add_argument("--access-log", action="store_true", help="log every request to stderr")
+    scheduling: Final = parser.add_argument_group("scheduling")
+    scheduling.add_argument(
+        "--schedule",
+        action="store_true",
+        help="accept every request in the parent and run them on the workers in cost-based, per-client fair order",
+    )
+    scheduling.add_argument(
+        "--client-concurrency",
+        type=int,
+        default=2,
+        help="requests one client (X-Client-Id header or address) may run at once (default: %(default)s)",
+    )
+    scheduling.add_argument(
+        "--interactive-max-units",
+        type=int,
+        default=DEFAULT_INTERACTIVE_MAX_UNITS,
+        help="estimated cost up to which a request is interactive and runs before batch work (default: %(default)s)",
+    )
+    scheduling.add_argument(
+        "--capacity-units",
+        type=int,
+        default=DEFAULT_CAPACITY_UNITS,
+        help="estimated cost of batch work that may run at once (default: %(default)s)",
+    )
+    scheduling.add_argument(
+        "--queue-units",
+        type=int,
+        default=DEFAULT_MAX_QUEUE_UNITS,
+        help="estimated cost of batch work that may wait before requests are shed with 503 (default: %(default)s)",
+    )
+    scheduling.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=30.0,
+        help="seconds a request may wait for a worker before it is shed with 503 (default: %(default)s)",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None, stdout: TextIO = sys.stdout, stderr: TextIO = sys.stderr) -> int:
+    """コマンドラインのエントリポイント [Ctrl+C または SIGTERM で終了]。
+
+    Args:
+        argv: コマンドライン引数 [Noneの場合は sys.argv]
+        stdout: 待ち受けを始めたことの出力先
+        stderr: 引数エラーの出力先
+
+    Returns:
+        int: 終了コード [EXIT_SUCCESS/EXIT_USAGE]
+    """
+    parser: Final[argparse.ArgumentParser] = build_parser()
+    try:
+        args: Final[argparse.Namespace] = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_SUCCESS if e.code == 0 else EXIT_USAGE
+
+    try:
+        warm_requests: Final[List[GenerateRequest]] = [load_request(path) for path in args.warm]
+        scheduler: Final[Optional[RenderScheduler]] = (
+            RenderScheduler(
+                slots=args.workers,
+                capacity_units=args.capacity_units,
+                interactive_max_units=args.interactive_max_units,
+                per_client_concurrency=args.client_concurrency,
+                max_queue_units=args.queue_units,
+                queue_timeout_seconds=args.queue_timeout,
+            )
+            if args.schedule
+            else None
+        )
+        service: Final[PreforkServer] = PreforkServer(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            warm_requests=warm_requests,
+            is_access_log=args.access_log,
+            scheduler=scheduler,
+        )
+    except (OSError, ValidationError) as e:
+        print(f"{parser.prog}: error: {e}", file=stderr)
+        return EXIT_USAGE
+
+    try:
+        host, port = service.start()
+    except OSError as e:
+        print(f"{parser.prog}: error: cannot listen on {args.host}:{args.port}: {e}", file=stderr)
+        return EXIT_USAGE
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(EXIT_SUCCESS))
+    mode: Final[str] = (
+        f"{service.workers} scheduled workers"
+        if service.scheduler is not None
+        else f"{service.workers if service.is_forking else 1} workers"
+    )
+    print(f"listening on http://{host}:{port} ({mode})", file=stdout, flush=True)
+    try:
+        service.supervise()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
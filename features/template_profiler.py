@@ -0,0 +1,301 @@
+"""テンプレートの行単位のレンダリングプロファイラー。
+
+数千行の手順書テンプレートのレンダリングが遅い場合に、どのループや式が原因かを特定するため、
+レンダリングの所要時間と出力のバイト数をテンプレートの行とブロックに割り当てます。
+Jinja2がコンパイルしたPythonコードの行番号を、コンパイル済みテンプレートの行の対応表
+[Template.get_corresponding_lineno] で `.j2` の行番号に戻して集計します。
+
+主な機能:
+- 行ごとの集計: 実行回数 [ループの繰り返しごとに1回]、所要時間 [その行から呼んだフィルターや
+  属性アクセスの処理を含む]、出力のバイト数 [UTF-8] を記録します。
+- ブロックごとの集計: ルートと `{% block %}` などのコンパイル済みの関数ごとに、所要時間と出力のバイト数を記録します。
+- レポート: 所要時間 [または実行回数/出力のバイト数] の多い順に、行のソースを添えて出力します。
+
+sys.settrace でテンプレートのコードだけをトレースするため、通常のレンダリングより遅くなります。
+DocumentRender.apply_context の is_profiling を指定した場合にだけ使います。
+
+典型的な使用方法:
+```python
+renderer = DocumentRender(template_file)
+if renderer.apply_context(context, 0, is_profiling=True) and renderer.render_profile is not None:
+    print(renderer.render_profile.format_report(count=20))
+```
+"""
+
+import re
+import sys
+import time
+from collections.abc import Callable, Iterator, Mapping
+from inspect import CO_GENERATOR
+from typing import TYPE_CHECKING, Any, Final, List, Literal, Optional, TypeAlias
+
+from jinja2 import Template
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+ProfileSortKey: TypeAlias = Literal["elapsed_seconds", "hits", "output_bytes"]
+TraceFunction: TypeAlias = Callable[["FrameType", str, object], Optional["TraceFunction"]]
+
+# Jinja2のレクサーと同じ改行の区切り [行番号を揃えるため]
+_NEWLINE_PATTERN: Final[re.Pattern[str]] = re.compile(r"\r\n|\r|\n")
+# コンパイル済みのブロックの関数名の接頭辞
+_BLOCK_PREFIX: Final[str] = "block_"
+
+
+class TemplateLineStats(BaseModel):
+    """テンプレートの1行の集計。
+
+    Attributes:
+        lineno: テンプレートの行番号 [1から]
+        source: テンプレートの行のソース [前後の空白を除く]
+        hits: 実行回数
+        elapsed_seconds: 所要時間 [秒]
+        output_bytes: 出力のバイト数 [UTF-8]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    lineno: int
+    source: str
+    hits: int
+    elapsed_seconds: float
+    output_bytes: int
+
+
+class TemplateBlockStats(BaseModel):
+    """コンパイル済みの関数 [ルート/ブロック] ごとの集計。
+
+    Attributes:
+        name: 名前 [例: "root"、"block content"]
+        elapsed_seconds: 所要時間 [秒]
+        output_bytes: 出力のバイト数 [UTF-8]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    elapsed_seconds: float
+    output_bytes: int
+
+
+class TemplateProfile(BaseModel):
+    """1回のレンダリングのプロファイル。
+
+    Attributes:
+        lines: 実行された行の集計 [行番号順]
+        blocks: ブロックごとの集計 [最初に実行された順]
+        total_seconds: レンダリングの所要時間 [秒。行には割り当てないトレースのオーバーヘッドを含む]
+        output_bytes: 出力全体のバイト数 [UTF-8]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    lines: List[TemplateLineStats] = Field(default_factory=list)
+    blocks: List[TemplateBlockStats] = Field(default_factory=list)
+    total_seconds: float = 0.0
+    output_bytes: int = 0
+
+    def hottest(self, count: int = 10, key: ProfileSortKey = "elapsed_seconds") -> List[TemplateLineStats]:
+        """指定した項目の多い順に、上位の行を返す。
+
+        Args:
+            count: 返す行数
+            key: 並べ替えの項目
+
+        Returns:
+            List[TemplateLineStats]: 上位の行 [同じ値の場合は行番号順]
+        """
+        return sorted(self.lines, key=lambda stats: (-getattr(stats, key), stats.lineno))[:count]
+
+    def format_report(self, count: int = 10, key: ProfileSortKey = "elapsed_seconds") -> str:
+        """上位の行とブロックごとの集計を、行プロファイラーのような表に整形する [割合は行に割り当てた時間の合計に対する値]。
+
+        Args:
+            count: 出力する行数
+            key: 並べ替えの項目
+
+        Returns:
+            str: 改行で終わるレポート
+        """
+        attributed_seconds: Final[float] = sum(stats.elapsed_seconds for stats in self.lines) or 1.0
+        report_lines: Final[List[str]] = [f"{'Line':>6} {'Hits':>8} {'Time ms':>10} {'%':>6} {'Bytes':>10}  Source"]
+        report_lines.extend(
+            f"{stats.lineno:>6} {stats.hits:>8} {stats.elapsed_seconds * 1000:>10.3f} "
+            f"{stats.elapsed_seconds / attributed_seconds * 100:>6.1f} {stats.output_bytes:>10}  {stats.source}"
+            for stats in self.hottest(count, key)
+        )
+        report_lines.append("")
+        report_lines.extend(f"{block.name}: {block.elapsed_seconds * 1000:.3f} ms, {block.output_bytes} bytes" for block in self.blocks)
+        report_lines.append(f"total: {self.total_seconds * 1000:.3f} ms, {self.output_bytes} bytes")
+        return "\n".join(report_lines) + "\n"
+
+
+class TemplateLineProfiler(BaseModel):
+    """コンパイル済みのテンプレートを、行ごとの所要時間と出力を集計しながらレンダリングするクラス。
+
+    Attributes:
+        template: コンパイル済みのテンプレート
+        source: テンプレートのソース [行のソースをレポートに添えるため]
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    template: Template
+    source: str = Field(repr=False)
+
+    _line_map: dict[int, int] = PrivateAttr(default_factory=dict)
+
+    def render(self, context: Mapping[str, Any]) -> tuple[str, TemplateProfile]:
+        """テンプレートをレンダリングし、結果とプロファイルを返す。
+
+        Args:
+            context: テンプレートに適用するコンテキスト
+
+        Returns:
+            tuple[str, TemplateProfile]: レンダリング結果とプロファイル
+
+        Raises:
+            Exception: レンダリング中の例外 [Template.render と同じく、テンプレートの行番号に書き換えて送出する]
+
+        Note:
+            トレース関数は呼び出しのたびに実行されるため、集計の状態はクロージャーのローカル変数に持ちます。
+            トレース関数自体の処理時間は、どの行にも割り当てません。
+        """
+        template: Final[Template] = self.template
+        filename: Final[str] = template.root_render_func.__code__.co_filename
+        template_line: Final[Callable[[int], int]] = self._template_line
+        hits: Final[dict[int, int]] = {}
+        line_seconds: Final[dict[int, float]] = {}
+        line_bytes: Final[dict[int, int]] = {}
+        block_seconds: Final[dict[str, float]] = {}
+        block_bytes: Final[dict[str, int]] = {}
+        last_code_lines: Final[dict[int, int]] = {}
+        perf_counter: Final[Callable[[], float]] = time.perf_counter
+        # 所要時間を割り当て中の行とブロック [テンプレートの外を実行中はNone] と、前回のイベントの時刻
+        current: Optional[tuple[int, str]] = None
+        last_time: float = perf_counter()
+
+        def charge(now: float) -> None:
+            if current is not None:
+                elapsed: float = now - last_time
+                line_seconds[current[0]] = line_seconds.get(current[0], 0.0) + elapsed
+                block_seconds[current[1]] = block_seconds.get(current[1], 0.0) + elapsed
+
+        def trace_call(frame: "FrameType", event: str, arg: object) -> Optional[TraceFunction]:
+            # テンプレートのコードのフレームだけを行ごとにトレースする [生成器の再開でも呼ばれる]
+            nonlocal current, last_time
+            if frame.f_code.co_filename != filename:
+                return None
+            charge(perf_counter())
+            current = (template_line(frame.f_lineno), _block_name(frame.f_code.co_name))
+            last_time = perf_counter()
+            return trace_line
+
+        def trace_line(frame: "FrameType", event: str, arg: object) -> Optional[TraceFunction]:
+            nonlocal current, last_time
+            charge(perf_counter())
+            if event == "line":
+                code_line: int = frame.f_lineno
+                lineno: int = template_line(code_line)
+                frame_id: int = id(frame)
+                previous_code_line: Optional[int] = last_code_lines.get(frame_id)
+                # 別の行に移った場合と、ループで同じ行の先頭に戻った場合を1回の実行と数える
+                if current is None or current[0] != lineno or previous_code_line is None or code_line <= previous_code_line:
+                    hits[lineno] = hits.get(lineno, 0) + 1
+                last_code_lines[frame_id] = code_line
+                current = (lineno, _block_name(frame.f_code.co_name))
+            elif event == "return":
+                if not frame.f_code.co_flags & CO_GENERATOR:
+                    # 終了したフレームのidは再利用され得るため、直前の行の記録を破棄する
+                    last_code_lines.pop(id(frame), None)
+                # 呼び出し元がテンプレートのコードであれば、呼び出し元の行に所要時間を戻す
+                caller: Optional[FrameType] = frame.f_back
+                if caller is not None and caller.f_code.co_filename == filename:
+                    current = (template_line(caller.f_lineno), _block_name(caller.f_code.co_name))
+                else:
+                    current = None
+            last_time = perf_counter()
+            return trace_line
+
+        chunks: Final[List[str]] = []
+        previous_trace: Final[Optional[Callable[..., Any]]] = sys.gettrace()
+        started: Final[float] = perf_counter()
+        sys.settrace(trace_call)
+        try:
+            generator: Final[Iterator[str]] = template.root_render_func(template.new_context(dict(context)))
+            for chunk in generator:
+                # 出力は、出力した最も内側のテンプレートの生成器の行とブロックに割り当てる
+                frame: Optional[FrameType] = _innermost_frame(generator, filename)
+                if frame is not None:
+                    size: int = len(chunk.encode("utf-8", "surrogatepass"))
+                    lineno: int = template_line(frame.f_lineno)
+                    block: str = _block_name(frame.f_code.co_name)
+                    line_bytes[lineno] = line_bytes.get(lineno, 0) + size
+                    block_bytes[block] = block_bytes.get(block, 0) + size
+                chunks.append(chunk)
+        except Exception:
+            sys.settrace(previous_trace)
+            template.environment.handle_exception()
+        finally:
+            sys.settrace(previous_trace)
+        total_seconds: Final[float] = perf_counter() - started
+
+        source_lines: Final[List[str]] = _NEWLINE_PATTERN.split(self.source)
+        profile: Final[TemplateProfile] = TemplateProfile(
+            lines=[
+                TemplateLineStats(
+                    lineno=lineno,
+                    source=source_lines[lineno - 1].strip() if 0 < lineno <= len(source_lines) else "",
+                    hits=hits.get(lineno, 0),
+                    elapsed_seconds=line_seconds.get(lineno, 0.0),
+                    output_bytes=line_bytes.get(lineno, 0),
+                )
+                for lineno in sorted(set(hits) | set(line_seconds) | set(line_bytes))
+            ],
+            blocks=[
+                TemplateBlockStats(name=name, elapsed_seconds=block_seconds.get(name, 0.0), output_bytes=block_bytes.get(name, 0))
+                for name in dict.fromkeys([*block_seconds, *block_bytes])
+            ],
+            total_seconds=total_seconds,
+            output_bytes=sum(line_bytes.values()),
+        )
+        return template.environment.concat(chunks), profile  # type: ignore[attr-defined]
+
+    def _template_line(self, code_line: int) -> int:
+        """コンパイル済みのコードの行番号を、テンプレートの行番号に変換する [結果を保持する]。"""
+        lineno: Optional[int] = self._line_map.get(code_line)
+        if lineno is None:
+            lineno = self.template.get_corresponding_lineno(code_line)
+            self._line_map[code_line] = lineno
+        return lineno
+
+
+def profile_render(template: Template, context: Mapping[str, Any], source: str) -> tuple[str, TemplateProfile]:
+    """テンプレートを行ごとに計測しながらレンダリングする。
+
+    Args:
+        template: コンパイル済みのテンプレート
+        context: テンプレートに適用するコンテキスト
+        source: テンプレートのソース
+
+    Returns:
+        tuple[str, TemplateProfile]: レンダリング結果とプロファイル
+    """
+    return TemplateLineProfiler(template=template, source=source).render(context)
+
+
+def _block_name(function_name: str) -> str:
+    """コンパイル済みの関数名を、レポートに表示するブロック名に変換する。"""
+    if function_name.startswith(_BLOCK_PREFIX):
+        return f"block {function_name[len(_BLOCK_PREFIX) :]}"
+    return function_name
+
+
+def _innermost_frame(generator: Iterator[str], filename: str) -> Optional["FrameType"]:
+    """yield from をたどり、出力した最も内側のテンプレートの生成器のフレームを返す。"""
+    inner: Any = generator
+    while getattr(inner, "gi_yieldfrom", None) is not None and inner.gi_yieldfrom.gi_code.co_filename == filename:
+        inner = inner.gi_yieldfrom
+    return getattr(inner, "gi_frame", None)
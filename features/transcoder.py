@@ -1,29 +1,83 @@
+import codecs
 from io import BytesIO
-from typing import TYPE_CHECKING, ClassVar, Final, List, Optional
+from typing import TYPE_CHECKING, ClassVar, Dict, Final, List, Optional, Set, Union
 
-import chardet
 from pydantic import BaseModel, PrivateAttr
 
+from .detection_cache import DetectionCache, DetectionCacheEntry, content_key
+from .encoding_detector import EncodingDetection, classify_known_encoding, detect_raw_encoding
+from .file_source import DEFAULT_SOURCE_NAME, FileSource, contains_nul
+
 if TYPE_CHECKING:
-    from chardet.resultdict import ResultDict
+    from .ingestion import IngestedBlob
+
+# 変換元のバイト列をそのまま変換先として扱える組み合わせ [正規化したコーデック名]
+_PASSTHROUGH_CODECS: Final[Dict[str, Set[str]]] = {"utf-8": {"utf-8", "ascii"}, "ascii": {"ascii"}}
+
+
+def _transcode_chunks(data: Union[bytes, memoryview], source_encoding: str, target_encoding: str, chunk_size: int) -> bytes:
+    """
+    増分コーデックで、チャンク単位にデコードと再エンコードを行います。
+
+    Args:
+        data (Union[bytes, memoryview]): 変換元のバイト列。
+        source_encoding (str): 変換元のエンコーディング名。
+        target_encoding (str): 変換先のエンコーディング名。
+        chunk_size (int): 1回にデコードするバイト数。
+
+    Returns:
+        bytes: 変換後のバイト列 [中間の文字列はチャンク単位にとどまり、ファイル全体の文字列を作らない]。
+
+    Raises:
+        UnicodeDecodeError: 変換元のエンコーディングでデコードできない場合。
+    """
+    decoder: Final[codecs.IncrementalDecoder] = codecs.getincrementaldecoder(source_encoding)()
+    encoder: Final[codecs.IncrementalEncoder] = codecs.getincrementalencoder(target_encoding)()
+    output: Final[BytesIO] = BytesIO()
+    for position in range(0, len(data), chunk_size):
+        output.write(encoder.encode(decoder.decode(data[position : position + chunk_size])))
+    # 末尾の未完了のバイト列の検出と、ISO-2022-JPなど状態を持つエンコーダの終端処理
+    output.write(encoder.encode(decoder.decode(b"", True), True))
+    # 書き込み後の getvalue は内部バッファを共有して返す [コピーしない]
+    return output.getvalue()
 
 
 class TextTranscoder(BaseModel):
     KNOWN_ENCODES: ClassVar[List[str]] = ["ASCII", "Shift_JIS", "EUC-JP", "ISO-2022-JP", "utf-8"]
+    CHUNK_SIZE: ClassVar[int] = 64 * 1024
 
     _filename: Optional[str] = PrivateAttr(default=None)
-    _import_file: BytesIO = PrivateAttr()
+    _import_file: Union[BytesIO, FileSource] = PrivateAttr()
+    _detection_cache: Optional[DetectionCache] = PrivateAttr(default=None)
+    _cache_key: Optional[str] = PrivateAttr(default=None)
+    _detection: Optional[DetectionCacheEntry] = PrivateAttr(default=None)
+    _ingested: Optional["IngestedBlob"] = PrivateAttr(default=None)
+    _decoded_text: Optional[str] = PrivateAttr(default=None)
 
-    def __init__(self: "TextTranscoder", import_file: BytesIO) -> None:
+    def __init__(
+        self: "TextTranscoder",
+        import_file: Union[BytesIO, FileSource],
+        detection_cache: Optional[DetectionCache] = None,
+        ingested: Optional["IngestedBlob"] = None,
+    ) -> None:
         """
         TextTranscoderの初期化メソッド。
 
         Args:
-            import_file (BytesIO): インポートするファイルのバイナリデータ。
+            import_file (Union[BytesIO, FileSource]): インポートするファイルのバイナリデータ。
+                FileSourceの場合は、バッファをコピーせずに検出・デコードする。
+            detection_cache (Optional[DetectionCache]): 検出結果のキャッシュ(デフォルトはNone)。
+                同じ内容の入力では、検出とUTF-8への変換をキャッシュから再利用する。
+            ingested (Optional[IngestedBlob]): import_file を走査済みの取り込み記録(デフォルトはNone)。
+                指定した場合は、NULバイトの判定と内容ハッシュを走査し直さずに記録から参照する。
         """
         super().__init__()
 
         self._import_file = import_file
+        self._detection_cache = detection_cache
+        self._ingested = ingested
+        if ingested is not None:
+            self._cache_key = ingested.content_hash
 
         if hasattr(import_file, "name"):
             self._filename = import_file.name
@@ -35,7 +89,16 @@ class TextTranscoder(BaseModel):
         Returns:
             bool: バイナリデータであればTrue、そうでなければFalse。
         """
-        import_file: Final[BytesIO] = self._import_file
+        detection: Final[Optional[DetectionCacheEntry]] = self._lookup_detection()
+        if detection is not None:
+            return detection.is_binary
+        if self._ingested is not None:
+            return self._ingested.is_binary
+
+        import_file: Final[Union[BytesIO, FileSource]] = self._import_file
+        if isinstance(import_file, FileSource):
+            return contains_nul(import_file.buffer[:1024])
+
         current_position: Final[int] = import_file.tell()
         import_file.seek(0)
         chunk: Final[bytes] = import_file.read(1024)
@@ -50,53 +113,158 @@ class TextTranscoder(BaseModel):
         Returns:
             Optional[str]: 検出されたエンコーディング名、またはバイナリデータの場合はNone。
         """
-        if self.detect_binary() is True:
-            return None
+        return self._detect().encoding
 
-        import_file: Final[BytesIO] = self._import_file
-        import_file.seek(0)
-        raw_data: Final[bytes] = import_file.getvalue()
-        result: ResultDict = chardet.detect(raw_data)
-        encoding: Final[Optional[str]] = result["encoding"]
+    def _detect(self: "TextTranscoder") -> DetectionCacheEntry:
+        """
+        バイナリ判定とエンコーディング検出の結果を返します [インスタンス内とキャッシュで再利用]。
+
+        Returns:
+            DetectionCacheEntry: 検出結果。
+        """
+        detection: Optional[DetectionCacheEntry] = self._lookup_detection()
+        if detection is None:
+            is_binary: Final[bool] = self.detect_binary()
+            detection = DetectionCacheEntry(encoding=None if is_binary else self._detect_text_encoding(), is_binary=is_binary)
+            self._store_detection(detection)
+        return detection
+
+    def _detect_text_encoding(self: "TextTranscoder") -> Optional[str]:
+        """
+        バイナリではないインポートファイルのエンコーディングを検出します。
+
+        Returns:
+            Optional[str]: 検出されたエンコーディング名。
+        """
+        raw_data: Final[Union[bytes, memoryview]] = self._read_buffer()
+        # chardet.detect と同じ名前を、BOM/ASCII/UTF-8の高速判定とサンプル判定で可能な限り全体走査せずに得る
+        has_nul: Final[Optional[bool]] = None if self._ingested is None else self._ingested.has_nul
+        detection: Final[EncodingDetection] = detect_raw_encoding(raw_data, has_nul=has_nul)
+        encoding: Final[Optional[str]] = detection.encoding
 
         # 日本語に関連するエンコーディングを優先する
         if encoding in self.KNOWN_ENCODES:
+            self._decoded_text = detection.text
             return encoding
 
-        # 他のエンコーディングを試す
-        for enc in self.KNOWN_ENCODES:
-            try:
-                raw_data.decode(enc)
-                return enc
-            except (UnicodeDecodeError, LookupError):
-                continue
-        return encoding
+        # 他のエンコーディングを試す [全候補を1回の走査で並行に検証し、優先順で最初に残った候補を返す]
+        known_encoding: Final[Optional[str]] = classify_known_encoding(raw_data, self.KNOWN_ENCODES)
+        if known_encoding is None:
+            self._decoded_text = detection.text
+            return encoding
+
+        if encoding is not None and codecs.lookup(known_encoding).name == codecs.lookup(encoding).name:
+            # chardet の名前 [SHIFT_JISなど] と同じコーデックの場合は、判定時にデコードした文字列を使える
+            self._decoded_text = detection.text
+        return known_encoding
+
+    def decode(self: "TextTranscoder") -> Optional[str]:
+        """
+        検出したエンコーディングで、インポートファイルを文字列にデコードします。
+
+        UTF-8のバイト列を経由せずにバッファから直接デコードします。検出の過程でデコード済みの場合、
+        または同じ内容をUTF-8へ変換済みの場合は、その結果を再利用します。
+
+        Returns:
+            Optional[str]: デコードした文字列、またはバイナリデータ/エンコーディングが不明な場合はNone。
+
+        Raises:
+            UnicodeDecodeError: 検出したエンコーディングでデコードできない場合。
+        """
+        detection: Final[DetectionCacheEntry] = self._detect()
+        if detection.encoding is None:
+            return None
+        if self._decoded_text is not None:
+            return self._decoded_text
+        if detection.utf8_buffer is not None:
+            return str(detection.utf8_buffer, "utf-8")
+        return str(self._read_buffer(), detection.encoding)
+
+    def _lookup_detection(self: "TextTranscoder") -> Optional[DetectionCacheEntry]:
+        """
+        インスタンス内、またはキャッシュに保存された検出結果を返します。
+
+        Returns:
+            Optional[DetectionCacheEntry]: 検出結果、または未検出の場合はNone。
+        """
+        if self._detection is None and self._detection_cache is not None:
+            if self._cache_key is None:
+                self._cache_key = content_key(self._read_buffer())
+            self._detection = self._detection_cache.get(self._cache_key)
+        return self._detection
 
-    def __convert_to_new_encode(self: "TextTranscoder", new_encode: str) -> Optional[BytesIO]:
+    def _store_detection(self: "TextTranscoder", detection: DetectionCacheEntry) -> None:
+        """
+        検出結果をインスタンス内とキャッシュに保存します。
+
+        Args:
+            detection (DetectionCacheEntry): 保存する検出結果。
+        """
+        self._detection = detection
+        if self._detection_cache is not None and self._cache_key is not None:
+            self._detection_cache.put(self._cache_key, detection)
+
+    def _read_buffer(self: "TextTranscoder") -> Union[bytes, memoryview]:
+        """
+        インポートファイル全体をコピーせずに参照するバッファを返します。
+
+        Returns:
+            Union[bytes, memoryview]: BytesIOは getvalue [未変更なら内部バッファを共有]、FileSourceはmemoryview。
+        """
+        import_file: Final[Union[BytesIO, FileSource]] = self._import_file
+        if isinstance(import_file, FileSource):
+            return import_file.buffer
+
+        import_file.seek(0)
+        return import_file.getvalue()
+
+    def __convert_to_new_encode(self: "TextTranscoder", new_encode: str) -> Optional[Union[BytesIO, FileSource]]:
         """
         現在のエンコーディングから新しいエンコーディングに変換します。
 
+        変換は CHUNK_SIZE ごとに増分コーデックで行い、ファイル全体の文字列を作りません。
+        UTF-8/ASCIIからUTF-8への変換など、変換後も同じバイト列になる場合は元のファイルをそのまま返します。
+
         Args:
             new_encode (str): 変換先のエンコーディング名。
 
         Returns:
-            Optional[BytesIO]: 変換されたファイルのバイナリデータ、またはエンコーディングが不明な場合はNone。
+            Optional[Union[BytesIO, FileSource]]: 変換されたファイルのバイナリデータ [入力と同じ型]、
+                変換が不要な場合は元のファイル、またはエンコーディングが不明な場合はNone。
         """
 
-        current_encode: Final[Optional[str]] = self.detect_encoding()
+        detection: Final[DetectionCacheEntry] = self._detect()
+        current_encode: Final[Optional[str]] = detection.encoding
         export_file: Optional[BytesIO] = None
 
         if current_encode is None:
             return None
 
-        import_file: Final[BytesIO] = self._import_file
-        import_file.seek(0)
-        content: Final[str] = import_file.read().decode(current_encode)
-
         try:
-            export_file = BytesIO(content.encode(new_encode))
+            target_codec: Final[str] = codecs.lookup(new_encode).name
         except LookupError:
             return None
+        source_codec: Final[str] = codecs.lookup(current_encode).name
+
+        if source_codec in _PASSTHROUGH_CODECS.get(target_codec, set()):
+            # 変換しても同じバイト列になるため、元のファイルをコピーせずにそのまま返す
+            if isinstance(self._import_file, BytesIO):
+                self._import_file.seek(0)
+            return self._import_file
+
+        encoded: bytes
+        if target_codec == "utf-8" and detection.utf8_buffer is not None:
+            # 同じ内容をUTF-8へ変換済みの場合は、デコードと再エンコードを省略する
+            encoded = detection.utf8_buffer
+        else:
+            encoded = _transcode_chunks(self._read_buffer(), current_encode, new_encode, self.CHUNK_SIZE)
+            if target_codec == "utf-8":
+                self._store_detection(detection.model_copy(update={"utf8_buffer": encoded}))
+
+        if isinstance(self._import_file, FileSource):
+            return FileSource(name=self._import_file.name, buffer=memoryview(encoded))
+
+        export_file = BytesIO(encoded)
 
         if isinstance(self._filename, str):
             export_file.name = self._filename
@@ -107,6 +275,8 @@ class TextTranscoder(BaseModel):
         """
         指定されたエンコーディングにファイルを変換します。
 
+        FileSourceの入力も BytesIO にコピーして返します [コピーせずに扱う場合は convert_source を使う]。
+
         Args:
             new_encode (str): 変換先のエンコーディング名(デフォルトは'utf-8')
             is_allow_fallback (bool): 変換に失敗した場合に元のファイルを返すかどうか。
@@ -115,9 +285,34 @@ class TextTranscoder(BaseModel):
             Optional[BytesIO]: 変換されたファイルのバイナリデータ、または元のファイル。
         """
 
-        result: Optional[BytesIO] = self.__convert_to_new_encode(new_encode)
+        result: Optional[Union[BytesIO, FileSource]] = self.__convert_to_new_encode(new_encode)
 
-        if is_allow_fallback is True:
-            return result if isinstance(result, BytesIO) else self._import_file
-        else:
-            return result
+        if result is None and is_allow_fallback is True:
+            result = self._import_file
+        if isinstance(result, FileSource):
+            export_file: Final[BytesIO] = BytesIO(result.buffer.tobytes())
+            export_file.name = result.name
+            return export_file
+        return result
+
+    def convert_source(self: "TextTranscoder", new_encode: str = "utf-8", is_allow_fallback: bool = True) -> Optional[FileSource]:
+        """
+        指定されたエンコーディングにファイルを変換し、FileSource として返します。
+
+        mmap などの FileSource の入力は、変換が不要な場合にバッファをコピーせずにそのまま返します。
+
+        Args:
+            new_encode (str): 変換先のエンコーディング名(デフォルトは'utf-8')
+            is_allow_fallback (bool): 変換に失敗した場合に元のファイルを返すかどうか。
+
+        Returns:
+            Optional[FileSource]: 変換されたファイルのバッファ、または元のファイル。
+        """
+
+        result: Optional[Union[BytesIO, FileSource]] = self.__convert_to_new_encode(new_encode)
+
+        if result is None and is_allow_fallback is True:
+            result = self._import_file
+        if isinstance(result, BytesIO):
+            return FileSource(name=self._filename or DEFAULT_SOURCE_NAME, buffer=memoryview(result.getvalue()))
+        return result
@@ -86,6 +86,8 @@ from pydantic import (
     field_validator,
 )
 
+from .file_source import FileSource
+from .ingestion import IngestedBlob, ingest_upload
 from .validate_uploaded_file import FileSizeConfig, FileValidator
 
 T = TypeVar("T")
@@ -842,12 +844,12 @@ class TemplateSecurityValidator(BaseModel):
         raise TypeError("Not a literal value")
 
     def validate_template_file(
-        self, template_file: BytesIO, validation_state: ValidationState
+        self, template_file: Union[BytesIO, FileSource, IngestedBlob], validation_state: ValidationState
     ) -> Tuple[Optional[str], Optional[nodes.Template]]:
         """テンプレートファイルの検証を行う。
 
         Args:
-            template_file: テンプレートファイル (BytesIO)
+            template_file: テンプレートファイル (BytesIO、FileSource、または取り込み済みの IngestedBlob)
             validation_state: 検証状態 (Noneの場合は新規作成)
 
         Returns:
@@ -855,28 +857,25 @@ class TemplateSecurityValidator(BaseModel):
         """
         validation_state.reset()
 
-        # ファイルの内容を取得
-        current_pos = template_file.tell()
-        content = template_file.read()
-        template_file.seek(current_pos)  # 元の位置に戻す
-
         # ファイルサイズの検証
         file_validator = FileValidator(size_config=FileSizeConfig(max_size_bytes=self.max_file_size_bytes))
         if not file_validator.validate_size(template_file):
             validation_state.set_error(f"Template file size exceeds maximum limit of {self.max_file_size_bytes} bytes")
             return None, None
 
+        # NULバイトの有無とUTF-8デコードの結果は、取り込み時の1回の走査の結果を参照する
+        ingested: Final[IngestedBlob] = template_file if isinstance(template_file, IngestedBlob) else ingest_upload(template_file)
+
         # バイナリデータのチェック
-        if b"\x00" in content:
+        if ingested.has_nul:
             validation_state.set_error("Template file contains invalid binary data")
             return None, None
 
         # UTF-8デコードのチェック
-        try:
-            template_content = content.decode("utf-8", errors="strict")
-        except UnicodeDecodeError:
+        if ingested.text is None:
             validation_state.set_error("Template file contains invalid UTF-8 bytes")
             return None, None
+        template_content: Final[str] = ingested.text
 
         # 構文の検証とASTの取得
         ast = self._validate_syntax(template_content, validation_state)
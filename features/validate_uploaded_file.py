@@ -49,10 +49,13 @@ with open('large_file.txt', 'rb') as f:
 """
 
 from io import BytesIO
-from typing import Annotated, ClassVar, Final, Optional
+from typing import Annotated, ClassVar, Final, Optional, Union
 
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 
+from .file_source import FileSource
+from .ingestion import IngestedBlob
+
 
 class FileSizeConfig(BaseModel):
     """ファイルサイズの設定を管理するモデル。
@@ -179,7 +182,7 @@ class FileValidator(BaseModel):
         """
         return self._validation_state.is_valid
 
-    def validate_size(self, file: BytesIO) -> bool:
+    def validate_size(self, file: Union[BytesIO, FileSource, IngestedBlob]) -> bool:
         """ファイルサイズを検証する。
 
         ファイルポインタの位置を保持したまま、ファイルサイズが制限値を超えていないかチェックします。
@@ -212,7 +215,7 @@ class FileValidator(BaseModel):
             self._validation_state.set_error(f"Failed to read file: {e!s}")
             return False
 
-    def get_file_size(self, file: BytesIO) -> Optional[int]:
+    def get_file_size(self, file: Union[BytesIO, FileSource, IngestedBlob]) -> Optional[int]:
         """ファイルサイズを取得する。
 
         ファイルポインタの位置を保持したまま、ファイルサイズを取得します。
@@ -226,7 +229,11 @@ class FileValidator(BaseModel):
         Note:
             このメソッドは例外を発生させません。
             ファイルサイズの取得に失敗した場合はNoneを返します。
+            FileSourceの場合はバッファの長さ、IngestedBlobの場合は取り込み時のサイズを返します [読み取り不要]。
         """
+        if isinstance(file, (FileSource, IngestedBlob)):
+            return file.size
+
         try:
             current_pos: Final[int] = file.tell()
             file.seek(0, 2)  # ファイルの末尾に移動
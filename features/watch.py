@@ -0,0 +1,328 @@
+"""設定ファイルとテンプレートを監視し、変更のたびに生成し直すモジュール。
+
+テンプレートの作成者は、大きな設定ファイルに対してテンプレートを少しずつ直しながら、
+両方のファイルをアップロードし直していました。このモジュールは2つのパスをポーリングし、
+変更された側だけを読み込み直して生成し直します。
+
+主な機能:
+- 変更の検出: OS固有の通知APIは使わず、stat [更新時刻/サイズ/inode] が変わった場合だけ
+  内容ハッシュを求めます。保存し直しただけで内容が同じ場合は生成しません。
+- 温かいキャッシュ: 1つの AppCore を使い続けます。テンプレートだけが変わった場合はパース済みの
+  設定を、設定ファイルだけが変わった場合はコンパイル済みのテンプレートを再利用します。
+  CSVは差分パースのセッション [IncrementalCSVParser] で変更されたレコードだけを再パースします。
+- レポート: 生成し直すたびに、段階ごとの所要時間 [poll/config/template/render/write] を1行で出力します。
+
+典型的な使用方法:
+```console
+python -m features.watch --config inventory.csv --template switch.j2 --output out/switch.txt
+```
+"""
+
+import argparse
+import codecs
+import sys
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Final, List, Optional, TextIO
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .cli import EXIT_SUCCESS, EXIT_USAGE, BatchOptions, add_generation_arguments, options_from_args
+from .core import AppCore
+from .csv_incremental import IncrementalCSVParser
+from .detection_cache import content_key
+from .encoded_writer import EncodedWriteError
+from .render_memo import RenderMemo
+
+# ポーリングの既定の間隔 [秒]
+DEFAULT_INTERVAL_SECONDS: Final[float] = 0.5
+
+
+class WatchedFile(BaseModel):
+    """stat と内容ハッシュで変更を検出する監視対象のファイル。
+
+    Attributes:
+        path: 監視するファイルのパス
+    """
+
+    path: Path
+
+    _signature: Optional[tuple[int, int, int]] = PrivateAttr(default=None)
+    _content_hash: Optional[str] = PrivateAttr(default=None)
+
+    def poll(self) -> Optional[bytes]:
+        """ファイルの内容が変わっていれば、新しい内容を返す。
+
+        Returns:
+            Optional[bytes]: 新しい内容 [変更がない場合、またはファイルがない場合はNone]
+
+        Note:
+            stat を読み取りより先に取得します。読み取り中に書き込まれた場合も、
+            次のポーリングで stat が変わるため、書き込み後の内容を読み直します。
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            # 削除してから置き換える保存方式に備えて、再作成されたら stat から比べ直す
+            self._signature = None
+            return None
+
+        signature: Final[tuple[int, int, int]] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self._signature:
+            return None
+        try:
+            data: Final[bytes] = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        self._signature = signature
+
+        content_hash: Final[str] = content_key(data)
+        if content_hash == self._content_hash:
+            return None
+        self._content_hash = content_hash
+        return data
+
+
+class RebuildReport(BaseModel):
+    """1回の生成し直しの結果。
+
+    Attributes:
+        sequence: 生成し直した回数 [1から]
+        changed: 変更を検出した側 ["config" / "template"]
+        stage_seconds: 段階ごとの所要時間 [秒。実行した段階だけを実行順に含む]
+        error_message: 失敗した理由 [成功した場合はNone]
+        output_bytes: 書き出したバイト数 [失敗した場合はNone]
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    sequence: int
+    changed: List[str]
+    stage_seconds: dict[str, float] = Field(default_factory=dict)
+    error_message: Optional[str] = None
+    output_bytes: Optional[int] = None
+
+    @property
+    def total_seconds(self) -> float:
+        """全段階の所要時間の合計を返す。"""
+        return sum(self.stage_seconds.values())
+
+
+class WatchSession(BaseModel):
+    """監視対象の2つのファイルと、使い続ける AppCore を保持するセッション。
+
+    Attributes:
+        config: 監視する設定ファイル
+        template: 監視するテンプレート
+        output_path: 出力先のパス
+        options: 生成オプション
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    config: WatchedFile
+    template: WatchedFile
+    output_path: Path
+    options: BatchOptions = Field(default_factory=BatchOptions)
+
+    # 編集を元に戻した場合に前回の結果を再利用できるよう、セッションごとのメモを使う
+    _core: AppCore = PrivateAttr(default_factory=lambda: AppCore("Config file error", "Template file error", render_memo=RenderMemo()))
+    _csv_session: IncrementalCSVParser = PrivateAttr(default_factory=IncrementalCSVParser)
+    _sequence: int = PrivateAttr(default=0)
+    _config_load_error: Optional[str] = PrivateAttr(default=None)
+    _template_load_error: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def csv_session(self) -> IncrementalCSVParser:
+        """設定ファイルの読み込みで使い続けるCSVの差分パースのセッションを返す。"""
+        return self._csv_session
+
+    def poll(self) -> Optional[RebuildReport]:
+        """両方のファイルを1回ポーリングし、変更があれば変更された側を読み込み直して生成し直す。
+
+        Returns:
+            Optional[RebuildReport]: 生成し直した結果 [変更がない場合はNone]
+        """
+        started: float = time.perf_counter()
+        config_data: Final[Optional[bytes]] = self.config.poll()
+        template_data: Final[Optional[bytes]] = self.template.poll()
+        if config_data is None and template_data is None:
+            return None
+
+        self._sequence += 1
+        changed: Final[List[str]] = [name for name, data in (("config", config_data), ("template", template_data)) if data is not None]
+        stage_seconds: Final[dict[str, float]] = {}
+
+        def lap(stage: str) -> None:
+            nonlocal started
+            now = time.perf_counter()
+            stage_seconds[stage] = now - started
+            started = now
+
+        def report(error_message: Optional[str] = None, output_bytes: Optional[int] = None) -> RebuildReport:
+            return RebuildReport(
+                sequence=self._sequence,
+                changed=changed,
+                stage_seconds=stage_seconds,
+                error_message=error_message,
+                output_bytes=output_bytes,
+            )
+
+        lap("poll")
+        core: Final[AppCore] = self._core
+        options: Final[BatchOptions] = self.options
+        # 編集途中の不正な保存などでパーサーが想定外の例外を送出しても、監視を止めずに失敗として報告する
+        if config_data is not None:
+            self._config_load_error = None
+            try:
+                core.load_config_file(
+                    memoryview(config_data),
+                    options.csv_rows_name,
+                    options.enable_auto_transcoding,
+                    options.enable_fill_nan,
+                    options.fill_nan_with,
+                    csv_session=self._csv_session,
+                    source_name=self.config.path.name,
+                )
+            except Exception as e:
+                self._config_load_error = f"Config file error: {type(e).__name__}: {e}"
+            lap("config")
+        if template_data is not None:
+            try:
+                core.load_template_file(memoryview(template_data), options.enable_auto_transcoding, source_name=self.template.path.name)
+                # 前回の実行時エラーは設定ファイルの変更で解消し得るため、読み込み時のエラーだけを保持する
+                self._template_load_error = core.template_error_message
+            except Exception as e:
+                self._template_load_error = f"Template file error: {type(e).__name__}: {e}"
+            lap("template")
+
+        if self._config_load_error is not None:
+            return report(self._config_load_error)
+        if core.config_error_message is not None:
+            return report(core.config_error_message)
+        if self._template_load_error is not None:
+            return report(self._template_load_error)
+        if core.config_dict is None:
+            return report(f"Waiting for '{self.config.path}'")
+
+        try:
+            core.apply(options.format_type, options.is_strict_undefined)
+        except Exception as e:
+            lap("render")
+            return report(f"Template file error: {type(e).__name__}: {e}")
+        lap("render")
+        if not core.is_ready_formatted:
+            return report(core.template_error_message or f"Waiting for '{self.template.path}'")
+
+        output_bytes: Optional[int] = None
+        error_message: Optional[str] = None
+        try:
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_bytes = core.write_download_content(self.output_path, options.output_encoding, options.unencodable)
+        except (EncodedWriteError, OSError) as e:
+            error_message = f"Output error: {e}"
+        lap("write")
+        if error_message is None and output_bytes is None:
+            error_message = f"Output error: unknown encoding '{options.output_encoding}'"
+        return report(error_message, output_bytes)
+
+
+def format_report(rebuild: RebuildReport, output_path: Path) -> str:
+    """生成し直した結果を、段階ごとの所要時間を含む1行に整形する。
+
+    Args:
+        rebuild: 生成し直した結果
+        output_path: 出力先のパス
+
+    Returns:
+        str: 改行を含まない1行
+    """
+    stages: Final[str] = ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in rebuild.stage_seconds.items())
+    head: Final[str] = f"#{rebuild.sequence} {'+'.join(rebuild.changed)} changed: {stages}, total {rebuild.total_seconds * 1000:.1f}ms"
+    if rebuild.error_message is not None:
+        return f"{head} error: {rebuild.error_message.replace(chr(10), ' ')}"
+    return f"{head} -> {output_path} ({rebuild.output_bytes} bytes)"
+
+
+def run_watch(
+    session: WatchSession,
+    on_report: Callable[[RebuildReport], None],
+    interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> None:
+    """should_stop がTrueを返すまで、一定の間隔でポーリングを繰り返す。
+
+    Args:
+        session: 監視のセッション
+        on_report: 生成し直すたびに呼ぶコールバック
+        interval_seconds: ポーリングの間隔 [秒]
+        should_stop: ポーリングのたびに呼ぶ終了判定
+    """
+    while not should_stop():
+        rebuild: Optional[RebuildReport] = session.poll()
+        if rebuild is not None:
+            on_report(rebuild)
+        time.sleep(interval_seconds)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作る。"""
+    parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m features.watch",
+        description="Re-render a template against a config whenever either file changes.",
+    )
+    parser.add_argument("--config", required=True, type=Path, help="config file to watch")
+    parser.add_argument("--template", required=True, type=Path, help="template file to watch")
+    parser.add_argument("--output", required=True, type=Path, help="file the output is written to")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL_SECONDS,
+        help="polling interval in seconds (default: %(default)s)",
+    )
+    add_generation_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None, stdout: TextIO = sys.stdout, stderr: TextIO = sys.stderr) -> int:
+    """コマンドラインのエントリポイント [Ctrl+Cで終了]。
+
+    Args:
+        argv: コマンドライン引数 [Noneの場合は sys.argv]
+        stdout: 生成し直すたびのレポートの出力先
+        stderr: 引数エラーの出力先
+
+    Returns:
+        int: 終了コード [EXIT_SUCCESS/EXIT_USAGE]
+    """
+    parser: Final[argparse.ArgumentParser] = build_parser()
+    try:
+        args: Final[argparse.Namespace] = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_SUCCESS if e.code == 0 else EXIT_USAGE
+
+    try:
+        codecs.lookup(args.output_encoding)
+    except LookupError:
+        print(f"{parser.prog}: error: unknown output encoding '{args.output_encoding}'", file=stderr)
+        return EXIT_USAGE
+    if args.interval <= 0:
+        print(f"{parser.prog}: error: --interval must be a positive number", file=stderr)
+        return EXIT_USAGE
+
+    session: Final[WatchSession] = WatchSession(
+        config=WatchedFile(path=args.config),
+        template=WatchedFile(path=args.template),
+        output_path=args.output,
+        options=options_from_args(args),
+    )
+    try:
+        run_watch(session, lambda rebuild: print(format_report(rebuild, args.output), file=stdout, flush=True), args.interval)
+    except KeyboardInterrupt:
+        pass
+    return EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""YAMLのアンカー/エイリアスの展開に予算を設け、billion laughs 型の文書を拒否するモジュール。
+
+PyYAML はエイリアスを同じオブジェクトへの参照として構築するため、読み込み自体は小さく済みますが、
+json.dumps/pprint/実行時の検証/レンダリングは参照先を展開しながら辿ります。
+そのため、入れ子のエイリアスを重ねた数KBの文書が、後段で数GB相当の走査に膨らみます。
+このモジュールは、構築の前にノードのグラフを1回だけ走査し、展開後の大きさを求めて予算と比較します。
+
+主な機能:
+- エイリアスの予算: エイリアスによる参照の数が max_aliases を超える文書を拒否します。
+- ノード数の予算: エイリアスを展開した場合のノード数が max_expanded_nodes を超える文書を拒否します
+  [部分木の大きさをノードごとに1回だけ求めるため、走査は展開前のノード数に比例します]。
+- 再帰: 自身を含むアンカー [例: `&a [*a]`] は展開が終わらないため拒否します。
+- 共有: 予算内の文書は従来どおり構築し、エイリアスは参照として共有します [複製しません]。
+
+予算は1つのドキュメントごとに適用します [複数ドキュメントのストリームではレコードごと]。
+
+典型的な使用方法:
+```python
+data = yaml.load(text, Loader=BudgetedSafeLoader)  # 予算を超える場合は YAMLBudgetError
+check_node_budget(node, YAMLBudget(max_aliases=100, max_expanded_nodes=10_000))
+```
+"""
+
+from typing import Dict, Final, List, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class YAMLBudget(BaseModel):
+    """YAMLの1ドキュメントあたりの予算。
+
+    Attributes:
+        max_aliases: エイリアスによる参照の数の上限
+        max_expanded_nodes: エイリアスを展開した場合のノード数の上限
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    max_aliases: int = Field(default=100_000, ge=0)
+    max_expanded_nodes: int = Field(default=10_000_000, ge=1)
+
+
+# 既定の予算 [30MBのファイル上限に収まる、エイリアスを使わない文書のノード数を上回る値]
+DEFAULT_YAML_BUDGET: Final[YAMLBudget] = YAMLBudget()
+
+
+class YAMLBudgetError(ValueError):
+    """YAMLの文書が予算を超えたことを表す例外。
+
+    Attributes:
+        line: 超過を検出したノードの行番号 [ドキュメント内で1始まり]
+        detail: 超過の内容
+    """
+
+    def __init__(self, line: int, detail: str) -> None:
+        self.line = line
+        self.detail = detail
+        super().__init__(f"{detail} (line {line})")
+
+
+def check_node_budget(root: yaml.Node, budget: YAMLBudget = DEFAULT_YAML_BUDGET) -> int:
+    """ノードのグラフを走査し、エイリアスを展開した場合のノード数を予算と比較する。
+
+    Args:
+        root: 合成済みのドキュメントのルートノード
+        budget: 予算
+
+    Returns:
+        int: エイリアスを展開した場合のノード数
+
+    Raises:
+        YAMLBudgetError: 予算を超えた場合、または再帰するエイリアスがある場合
+    """
+    # ノードごとの展開後の大きさ [id をキーにする。走査中はノードへの参照を保持するため id は再利用されない]
+    sizes: Final[Dict[int, int]] = {}
+    in_progress: Final[Dict[int, yaml.Node]] = {}
+    aliases: int = 0
+    # (ノード, 子を積んだかどうか) の明示的なスタックで走査する [深い入れ子で再帰の上限に達しないため]
+    stack: Final[List[Tuple[yaml.Node, bool]]] = [(root, False)]
+    while stack:
+        node, is_expanded = stack.pop()
+        key = id(node)
+        if is_expanded:
+            size = 1 + sum(sizes[id(child)] for child in _children(node))
+            if size > budget.max_expanded_nodes:
+                raise YAMLBudgetError(
+                    _line_of(node), f"YAML document expands to more than {budget.max_expanded_nodes} nodes through aliases"
+                )
+            sizes[key] = size
+            del in_progress[key]
+            continue
+        if key in sizes:
+            aliases = _count_alias(aliases, node, budget)
+            continue
+        if key in in_progress:
+            raise YAMLBudgetError(_line_of(node), "YAML document contains a recursive alias")
+        in_progress[key] = node
+        stack.append((node, True))
+        for child in reversed(_children(node)):
+            child_key = id(child)
+            if child_key in sizes:
+                aliases = _count_alias(aliases, child, budget)
+            elif child_key in in_progress:
+                raise YAMLBudgetError(_line_of(child), "YAML document contains a recursive alias")
+            else:
+                stack.append((child, False))
+    return sizes[id(root)]
+
+
+def _children(node: yaml.Node) -> List[yaml.Node]:
+    """ノードの子 [マッピングの場合はキーと値] を返す。"""
+    if isinstance(node, yaml.SequenceNode):
+        return list(node.value)
+    if isinstance(node, yaml.MappingNode):
+        return [item for pair in node.value for item in pair]
+    return []
+
+
+def _count_alias(aliases: int, node: yaml.Node, budget: YAMLBudget) -> int:
+    """エイリアスによる参照を1つ数え、予算を超えた場合は例外を送出する。"""
+    if aliases + 1 > budget.max_aliases:
+        raise YAMLBudgetError(_line_of(node), f"YAML document uses more than {budget.max_aliases} aliases")
+    return aliases + 1
+
+
+def _line_of(node: yaml.Node) -> int:
+    """ノードの行番号を返す [位置を持たない場合は1]。"""
+    mark: Final[Optional[yaml.Mark]] = node.start_mark
+    return 1 if mark is None else mark.line + 1
+
+
+class _BudgetedConstructorMixin:
+    """構築の前に check_node_budget を適用する get_single_data。"""
+
+    yaml_budget: YAMLBudget = DEFAULT_YAML_BUDGET
+
+    def get_single_data(self) -> object:
+        node: Final[Optional[yaml.Node]] = self.get_single_node()  # type: ignore[attr-defined]
+        if node is None:
+            return None
+        check_node_budget(node, self.yaml_budget)
+        return self.construct_document(node)  # type: ignore[attr-defined]
+
+
+class BudgetedSafeLoader(_BudgetedConstructorMixin, yaml.SafeLoader):
+    """予算を適用する純Python実装の SafeLoader。"""
+
+
+if getattr(yaml, "__with_libyaml__", False):
+
+    class BudgetedCSafeLoader(_BudgetedConstructorMixin, yaml.CSafeLoader):
+        """予算を適用する libyaml の CSafeLoader。"""
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Load-test the local render service (features/render_service.py).
+
+Sends the same generate request N times from C concurrent client threads and
+reports the latency distribution (p50/p90/p99/max) and the throughput. Each
+request opens its own connection, matching the service (one response per
+connection), so the numbers include the connect cost a real client pays.
+
+Stdlib only, so it runs against a service on a machine without the project's
+dependencies installed.
+
+CLI:
+    python3 scripts/render_service_loadtest.py --url http://127.0.0.1:8765/generate \
+        --request request.json --requests 500 --concurrency 16
+    python3 scripts/render_service_loadtest.py --url http://127.0.0.1:8765/generate/stream --json
+
+Without --request, a small built-in CSV/template request is sent. A response
+counts as an error when the status is not 200 or, for /generate, when the JSON
+result carries a config/template error. Exit status is 1 if any request failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+DEFAULT_URL = "http://127.0.0.1:8765/generate"
+
+SAMPLE_REQUEST: dict[str, object] = {
+    "configText": "hostname,ip\n" + "".join(f"sw{i:03d},10.0.{i // 256}.{i % 256}\n" for i in range(200)),
+    "configName": "inventory.csv",
+    "templateText": "{% for row in csv_rows %}hostname {{ row.hostname }}\n ip address {{ row.ip }}\n{% endfor %}",
+    "templateName": "switch.j2",
+    "settings": {
+        "csvRowsName": "csv_rows",
+        "enableAutoTranscoding": True,
+        "enableFillNan": True,
+        "fillNanWith": "#",
+        "formatType": 0,
+        "isStrictUndefined": True,
+    },
+    "debug": None,
+}
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One request's outcome."""
+
+    seconds: float
+    response_bytes: int
+    error: str | None
+
+
+@dataclass(frozen=True)
+class Report:
+    """Aggregated load-test results (latencies in milliseconds)."""
+
+    requests: int
+    errors: int
+    concurrency: int
+    elapsed_seconds: float
+    throughput_rps: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    response_bytes: int
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values (0.0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def send(url: str, body: bytes, timeout: float) -> Sample:
+    """POST body to url on a fresh connection and time the full response."""
+    parts = urlsplit(url)
+    if parts.scheme != "http" or parts.hostname is None:
+        raise ValueError(f"only http:// URLs are supported: {url!r}")
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        connection.request("POST", parts.path or "/", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        payload = response.read()
+    except (http.client.HTTPException, OSError) as exc:
+        return Sample(time.perf_counter() - started, 0, str(exc))
+    finally:
+        connection.close()
+    seconds = time.perf_counter() - started
+    error = None if response.status == 200 else f"HTTP {response.status}"
+    if error is None and payload[:1] == b"{":
+        result = json.loads(payload)
+        error = result.get("configError") or result.get("templateError")
+    return Sample(seconds, len(payload), error)
+
+
+def summarize(samples: list[Sample], concurrency: int, elapsed_seconds: float) -> Report:
+    """Aggregate samples into a Report."""
+    latencies = sorted(sample.seconds * 1000 for sample in samples)
+    return Report(
+        requests=len(samples),
+        errors=sum(1 for sample in samples if sample.error is not None),
+        concurrency=concurrency,
+        elapsed_seconds=elapsed_seconds,
+        throughput_rps=len(samples) / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+        p50_ms=percentile(latencies, 0.50),
+        p90_ms=percentile(latencies, 0.90),
+        p99_ms=percentile(latencies, 0.99),
+        max_ms=latencies[-1] if latencies else 0.0,
+        response_bytes=sum(sample.response_bytes for sample in samples),
+    )
+
+
+def run(url: str, body: bytes, requests: int, concurrency: int, warmup: int = 0, timeout: float = 30.0) -> Report:
+    """Send warmup unmeasured requests, then requests measured ones from concurrency threads."""
+    for _ in range(warmup):
+        send(url, body, timeout)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        samples = list(pool.map(lambda _: send(url, body, timeout), range(requests)))
+        elapsed_seconds = time.perf_counter() - started
+    return summarize(samples, concurrency, elapsed_seconds)
+
+
+def format_report(report: Report) -> str:
+    """Human-readable multi-line summary."""
+    return (
+        f"requests:    {report.requests} ({report.errors} errors, concurrency {report.concurrency})\n"
+        f"elapsed:     {report.elapsed_seconds:.3f} s\n"
+        f"throughput:  {report.throughput_rps:.1f} req/s\n"
+        f"latency ms:  p50 {report.p50_ms:.2f}  p90 {report.p90_ms:.2f}  p99 {report.p99_ms:.2f}  max {report.max_ms:.2f}\n"
+        f"received:    {report.response_bytes} bytes"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--url", default=DEFAULT_URL, help="generate endpoint (default: %(default)s)")
+    parser.add_argument("--request", type=Path, help="JSON request body file (default: built-in sample)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests sent first (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the report as one JSON object")
+    args = parser.parse_args(argv)
+    if args.requests < 1 or args.concurrency < 1 or args.warmup < 0:
+        parser.error("--requests and --concurrency must be positive and --warmup non-negative")
+
+    body = args.request.read_bytes() if args.request is not None else json.dumps(SAMPLE_REQUEST).encode("utf-8")
+    report = run(args.url, body, args.requests, args.concurrency, args.warmup, args.timeout)
+    print(json.dumps(asdict(report)) if args.json else format_report(report))
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""Shared fixtures for the unit tests.
+
+The fixtures cover:
+- In-memory uploads that carry a file name, as AppCore and the transcoders receive them.
+"""
+
+from collections.abc import Callable
+from io import BytesIO
+
+import pytest
+
+UploadFactory = Callable[[bytes, str], BytesIO]
+
+
+def _make_upload(data: bytes, name: str) -> BytesIO:
+    upload = BytesIO(data)
+    upload.name = name
+    return upload
+
+
+@pytest.fixture
+def make_upload() -> UploadFactory:
+    """Return a factory that builds a named BytesIO upload from bytes and a file name."""
+    return _make_upload
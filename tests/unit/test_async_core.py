@@ -0,0 +1,240 @@
+"""Unit tests for the asyncio API of AppCore.
+
+The tests cover:
+- Async load/apply/download producing the same output as the synchronous AppCore, off the event loop thread.
+- Several AsyncAppCores running at once against the process-wide detection cache and render memo.
+- One-shot generation on thread and process executors, including error results.
+- The shared concurrency limit, counted until executor work actually finishes.
+- Per-call and default timeouts.
+- Cancellation: queued work is dropped, and running work still serializes later operations on the same core.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from typing import Final, List, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.async_core import AsyncAppCore, AsyncRuntime, GenerationRequest, GenerationResult, generate_sync
+from features.cli import BatchOptions
+from features.core import AppCore
+from features.document_render import DocumentRender
+from features.render_memo import RenderMemo
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[bytes] = "hostname,vlan\nsw-東京-01,10\nsw-大阪-01,20\n".encode()
+TEMPLATE: Final[bytes] = b"{% for row in csv_rows %}hostname {{ row.hostname }}\n{% endfor %}"
+EXPECTED_TEXT: Final[str] = "hostname sw-東京-01\nhostname sw-大阪-01\n"
+
+
+def _async_core(runtime: AsyncRuntime) -> AsyncAppCore:
+    return AsyncAppCore(runtime=runtime, core=AppCore("config error", "template error", render_memo=RenderMemo()))
+
+
+@UNIT
+def test_async_core_matches_sync(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    render_threads: List[int] = []
+    original_apply_context = DocumentRender.apply_context
+
+    def record_thread(self: DocumentRender, *args: object, **kwargs: object) -> bool:
+        render_threads.append(threading.get_ident())
+        return original_apply_context(self, *args, **kwargs)  # type: ignore[arg-type]
+
+    mocker.patch.object(DocumentRender, "apply_context", record_thread)
+
+    async def scenario() -> Optional[bytes]:
+        core = _async_core(AsyncRuntime(max_concurrency=2))
+        await core.load_config_file(make_upload(CSV_CONFIG, "config.csv"), "csv_rows", True)
+        await core.load_template_file(make_upload(TEMPLATE, "template.j2"), True)
+        await core.apply(0, True)
+        output = BytesIO()
+        assert await core.write_download_content(output, "utf-8") == len(EXPECTED_TEXT.encode())
+        assert core.core.formatted_text == EXPECTED_TEXT
+        return await core.get_download_content("utf-8")
+
+    assert asyncio.run(scenario()) == EXPECTED_TEXT.encode()
+    assert render_threads
+    assert threading.get_ident() not in render_threads, "Rendering must not run on the event loop thread"
+
+
+@UNIT
+def test_concurrent_cores_share_default_caches(make_upload: UploadFactory) -> None:
+    configs = [f"hostname,vlan\nsw-{i % 3}-東京,{i}\n".encode("Shift_JIS") for i in range(24)]
+
+    async def generate(runtime: AsyncRuntime, index: int) -> Optional[str]:
+        core = AsyncAppCore(runtime=runtime, core=AppCore("config error", "template error"))
+        await core.load_config_file(make_upload(configs[index], "config.csv"), "csv_rows", True)
+        await core.load_template_file(make_upload(TEMPLATE + b"\n\n\nvlan {{ csv_rows[0].vlan }}", "template.j2"), True)
+        await core.apply(index % 5, True)
+        assert core.core.config_error_message is None
+        assert core.core.template_error_message is None
+        return core.core.formatted_text
+
+    async def scenario() -> List[Optional[str]]:
+        runtime = AsyncRuntime(max_concurrency=8)
+        try:
+            return list(await asyncio.gather(*(generate(runtime, index) for index in range(len(configs)))))
+        finally:
+            runtime.shutdown()
+
+    for index, text in enumerate(asyncio.run(scenario())):
+        expected = AppCore("config error", "template error", detection_cache=None, render_memo=None)
+        expected.load_config_file(make_upload(configs[index], "config.csv"), "csv_rows", True)
+        expected.load_template_file(make_upload(TEMPLATE + b"\n\n\nvlan {{ csv_rows[0].vlan }}", "template.j2"), True)
+        assert text == expected.apply(index % 5, True).formatted_text
+
+
+@UNIT
+@pytest.mark.parametrize("executor_type", [pytest.param(None, id="default"), pytest.param(ProcessPoolExecutor, id="process")])
+def test_generate(executor_type: Optional[Callable[..., ProcessPoolExecutor]]) -> None:
+    requests: Final[List[GenerationRequest]] = [
+        GenerationRequest(config=CSV_CONFIG, template=TEMPLATE, config_name="inventory.csv"),
+        GenerationRequest(config=CSV_CONFIG, template=b"{{ missing }}", config_name="inventory.csv"),
+        GenerationRequest(config=CSV_CONFIG, template=TEMPLATE, config_name="inventory.csv", options=BatchOptions(output_encoding="ascii")),
+    ]
+
+    async def scenario() -> List[GenerationResult]:
+        runtime = AsyncRuntime(executor=None if executor_type is None else executor_type(max_workers=2))
+        try:
+            return list(await asyncio.gather(*(runtime.generate(request) for request in requests)))
+        finally:
+            if runtime.executor is not None:
+                runtime.executor.shutdown()
+
+    success, runtime_error, unencodable = asyncio.run(scenario())
+
+    assert success == GenerationResult(content=EXPECTED_TEXT.encode())
+    assert runtime_error.content is None
+    assert runtime_error.error_message == "Template file error: Template runtime error: 'missing' is undefined in 'template.j2'"
+    assert unencodable.error_message is not None
+    assert unencodable.error_message.startswith("Output error:")
+    assert generate_sync(requests[0]) == success
+
+
+@UNIT
+def test_stateful_operations_use_threads_with_process_executor(make_upload: UploadFactory) -> None:
+    async def scenario() -> Optional[str]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            core = _async_core(AsyncRuntime(executor=executor))
+            await core.load_config_file(make_upload(CSV_CONFIG, "config.csv"), "csv_rows", True)
+            await core.load_template_file(make_upload(TEMPLATE, "template.j2"), True)
+            await core.apply(0, True)
+        return core.core.formatted_text
+
+    assert asyncio.run(scenario()) == EXPECTED_TEXT
+
+
+@UNIT
+def test_concurrency_limit_is_shared() -> None:
+    running: List[int] = [0]
+    peak: List[int] = [0]
+    counter_lock = threading.Lock()
+
+    def work() -> None:
+        with counter_lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with counter_lock:
+            running[0] -= 1
+
+    async def scenario() -> None:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            runtime = AsyncRuntime(executor=executor, max_concurrency=2)
+            await asyncio.gather(*(runtime.run(work) for _ in range(8)))
+            assert runtime.in_flight == 0
+
+    asyncio.run(scenario())
+
+    assert peak[0] == 2
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("default_timeout", "call_timeout"),
+    [pytest.param(0.05, None, id="default"), pytest.param(60.0, 0.05, id="per_call")],
+)
+def test_timeout_keeps_slot_until_work_finishes(default_timeout: float, call_timeout: Optional[float]) -> None:
+    release = threading.Event()
+
+    async def scenario() -> None:
+        runtime = AsyncRuntime(max_concurrency=1, timeout_seconds=default_timeout)
+        with pytest.raises(TimeoutError):
+            await runtime.run(partial(release.wait, 5), call_timeout)
+        assert runtime.in_flight == 1, "Timed out work that is still running must keep its slot"
+
+        release.set()
+        assert await runtime.run(lambda: "next") == "next"
+        assert runtime.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+@UNIT
+def test_cancelled_queued_work_never_runs() -> None:
+    started: List[str] = []
+    release = threading.Event()
+
+    def blocking() -> None:
+        started.append("blocking")
+        release.wait(5)
+
+    async def scenario() -> None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            runtime = AsyncRuntime(executor=executor, max_concurrency=2)
+            first = asyncio.create_task(runtime.run(blocking))
+            await asyncio.sleep(0.02)
+            queued = asyncio.create_task(runtime.run(lambda: started.append("queued")))
+            await asyncio.sleep(0.02)
+            assert runtime.in_flight == 2
+
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            await asyncio.sleep(0)
+            assert runtime.in_flight == 1, "Queued work must be dropped as soon as its caller is cancelled"
+            release.set()
+            await first
+
+    asyncio.run(scenario())
+
+    assert started == ["blocking"]
+
+
+@UNIT
+def test_cancelled_running_operation_serializes_next_operation(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    release = threading.Event()
+    original_apply_context = DocumentRender.apply_context
+
+    def slow_apply_context(self: DocumentRender, *args: object, **kwargs: object) -> bool:
+        release.wait(5)
+        return original_apply_context(self, *args, **kwargs)  # type: ignore[arg-type]
+
+    async def scenario() -> Optional[bytes]:
+        core = _async_core(AsyncRuntime())
+        await core.load_config_file(make_upload(CSV_CONFIG, "config.csv"), "csv_rows", True)
+        await core.load_template_file(make_upload(TEMPLATE, "template.j2"), True)
+        mocker.patch.object(DocumentRender, "apply_context", slow_apply_context)
+
+        applying = asyncio.create_task(core.apply(0, True))
+        await asyncio.sleep(0.02)
+        applying.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await applying
+
+        download = asyncio.create_task(core.get_download_content("utf-8"))
+        await asyncio.sleep(0.02)
+        assert not download.done(), "The next operation must wait for the cancelled one to finish"
+        release.set()
+        return await download
+
+    assert asyncio.run(scenario()) == EXPECTED_TEXT.encode()
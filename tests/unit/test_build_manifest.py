@@ -0,0 +1,130 @@
+"""Unit tests for the content-hash manifest of incremental batch builds.
+
+The tests cover:
+- Rebuild reasons for new, missing and modified outputs and for each changed input.
+- Appending records as jobs finish and replaying them after an interruption, ignoring a half-written line.
+- Compaction to one line per output, and manifests of another format version being discarded.
+- File hashes identical to content_key, and a stable engine fingerprint.
+"""
+
+import json
+from pathlib import Path
+from typing import Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.build_manifest import (
+    MANIFEST_FORMAT,
+    BuildInputs,
+    BuildManifest,
+    ManifestEntry,
+    engine_fingerprint,
+    hash_file,
+)
+from features.detection_cache import content_key
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+INPUTS: Final[BuildInputs] = BuildInputs(config_hash="c1", template_hash="t1", options_hash="o1", engine="e1")
+
+
+def _built(manifest: BuildManifest, output_path: Path, text: str = "hostname sw-01\n") -> None:
+    output_path.write_text(text, encoding="utf-8")
+    size = output_path.stat().st_size
+    manifest.record(output_path, ManifestEntry(**INPUTS.model_dump(), output_size=size, output_hash=hash_file(output_path)))
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("changes", "expected_reasons"),
+    [
+        pytest.param({}, [], id="up_to_date"),
+        pytest.param({"config_hash": "c2"}, ["config changed"], id="config"),
+        pytest.param({"template_hash": "t2"}, ["template changed"], id="template"),
+        pytest.param({"options_hash": "o2"}, ["options changed"], id="options"),
+        pytest.param({"engine": "e2", "config_hash": "c2"}, ["engine changed", "config changed"], id="engine_and_config"),
+    ],
+)
+def test_stale_reasons_for_inputs(tmp_path: Path, changes: dict[str, str], expected_reasons: List[str]) -> None:
+    manifest = BuildManifest.load(tmp_path / "manifest.jsonl")
+    _built(manifest, tmp_path / "sw-01.txt")
+
+    assert manifest.stale_reasons(tmp_path / "sw-01.txt", INPUTS.model_copy(update=changes)) == expected_reasons
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("new_text", "expected_reasons"),
+    [
+        pytest.param(None, ["output missing"], id="deleted"),
+        pytest.param("hostname sw-01 edited\n", ["output modified"], id="resized"),
+        pytest.param("hostname sw-02\n", ["output modified"], id="same_size"),
+    ],
+)
+def test_stale_reasons_for_output(tmp_path: Path, new_text: str | None, expected_reasons: List[str]) -> None:
+    output_path: Final[Path] = tmp_path / "sw-01.txt"
+    manifest = BuildManifest.load(tmp_path / "manifest.jsonl")
+    _built(manifest, output_path)
+
+    if new_text is None:
+        output_path.unlink()
+    else:
+        output_path.write_text(new_text, encoding="utf-8")
+
+    assert manifest.stale_reasons(output_path, INPUTS) == expected_reasons
+    assert manifest.stale_reasons(tmp_path / "new.txt", INPUTS) == ["not built before"]
+
+
+@UNIT
+def test_records_survive_interruption(tmp_path: Path) -> None:
+    manifest_path: Final[Path] = tmp_path / "manifest.jsonl"
+    manifest = BuildManifest.load(manifest_path)
+    _built(manifest, tmp_path / "sw-01.txt")
+    _built(manifest, tmp_path / "sw-02.txt")
+    manifest.discard(tmp_path / "sw-02.txt")
+    with manifest_path.open("a", encoding="utf-8") as journal:
+        journal.write('{"output": "half-written", "config_ha')
+
+    resumed = BuildManifest.load(manifest_path)
+
+    assert len(resumed) == 1
+    assert resumed.stale_reasons(tmp_path / "sw-01.txt", INPUTS) == []
+    assert resumed.get(tmp_path / "sw-02.txt") is None
+    manifest.close()
+
+
+@UNIT
+def test_compact_keeps_latest_record(tmp_path: Path) -> None:
+    manifest_path: Final[Path] = tmp_path / "manifest.jsonl"
+    manifest = BuildManifest.load(manifest_path)
+    for text in ("first\n", "second\n", "third\n"):
+        _built(manifest, tmp_path / "sw-01.txt", text)
+
+    manifest.compact()
+
+    lines = manifest_path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"format": MANIFEST_FORMAT}
+    assert len(lines) == 2
+    assert json.loads(lines[1])["output_hash"] == content_key(b"third\n")
+    assert not manifest_path.with_name(f"{manifest_path.name}.tmp").exists()
+
+
+@UNIT
+def test_other_format_is_discarded(tmp_path: Path) -> None:
+    manifest_path: Final[Path] = tmp_path / "manifest.jsonl"
+    record = {"output": str(tmp_path / "sw-01.txt"), **INPUTS.model_dump(), "output_size": 0, "output_hash": ""}
+    manifest_path.write_text(f"{json.dumps({'format': 0})}\n{json.dumps(record)}\n", encoding="utf-8")
+
+    assert len(BuildManifest.load(manifest_path)) == 0
+
+
+@UNIT
+def test_hash_file_and_engine_fingerprint(tmp_path: Path) -> None:
+    data: Final[bytes] = "東京".encode() * 100_000
+    path = tmp_path / "config.csv"
+    path.write_bytes(data)
+
+    assert hash_file(path) == content_key(data)
+    assert engine_fingerprint() == engine_fingerprint()
+    assert len(engine_fingerprint()) == len(content_key(b""))
@@ -0,0 +1,299 @@
+"""Unit tests for the headless batch command line.
+
+The tests cover:
+- Collecting inputs from files, glob patterns and directories without duplicates.
+- Planning one job per (config, template) pair and rejecting colliding output names.
+- Running jobs inline and in a process pool, with identical outputs and reports.
+- Passing the generation options and the output encoding through to AppCore.
+- Exit codes for failed jobs and usage errors.
+- Unexpected parser exceptions reported as failed jobs without aborting the batch.
+- A broken process pool failing only its running jobs, with the rest run on a new pool.
+"""
+
+import json
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from pathlib import Path
+from typing import ClassVar, Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features import cli
+from features.cli import (
+    EXIT_JOB_FAILED,
+    EXIT_SUCCESS,
+    EXIT_USAGE,
+    BatchJob,
+    BatchOptions,
+    JobResult,
+    collect_inputs,
+    main,
+    plan_jobs,
+    run_job,
+)
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[str] = "hostname,vlan\nsw-東京-01,10\nsw-大阪-01,\n"
+TEMPLATE: Final[str] = "{% for row in csv_rows %}hostname {{ row.hostname }} vlan {{ row.vlan }}\n{% endfor %}"
+
+
+@pytest.fixture
+def workspace(tmp_path: Path) -> Path:
+    (tmp_path / "configs").mkdir()
+    (tmp_path / "configs" / "tokyo.csv").write_text(CSV_CONFIG, encoding="utf-8")
+    (tmp_path / "configs" / "osaka.toml").write_text('[[csv_rows]]\nhostname = "sw-大阪-02"\nvlan = 20\n', encoding="utf-8")
+    (tmp_path / "configs" / "notes.md").write_text("not a config", encoding="utf-8")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "switch.j2").write_text(TEMPLATE, encoding="utf-8")
+    return tmp_path
+
+
+def _run(config: Path, template: Path, output_dir: Path, *extra_args: str) -> tuple[int, str, str]:
+    stdout = StringIO()
+    stderr = StringIO()
+    argv = ["--config", str(config), "--template", str(template), "--output-dir", str(output_dir), *extra_args]
+    exit_code = main(argv, stdout, stderr)
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+@UNIT
+def test_collect_inputs(workspace: Path) -> None:
+    configs = workspace / "configs"
+
+    from_dir = collect_inputs([str(configs)], ["csv", "toml"])
+    from_glob = collect_inputs([str(configs / "*.csv"), str(configs / "tokyo.csv"), str(workspace / "missing.csv")])
+
+    assert from_dir == [configs / "osaka.toml", configs / "tokyo.csv"]
+    assert from_glob == [configs / "tokyo.csv"], "Duplicates and missing paths must be dropped"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("template_names", "expected_names"),
+    [
+        pytest.param(["switch.j2"], ["a.txt", "b.txt"], id="single_template"),
+        pytest.param(["switch.j2", "router.j2"], ["a_switch.txt", "a_router.txt", "b_switch.txt", "b_router.txt"], id="templates"),
+    ],
+)
+def test_plan_jobs(tmp_path: Path, template_names: List[str], expected_names: List[str]) -> None:
+    jobs = plan_jobs([Path("a.csv"), Path("b.toml")], [Path(name) for name in template_names], tmp_path, "txt")
+
+    assert [job.output_path for job in jobs] == [tmp_path / name for name in expected_names]
+
+
+@UNIT
+def test_plan_jobs_rejects_collision(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="would be written by both"):
+        plan_jobs([Path("east/site.csv"), Path("west/site.csv")], [Path("switch.j2")], tmp_path, "txt")
+
+
+@UNIT
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_writes_outputs(workspace: Path, jobs: str) -> None:
+    output_dir: Final[Path] = workspace / "out"
+
+    exit_code, stdout, stderr = _run(
+        workspace / "configs", workspace / "templates" / "*.j2", output_dir, "--jobs", jobs, "--report-format", "jsonl"
+    )
+
+    assert exit_code == EXIT_SUCCESS
+    assert (output_dir / "tokyo.txt").read_text(encoding="utf-8") == "hostname sw-東京-01 vlan 10\nhostname sw-大阪-01 vlan #\n"
+    assert (output_dir / "osaka.txt").read_text(encoding="utf-8") == "hostname sw-大阪-02 vlan 20\n"
+    reports = [json.loads(line) for line in stdout.splitlines()]
+    assert sorted(report["output"] for report in reports) == [str(output_dir / "osaka.txt"), str(output_dir / "tokyo.txt")]
+    assert all(report["status"] == "ok" and report["error"] is None for report in reports)
+    assert stderr.startswith("2 succeeded, 0 failed in ")
+
+
+@UNIT
+def test_main_passes_options(workspace: Path) -> None:
+    output_dir: Final[Path] = workspace / "out"
+
+    exit_code, stdout, _ = _run(
+        workspace / "configs" / "tokyo.csv",
+        workspace / "templates",
+        output_dir,
+        *("--output-ext", "cfg", "--fill-nan-with", "0", "--output-encoding", "cp932", "--unencodable", "replace"),
+    )
+
+    assert exit_code == EXIT_SUCCESS
+    assert (output_dir / "tokyo.cfg").read_bytes() == "hostname sw-東京-01 vlan 10\nhostname sw-大阪-01 vlan 0\n".encode("cp932")
+    assert stdout.startswith("ok\t")
+
+
+@UNIT
+def test_main_reports_failed_job(workspace: Path) -> None:
+    (workspace / "templates" / "broken.j2").write_text("{{ undefined_name }}", encoding="utf-8")
+    output_dir: Final[Path] = workspace / "out"
+
+    exit_code, stdout, stderr = _run(workspace / "configs" / "osaka.toml", workspace / "templates", output_dir)
+
+    assert exit_code == EXIT_JOB_FAILED
+    assert (output_dir / "osaka_switch.txt").exists(), "Other jobs must still be written"
+    assert not (output_dir / "osaka_broken.txt").exists()
+    assert [line.split("\t")[0] for line in stdout.splitlines()] == ["error", "ok"]
+    assert "undefined_name" in stdout
+    assert stderr.startswith("1 succeeded, 1 failed in ")
+
+
+@UNIT
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_survives_unexpected_parser_error(workspace: Path, jobs: str) -> None:
+    # a bare carriage return makes the csv module raise instead of reporting a parse error
+    (workspace / "configs" / "broken.csv").write_bytes(b"a,b\nx\ry,2\n")
+    output_dir: Final[Path] = workspace / "out"
+
+    exit_code, stdout, stderr = _run(workspace / "configs", workspace / "templates" / "switch.j2", output_dir, "--jobs", jobs)
+
+    assert exit_code == EXIT_JOB_FAILED
+    assert (output_dir / "tokyo.txt").exists(), "Other jobs must still be written"
+    assert (output_dir / "osaka.txt").exists()
+    errors = [line for line in stdout.splitlines() if line.startswith("error\t")]
+    assert len(errors) == 1
+    assert "Config file error: Error: new-line character seen in unquoted field" in errors[0]
+    assert stderr.startswith("2 succeeded, 1 failed in ")
+
+
+class _CrashingPool:
+    """Inline stand-in for ProcessPoolExecutor whose worker dies on the "nagoya" job, breaking the pool."""
+
+    created: ClassVar[List["_CrashingPool"]] = []
+
+    def __init__(self, max_workers: int) -> None:
+        self.is_broken = False
+        _CrashingPool.created.append(self)
+
+    def __enter__(self) -> "_CrashingPool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+    def submit(self, fn: Callable[..., JobResult], job: BatchJob, *args: object) -> "Future[JobResult]":
+        future: Future[JobResult] = Future()
+        self.is_broken = self.is_broken or job.config_path.stem == "nagoya"
+        if self.is_broken:
+            future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        else:
+            future.set_result(fn(job, *args))
+        return future
+
+
+@UNIT
+def test_main_recreates_broken_process_pool(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (workspace / "configs" / "nagoya.csv").write_text(CSV_CONFIG, encoding="utf-8")
+    monkeypatch.setattr(_CrashingPool, "created", [])
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", _CrashingPool)
+    output_dir: Final[Path] = workspace / "out"
+
+    exit_code, stdout, stderr = _run(workspace / "configs", workspace / "templates", output_dir, "--jobs", "2", "--report-format", "jsonl")
+
+    assert exit_code == EXIT_JOB_FAILED
+    reports = {Path(report["config"]).stem: report for report in map(json.loads, stdout.splitlines())}
+    assert reports["nagoya"]["status"] == "error"
+    assert "terminated abruptly" in reports["nagoya"]["error"]
+    # the job submitted after the crash runs on a new pool
+    assert reports["tokyo"]["status"] == "ok"
+    assert (output_dir / "tokyo.txt").exists()
+    assert len(_CrashingPool.created) == 2
+    assert "failed in " in stderr
+
+
+@UNIT
+def test_run_job_reports_unencodable_output(workspace: Path) -> None:
+    job = BatchJob(
+        config_path=workspace / "configs" / "tokyo.csv",
+        template_path=workspace / "templates" / "switch.j2",
+        output_path=workspace / "out" / "tokyo.txt",
+    )
+
+    result = run_job(job, BatchOptions(output_encoding="ascii"))
+
+    assert result.is_success is False
+    assert result.error_message is not None
+    assert result.error_message.startswith("Output error: ")
+    assert not job.output_path.exists(), "A partially written output must be removed"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("extra_args", "expected_message"),
+    [
+        pytest.param(["--output-encoding", "utf-9"], "unknown output encoding", id="unknown_encoding"),
+        pytest.param(["--jobs", "-1"], "--jobs", id="negative_jobs"),
+        pytest.param(["--config", "missing/*.csv"], "no config files matched", id="no_config"),
+    ],
+)
+def test_main_usage_errors(workspace: Path, extra_args: List[str], expected_message: str) -> None:
+    exit_code, stdout, stderr = _run(workspace / "configs", workspace / "templates", workspace / "out", *extra_args)
+
+    assert exit_code == EXIT_USAGE
+    assert expected_message in stderr
+    assert stdout == ""
+    assert not (workspace / "out").exists()
+
+
+@UNIT
+def test_main_rejects_output_collision(workspace: Path) -> None:
+    (workspace / "configs" / "tokyo.toml").write_text('hostname = "sw"\n', encoding="utf-8")
+
+    exit_code, _, stderr = _run(workspace / "configs", workspace / "templates", workspace / "out")
+
+    assert exit_code == EXIT_USAGE
+    assert "would be written by both" in stderr
+
+
+@UNIT
+def test_incremental_rebuilds_only_changed_outputs(workspace: Path) -> None:
+    output_dir: Final[Path] = workspace / "out"
+
+    def build(*extra_args: str) -> tuple[dict[str, str], str]:
+        exit_code, stdout, stderr = _run(
+            workspace / "configs", workspace / "templates", output_dir, "--incremental", "--report-format", "jsonl", *extra_args
+        )
+        assert exit_code == EXIT_SUCCESS
+        reports = [json.loads(line) for line in stdout.splitlines()]
+        return {Path(report["output"]).name: report["reason"] for report in reports}, stderr
+
+    assert build()[0] == {"osaka.txt": "not built before", "tokyo.txt": "not built before"}
+    rebuilt, summary = build()
+    assert rebuilt == {}
+    assert summary.startswith("0 succeeded, 0 failed, 2 up to date in ")
+
+    (workspace / "configs" / "tokyo.csv").write_text(CSV_CONFIG + "sw-名古屋-01,30\n", encoding="utf-8")
+    assert build()[0] == {"tokyo.txt": "config changed"}
+    assert "sw-名古屋-01" in (output_dir / "tokyo.txt").read_text(encoding="utf-8")
+
+    (output_dir / "osaka.txt").unlink()
+    assert build()[0] == {"osaka.txt": "output missing"}
+
+    (workspace / "templates" / "switch.j2").write_text(TEMPLATE.replace("vlan", "switchport access vlan", 1), encoding="utf-8")
+    assert build()[0] == {"osaka.txt": "template changed", "tokyo.txt": "template changed"}
+
+    assert build("--fill-nan-with", "0")[0] == {"osaka.txt": "options changed", "tokyo.txt": "options changed"}
+
+
+@UNIT
+def test_incremental_resumes_after_failure(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    output_dir: Final[Path] = workspace / "out"
+    manifest_path: Final[Path] = workspace / "manifest.jsonl"
+    (workspace / "templates" / "switch.j2").write_text("{{ undefined_name }}", encoding="utf-8")
+
+    exit_code, _, _ = _run(workspace / "configs", workspace / "templates", output_dir, "--incremental", "--manifest", str(manifest_path))
+    assert exit_code == EXIT_JOB_FAILED
+    assert manifest_path.exists()
+
+    (workspace / "templates" / "switch.j2").write_text(TEMPLATE, encoding="utf-8")
+    exit_code, stdout, _ = _run(
+        workspace / "configs", workspace / "templates", output_dir, "--incremental", "--manifest", str(manifest_path)
+    )
+    assert exit_code == EXIT_SUCCESS
+    assert [line.split("\t")[-1] for line in stdout.splitlines()] == ["not built before", "not built before"]
+
+    monkeypatch.setattr("features.cli.engine_fingerprint", lambda: "next-engine")
+    _, stdout, _ = _run(workspace / "configs", workspace / "templates", output_dir, "--incremental", "--manifest", str(manifest_path))
+    assert [line.split("\t")[-1] for line in stdout.splitlines()] == ["engine changed", "engine changed"]
@@ -0,0 +1,166 @@
+"""Unit tests for the ConfigDebugView class.
+
+The tests cover:
+- Byte-identical output with the legacy json.dumps / pprint.pformat serializations.
+- Depth and item truncation that keeps the JSON output valid.
+- Paging over a node selected by path.
+- Per-option caching and the ConfigParser / AppCore integration.
+"""
+
+import json
+import pprint
+from io import BytesIO
+from typing import Any, Dict, Final, Optional, Tuple, Union
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pydantic import ValidationError
+from pytest_mock import MockerFixture
+
+from features.config_debug import ConfigDebugView
+from features.config_parser import ConfigParser
+from features.core import AppCore
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+SAMPLE_CONFIG: Final[Dict[str, Any]] = {
+    "hostname": "sw01",
+    "interfaces": {f"Gi0/{i}": {"vlan": i, "desc": f"port {i}"} for i in range(5)},
+    "csv_rows": [{"id": i, "name": f"host{i}"} for i in range(10)],
+}
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("style", "expected"),
+    [
+        pytest.param("json", json.dumps(SAMPLE_CONFIG, indent=2, ensure_ascii=False, default=str), id="render_valid_json_legacy_parity"),
+        pytest.param("pprint", pprint.pformat(SAMPLE_CONFIG), id="render_valid_pprint_legacy_parity"),
+    ],
+)
+def test_render_without_options_matches_legacy(style: str, expected: str) -> None:
+    view = ConfigDebugView(SAMPLE_CONFIG)
+
+    assert view.render(style=style) == expected, "Untruncated render must match the legacy serialization"  # type: ignore[arg-type]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("path", "max_depth", "max_items", "expected"),
+    [
+        pytest.param(
+            (), 1, None, {"hostname": "sw01", "interfaces": "<dict: 5 keys>", "csv_rows": "<list: 10 items>"}, id="truncate_depth_1"
+        ),
+        pytest.param((), 0, None, "<dict: 3 keys>", id="truncate_depth_0_root"),
+        pytest.param(
+            ("csv_rows",), None, 2, [{"id": 0, "name": "host0"}, {"id": 1, "name": "host1"}, "... 8 more items"], id="truncate_items_list"
+        ),
+        pytest.param(("interfaces",), 1, 1, {"Gi0/0": "<dict: 2 keys>", "...": "4 more keys"}, id="truncate_items_dict"),
+    ],
+)
+def test_render_truncation_keeps_valid_json(
+    path: Tuple[Union[str, int], ...], max_depth: Optional[int], max_items: Optional[int], expected: object
+) -> None:
+    view = ConfigDebugView(SAMPLE_CONFIG)
+
+    rendered = view.render(path=path, max_depth=max_depth, max_items=max_items)
+
+    assert json.loads(rendered) == expected, f"Unexpected truncated view: {rendered}"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("page", "page_size", "expected_ids"),
+    [
+        pytest.param(0, 4, [0, 1, 2, 3], id="page_valid_first"),
+        pytest.param(2, 4, [8, 9], id="page_valid_last_partial"),
+        pytest.param(5, 4, [], id="page_valid_out_of_range"),
+    ],
+)
+def test_render_paging(page: int, page_size: int, expected_ids: list) -> None:
+    view = ConfigDebugView(SAMPLE_CONFIG)
+
+    rows = json.loads(view.render(path=("csv_rows",), page=page, page_size=page_size))
+
+    assert [row["id"] for row in rows] == expected_ids, "Paging returned the wrong slice of rows"
+    assert view.count(("csv_rows",)) == 10, "count() must report the size of the paged node"
+
+
+@UNIT
+def test_render_is_cached_per_options(mocker: MockerFixture) -> None:
+    view = ConfigDebugView(SAMPLE_CONFIG)
+    dumps = mocker.spy(json, "dumps")
+
+    first = view.render(max_depth=1)
+    second = view.render(max_depth=1)
+    view.render(max_depth=2)
+
+    assert first is second, "Identical options must return the cached string"
+    assert dumps.call_count == 2, "Serialization must run once per distinct option set"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("kwargs", "expected_exception"),
+    [
+        pytest.param({"path": ("missing",)}, KeyError, id="render_invalid_missing_path"),
+        pytest.param({"path": ("hostname", "x")}, KeyError, id="render_invalid_path_into_scalar"),
+        pytest.param({"path": ("csv_rows", 10)}, KeyError, id="render_invalid_index_out_of_range"),
+        pytest.param({"path": ("csv_rows", 0, "missing")}, KeyError, id="render_invalid_missing_row_key"),
+        pytest.param({"page_size": 0}, ValidationError, id="render_invalid_zero_page_size"),
+        pytest.param({"max_depth": -1}, ValidationError, id="render_invalid_negative_depth"),
+    ],
+)
+def test_render_invalid_options(kwargs: Dict[str, Any], expected_exception: type) -> None:
+    view = ConfigDebugView(SAMPLE_CONFIG)
+
+    with pytest.raises(expected_exception):
+        view.render(**kwargs)
+
+
+@UNIT
+def test_render_none_source_is_empty() -> None:
+    view = ConfigDebugView(None)
+
+    assert view.render() == "", "A view without source must render an empty string"
+    assert view.count() == 0, "A view without source must have no items"
+
+
+@UNIT
+def test_config_parser_debug_view_is_reset_on_parse() -> None:
+    config_file = BytesIO(b'name = "world"\n')
+    config_file.name = "config.toml"
+    parser = ConfigParser(config_file)
+    # Read the properties into locals so that narrowing one read does not leak into the next.
+    initial_view = parser.debug_view
+    assert initial_view is None, "No view must exist before parsing"
+
+    assert parser.parse() is True
+    first_view = parser.debug_view
+    assert first_view is not None
+    assert first_view is parser.debug_view, "The view must be created once per parse result"
+    assert parser.parse() is True
+
+    second_view = parser.debug_view
+    assert second_view is not first_view, "Re-parsing must discard the previous view"
+    assert parser.parsed_str == pprint.pformat({"name": "world"}), "parsed_str must keep the pprint representation"
+
+
+@UNIT
+def test_app_core_config_debug_view_follows_config_dict() -> None:
+    core = AppCore()
+    # Read the property into locals so that narrowing one read does not leak into the next.
+    initial_view = core.config_debug_view
+    assert initial_view is None, "No view must exist without a config"
+
+    core.config_dict = {"name": "world"}
+    view = core.config_debug_view
+    assert view is not None
+    assert view is core.config_debug_view, "The view must be cached while the config is unchanged"
+
+    core.config_dict = {"name": "other"}
+
+    replaced_view = core.config_debug_view
+    assert replaced_view is not None
+    assert replaced_view is not view, "Replacing the config must discard the cached view"
+    assert json.loads(replaced_view.render()) == {"name": "other"}
@@ -537,21 +537,12 @@ def _assert_csv_dicts_equal(parsed_dict: typing.Dict[str, Any], expected_dict: t
             id="yaml_success_anchors_aliases",
         ),
         pytest.param(
-            b"doc1:\n  key: value1\n---\ndoc2:\n  key: value2",  # Multiple documents
+            b"doc1:\n  key: value1\n---\ndoc2:\n  key: value2",  # Multiple documents are exposed as records
             "multidoc.yaml",
             NO_EXPECTED_INITIAL_ERROR,
-            NO_EXPECTED_DICT,
-            (
-                "expected a single document in the stream\n"
-                '  in "<unicode string>", line 1, column 1:\n'
-                "    doc1:\n"
-                "    ^\n"
-                "but found another document\n"
-                '  in "<unicode string>", line 3, column 1:\n'
-                "    ---\n"
-                "    ^"
-            ),
-            id="yaml_failure_multiple_documents_first_only",
+            {"csv_rows": [{"doc1": {"key": "value1"}}, {"doc2": {"key": "value2"}}]},
+            NO_EXPECTED_RUNTIME_ERROR,
+            id="yaml_success_multiple_documents_as_records",
         ),
         pytest.param(
             (
@@ -6,6 +6,8 @@ from _pytest.mark.structures import MarkDecorator
 from pydantic import BaseModel, PrivateAttr
 
 from features.core import AppCore
+from features.ingestion import IngestedBlob, ingest_upload
+from features.render_memo import RenderMemo
 
 UNIT: MarkDecorator = pytest.mark.unit
 
@@ -17,10 +19,10 @@ class MockParser(BaseModel):
     __enable_fill_nan: bool = PrivateAttr(default=False)
     __fill_nan_with: Optional[str] = None
 
-    def __init__(self: "MockParser", file: BytesIO) -> None:
+    def __init__(self: "MockParser", file: IngestedBlob) -> None:
         super().__init__()
 
-        self.__content = file.read().decode()
+        self.__content = file.text
 
     def parse(self: "MockParser") -> bool:
         if self.__content != "POSITIVE":
@@ -79,10 +81,10 @@ class MockRender(BaseModel):
     __is_successful: bool = False
     __render_content: str = "This is POSITIVE"
 
-    def __init__(self: "MockRender", file: BytesIO) -> None:
+    def __init__(self: "MockRender", file: IngestedBlob) -> None:
         super().__init__()
 
-        content = file.read().decode()
+        content = file.text
 
         if content == "POSITIVE":
             self.__is_successful = True
@@ -91,7 +93,9 @@ class MockRender(BaseModel):
     def is_valid_template(self: "MockRender") -> bool:
         return self.__is_successful
 
-    def apply_context(self: "MockRender", content: Dict[str, Any], format_type: int = 3, is_strict_undefined: bool = True) -> bool:
+    def apply_context(
+        self: "MockRender", content: Dict[str, Any], format_type: int = 3, is_strict_undefined: bool = True, is_speculative: bool = False
+    ) -> bool:
         if not self.__is_successful:
             return False
 
@@ -108,6 +112,10 @@ class MockRender(BaseModel):
 
         return self.__render_content
 
+    @property
+    def raw_content(self: "MockRender") -> Optional[str]:
+        return self.render_content
+
     @property
     def error_message(self: "MockRender") -> Optional[str]:
         if not self.__is_successful:
@@ -120,7 +128,7 @@ class MockRender(BaseModel):
 def model(monkeypatch: pytest.MonkeyPatch) -> AppCore:
     monkeypatch.setattr("features.core.ConfigParser", MockParser)
     monkeypatch.setattr("features.core.DocumentRender", MockRender)
-    return AppCore("[CONFIG_ERROR]", "[TEMPLATE_ERROR]")
+    return AppCore("[CONFIG_ERROR]", "[TEMPLATE_ERROR]", render_memo=RenderMemo())
 
 
 # テスト: モックオブジェクトの動作確認
@@ -151,7 +159,7 @@ def test_mock_parser(
     config_file.name = "config.toml"
 
     # Act
-    parser = MockParser(config_file)
+    parser = MockParser(ingest_upload(config_file))
 
     # Assert
     assert parser.csv_rows_name == "csv_rows", "Default csv_rows_name should be 'csv_rows'"
@@ -207,7 +215,7 @@ def test_mock_render(
 ) -> None:
     """MockRenderの動作をテストする。"""
     # Arrange
-    render = MockRender(BytesIO(template_content))
+    render = MockRender(ingest_upload(BytesIO(template_content), name="template.j2"))
 
     # Act & Assert
     assert render.is_valid_template == expected_validate_template, (
@@ -0,0 +1,186 @@
+"""Unit tests for the IncrementalCSVParser class.
+
+The tests cover:
+- Parity with the full ConfigParser CSV parse after single and random edits,
+  including quoted multi-line fields and quote state changes.
+- Re-tokenization limited to the edited rows on a large table.
+- Fallback to the full parse for header edits and errors, keeping the canonical messages.
+- Returned rows being copies that callers can change without affecting later parses.
+- ConfigParser / AppCore integration through a shared session.
+"""
+
+import csv
+import random
+import re
+from io import BytesIO
+from typing import Final, List, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.config_parser import ConfigParser, CSVData, build_csv_row, read_csv_table
+from features.core import AppCore
+from features.csv_incremental import IncrementalCSVParser
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+BASE_CSV: Final[str] = 'id,name,note\n1,sw01,"multi\nline"\n2,sw02,\n\n3,"sw,03","say ""hi"""\r\n4,sw04,plain\n'
+LARGE_ROW_COUNT: Final[int] = 20000
+
+
+def _full_parse(text: str, fill_value: Optional[str] = None) -> CSVData:
+    header, body = read_csv_table(text)
+    return [build_csv_row(header, raw_row, index, fill_value) for index, raw_row in enumerate(body)]
+
+
+def _large_csv() -> str:
+    return "id,host,vlan\n" + "".join(f"{i},host{i},{i % 4094}\n" for i in range(LARGE_ROW_COUNT))
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        pytest.param(BASE_CSV, BASE_CSV.replace("sw02", "sw-two"), id="edit_valid_cell"),
+        pytest.param(BASE_CSV, BASE_CSV.replace("2,sw02,\n", ""), id="edit_valid_delete_row"),
+        pytest.param(BASE_CSV, BASE_CSV.replace("2,sw02,\n", "2,sw02,\n9,new,row\n"), id="edit_valid_insert_row"),
+        pytest.param(BASE_CSV, BASE_CSV.replace('"multi\nline"', '"multi\nline\nmore"'), id="edit_valid_inside_multiline_field"),
+        pytest.param(BASE_CSV, BASE_CSV.replace('"multi\nline"', "single"), id="edit_valid_remove_quotes"),
+        pytest.param("a,b\n1,x\n2,y\n3,z\n", 'a,b\n1,"x\n2,y"\n3,z\n', id="edit_valid_quote_spans_rows"),
+        pytest.param('a,b\n1,"x\n2,y"\n3,z\n', "a,b\n1,x\n2,y\n3,z\n", id="edit_valid_quote_split_into_rows"),
+        pytest.param(BASE_CSV, BASE_CSV.replace("\r\n", "\n"), id="edit_valid_line_ending"),
+        pytest.param(BASE_CSV, BASE_CSV + "5,sw05,tail", id="edit_valid_append_without_newline"),
+        pytest.param(BASE_CSV, BASE_CSV.replace("id,name", "id,host", 1), id="edit_valid_header_falls_back"),
+        pytest.param(BASE_CSV, "id,name,note\n" + BASE_CSV, id="edit_valid_duplicate_header_falls_back"),
+    ],
+)
+def test_incremental_parse_matches_full_parse(old: str, new: str) -> None:
+    session = IncrementalCSVParser()
+    session.parse(old, None)
+
+    rows = session.parse(new, None)
+
+    assert repr(rows) == repr(_full_parse(new)), "Incremental result must equal the full parse"
+
+
+@UNIT
+def test_random_edits_match_full_parse() -> None:
+    rng = random.Random(0)  # noqa: S311 - reproducible edit sequence, not security sensitive
+    alphabet: Final[List[str]] = ["a", "1", ",", "\n", '"', " ", "\r\n", "\r"]
+    session = IncrementalCSVParser()
+    text = BASE_CSV
+    session.parse(text, "#")
+
+    for _ in range(500):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(0, 4))
+        candidate = text[:start] + "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 3))) + text[end:]
+        try:
+            expected = _full_parse(candidate, "#")
+        except (ValueError, csv.Error) as e:
+            with pytest.raises(type(e), match=re.escape(str(e))):
+                session.parse(candidate, "#")
+            continue
+
+        assert session.parse(candidate, "#") == expected, f"Incremental result diverged for {candidate!r}"
+        text = candidate
+
+
+@UNIT
+def test_single_row_edit_reparses_only_that_row() -> None:
+    text = _large_csv()
+    session = IncrementalCSVParser()
+    session.parse(text, None)
+
+    edited = text.replace("\n777,host777,", "\n777,edited,", 1)
+    rows = session.parse(edited, None)
+
+    assert session.is_last_parse_incremental is True
+    assert session.reparsed_record_count <= 2, f"Re-tokenized {session.reparsed_record_count} records for a one-row edit"
+    assert rows[777] == {"id": 777, "host": "edited", "vlan": 777}
+    assert len(rows) == LARGE_ROW_COUNT
+
+
+@UNIT
+def test_unchanged_text_reparses_nothing() -> None:
+    session = IncrementalCSVParser()
+    first = session.parse(BASE_CSV, None)
+    first.clear()
+
+    second = session.parse(BASE_CSV, None)
+
+    assert session.reparsed_record_count == 0
+    assert len(second) == 4, "Mutating a returned list must not affect the session state"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("edited", "expected_error"),
+    [
+        pytest.param(BASE_CSV.replace("4,sw04,plain", '4,"sw04,plain'), "unterminated quoted field", id="error_unterminated"),
+        pytest.param(BASE_CSV.replace("plain", "plain,extra"), "row 4 has more fields than the header", id="error_extra_field"),
+        pytest.param(BASE_CSV.replace("sw02", "sw\x0002"), "Null byte detected", id="error_null_byte"),
+        pytest.param("id,name,note\n", "CSV file must contain at least one data row.", id="error_no_data_row"),
+    ],
+)
+def test_errors_match_full_parse_and_keep_last_good_state(edited: str, expected_error: str) -> None:
+    session = IncrementalCSVParser()
+    session.parse(BASE_CSV, None)
+
+    with pytest.raises(ValueError, match=expected_error):
+        session.parse(edited, None)
+
+    fixed = BASE_CSV.replace("sw01", "sw-one")
+    assert repr(session.parse(fixed, None)) == repr(_full_parse(fixed))
+    assert session.is_last_parse_incremental is True, "The next edit must diff against the last successful parse"
+
+
+@UNIT
+def test_caller_changes_do_not_leak_into_next_parse() -> None:
+    parser = IncrementalCSVParser()
+    first = parser.parse(BASE_CSV, "-")
+    first[0]["name"] = "MUTATED"
+    first.append({"id": 99})
+
+    second = parser.parse(BASE_CSV.replace("sw04", "sw05"), "-")
+    second[1]["name"] = "MUTATED"
+    third = parser.parse(BASE_CSV.replace("sw04", "sw06"), "-")
+
+    assert parser.is_last_parse_incremental is True
+    assert third == _full_parse(BASE_CSV.replace("sw04", "sw06"), "-"), "Caller changes must not reach the parser state"
+
+
+@UNIT
+def test_fill_value_change_falls_back_to_full_parse() -> None:
+    session = IncrementalCSVParser()
+    session.parse(BASE_CSV, None)
+
+    rows = session.parse(BASE_CSV, "#")
+
+    assert session.is_last_parse_incremental is False
+    assert rows[1]["note"] == "#"
+
+
+def _load(core: AppCore, text: str, session: IncrementalCSVParser) -> None:
+    config_file = BytesIO(text.encode("utf-8"))
+    config_file.name = "inventory.csv"
+    core.load_config_file(config_file, "rows", enable_auto_transcoding=False, enable_fill_nan=True, fill_nan_with="#", csv_session=session)
+
+
+@UNIT
+def test_config_parser_and_app_core_share_session() -> None:
+    session = IncrementalCSVParser()
+    core = AppCore()
+    _load(core, BASE_CSV, session)
+    _load(core, BASE_CSV.replace("sw04", "sw-four"), session)
+
+    assert session.is_last_parse_incremental is True
+    assert core.config_dict is not None
+    assert core.config_dict["rows"][3] == {"id": 4, "name": "sw-four", "note": "plain"}
+
+    config_file = BytesIO(BASE_CSV.encode("utf-8"))
+    config_file.name = "inventory.csv"
+    parser = ConfigParser(config_file)
+    parser.incremental_csv = session
+    assert parser.parse() is True
+    assert parser.incremental_csv is session
@@ -0,0 +1,142 @@
+"""Unit tests for the encoding detection cache.
+
+The tests cover:
+- LRU eviction by entry count and by the total size of the cached UTF-8 buffers.
+- Consistent bookkeeping under concurrent access from several threads.
+- Content keys that do not depend on the buffer type.
+- TextTranscoder reusing detection results and UTF-8 buffers for unchanged inputs.
+- AppCore sharing one cache between config and template loads and across instances.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Final
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features import transcoder as transcoder_module
+from features.core import AppCore
+from features.detection_cache import DetectionCache, DetectionCacheEntry, content_key
+from features.file_source import FileSource
+from features.transcoder import TextTranscoder
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+SHIFT_JIS_CONFIG: Final[bytes] = 'name = "東京サーバー"\n'.encode("Shift_JIS")
+
+
+@UNIT
+def test_content_key_ignores_buffer_type() -> None:
+    data = b"key = 1\n"
+
+    assert content_key(data) == content_key(memoryview(data)) == content_key(bytearray(data))
+    assert content_key(data) != content_key(data + b" ")
+
+
+@UNIT
+def test_cache_evicts_least_recently_used() -> None:
+    cache = DetectionCache(max_entries=2)
+    cache.put("a", DetectionCacheEntry(encoding="utf-8", is_binary=False))
+    cache.put("b", DetectionCacheEntry(encoding="Shift_JIS", is_binary=False))
+    assert cache.get("a") is not None
+    cache.put("c", DetectionCacheEntry(encoding=None, is_binary=True))
+
+    assert cache.get("b") is None, "The least recently used entry must be evicted"
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+@UNIT
+def test_cache_bounds_buffer_bytes() -> None:
+    cache = DetectionCache(max_entries=8, max_buffer_bytes=10)
+    cache.put("a", DetectionCacheEntry(encoding="Shift_JIS", is_binary=False, utf8_buffer=b"x" * 6))
+    cache.put("b", DetectionCacheEntry(encoding="Shift_JIS", is_binary=False, utf8_buffer=b"y" * 6))
+    cache.put("c", DetectionCacheEntry(encoding="Shift_JIS", is_binary=False, utf8_buffer=b"z" * 11))
+
+    assert cache.get("a") is None, "Entries must be evicted once the buffer total exceeds the limit"
+    entry_b = cache.get("b")
+    assert entry_b is not None
+    assert entry_b.utf8_buffer == b"y" * 6
+    entry_c = cache.get("c")
+    assert entry_c is not None
+    assert entry_c.encoding == "Shift_JIS"
+    assert entry_c.utf8_buffer is None, "A buffer larger than the limit must be dropped but the detection kept"
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+@UNIT
+def test_cache_is_thread_safe() -> None:
+    cache = DetectionCache(max_entries=16, max_buffer_bytes=64)
+
+    def _worker(worker: int) -> None:
+        for i in range(2000):
+            key = f"{worker}-{i % 32}"
+            if cache.get(key) is None:
+                cache.put(key, DetectionCacheEntry(encoding="Shift_JIS", is_binary=False, utf8_buffer=b"x" * (i % 8)))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_worker, range(4)))
+
+    assert len(cache) <= 16
+    assert cache.hits + cache.misses == 4 * 2000
+
+
+@UNIT
+def test_transcoder_reuses_detection_and_utf8_buffer(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    cache = DetectionCache()
+    detect = mocker.spy(transcoder_module, "detect_raw_encoding")
+
+    first = TextTranscoder(make_upload(SHIFT_JIS_CONFIG, "config.toml"), cache).convert(is_allow_fallback=False)
+    second_transcoder = TextTranscoder(FileSource.open(SHIFT_JIS_CONFIG, 1024, name="config.toml"), cache)
+    second = second_transcoder.convert_source(is_allow_fallback=False)
+
+    assert detect.call_count == 1, "Unchanged content must not be detected again"
+    assert isinstance(first, BytesIO)
+    assert isinstance(second, FileSource)
+    assert first.getvalue() == bytes(second.buffer) == 'name = "東京サーバー"\n'.encode()
+    assert second_transcoder.detect_encoding() == "Shift_JIS"
+    assert second_transcoder.detect_binary() is False
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("data", "expected_encoding", "is_buffer_cached"),
+    [
+        pytest.param(SHIFT_JIS_CONFIG, "Shift_JIS", True, id="cache_shift_jis_with_buffer"),
+        pytest.param('name = "東京サーバー"\n'.encode(), "utf-8", False, id="cache_utf8_without_buffer"),
+        pytest.param(b"\x00\x01\x02", None, False, id="cache_binary"),
+    ],
+)
+def test_transcoder_cache_entry(make_upload: UploadFactory, data: bytes, expected_encoding: str, is_buffer_cached: bool) -> None:
+    cache = DetectionCache()
+    TextTranscoder(make_upload(data, "config.toml"), cache).convert(is_allow_fallback=False)
+
+    entry = cache.get(content_key(data))
+
+    assert entry is not None
+    assert entry.encoding == expected_encoding
+    assert entry.is_binary is (expected_encoding is None)
+    assert (entry.utf8_buffer is not None) is is_buffer_cached
+
+
+@UNIT
+def test_app_core_shares_cache(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    cache = DetectionCache()
+    detect = mocker.spy(transcoder_module, "detect_raw_encoding")
+    template = "{{ name }}".encode("Shift_JIS")
+
+    for _ in range(3):
+        core = AppCore("config error", "template error", detection_cache=cache)
+        core.load_config_file(make_upload(SHIFT_JIS_CONFIG, "config.toml"), "csv_rows", enable_auto_transcoding=True)
+        core.load_template_file(make_upload(template, "template.j2"), enable_auto_transcoding=True).apply(0, is_strict_undefined=True)
+        assert core.formatted_text == "東京サーバー"
+
+    assert detect.call_count == 2, "Config and template must each be detected once across instances"
+    assert len(cache) == 2
+    assert cache.hits == 4
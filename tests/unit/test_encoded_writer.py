@@ -0,0 +1,168 @@
+"""Unit tests for the streaming encoded download writer.
+
+The tests cover:
+- Output identical to encoding the whole text at once, for the legacy target encodings and every
+  unencodable-character policy, with chunk sizes that split the input at arbitrary points.
+- The final escape sequence of stateful encodings such as ISO-2022-JP.
+- Path destinations: the file is replaced only on success, so a failed write keeps the previous output.
+- Rejection of unknown encodings and error handlers before the destination is opened.
+- Bounded memory when a generator of text chunks is written.
+- AppCore.write_download_content.
+"""
+
+import tracemalloc
+from collections.abc import Iterator
+from io import BytesIO
+from pathlib import Path
+from typing import Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.core import AppCore
+from features.encoded_writer import EncodedWriteError, UnencodablePolicy, iter_text_chunks, write_encoded
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+PROCEDURE_TEXT: Final[str] = "".join(f"interface Gi0/{i}\n description 東京サーバー{i:04d} ①髙\n!\n" for i in range(300))
+
+
+def _split(text: str, sizes: List[int]) -> Iterator[str]:
+    position: int = 0
+    index: int = 0
+    while position < len(text):
+        size = sizes[index % len(sizes)]
+        yield text[position : position + size]
+        position += size
+        index += 1
+
+
+@UNIT
+@pytest.mark.parametrize("chunk_chars", [1, 5, 64 * 1024])
+@pytest.mark.parametrize("errors", ["replace", "ignore", "xmlcharrefreplace", "backslashreplace"])
+@pytest.mark.parametrize("encoding", ["Shift_JIS", "cp932", "EUC-JP", "ISO-2022-JP", "utf-8"])
+def test_write_matches_whole_text_encode(encoding: str, errors: UnencodablePolicy, chunk_chars: int) -> None:
+    stream = BytesIO()
+
+    written = write_encoded(_split(PROCEDURE_TEXT, [1, 3, 7, 1000]), stream, encoding, errors, chunk_chars)
+
+    assert stream.getvalue() == PROCEDURE_TEXT.encode(encoding, errors)
+    assert written == len(stream.getvalue())
+    assert stream.closed is False, "A caller supplied stream must be left open"
+
+
+@UNIT
+def test_write_terminates_stateful_encoding() -> None:
+    stream = BytesIO()
+
+    write_encoded(["設定", "完了"], stream, "ISO-2022-JP", chunk_chars=1)
+
+    assert stream.getvalue() == "設定完了".encode("ISO-2022-JP")
+    assert stream.getvalue().endswith(b"\x1b(B")
+
+
+@UNIT
+def test_write_reports_unencodable_position() -> None:
+    stream = BytesIO()
+
+    with pytest.raises(EncodedWriteError) as exc_info:
+        write_encoded(["line 1\n", "line 2\nhost ", "①髙 😀\n"], stream, "Shift_JIS", chunk_chars=4)
+
+    assert exc_info.value.line == 3
+    assert exc_info.value.position == len("line 1\nline 2\nhost ")
+    assert "'①'" in str(exc_info.value)
+
+
+@UNIT
+def test_write_to_path(tmp_path: Path) -> None:
+    path = tmp_path / "procedure.txt"
+
+    written = write_encoded(iter_text_chunks(PROCEDURE_TEXT, 100), path, "cp932")
+
+    assert path.read_bytes() == PROCEDURE_TEXT.encode("cp932")
+    assert written == path.stat().st_size
+
+
+@UNIT
+def test_write_to_path_removes_partial_file(tmp_path: Path) -> None:
+    path = tmp_path / "procedure.txt"
+
+    with pytest.raises(EncodedWriteError):
+        write_encoded(iter_text_chunks(PROCEDURE_TEXT, 100), path, "Shift_JIS", chunk_chars=100)
+
+    assert not path.exists(), "A partially written file must be removed"
+    assert list(tmp_path.iterdir()) == [], "The temporary file must be removed"
+
+
+@UNIT
+def test_failed_write_keeps_existing_file(tmp_path: Path) -> None:
+    path = tmp_path / "procedure.txt"
+    path.write_bytes(b"previous output")
+
+    with pytest.raises(EncodedWriteError):
+        write_encoded(iter_text_chunks(PROCEDURE_TEXT, 100), path, "Shift_JIS", chunk_chars=100)
+
+    assert path.read_bytes() == b"previous output", "A failed write must not touch the previous output"
+    assert list(tmp_path.iterdir()) == [path]
+
+    write_encoded(["updated"], path, "utf-8")
+    assert path.read_bytes() == b"updated"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("encoding", "errors"),
+    [
+        pytest.param("utf-9", "strict", id="unknown_encoding"),
+        pytest.param("Shift_JIS", "no-such-handler", id="unknown_error_handler"),
+    ],
+)
+def test_write_rejects_unknown_codec_before_opening(tmp_path: Path, encoding: str, errors: UnencodablePolicy) -> None:
+    path = tmp_path / "procedure.txt"
+
+    with pytest.raises(LookupError):
+        write_encoded(["text"], path, encoding, errors)
+
+    assert not path.exists()
+
+
+@UNIT
+def test_write_generator_keeps_memory_bounded(tmp_path: Path) -> None:
+    line: Final[str] = " description 東京サーバー 第1データセンター\n"
+    total_chars: Final[int] = len(line) * 200_000
+
+    def render() -> Iterator[str]:
+        for _ in range(200_000):
+            yield line
+
+    tracemalloc.start()
+    try:
+        written = write_encoded(render(), tmp_path / "procedure.txt", "EUC-JP", chunk_chars=16 * 1024)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert written == len(line.encode("EUC-JP")) * 200_000
+    assert peak < total_chars // 10, f"Peak {peak} bytes while writing {total_chars} characters"
+
+
+@UNIT
+def test_app_core_write_download_content(tmp_path: Path) -> None:
+    core = AppCore("config error", "template error")
+    assert core.write_download_content(tmp_path / "empty.txt", "Shift_JIS") is None
+
+    core.config_dict = {"name": "東京サーバー①"}
+    template = BytesIO("{{ name }}\n".encode())
+    template.name = "template.j2"
+    core.load_template_file(template, enable_auto_transcoding=False).apply(0, is_strict_undefined=True)
+    stream = BytesIO()
+
+    assert core.write_download_content(stream, "cp932") == len(stream.getvalue())
+    assert stream.getvalue() == core.get_download_content("cp932") == "東京サーバー①".encode("cp932")
+    assert core.write_download_content(BytesIO(), "utf-9") is None
+    with pytest.raises(EncodedWriteError):
+        core.write_download_content(BytesIO(), "EUC-JP")
+    replaced = BytesIO()
+    core.write_download_content(replaced, "EUC-JP", errors="replace")
+    assert replaced.getvalue() == "東京サーバー?".encode("EUC-JP")
@@ -0,0 +1,238 @@
+"""Unit tests for the staged encoding detection pipeline.
+
+The tests cover:
+- Parity: on a corpus of the assets/examples inputs and synthetic Japanese tables, encoded in every
+  `TextTranscoder.KNOWN_ENCODES` entry, the pipeline returns the same name as `chardet.detect`
+  and `TextTranscoder.detect_encoding` returns the same result as the previous full-scan implementation.
+- The stage that decides each input, and early exit of the sampled stage.
+- Fallback to the full scan when the sample cannot decide or the rest of the file contradicts it.
+- The single-pass KNOWN_ENCODES classifier returns the same candidate as decoding each candidate in turn,
+  including on corrupted inputs and sequences split across chunk boundaries.
+- Per-encoding benchmarks against the full chardet scan and the decode-each-candidate loop
+  (run with `-n0 -m benchmark`).
+"""
+
+import random
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Final, List, Optional, Tuple
+
+import chardet
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from chardet.universaldetector import UniversalDetector
+from pytest_benchmark.fixture import BenchmarkFixture
+from pytest_mock import MockerFixture
+
+from features.encoding_detector import DetectionStage, classify_known_encoding, detect_raw_encoding
+from features.transcoder import TextTranscoder
+
+UNIT: MarkDecorator = pytest.mark.unit
+BENCHMARK: MarkDecorator = pytest.mark.benchmark
+
+EXAMPLES_DIR: Final[Path] = Path(__file__).resolve().parents[2] / "assets" / "examples"
+JAPANESE_TABLE: Final[str] = "id,ホスト名,設置場所,備考\n" + "".join(
+    f"{i},東京サーバー{i:04d},第{i % 7}データセンター,これは日本語のテストです。ひらがなとカタカナ。\n" for i in range(1000)
+)
+ASCII_TABLE: Final[str] = "id,host,vlan\n" + "".join(f"{i},host{i},{i % 4094}\n" for i in range(1000))
+BENCHMARK_SCALE: Final[int] = 4
+
+
+@lru_cache(maxsize=None)
+def _chardet_encoding(data: bytes) -> Optional[str]:
+    return chardet.detect(data)["encoding"]
+
+
+def _legacy_known_encoding(data: bytes) -> Optional[str]:
+    """Previous KNOWN_ENCODES fallback: decode the whole file with each candidate in turn."""
+    for known in TextTranscoder.KNOWN_ENCODES:
+        try:
+            data.decode(known)
+            return known
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return None
+
+
+def _legacy_detect_encoding(data: bytes) -> Optional[str]:
+    """Previous TextTranscoder.detect_encoding: chardet over the whole file, then the KNOWN_ENCODES fallback."""
+    if b"\0" in data[:1024]:
+        return None
+    encoding: Final[Optional[str]] = _chardet_encoding(data)
+    if encoding in TextTranscoder.KNOWN_ENCODES:
+        return encoding
+    known_encoding: Final[Optional[str]] = _legacy_known_encoding(data)
+    return known_encoding if known_encoding is not None else encoding
+
+
+def _corpus() -> List[Tuple[str, bytes]]:
+    corpus: Final[List[Tuple[str, bytes]]] = []
+    texts: Final[List[Tuple[str, str]]] = [
+        ("japanese_table", JAPANESE_TABLE),
+        ("ascii_table", ASCII_TABLE),
+        ("ascii_then_japanese", ASCII_TABLE + JAPANESE_TABLE),
+    ]
+    for path in sorted(EXAMPLES_DIR.glob("*.*")):
+        if path.suffix == ".py":
+            continue
+        raw = path.read_bytes()
+        corpus.append((f"{path.name}-as-is", raw))
+        try:
+            texts.append((path.name, raw.decode("utf-8")))
+        except UnicodeDecodeError:
+            continue
+
+    for name, text in texts:
+        for encoding in TextTranscoder.KNOWN_ENCODES:
+            try:
+                corpus.append((f"{name}-{encoding}", text.encode(encoding)))
+            except UnicodeEncodeError:
+                continue
+    return corpus
+
+
+CORPUS: Final[List[Tuple[str, bytes]]] = _corpus()
+
+
+@UNIT
+@pytest.mark.parametrize("data", [pytest.param(data, id=name) for name, data in CORPUS])
+def test_parity_with_full_scan(data: bytes) -> None:
+    detection = detect_raw_encoding(data, chunk_size=4096)
+
+    assert detection.encoding == _chardet_encoding(data), f"Stage '{detection.stage}' diverged from chardet"
+    assert TextTranscoder(BytesIO(data)).detect_encoding() == _legacy_detect_encoding(data)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("data", "expected_stage"),
+    [
+        pytest.param(b"", "full", id="stage_empty"),
+        pytest.param(ASCII_TABLE.encode("ascii"), "ascii", id="stage_ascii"),
+        pytest.param(b"\xef\xbb\xbf" + JAPANESE_TABLE.encode("utf-8"), "bom", id="stage_bom_utf8"),
+        pytest.param("﻿日本語".encode("utf-16-le"), "bom", id="stage_bom_utf16"),
+        pytest.param(JAPANESE_TABLE.encode("utf-8"), "utf-8", id="stage_utf8"),
+        pytest.param(JAPANESE_TABLE.encode("Shift_JIS"), "sampled", id="stage_shift_jis"),
+        pytest.param(JAPANESE_TABLE.encode("EUC-JP"), "sampled", id="stage_euc_jp"),
+        pytest.param(JAPANESE_TABLE.encode("ISO-2022-JP"), "sampled", id="stage_iso_2022_jp"),
+        pytest.param("café".encode(), "full", id="stage_utf8_too_few_multibyte_chars"),
+        pytest.param(("hello 😀 " * 50).encode(), "full", id="stage_utf8_outside_chardet_state_machine"),
+        pytest.param(ASCII_TABLE.encode("ascii") + b"\x00", "full", id="stage_nul_after_first_kilobyte"),
+        pytest.param(b"abc \x1b$B$3$s\x1b(B", "sampled", id="stage_ascii_with_escape"),
+        pytest.param(("Grüße aus Köln. " * 40).encode("cp1252"), "full", id="stage_single_byte_latin"),
+        pytest.param(JAPANESE_TABLE.encode("Shift_JIS") + b"\xff\xfe", "full", id="stage_sample_contradicted_by_tail"),
+    ],
+)
+def test_detection_stage(data: bytes, expected_stage: DetectionStage) -> None:
+    detection = detect_raw_encoding(data)
+
+    assert detection.stage == expected_stage
+    assert detection.encoding == _chardet_encoding(data)
+
+
+@UNIT
+def test_sampled_stage_stops_early(mocker: MockerFixture) -> None:
+    data = (JAPANESE_TABLE * 4).encode("Shift_JIS")
+    feed = mocker.spy(UniversalDetector, "feed")
+
+    detection = detect_raw_encoding(data)
+
+    fed_bytes = sum(len(call.args[1]) for call in feed.call_args_list)
+    assert detection.encoding == "SHIFT_JIS"
+    assert fed_bytes < len(data) // 10, f"Fed {fed_bytes} of {len(data)} bytes to chardet"
+
+
+@UNIT
+def test_utf8_fast_path_skips_chardet(mocker: MockerFixture) -> None:
+    detect = mocker.spy(chardet, "detect")
+
+    detection = detect_raw_encoding(memoryview(JAPANESE_TABLE.encode("utf-8")))
+
+    assert detection.encoding == "utf-8"
+    assert detect.call_count == 0, "The UTF-8 fast path must not call chardet"
+
+
+@UNIT
+@pytest.mark.parametrize("data", [pytest.param(data, id=name) for name, data in CORPUS])
+def test_classifier_matches_decode_loop(data: bytes) -> None:
+    assert classify_known_encoding(data, TextTranscoder.KNOWN_ENCODES, chunk_size=7) == _legacy_known_encoding(data)
+    assert classify_known_encoding(memoryview(data), TextTranscoder.KNOWN_ENCODES) == _legacy_known_encoding(data)
+
+
+@UNIT
+def test_classifier_matches_decode_loop_on_corrupted_inputs() -> None:
+    rng = random.Random(0)  # noqa: S311 - reproducible corpus, not security sensitive
+    fragments: Final[List[str]] = ["abc,", "日本語のテキスト", "ｶﾀｶﾅ", "①髙", "\n"]
+    for _ in range(2000):
+        text = "".join(rng.choice(fragments) for _ in range(rng.randrange(6)))
+        try:
+            data = bytearray(text.encode(rng.choice(["Shift_JIS", "cp932", "EUC-JP", "ISO-2022-JP", "utf-8"])))
+        except UnicodeEncodeError:
+            continue
+        for _ in range(rng.randrange(3)):
+            if data:
+                data[rng.randrange(len(data))] = rng.randrange(256)
+
+        expected = _legacy_known_encoding(bytes(data))
+        for chunk_size in (1, 2, 3, 64):
+            actual = classify_known_encoding(bytes(data), TextTranscoder.KNOWN_ENCODES, chunk_size=chunk_size)
+            assert actual == expected, f"Classifier diverged for {bytes(data)!r} with chunk size {chunk_size}"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("encodings", "expected"),
+    [
+        pytest.param(["no-such-codec", "Shift_JIS"], "Shift_JIS", id="classifier_skips_unknown_codec"),
+        pytest.param(["utf-8", "Shift_JIS"], "Shift_JIS", id="classifier_drops_failed_candidate"),
+        pytest.param(["ASCII", "utf-8"], None, id="classifier_no_candidate"),
+        pytest.param([], None, id="classifier_empty_candidates"),
+    ],
+)
+def test_classifier_candidates(encodings: List[str], expected: Optional[str]) -> None:
+    assert classify_known_encoding("日本語".encode("Shift_JIS"), encodings) == expected
+
+
+def _benchmark_cases() -> List[object]:
+    cases: Final[List[object]] = []
+    for encoding in TextTranscoder.KNOWN_ENCODES:
+        text = ASCII_TABLE if encoding == "ASCII" else JAPANESE_TABLE
+        for detector in ("pipeline", "chardet"):
+            cases.append(pytest.param((text * BENCHMARK_SCALE).encode(encoding), detector, id=f"{encoding}-{detector}"))
+    return cases
+
+
+@BENCHMARK
+@pytest.mark.parametrize(("data", "detector"), _benchmark_cases())
+def test_benchmark_detection(benchmark: BenchmarkFixture, data: bytes, detector: str) -> None:
+    if detector == "pipeline":
+        encoding = benchmark(lambda: detect_raw_encoding(data).encoding)
+    else:
+        encoding = benchmark(lambda: chardet.detect(data)["encoding"])
+
+    assert encoding is not None
+
+
+def _classifier_benchmark_cases() -> List[object]:
+    cases: Final[List[object]] = []
+    inputs: Final[List[Tuple[str, bytes]]] = [
+        (encoding, ((ASCII_TABLE if encoding == "ASCII" else JAPANESE_TABLE) * BENCHMARK_SCALE * 10).encode(encoding))
+        for encoding in TextTranscoder.KNOWN_ENCODES
+    ]
+    inputs.append(("Shift_JIS-late-failure", (JAPANESE_TABLE * BENCHMARK_SCALE * 10).encode("Shift_JIS") + "①".encode("cp932")))
+    for name, data in inputs:
+        for classifier in ("single-pass", "decode-loop"):
+            cases.append(pytest.param(data, classifier, id=f"{name}-{classifier}"))
+    return cases
+
+
+@BENCHMARK
+@pytest.mark.parametrize(("data", "classifier"), _classifier_benchmark_cases())
+def test_benchmark_known_encoding_classifier(benchmark: BenchmarkFixture, data: bytes, classifier: str) -> None:
+    if classifier == "single-pass":
+        result = benchmark(classify_known_encoding, data, TextTranscoder.KNOWN_ENCODES)
+    else:
+        result = benchmark(_legacy_known_encoding, data)
+
+    assert result == _legacy_known_encoding(data)
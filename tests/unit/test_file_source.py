@@ -0,0 +1,217 @@
+"""Unit tests for the FileSource ingestion helpers.
+
+The tests cover:
+- Opening paths (mmap), mmap objects, memoryviews, bytes, BytesIO and chunk iterators.
+- Early size rejection before mapping a path or consuming the remaining chunks.
+- Zero-copy buffers and direct decoding in ConfigParser, DocumentRender and TextTranscoder.
+- AppCore loading from paths and nameless buffers.
+"""
+
+import mmap
+from io import BytesIO
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.config_parser import ConfigParser
+from features.core import AppCore
+from features.document_render import DocumentRender
+from features.file_source import FileSource, FileSourceError, contains_nul
+from features.transcoder import TextTranscoder
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+MAX_SIZE: int = 64
+
+
+@pytest.fixture
+def config_path(tmp_path: Path) -> Path:
+    path = tmp_path / "config.toml"
+    path.write_bytes('name = "世界"\n'.encode())
+    return path
+
+
+@UNIT
+def test_open_path_maps_file(config_path: Path) -> None:
+    with FileSource.open(config_path, MAX_SIZE) as source:
+        assert source.name == "config.toml", "A path source must be named after the file"
+        assert source.size == config_path.stat().st_size
+        assert source.decode() == 'name = "世界"\n'
+        assert isinstance(source.buffer.obj, mmap.mmap), "A path source must be backed by a read-only mmap"
+
+    with pytest.raises(TypeError):
+        source.decode()
+
+
+@UNIT
+def test_open_empty_path(tmp_path: Path) -> None:
+    path = tmp_path / "empty.yaml"
+    path.write_bytes(b"")
+
+    source = FileSource.open(str(path), MAX_SIZE)
+
+    assert source.size == 0
+    assert source.decode() == ""
+
+
+@UNIT
+def test_open_path_rejects_oversize_before_mapping(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = tmp_path / "large.csv"
+    path.write_bytes(b"x" * (MAX_SIZE + 1))
+    mapper = mocker.spy(mmap, "mmap")
+
+    with pytest.raises(FileSourceError, match=f"File size exceeds maximum limit of {MAX_SIZE} bytes"):
+        FileSource.open(path, MAX_SIZE)
+
+    assert mapper.call_count == 0, "An oversize file must be rejected from its stat size"
+
+
+@UNIT
+def test_open_missing_path() -> None:
+    with pytest.raises(FileSourceError, match="Failed to read file"):
+        FileSource.open(Path("/nonexistent/config.toml"), MAX_SIZE)
+
+
+@UNIT
+def test_chunk_iterator_stops_at_limit() -> None:
+    consumed: List[int] = []
+
+    def chunks() -> Iterator[bytes]:
+        for index in range(100):
+            consumed.append(index)
+            yield b"x" * 16
+
+    with pytest.raises(FileSourceError, match="File size exceeds"):
+        FileSource.open(chunks(), MAX_SIZE, name="stream.csv")
+
+    assert len(consumed) == MAX_SIZE // 16 + 1, "Chunks after the limit must not be consumed"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    "factory",
+    [
+        pytest.param(lambda data: data, id="source_bytes"),
+        pytest.param(bytearray, id="source_bytearray"),
+        pytest.param(memoryview, id="source_memoryview"),
+        pytest.param(lambda data: iter([data[:3], data[3:]]), id="source_chunks"),
+    ],
+)
+def test_open_buffers(factory: object) -> None:
+    data = "a: あ\n".encode()
+
+    source = FileSource.open(factory(data), MAX_SIZE, name="config.yaml")  # type: ignore[operator]
+
+    assert source.name == "config.yaml"
+    assert source.decode() == "a: あ\n"
+    assert source.buffer.readonly is True, "The shared buffer must be read-only"
+
+
+@UNIT
+def test_open_buffer_is_zero_copy() -> None:
+    data = bytearray(b"key = 1\n")
+
+    source = FileSource.open(data, MAX_SIZE, name="config.toml")
+    data[6] = ord("2")
+
+    assert source.decode() == "key = 2\n", "The source must reference the caller's buffer instead of copying it"
+
+
+@UNIT
+def test_open_mmap_and_bytes_io(config_path: Path) -> None:
+    with config_path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        source = FileSource.open(mapping, MAX_SIZE, name="mapped.toml")
+        assert source.decode() == 'name = "世界"\n'
+        source.close()
+        assert mapping.closed is False, "Closing the source must not close a caller-owned mmap"
+
+    upload = BytesIO(b"a,b\n1,2\n")
+    upload.name = "upload.csv"
+    assert FileSource.open(upload, MAX_SIZE).name == "upload.csv", "A BytesIO source must keep its name"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        pytest.param(b"abc", False, id="nul_absent"),
+        pytest.param(b"a\x00c", True, id="nul_present"),
+        pytest.param(memoryview(b"\x00"), True, id="nul_present_memoryview"),
+    ],
+)
+def test_contains_nul(data: bytes, expected: bool) -> None:
+    assert contains_nul(data) is expected
+
+
+@UNIT
+def test_loaders_accept_file_source() -> None:
+    parser = ConfigParser(FileSource.open('name = "world"\n'.encode(), MAX_SIZE, name="config.toml"))
+    assert parser.parse() is True
+    assert parser.parsed_dict == {"name": "world"}
+
+    render = DocumentRender(FileSource.open(b"Hello {{ name }}", MAX_SIZE, name="template.j2"))
+    assert render.is_valid_template is True
+    assert render.apply_context({"name": "world"}, 0) is True
+    assert render.render_content == "Hello world"
+
+    invalid_render = DocumentRender(FileSource.open(b"Hello\x00", MAX_SIZE, name="template.j2"))
+    assert invalid_render.error_message == "Template file contains invalid binary data"
+
+
+@UNIT
+def test_transcoder_accepts_file_source() -> None:
+    source = FileSource.open("漢字による試験".encode("Shift_JIS"), MAX_SIZE, name="legacy.csv")
+    transcoder = TextTranscoder(source)
+
+    converted = transcoder.convert_source(is_allow_fallback=False)
+    copied = transcoder.convert(is_allow_fallback=False)
+
+    assert transcoder.detect_encoding() == "Shift_JIS"
+    assert isinstance(converted, FileSource), "convert_source must return a FileSource"
+    assert converted.name == "legacy.csv"
+    assert converted.decode() == "漢字による試験"
+    assert isinstance(copied, BytesIO), "convert must keep returning a BytesIO"
+    assert copied.name == "legacy.csv"
+    assert copied.getvalue() == "漢字による試験".encode()
+    assert TextTranscoder(FileSource.open(b"\x00\x01", MAX_SIZE)).convert_source(is_allow_fallback=False) is None
+
+
+@UNIT
+def test_convert_source_passes_utf8_through() -> None:
+    source = FileSource.open("漢字".encode(), MAX_SIZE, name="utf8.csv")
+
+    assert TextTranscoder(source).convert_source() is source, "UTF-8 input must not be copied"
+
+
+@UNIT
+def test_app_core_loads_paths_and_buffers(tmp_path: Path) -> None:
+    template_path = tmp_path / "template.j2"
+    template_path.write_bytes("{{ name }}!".encode("Shift_JIS"))
+    config_view = memoryview('name = "世界"\n'.encode())
+
+    core = AppCore("config error", "template error")
+    core.load_config_file(config_view, "csv_rows", enable_auto_transcoding=True, source_name="config.toml")
+    core.load_template_file(template_path, enable_auto_transcoding=True).apply(0, is_strict_undefined=True)
+
+    assert core.config_error_message is None
+    assert core.template_error_message is None
+    assert core.formatted_text == "世界!"
+
+
+@UNIT
+def test_app_core_rejects_oversize_path(tmp_path: Path) -> None:
+    path = tmp_path / "huge.csv"
+    path.write_bytes(b"")
+    with path.open("r+b") as file:
+        file.truncate(30 * 1024 * 1024 + 1)
+
+    core = AppCore("config error", "template error")
+    core.load_config_file(path, "csv_rows", enable_auto_transcoding=False)
+    core.load_template_file(str(path), enable_auto_transcoding=False)
+
+    assert core.config_error_message == "config error: File size exceeds maximum limit of 31457280 bytes in 'huge.csv'"
+    assert core.template_error_message == "template error: File size exceeds maximum limit of 31457280 bytes in 'huge.csv'"
+    assert core.config_dict is None
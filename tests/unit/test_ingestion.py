@@ -0,0 +1,181 @@
+"""Unit tests for the single-pass upload ingestion record.
+
+The tests cover:
+- Size, first NUL offset, BOM and content hash from one chunked scan, including NUL bytes on chunk boundaries.
+- Decoding as UTF-8, or with the detected encoding when auto transcoding is enabled.
+- TextTranscoder.decode returning the same text as converting to UTF-8 and decoding again.
+- ConfigParser, DocumentRender and FileValidator consuming the record.
+- AppCore loads that neither hash nor scan for NUL bytes again after ingestion.
+"""
+
+from io import BytesIO
+from typing import Final, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features import encoding_detector as encoding_detector_module
+from features import transcoder as transcoder_module
+from features.config_parser import ConfigParser
+from features.core import AppCore
+from features.detection_cache import DetectionCache, content_key
+from features.document_render import DocumentRender
+from features.file_source import FileSource
+from features.ingestion import IngestedBlob, ingest_upload, scan_upload
+from features.transcoder import TextTranscoder
+from features.validate_uploaded_file import FileSizeConfig, FileValidator
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+JAPANESE_CONFIG: Final[str] = "".join(f'host_{i} = "東京サーバー{i:04d} これは日本語のテストです。"\n' for i in range(200))
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("data", "expected_nul_offset", "expected_bom", "expected_binary"),
+    [
+        pytest.param(b"", None, None, False, id="scan_empty"),
+        pytest.param(b"key = 1\n", None, None, False, id="scan_text"),
+        pytest.param(b"\xef\xbb\xbfkey = 1\n", None, "UTF-8-SIG", False, id="scan_utf8_bom"),
+        pytest.param(b"\xff\xfek\x00", 3, "UTF-16", True, id="scan_utf16_bom"),
+        pytest.param(b"abc\x00", 3, None, True, id="scan_nul_in_head"),
+        pytest.param(b"a" * 1024 + b"\x00", 1024, None, False, id="scan_nul_after_sniff_range"),
+    ],
+)
+def test_scan_upload(
+    make_upload: UploadFactory, data: bytes, expected_nul_offset: Optional[int], expected_bom: Optional[str], expected_binary: bool
+) -> None:
+    blob = scan_upload(make_upload(data, "config.toml"))
+
+    assert blob.name == "config.toml"
+    assert blob.size == len(data)
+    assert blob.nul_offset == expected_nul_offset
+    assert blob.has_nul is (expected_nul_offset is not None)
+    assert blob.is_binary is expected_binary
+    assert blob.bom == expected_bom
+    assert blob.content_hash == content_key(data)
+    assert blob.text is None
+
+
+@UNIT
+@pytest.mark.parametrize("nul_offset", [0, 6, 7, 8, 63])
+def test_scan_upload_across_chunks(monkeypatch: pytest.MonkeyPatch, nul_offset: int) -> None:
+    monkeypatch.setattr("features.ingestion.SCAN_CHUNK_SIZE", 7)
+    data = bytearray(b"x" * 64)
+    data[nul_offset] = 0
+    data[-1] = 0
+
+    blob = scan_upload(FileSource.open(bytes(data), 1024, name="template.j2"))
+
+    assert blob.nul_offset == nul_offset, "The first NUL byte must be reported"
+    assert blob.content_hash == content_key(bytes(data)), "The chunked hash must match content_key"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("encoding", "is_auto", "expected_encoding"),
+    [
+        pytest.param("utf-8", False, "utf-8", id="ingest_utf8"),
+        pytest.param("utf-8", True, "utf-8", id="ingest_auto_utf8"),
+        pytest.param("Shift_JIS", True, "Shift_JIS", id="ingest_auto_shift_jis"),
+        pytest.param("EUC-JP", True, "EUC-JP", id="ingest_auto_euc_jp"),
+        pytest.param("ISO-2022-JP", True, "ISO-2022-JP", id="ingest_auto_iso_2022_jp"),
+        pytest.param("utf-8-sig", True, "utf-8", id="ingest_auto_utf8_bom_keeps_bom_like_convert"),
+    ],
+)
+def test_ingest_upload_decodes(make_upload: UploadFactory, encoding: str, is_auto: bool, expected_encoding: str) -> None:
+    data: Final[bytes] = JAPANESE_CONFIG.encode(encoding)
+
+    blob = ingest_upload(make_upload(data, "config.toml"), enable_auto_transcoding=is_auto)
+
+    assert blob.encoding == expected_encoding
+    assert blob.text == data.decode(expected_encoding)
+    assert blob.decode_error is None
+
+
+@UNIT
+def test_ingest_upload_reports_decode_error(make_upload: UploadFactory) -> None:
+    data: Final[bytes] = JAPANESE_CONFIG.encode("Shift_JIS")
+
+    blob = ingest_upload(make_upload(data, "config.toml"))
+
+    assert blob.text is None
+    with pytest.raises(UnicodeDecodeError) as exc_info:
+        data.decode("utf-8")
+    assert blob.decode_error == str(exc_info.value), "The message must match the previous ConfigParser error"
+
+
+@UNIT
+def test_ingest_upload_rejects_binary_with_auto_transcoding(make_upload: UploadFactory) -> None:
+    blob = ingest_upload(make_upload(b"\x00\x01\x02", "config.toml"), enable_auto_transcoding=True)
+
+    assert blob.is_binary is True
+    assert blob.encoding is None
+    assert blob.text is None
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("text", "encoding"),
+    [
+        pytest.param("key = 1\n" * 40, "ascii", id="decode_ascii"),
+        pytest.param("Grüße aus Köln. " * 40, "cp1252", id="decode_latin"),
+        *[
+            pytest.param(JAPANESE_CONFIG, encoding, id=f"decode_{encoding}")
+            for encoding in ("utf-8", "utf-8-sig", "Shift_JIS", "EUC-JP", "ISO-2022-JP")
+        ],
+    ],
+)
+def test_transcoder_decode_matches_convert(text: str, encoding: str) -> None:
+    data = text.encode(encoding)
+
+    converted = TextTranscoder(BytesIO(data)).convert(is_allow_fallback=False)
+    decoded = TextTranscoder(BytesIO(data)).decode()
+
+    assert isinstance(converted, BytesIO)
+    assert decoded == converted.getvalue().decode("utf-8")
+
+
+@UNIT
+def test_consumers_accept_record(make_upload: UploadFactory) -> None:
+    config = ingest_upload(make_upload(JAPANESE_CONFIG.encode("EUC-JP"), "config.toml"), enable_auto_transcoding=True)
+    template = ingest_upload(make_upload(b"{{ host_1 }}" + b" " * 2048 + b"\x00", "template.j2"))
+
+    parser = ConfigParser(config)
+    render = DocumentRender(template)
+
+    assert parser.parse() is True
+    assert parser.parsed_dict is not None
+    assert parser.parsed_dict["host_1"] == "東京サーバー0001 これは日本語のテストです。"
+    assert render.is_valid_template is False
+    assert render.error_message == "Template file contains invalid binary data"
+    validator = FileValidator(size_config=FileSizeConfig(max_size_bytes=1024))
+    assert validator.get_file_size(template) == template.size
+    assert validator.validate_size(template) is False
+
+
+@UNIT
+def test_app_core_scans_upload_once(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    hash_in_transcoder = mocker.spy(transcoder_module, "content_key")
+    nul_in_transcoder = mocker.spy(transcoder_module, "contains_nul")
+    nul_in_detector = mocker.spy(encoding_detector_module, "contains_nul")
+    core = AppCore("config error", "template error", detection_cache=DetectionCache())
+
+    core.load_config_file(make_upload(JAPANESE_CONFIG.encode("Shift_JIS"), "config.toml"), "csv_rows", enable_auto_transcoding=True)
+    core.load_template_file(make_upload("{{ host_1 }}".encode("Shift_JIS"), "template.j2"), enable_auto_transcoding=True)
+    core.apply(0, is_strict_undefined=True)
+
+    assert core.formatted_text == "東京サーバー0001 これは日本語のテストです。"
+    assert hash_in_transcoder.call_count == 0, "The content hash must come from the ingestion record"
+    assert nul_in_transcoder.call_count == 0
+    assert nul_in_detector.call_count == 0, "NUL presence must come from the ingestion record"
+
+
+@UNIT
+def test_record_is_immutable(make_upload: UploadFactory) -> None:
+    blob: IngestedBlob = ingest_upload(make_upload(b"key = 1\n", "config.toml"))
+
+    with pytest.raises(ValueError, match="frozen"):
+        blob.text = "key = 2\n"  # type: ignore[misc]
@@ -0,0 +1,191 @@
+"""Unit tests for process-isolated parsing and rendering.
+
+The tests cover:
+- Parity with in-process parsing and rendering, in both pooled and per-call modes.
+- Child process reuse in pooled mode and replacement of children that hit a limit.
+- The wall-clock, CPU time and memory limits, mapped into AppCore's error messages.
+- Isolation failures being kept out of the render memo.
+- Per-call overhead accounting in IsolationStats and the pipeline metrics.
+- Benchmarks of in-process, pooled and per-call generation (run with `-n0 -m benchmark`).
+"""
+
+import sys
+from collections.abc import Iterator
+from typing import Final, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from features.core import AppCore
+from features.isolation import IsolationLimits, IsolationMode, IsolationPool
+from features.render_memo import RenderMemo
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+BENCHMARK: MarkDecorator = pytest.mark.benchmark
+
+CONFIG: Final[bytes] = b'hostname = "router-1"\n[[interfaces]]\nname = "ge-0/0/0"\n[[interfaces]]\nname = "ge-0/0/1"\n'
+TEMPLATE: Final[bytes] = b"hostname {{ hostname }}\n{% for i in interfaces %}interface {{ i.name }}\n{% endfor %}"
+BUSY_TEMPLATE: Final[bytes] = b"{% for a in range(100000) %}{% for b in range(100000) %}{% endfor %}{% endfor %}"
+GREEDY_TEMPLATE: Final[bytes] = b"{{ ('x' * 1000000000)|length }}"
+LARGE_CONFIG: Final[bytes] = b'value = "' + b"x" * (12 * 1024 * 1024) + b'"\n'
+
+
+def _generate(
+    make_upload: UploadFactory, core: AppCore, config: bytes = CONFIG, template: bytes = TEMPLATE, config_name: str = "config.toml"
+) -> AppCore:
+    core.load_config_file(make_upload(config, config_name), "csv_rows", True)
+    core.load_template_file(make_upload(template, "template.j2"), True)
+    return core.apply(0, True)
+
+
+@pytest.fixture(params=[pytest.param("pooled", id="pooled"), pytest.param("per_call", id="per_call")])
+def pool(request: pytest.FixtureRequest) -> Iterator[IsolationPool]:
+    mode: IsolationMode = request.param
+    with IsolationPool(mode=mode, limits=IsolationLimits(cpu_seconds=1, memory_bytes=256 * 1024 * 1024, wall_clock_seconds=5)) as created:
+        yield created
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("config", "template", "config_name"),
+    [
+        pytest.param(CONFIG, TEMPLATE, "config.toml", id="success"),
+        pytest.param(b"hostname = \n", TEMPLATE, "config.toml", id="config_syntax_error"),
+        pytest.param(CONFIG, b"{{ missing }}", "config.toml", id="undefined_variable"),
+        pytest.param(CONFIG, b"{% for %}", "config.toml", id="template_syntax_error"),
+        pytest.param(b"a,b\n1,2\n", b"{{ csv_rows[0].a }}", "config.csv", id="csv"),
+    ],
+)
+def test_matches_in_process(make_upload: UploadFactory, pool: IsolationPool, config: bytes, template: bytes, config_name: str) -> None:
+    expected = _generate(make_upload, AppCore("config error", "template error", render_memo=None), config, template, config_name)
+
+    actual = _generate(
+        make_upload, AppCore("config error", "template error", render_memo=None, isolation=pool), config, template, config_name
+    )
+
+    assert actual.config_dict == expected.config_dict
+    assert actual.formatted_text == expected.formatted_text
+    assert actual.config_error_message == expected.config_error_message
+    assert actual.template_error_message == expected.template_error_message
+    assert pool.stats.failures == 0
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("mode", "expected_spawned"),
+    [pytest.param("pooled", 1, id="pooled"), pytest.param("per_call", 6, id="per_call")],
+)
+def test_child_reuse(make_upload: UploadFactory, mode: IsolationMode, expected_spawned: int) -> None:
+    with IsolationPool(mode=mode, size=1) as isolation:
+        core = AppCore("config error", "template error", render_memo=None, isolation=isolation)
+        for _ in range(3):
+            _generate(make_upload, core)
+
+        assert core.formatted_text == "hostname router-1\ninterface ge-0/0/0\ninterface ge-0/0/1\n"
+        assert isolation.stats.calls == 6
+        assert isolation.stats.spawned == expected_spawned
+
+
+@UNIT
+def test_wall_clock_limit(make_upload: UploadFactory) -> None:
+    with IsolationPool(limits=IsolationLimits(cpu_seconds=None, wall_clock_seconds=0.5)) as isolation:
+        core = _generate(
+            make_upload, AppCore("config error", "template error", render_memo=None, isolation=isolation), template=BUSY_TEMPLATE
+        )
+
+        assert core.formatted_text is None
+        assert core.template_error_message == "template error: Rendering exceeded the wall-clock limit of 0.5 seconds in 'template.j2'"
+        # the killed child is replaced by a new one
+        core = _generate(make_upload, core)
+        assert core.template_error_message is None
+        assert isolation.stats.failures == 1
+        assert isolation.stats.spawned == 2
+
+
+@UNIT
+@pytest.mark.skipif(sys.platform == "win32", reason="resource limits are not available on Windows")
+def test_cpu_limit(make_upload: UploadFactory) -> None:
+    with IsolationPool(limits=IsolationLimits(cpu_seconds=0.5, wall_clock_seconds=30)) as isolation:
+        core = _generate(
+            make_upload, AppCore("config error", "template error", render_memo=None, isolation=isolation), template=BUSY_TEMPLATE
+        )
+
+        assert core.template_error_message == "template error: Rendering exceeded the CPU time limit of 0.5 seconds in 'template.j2'"
+        assert isolation.stats.failures == 1
+
+
+@UNIT
+@pytest.mark.skipif(sys.platform == "win32", reason="resource limits are not available on Windows")
+def test_memory_limit_while_parsing(make_upload: UploadFactory) -> None:
+    with IsolationPool(limits=IsolationLimits(cpu_seconds=None, memory_bytes=8 * 1024 * 1024)) as isolation:
+        core = AppCore("config error", "template error", render_memo=None, isolation=isolation)
+
+        core.load_config_file(make_upload(LARGE_CONFIG, "config.toml"), "csv_rows", True)
+        assert core.config_dict is None
+        assert core.config_error_message == "config error: Parsing exceeded the memory limit of 8 MiB in 'config.toml'"
+
+        core = core.load_config_file(make_upload(CONFIG, "config.toml"), "csv_rows", True)
+        assert core.config_error_message is None
+        assert isolation.stats.spawned == 2
+
+
+@UNIT
+@pytest.mark.skipif(sys.platform == "win32", reason="resource limits are not available on Windows")
+def test_memory_limit_while_rendering(make_upload: UploadFactory) -> None:
+    with IsolationPool(limits=IsolationLimits(memory_bytes=64 * 1024 * 1024)) as isolation:
+        core = _generate(
+            make_upload, AppCore("config error", "template error", render_memo=None, isolation=isolation), template=GREEDY_TEMPLATE
+        )
+
+        assert core.template_error_message == "template error: Template runtime error: Memory exhausted while rendering in 'template.j2'"
+
+
+@UNIT
+def test_isolation_failures_are_not_memoized(make_upload: UploadFactory) -> None:
+    memo = RenderMemo()
+    with IsolationPool(limits=IsolationLimits(cpu_seconds=None, wall_clock_seconds=0.5)) as isolation:
+        core = _generate(
+            make_upload, AppCore("config error", "template error", render_memo=memo, isolation=isolation), template=BUSY_TEMPLATE
+        )
+
+        assert core.template_error_message is not None
+        assert len(memo) == 0
+
+        _generate(make_upload, core)
+        assert len(memo) == 1
+
+
+@UNIT
+def test_overhead_is_recorded(make_upload: UploadFactory) -> None:
+    with IsolationPool() as isolation:
+        core = _generate(make_upload, AppCore("config error", "template error", render_memo=None, isolation=isolation))
+
+        stats = isolation.stats
+        assert stats.calls == 2
+        assert stats.child_seconds > 0
+        assert stats.overhead_seconds > 0
+        assert stats.mean_overhead_seconds == pytest.approx(stats.overhead_seconds / 2)
+        for operation, stage in [("load_config_file", "parse"), ("apply", "render")]:
+            metrics = core.operation_metrics(operation)
+            assert metrics is not None
+            assert metrics.stage(stage) is not None
+            assert metrics.stage("isolation_overhead") is not None
+
+
+@BENCHMARK
+@pytest.mark.parametrize(
+    "mode", [pytest.param(None, id="in_process"), pytest.param("pooled", id="pooled"), pytest.param("per_call", id="per_call")]
+)
+def test_benchmark_generate(benchmark: BenchmarkFixture, mode: Optional[IsolationMode]) -> None:
+    isolation: Final[Optional[IsolationPool]] = None if mode is None else IsolationPool(mode=mode)
+    try:
+        core = AppCore("config error", "template error", render_memo=None, isolation=isolation)
+
+        result = benchmark(_generate, core)
+
+        assert result.formatted_text is not None
+    finally:
+        if isolation is not None:
+            isolation.close()
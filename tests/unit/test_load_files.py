@@ -0,0 +1,137 @@
+"""Unit tests for loading the config and template files concurrently.
+
+The tests cover:
+- The same parsed config, rendered text and error messages as loading the two files in sequence.
+- The template being loaded on the executor while the config is loaded on the calling thread.
+- Sequential loading when an input is missing or when allocations are traced.
+- Exceptions raised by either load, after both loads have finished.
+- Metrics recorded in the same order as sequential loading.
+"""
+
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Final, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.core import AppCore
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CONFIG: Final[bytes] = 'hostname = "router-1"\nlocation = "東京"\n'.encode()
+TEMPLATE: Final[bytes] = b"hostname {{ hostname }}\nlocation {{ location }}\n"
+
+
+def _core(trace_allocations: bool = False) -> AppCore:
+    return AppCore("config error", "template error", render_memo=None, trace_allocations=trace_allocations)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("config", "template", "config_name"),
+    [
+        pytest.param(CONFIG, TEMPLATE, "config.toml", id="success"),
+        pytest.param(b"hostname = \n", TEMPLATE, "config.toml", id="config_syntax_error"),
+        pytest.param(CONFIG, b"{% for %}", "config.toml", id="template_syntax_error"),
+        pytest.param(b"hostname = \n", b"{% for %}", "config.toml", id="both_errors"),
+        pytest.param(b"\x00\x01\x02", b"\xff\xfe\x00", "config.toml", id="binary_inputs"),
+        pytest.param(b"hostname,vlan\nsw-1,10\n", b"{{ csv_rows[0].hostname }}", "config.csv", id="csv"),
+    ],
+)
+def test_matches_sequential_loading(make_upload: UploadFactory, config: bytes, template: bytes, config_name: str) -> None:
+    expected = _core().load_config_file(make_upload(config, config_name), "csv_rows", True)
+    expected.load_template_file(make_upload(template, "template.j2"), True).apply(0, True)
+
+    actual = _core().load_files(make_upload(config, config_name), make_upload(template, "template.j2"), "csv_rows", True).apply(0, True)
+
+    assert actual.config_dict == expected.config_dict
+    assert actual.formatted_text == expected.formatted_text
+    assert actual.config_error_message == expected.config_error_message
+    assert actual.template_error_message == expected.template_error_message
+
+
+@UNIT
+def test_template_is_loaded_on_executor(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    threads: Dict[str, str] = {}
+    original_load_config_file = AppCore.load_config_file
+    original_load_template_file = AppCore.load_template_file
+
+    def _load_config_file(self: AppCore, *args: object, **kwargs: object) -> AppCore:
+        threads["config"] = threading.current_thread().name
+        return original_load_config_file(self, *args, **kwargs)  # type: ignore[arg-type]
+
+    def _load_template_file(self: AppCore, *args: object, **kwargs: object) -> AppCore:
+        threads["template"] = threading.current_thread().name
+        return original_load_template_file(self, *args, **kwargs)  # type: ignore[arg-type]
+
+    mocker.patch.object(AppCore, "load_config_file", _load_config_file)
+    mocker.patch.object(AppCore, "load_template_file", _load_template_file)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="custom-load") as executor:
+        core = _core().load_files(
+            make_upload(CONFIG, "config.toml"), make_upload(TEMPLATE, "template.j2"), "csv_rows", True, executor=executor
+        )
+
+    assert core.apply(0, True).formatted_text == "hostname router-1\nlocation 東京"
+    assert threads["config"] == threading.current_thread().name
+    assert threads["template"].startswith("custom-load")
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("config", "template", "trace_allocations"),
+    [
+        pytest.param(None, TEMPLATE, False, id="config_missing"),
+        pytest.param(CONFIG, None, False, id="template_missing"),
+        pytest.param(CONFIG, TEMPLATE, True, id="trace_allocations"),
+    ],
+)
+def test_falls_back_to_sequential_loading(
+    make_upload: UploadFactory, mocker: MockerFixture, config: Optional[bytes], template: Optional[bytes], trace_allocations: bool
+) -> None:
+    executor = mocker.Mock(spec=Executor)
+    config_file = None if config is None else make_upload(config, "config.toml")
+    template_file = None if template is None else make_upload(template, "template.j2")
+
+    core = _core(trace_allocations).load_files(config_file, template_file, "csv_rows", True, executor=executor)
+
+    executor.submit.assert_not_called()
+    assert (core.config_dict is not None) == (config is not None)
+    assert core.template_error_message is None
+
+
+@UNIT
+@pytest.mark.parametrize("failing", [pytest.param("load_config_file", id="config"), pytest.param("load_template_file", id="template")])
+def test_exceptions_are_raised_after_both_loads(make_upload: UploadFactory, mocker: MockerFixture, failing: str) -> None:
+    finished: Dict[str, bool] = {}
+    other: Final[str] = "load_template_file" if failing == "load_config_file" else "load_config_file"
+    original_other = getattr(AppCore, other)
+
+    def _fail(self: AppCore, *args: object, **kwargs: object) -> AppCore:
+        raise RuntimeError("unexpected")
+
+    def _other(self: AppCore, *args: object, **kwargs: object) -> AppCore:
+        result: AppCore = original_other(self, *args, **kwargs)
+        finished[other] = True
+        return result
+
+    mocker.patch.object(AppCore, failing, _fail)
+    mocker.patch.object(AppCore, other, _other)
+
+    with pytest.raises(RuntimeError, match="unexpected"):
+        _core().load_files(make_upload(CONFIG, "config.toml"), make_upload(TEMPLATE, "template.j2"), "csv_rows", True)
+
+    assert finished == {other: True}
+
+
+@UNIT
+def test_metrics_follow_sequential_order(make_upload: UploadFactory) -> None:
+    core = _core().load_files(make_upload(CONFIG, "config.toml"), make_upload(TEMPLATE, "template.j2"), "csv_rows", True)
+
+    operations = [metric.operation for metric in core.metrics.stages]
+    assert operations == sorted(operations, key=["load_config_file", "load_template_file"].index)
+    assert core.operation_metrics("load_config_file") is not None
+    assert core.operation_metrics("load_template_file") is not None
@@ -0,0 +1,213 @@
+"""Unit tests for the parser backend registry.
+
+The tests cover:
+- Automatic selection of accelerated backends and the pinned-backend override.
+- Parity: every registered backend must produce output identical to the reference
+  backend on the assets/examples inputs, both as-is and scaled up 1000x.
+- Canonical error messages when an accelerated backend fails, without re-parsing on budget errors.
+- A pinned backend only applying to its own format.
+- Per-backend benchmarks on the scaled-up inputs (run with `-n0 -m benchmark`).
+"""
+
+import tomllib
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Final, List, Tuple
+
+import pytest
+import toml
+import yaml
+from _pytest.mark.structures import MarkDecorator
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from features.config_parser import ConfigParser
+from features.parser_backends import PARSER_BACKENDS, ParserBackend, ParserBackendRegistry
+from features.yaml_budget import YAMLBudgetError
+
+UNIT: MarkDecorator = pytest.mark.unit
+BENCHMARK: MarkDecorator = pytest.mark.benchmark
+
+EXAMPLES_DIR: Final[Path] = Path(__file__).resolve().parents[2] / "assets" / "examples"
+SCALE_FACTOR: Final[int] = 1000
+FORMAT_BY_SUFFIX: Final[dict] = {".toml": "toml", ".yaml": "yaml", ".csv": "csv"}
+
+
+def _is_utf8(path: Path) -> bool:
+    try:
+        path.read_bytes().decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _example_files() -> List[Path]:
+    """パーサーが受け取るのはトランスコード後のUTF-8テキストのため、UTF-8の入力だけを対象にする。"""
+    return sorted(path for path in EXAMPLES_DIR.iterdir() if path.suffix in FORMAT_BY_SUFFIX and _is_utf8(path))
+
+
+def _scale_up(path: Path) -> str:
+    """assets/examples の入力を SCALE_FACTOR 倍に拡大したテキストを返す。"""
+    text: Final[str] = path.read_text(encoding="utf-8")
+    match FORMAT_BY_SUFFIX[path.suffix]:
+        case "toml":
+            parsed = tomllib.loads(text)
+            return toml.dumps({f"item_{index}": parsed for index in range(SCALE_FACTOR)})
+        case "yaml":
+            indented = "".join(f"  {line}" for line in text.splitlines(keepends=True))
+            return "".join(f"item_{index}:\n{indented}\n" for index in range(SCALE_FACTOR))
+        case _:
+            header, _, body = text.partition("\n")
+            rows = body if body.endswith("\n") else body + "\n"
+            return header + "\n" + rows * SCALE_FACTOR
+
+
+def _backend_cases(is_scaled: bool) -> List[Any]:
+    cases: List[Any] = []
+    suffix: Final[str] = "scaled" if is_scaled else "original"
+    for path in _example_files():
+        for backend in PARSER_BACKENDS.backends(FORMAT_BY_SUFFIX[path.suffix]):
+            cases.append(pytest.param(path, backend.name, is_scaled, id=f"{backend.name}_{path.stem}_{suffix}"))
+    return cases
+
+
+def _input_text(path: Path, is_scaled: bool) -> Tuple[str, str]:
+    file_format: Final[str] = FORMAT_BY_SUFFIX[path.suffix]
+    text: Final[str] = _scale_up(path) if is_scaled else path.read_text(encoding="utf-8")
+    return file_format, text
+
+
+@UNIT
+@pytest.mark.parametrize(("path", "backend_name", "is_scaled"), _backend_cases(is_scaled=False) + _backend_cases(is_scaled=True))
+def test_backend_parity_with_reference(path: Path, backend_name: str, is_scaled: bool) -> None:
+    file_format, text = _input_text(path, is_scaled)
+    expected = PARSER_BACKENDS.reference(file_format).loads(text)
+
+    actual = PARSER_BACKENDS.select(file_format, backend_name).loads(text)
+
+    assert actual == expected, f"Backend '{backend_name}' diverged from the reference on {path.name} (scaled={is_scaled})"
+
+
+@UNIT
+def test_select_prefers_accelerated_backend() -> None:
+    backend = PARSER_BACKENDS.select("yaml")
+
+    assert backend.is_accelerated is yaml.__with_libyaml__, "The C loader must be selected whenever libyaml is available"
+    assert PARSER_BACKENDS.reference("yaml").name == "pyyaml", "The pure-Python loader must remain the reference"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("file_format", "backend_name", "expected_message"),
+    [
+        pytest.param("json", None, "No parser backend registered for 'json'", id="select_invalid_unknown_format"),
+        pytest.param("yaml", "missing", "Parser backend 'missing' is not available for 'yaml'", id="select_invalid_unknown_backend"),
+    ],
+)
+def test_select_invalid(file_format: str, backend_name: str, expected_message: str) -> None:
+    with pytest.raises(ValueError, match=expected_message):
+        PARSER_BACKENDS.select(file_format, backend_name)
+
+
+@UNIT
+def test_register_rejects_duplicates() -> None:
+    registry = ParserBackendRegistry()
+    registry.register(ParserBackend(name="ref", file_format="yaml", loads=str, is_reference=True))
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(ParserBackend(name="ref", file_format="yaml", loads=str))
+    with pytest.raises(ValueError, match="Reference parser backend is already registered"):
+        registry.register(ParserBackend(name="other", file_format="yaml", loads=str, is_reference=True))
+
+
+@UNIT
+def test_loads_falls_back_to_reference_error() -> None:
+    def failing_loads(data: str) -> object:
+        raise RuntimeError("accelerated failure")
+
+    def reference_loads(data: str) -> object:
+        raise ValueError(f"canonical error for {data}")
+
+    registry = ParserBackendRegistry()
+    registry.register(ParserBackend(name="ref", file_format="x", loads=reference_loads, is_reference=True))
+    registry.register(ParserBackend(name="fast", file_format="x", loads=failing_loads, priority=1, is_accelerated=True))
+
+    with pytest.raises(ValueError, match="canonical error for input"):
+        registry.loads("x", "input")
+
+
+@UNIT
+def test_loads_does_not_reparse_budget_errors() -> None:
+    reference_calls: List[str] = []
+
+    def budget_loads(data: str) -> object:
+        raise YAMLBudgetError(1, "YAML document uses more than 0 aliases")
+
+    def reference_loads(data: str) -> object:
+        reference_calls.append(data)
+        return {}
+
+    registry = ParserBackendRegistry()
+    registry.register(ParserBackend(name="ref", file_format="x", loads=reference_loads, is_reference=True))
+    registry.register(ParserBackend(name="fast", file_format="x", loads=budget_loads, priority=1, is_accelerated=True))
+
+    with pytest.raises(YAMLBudgetError, match="more than 0 aliases"):
+        registry.loads("x", "input")
+    assert reference_calls == [], "Budget errors are backend-independent and must not trigger a reference re-parse"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "expected_error"),
+    [
+        pytest.param(b"a: b: c", "mapping values are not allowed here", id="yaml_failure_canonical_scanner_error"),
+        pytest.param(b"a: *x", "found undefined alias 'x'", id="yaml_failure_canonical_composer_error"),
+    ],
+)
+def test_config_parser_keeps_canonical_yaml_errors(content: bytes, expected_error: str) -> None:
+    config_file = BytesIO(content)
+    config_file.name = "broken.yaml"
+    parser = ConfigParser(config_file)
+
+    assert parser.parse() is False
+    assert parser.error_message is not None
+    assert expected_error in parser.error_message, f"Unexpected error message: {parser.error_message}"
+
+
+@UNIT
+def test_config_parser_pinned_backend() -> None:
+    config_file = BytesIO(b"name: world\n")
+    config_file.name = "config.yaml"
+    parser = ConfigParser(config_file)
+    parser.parser_backend_name = "pyyaml"
+
+    assert parser.parse() is True
+    assert parser.parsed_dict == {"name": "world"}
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("name", "content", "expected"),
+    [
+        pytest.param("config.toml", b'name = "world"\n', {"name": "world"}, id="toml"),
+        pytest.param("config.csv", b"name\nworld\n", {"csv_rows": [{"name": "world"}]}, id="csv"),
+    ],
+)
+def test_config_parser_pinned_backend_ignored_for_other_formats(name: str, content: bytes, expected: Dict[str, object]) -> None:
+    config_file = BytesIO(content)
+    config_file.name = name
+    parser = ConfigParser(config_file)
+    parser.parser_backend_name = "pyyaml"
+
+    assert parser.parse() is True, parser.error_message
+    assert parser.parsed_dict == expected
+
+
+@BENCHMARK
+@pytest.mark.parametrize(("path", "backend_name", "is_scaled"), _backend_cases(is_scaled=True))
+def test_benchmark_backend_scaled(benchmark: BenchmarkFixture, path: Path, backend_name: str, is_scaled: bool) -> None:
+    file_format, text = _input_text(path, is_scaled)
+    backend = PARSER_BACKENDS.select(file_format, backend_name)
+
+    result = benchmark(backend.loads, text)
+
+    assert result, f"Backend '{backend_name}' returned an empty result for {path.name}"
@@ -0,0 +1,139 @@
+"""Unit tests for the per-stage metrics of the AppCore pipeline.
+
+The tests cover:
+- The stages recorded for each AppCore operation, in execution order.
+- Byte and character sizes recorded per stage.
+- Module-wide and per-instance hook callbacks.
+- Failing hooks not changing the pipeline results or stopping the other hooks.
+- Allocation peaks recorded only when allocation tracing is enabled.
+- measure_stage being a no-op outside of an AppCore operation.
+"""
+
+from typing import Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.core import AppCore
+from features.pipeline_metrics import StageMetric, add_metrics_hook, measure_stage, remove_metrics_hook
+from features.render_memo import RenderMemo
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[bytes] = "hostname,vlan\nsw-東京-01,10\nsw-大阪-01,20\n".encode()
+TEMPLATE: Final[bytes] = b"{% for row in csv_rows %}hostname {{ row.hostname }}\n{% endfor %}"
+EXPECTED_TEXT: Final[str] = "hostname sw-東京-01\nhostname sw-大阪-01\n"
+
+
+def _core(make_upload: UploadFactory, **kwargs: object) -> AppCore:
+    core = AppCore("config error", "template error", render_memo=RenderMemo(), **kwargs)  # type: ignore[arg-type]
+    core.load_config_file(make_upload(CSV_CONFIG, "config.csv"), "csv_rows", enable_auto_transcoding=True)
+    core.load_template_file(make_upload(TEMPLATE, "template.j2"), enable_auto_transcoding=True)
+    return core
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("operation", "expected_stages"),
+    [
+        pytest.param("load_config_file", ["validate_size", "ingest", "parse"], id="load_config_file"),
+        pytest.param("load_template_file", ["validate_size", "ingest", "static_validation"], id="load_template_file"),
+        pytest.param("apply", ["memo_lookup", "runtime_validation", "render", "memory_validation", "format"], id="apply"),
+        pytest.param("get_download_content", ["encode"], id="get_download_content"),
+    ],
+)
+def test_operation_records_stages(make_upload: UploadFactory, operation: str, expected_stages: List[str]) -> None:
+    core = _core(make_upload).apply(0, True)
+    assert core.get_download_content("utf-8") == EXPECTED_TEXT.encode()
+
+    metrics = core.operation_metrics(operation)
+
+    assert metrics is not None
+    assert [metric.stage for metric in metrics.stages] == expected_stages
+    assert all(metric.operation == operation for metric in metrics.stages)
+    assert all(metric.elapsed_seconds >= 0 for metric in metrics.stages)
+    assert metrics.total_seconds == sum(metric.elapsed_seconds for metric in metrics.stages)
+
+
+@UNIT
+def test_stage_sizes(make_upload: UploadFactory) -> None:
+    core = _core(make_upload).apply(0, True)
+    core.get_download_content("utf-8")
+    metrics = core.metrics
+
+    ingest = metrics.stage("ingest", "load_config_file")
+    assert ingest is not None
+    assert (ingest.bytes_in, ingest.chars_out) == (len(CSV_CONFIG), len(CSV_CONFIG.decode()))
+    render = metrics.stage("render")
+    assert render is not None
+    assert render.chars_out == len(EXPECTED_TEXT)
+    encode = metrics.stage("encode")
+    assert encode is not None
+    assert (encode.chars_in, encode.bytes_out) == (len(EXPECTED_TEXT), len(EXPECTED_TEXT.encode()))
+    assert [metric.operation for metric in metrics.stages][:1] == ["load_config_file"]
+
+
+@UNIT
+def test_memo_hit_skips_render_stages(make_upload: UploadFactory) -> None:
+    core = _core(make_upload).apply(0, True).apply(4, True)
+    metrics = core.operation_metrics("apply")
+
+    assert metrics is not None
+    assert [metric.stage for metric in metrics.stages] == ["memo_lookup", "format"], "Only the last call must be kept"
+
+
+@UNIT
+def test_hooks_receive_every_stage(make_upload: UploadFactory) -> None:
+    module_metrics: List[StageMetric] = []
+    instance_metrics: List[StageMetric] = []
+    add_metrics_hook(module_metrics.append)
+    try:
+        core = _core(make_upload, metrics_hooks=[instance_metrics.append]).apply(0, True)
+    finally:
+        remove_metrics_hook(module_metrics.append)
+    AppCore("config error", "template error").load_template_file(make_upload(TEMPLATE, "template.j2"), enable_auto_transcoding=True)
+
+    assert module_metrics == instance_metrics
+    assert module_metrics == core.metrics.stages
+
+
+@UNIT
+def test_failing_hooks_do_not_change_results(make_upload: UploadFactory) -> None:
+    def _exporter_down(metric: StageMetric) -> None:
+        raise ConnectionError("exporter is down")
+
+    instance_metrics: List[StageMetric] = []
+    add_metrics_hook(_exporter_down)
+    try:
+        core = _core(make_upload, metrics_hooks=[_exporter_down, instance_metrics.append]).apply(0, True)
+    finally:
+        remove_metrics_hook(_exporter_down)
+
+    assert core.config_error_message is None
+    assert core.template_error_message is None
+    assert core.formatted_text == EXPECTED_TEXT
+    assert instance_metrics == core.metrics.stages
+
+
+@UNIT
+@pytest.mark.parametrize("trace_allocations", [True, False])
+def test_trace_allocations(make_upload: UploadFactory, trace_allocations: bool) -> None:
+    metrics = _core(make_upload, trace_allocations=trace_allocations).apply(0, True).metrics
+
+    peaks = [metric.peak_allocated_bytes for metric in metrics.stages]
+    if trace_allocations:
+        assert all(peak is not None and peak >= 0 for peak in peaks)
+        parse = metrics.stage("parse")
+        assert parse is not None
+        assert parse.peak_allocated_bytes
+    else:
+        assert peaks == [None] * len(peaks)
+
+
+@UNIT
+def test_measure_stage_without_operation() -> None:
+    with measure_stage("render", chars_in=1) as sizes:
+        sizes.chars_out = 2
+    assert (sizes.chars_in, sizes.chars_out) == (1, 2)
+    assert AppCore("config error", "template error").operation_metrics("apply") is None
@@ -0,0 +1,214 @@
+"""Unit tests for the on-demand profiling of slow generations.
+
+The tests cover:
+- Profile settings from environment variables, and command line overrides.
+- Saving a pstats or collapsed-stack artifact tagged with fingerprints and stage timings above the threshold.
+- No artifact below the threshold or without settings.
+- Skipping a deterministic profile, without failing the generation, while another one is active.
+- Profiles of slow batch jobs reported on the job result.
+- Environment settings applied by the shared generation entry points, and ignored when invalid.
+"""
+
+import json
+import os
+import pstats
+import time
+from pathlib import Path
+from typing import Final, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.async_core import GenerationRequest, generate_sync
+from features.cli import BatchJob, BatchOptions, build_parser, profile_settings_from_args, run_job
+from features.core import AppCore
+from features.profiling import ProfileMode, ProfileSettings, StackSampler, capture_profile, profile_settings_from_env
+from features.render_memo import RenderMemo
+from features.render_service import GenerateRequest, generate
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[bytes] = "hostname,vlan\nsw-東京-01,10\n".encode()
+TEMPLATE: Final[bytes] = b"{% for row in csv_rows %}hostname {{ row.hostname }}\n{% endfor %}"
+
+
+def _generate(make_upload: UploadFactory, core: AppCore) -> None:
+    core.load_config_file(make_upload(CSV_CONFIG, "config.csv"), "csv_rows", enable_auto_transcoding=True)
+    core.load_template_file(make_upload(TEMPLATE, "template.j2"), enable_auto_transcoding=True)
+    core.apply(0, True)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("environ", "expected"),
+    [
+        pytest.param({}, None, id="disabled"),
+        pytest.param({"CG_PROFILE_DIR": ""}, None, id="empty_dir"),
+        pytest.param({"CG_PROFILE_DIR": "profiles"}, ProfileSettings(output_dir=Path("profiles")), id="defaults"),
+        pytest.param(
+            {"CG_PROFILE_DIR": "profiles", "CG_PROFILE_THRESHOLD_MS": "250", "CG_PROFILE_MODE": "sampling"},
+            ProfileSettings(output_dir=Path("profiles"), threshold_seconds=0.25, mode="sampling"),
+            id="all",
+        ),
+    ],
+)
+def test_settings_from_env(environ: dict[str, str], expected: Optional[ProfileSettings]) -> None:
+    assert ProfileSettings.from_env(environ) == expected
+
+
+@UNIT
+@pytest.mark.parametrize(
+    "environ",
+    [
+        pytest.param({"CG_PROFILE_DIR": "profiles", "CG_PROFILE_THRESHOLD_MS": "slow"}, id="threshold"),
+        pytest.param({"CG_PROFILE_DIR": "profiles", "CG_PROFILE_MODE": "tracing"}, id="mode"),
+    ],
+)
+def test_settings_from_env_rejects_invalid_values(environ: dict[str, str]) -> None:
+    with pytest.raises(ValueError):  # noqa: PT011
+        ProfileSettings.from_env(environ)
+
+
+@UNIT
+def test_entry_point_settings_ignore_invalid_values() -> None:
+    assert profile_settings_from_env({"CG_PROFILE_DIR": "profiles", "CG_PROFILE_THRESHOLD_MS": "slow"}) is None
+    assert profile_settings_from_env({"CG_PROFILE_DIR": "profiles"}) == ProfileSettings(output_dir=Path("profiles"))
+
+
+@UNIT
+def test_command_line_overrides_environment(tmp_path: Path) -> None:
+    args = build_parser().parse_args(
+        ["--config", "c.csv", "--template", "t.j2", "--output-dir", "out", "--profile-threshold-ms", "10", "--profile-mode", "sampling"]
+    )
+
+    settings = profile_settings_from_args(args, {"CG_PROFILE_DIR": str(tmp_path), "CG_PROFILE_THRESHOLD_MS": "5000"})
+
+    assert settings == ProfileSettings(output_dir=tmp_path, threshold_seconds=0.01, mode="sampling")
+
+
+@UNIT
+@pytest.mark.parametrize(("mode", "suffix"), [("deterministic", ".pstats"), ("sampling", ".collapsed")])
+def test_slow_generation_saves_artifact(make_upload: UploadFactory, tmp_path: Path, mode: ProfileMode, suffix: str) -> None:
+    core = AppCore("config error", "template error", render_memo=RenderMemo())
+    settings = ProfileSettings(output_dir=tmp_path, threshold_seconds=0, mode=mode, sample_interval_seconds=0.001)
+
+    with capture_profile(core, settings, label="sw/東京 01") as capture:
+        _generate(make_upload, core)
+        time.sleep(0.02)
+
+    artifact = capture.artifact
+    assert artifact is not None
+    assert artifact.profile_path.suffix == suffix
+    assert artifact.profile_path.name.endswith(f"-sw_01-{os.getpid()}{suffix}")
+    metadata = json.loads(artifact.metadata_path.read_text(encoding="utf-8"))
+    assert metadata["label"] == "sw/東京 01"
+    assert metadata["config_fingerprint"] == core.config_fingerprint
+    assert metadata["template_fingerprint"] == core.template_fingerprint
+    assert [stage["stage"] for stage in metadata["stages"]] == [metric.stage for metric in core.metrics.stages]
+    assert metadata["elapsed_seconds"] == capture.elapsed_seconds
+    if mode == "deterministic":
+        assert pstats.Stats(str(artifact.profile_path)).total_calls > 0  # type: ignore[attr-defined]
+    else:
+        assert "test_profiling:test_slow_generation_saves_artifact:" in artifact.profile_path.read_text(encoding="utf-8")
+
+
+@UNIT
+@pytest.mark.parametrize("threshold_seconds", [pytest.param(None, id="disabled"), pytest.param(60.0, id="below_threshold")])
+def test_fast_generation_saves_nothing(make_upload: UploadFactory, tmp_path: Path, threshold_seconds: Optional[float]) -> None:
+    core = AppCore("config error", "template error", render_memo=RenderMemo())
+    settings = None if threshold_seconds is None else ProfileSettings(output_dir=tmp_path, threshold_seconds=threshold_seconds)
+
+    with capture_profile(core, settings, label="fast") as capture:
+        _generate(make_upload, core)
+
+    assert capture.artifact is None
+    assert capture.error_message is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@UNIT
+def test_unwritable_output_dir_does_not_fail_generation(make_upload: UploadFactory, tmp_path: Path) -> None:
+    blocker: Final[Path] = tmp_path / "file"
+    blocker.write_text("", encoding="utf-8")
+    core = AppCore("config error", "template error", render_memo=RenderMemo())
+
+    with capture_profile(core, ProfileSettings(output_dir=blocker / "profiles", threshold_seconds=0)) as capture:
+        _generate(make_upload, core)
+
+    assert capture.artifact is None
+    assert capture.error_message is not None
+    assert capture.error_message.startswith("Profile error:")
+    assert core.formatted_text == "hostname sw-東京-01\n"
+
+
+@UNIT
+def test_concurrent_deterministic_profile_is_skipped(make_upload: UploadFactory, tmp_path: Path) -> None:
+    settings = ProfileSettings(output_dir=tmp_path, threshold_seconds=0)
+    outer_core = AppCore("config error", "template error", render_memo=RenderMemo())
+    inner_core = AppCore("config error", "template error", render_memo=RenderMemo())
+
+    with capture_profile(outer_core, settings, label="outer") as outer:
+        with capture_profile(inner_core, settings, label="inner") as inner:
+            _generate(make_upload, inner_core)
+        _generate(make_upload, outer_core)
+
+    assert inner.artifact is None
+    assert inner.error_message == "Profile skipped: another deterministic profiler is already active"
+    assert inner_core.formatted_text == "hostname sw-東京-01\n"
+    assert outer.artifact is not None
+    assert outer.error_message is None
+
+    # the lock is released once the active profile ends
+    with capture_profile(inner_core, settings, label="after") as after:
+        _generate(make_upload, inner_core)
+    assert after.artifact is not None
+
+
+@UNIT
+def test_stack_sampler_collapses_stacks() -> None:
+    sampler = StackSampler(interval_seconds=0.001)
+
+    sampler.start()
+    time.sleep(0.05)
+    sampler.stop()
+
+    assert sampler.sample_count > 0
+    lines: Final[list[str]] = sampler.collapsed().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sampler.sample_count
+    assert all("test_profiling:test_stack_sampler_collapses_stacks:" in line for line in lines)
+
+
+@UNIT
+def test_run_job_reports_profile_path(tmp_path: Path) -> None:
+    (tmp_path / "inventory.csv").write_bytes(CSV_CONFIG)
+    (tmp_path / "switch.j2").write_bytes(TEMPLATE)
+    job = BatchJob(
+        config_path=tmp_path / "inventory.csv", template_path=tmp_path / "switch.j2", output_path=tmp_path / "out" / "inventory.txt"
+    )
+
+    profiled = run_job(job, BatchOptions(), ProfileSettings(output_dir=tmp_path / "profiles", threshold_seconds=0))
+    unprofiled = run_job(job, BatchOptions())
+
+    assert profiled.is_success
+    assert profiled.profile_path is not None
+    assert profiled.profile_path.parent == tmp_path / "profiles"
+    assert unprofiled.profile_path is None
+
+
+@UNIT
+@pytest.mark.parametrize("entry_point", [pytest.param("render_service", id="render_service"), pytest.param("async_core", id="async_core")])
+def test_shared_entry_points_read_environment(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, entry_point: str) -> None:
+    monkeypatch.setenv("CG_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("CG_PROFILE_THRESHOLD_MS", "0")
+
+    if entry_point == "render_service":
+        result = generate(GenerateRequest(config_text=CSV_CONFIG.decode(), template_text=TEMPLATE.decode(), config_name="inventory.csv"))
+        assert result.output == "hostname sw-東京-01\n"
+    else:
+        content = generate_sync(GenerationRequest(config=CSV_CONFIG, template=TEMPLATE, config_name="inventory.csv")).content
+        assert content == "hostname sw-東京-01\n".encode()
+
+    profiles = sorted(path.suffix for path in tmp_path.iterdir())
+    assert profiles == [".json", ".pstats"]
+    assert all(f"-inventory-{os.getpid()}." in path.name for path in tmp_path.iterdir())
@@ -0,0 +1,184 @@
+"""Unit tests for the NDJSON / multi-document YAML record streams.
+
+The tests cover:
+- Incremental scanning that decodes each record exactly once.
+- A memory budget measured on the decoded records.
+- Per-record error locations (record number and line).
+- YAML document splitting on `---` / `...` markers.
+- ConfigParser integration under csv_rows_name and rendering through DocumentRender.
+"""
+
+import json
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.config_parser import ConfigParser
+from features.document_render import DocumentRender
+from features.parser_backends import PARSER_BACKENDS
+from features.record_stream import RecordStreamError, scan_ndjson, scan_yaml_documents, split_yaml_documents
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+
+def _parse(content: bytes, filename: str, csv_rows_name: str = "csv_rows") -> ConfigParser:
+    config_file = BytesIO(content)
+    config_file.name = filename
+    parser = ConfigParser(config_file)
+    parser.csv_rows_name = csv_rows_name
+    parser.parse()
+    return parser
+
+
+def _scan_yaml(content: str, max_bytes: Optional[int]) -> List[Dict[str, Any]]:
+    return scan_yaml_documents(content, split_yaml_documents(content), max_bytes)
+
+
+@UNIT
+def test_scan_ndjson_decodes_each_record_once(mocker: MockerFixture) -> None:
+    loads = mocker.spy(json, "loads")
+
+    records = scan_ndjson('{"id": 1}\n\n{"id": 2}\n   \n{"id": 3}\n')
+
+    assert records == [{"id": 1}, {"id": 2}, {"id": 3}], "Blank lines must be skipped"
+    assert loads.call_count == 3, "Each record must be decoded exactly once"
+
+
+@UNIT
+def test_scan_yaml_documents_decodes_each_document_once(mocker: MockerFixture) -> None:
+    content = "id: 1\n---\nid: 2\n---\nid: 3\n"
+    loads = mocker.spy(type(PARSER_BACKENDS), "loads")
+
+    records = scan_yaml_documents(content, split_yaml_documents(content))
+    rendered = [record["id"] for record in records]
+
+    assert rendered == [1, 2, 3]
+    assert loads.call_count == 3, "Accessing the records must not decode the documents again"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "expected_record", "expected_line", "expected_detail"),
+    [
+        pytest.param('{"id": 1}\n{"id": \n', 2, 2, "Expecting value at column 8", id="ndjson_invalid_syntax"),
+        pytest.param('{"id": 1}\n\n[1, 2]\n', 2, 3, "record is not a JSON object", id="ndjson_invalid_non_object_after_blank"),
+    ],
+)
+def test_scan_ndjson_reports_record_location(content: str, expected_record: int, expected_line: int, expected_detail: str) -> None:
+    with pytest.raises(RecordStreamError) as excinfo:
+        scan_ndjson(content)
+
+    assert excinfo.value.record_index == expected_record, "Wrong record number in error"
+    assert excinfo.value.line == expected_line, "Wrong line number in error"
+    assert expected_detail in str(excinfo.value), f"Unexpected error message: {excinfo.value}"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "expected_documents"),
+    [
+        pytest.param("a: 1\n", ["a: 1\n"], id="split_valid_single_document"),
+        pytest.param("---\na: 1\n...\n", ["---\na: 1\n"], id="split_valid_explicit_single_document"),
+        pytest.param("a: 1\n---\nb: 2\n", ["a: 1\n", "---\nb: 2\n"], id="split_valid_implicit_first_document"),
+        pytest.param("--- {a: 1}\n--- {b: 2}\n", ["--- {a: 1}\n", "--- {b: 2}\n"], id="split_valid_inline_documents"),
+        pytest.param("# header\n---\na: 1\n---\n# empty\n", ["---\na: 1\n"], id="split_valid_comment_only_documents_skipped"),
+        pytest.param("a: |\n  ---x\n", ["a: |\n  ---x\n"], id="split_valid_indented_dashes_are_content"),
+    ],
+)
+def test_split_yaml_documents(content: str, expected_documents: List[str]) -> None:
+    spans = split_yaml_documents(content)
+
+    assert [content[start:end] for start, end, _ in spans] == expected_documents, "Unexpected document split"
+
+
+@UNIT
+def test_scan_yaml_documents_reports_absolute_line() -> None:
+    content = "a: 1\n---\nb: [1\nc: 2\n"
+
+    with pytest.raises(RecordStreamError) as excinfo:
+        scan_yaml_documents(content, split_yaml_documents(content))
+
+    assert excinfo.value.record_index == 2, "Wrong document number in error"
+    assert excinfo.value.line == 4, "The line number must be relative to the whole stream"
+
+
+@UNIT
+def test_scan_rejects_over_budget() -> None:
+    with pytest.raises(ValueError, match="Memory consumption exceeds"):
+        scan_ndjson('{"id": 1}\n' * 10, max_bytes=20)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "scan"),
+    [
+        pytest.param('{"a": 1}\n' * 1000, scan_ndjson, id="ndjson"),
+        pytest.param("a: 1\n---\n" * 1000, _scan_yaml, id="yaml"),
+    ],
+)
+def test_budget_measures_decoded_records(content: str, scan: Callable[[str, Optional[int]], List[Dict[str, Any]]]) -> None:
+    max_bytes = 10 * len(content)
+
+    # many small records decode into objects far larger than their text
+    with pytest.raises(ValueError, match="Memory consumption exceeds"):
+        scan(content, max_bytes)
+    assert len(scan(content, None)) == 1000
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "filename", "expected_rows"),
+    [
+        pytest.param(b'{"id": 1}\n{"id": 2}\n', "inventory.ndjson", [{"id": 1}, {"id": 2}], id="parse_valid_ndjson"),
+        pytest.param(b'{"id": 1}\n', "inventory.jsonl", [{"id": 1}], id="parse_valid_jsonl_single_record"),
+        pytest.param(b"id: 1\n---\nid: 2\n", "inventory.yaml", [{"id": 1}, {"id": 2}], id="parse_valid_yaml_stream"),
+    ],
+)
+def test_config_parser_exposes_records_under_rows_name(content: bytes, filename: str, expected_rows: List[Dict[str, Any]]) -> None:
+    parser = _parse(content, filename, csv_rows_name="devices")
+
+    assert parser.error_message is None, f"Unexpected error: {parser.error_message}"
+    parsed = parser.parsed_dict
+    assert parsed is not None
+    assert isinstance(parsed["devices"], list), "Records must be exposed as a list like CSV rows"
+    assert parsed["devices"] == expected_rows
+    assert json.loads(parser.debug_view.render()) == {"devices": expected_rows}, "The debug view must materialize the records"  # type: ignore[union-attr]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "filename", "expected_error"),
+    [
+        pytest.param(b"", "empty.ndjson", "NDJSON file must contain at least one record.", id="parse_invalid_empty_ndjson"),
+        pytest.param(
+            b'{"id": 1}\n{"id": 2,}\n', "bad.ndjson", "Failed to parse NDJSON: record 2 (line 2)", id="parse_invalid_ndjson_record"
+        ),
+        pytest.param(
+            b"id: 1\n---\n- 2\n", "bad.yaml", "Failed to parse YAML stream: record 2 (line 2)", id="parse_invalid_yaml_non_mapping"
+        ),
+        pytest.param(b"- 1\n", "list.yaml", "Invalid YAML file loaded.", id="parse_invalid_single_document_unchanged"),
+    ],
+)
+def test_config_parser_record_errors(content: bytes, filename: str, expected_error: str) -> None:
+    parser = _parse(content, filename)
+
+    assert parser.parsed_dict is None
+    error_message: Optional[str] = parser.error_message
+    assert error_message is not None
+    assert expected_error in error_message, f"Unexpected error: {error_message}"
+
+
+@UNIT
+def test_records_render_through_document_render() -> None:
+    parser = _parse(b'{"host": "sw01"}\n{"host": "sw02"}\n', "inventory.ndjson")
+    template_file = BytesIO(b"{{ csv_rows|length }}:{% for r in csv_rows %}{{ r.host }};{% endfor %}")
+    template_file.name = "template.j2"
+    render = DocumentRender(template_file)
+    parsed = parser.parsed_dict
+    assert parsed is not None
+
+    assert render.apply_context(parsed, format_type=0) is True, f"Render failed: {render.error_message}"
+    assert render.render_content == "2:sw01;sw02;"
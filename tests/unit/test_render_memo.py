@@ -0,0 +1,187 @@
+"""Unit tests for the memoization of AppCore.apply results.
+
+The tests cover:
+- Returning the memoized output across AppCore instances without rendering again.
+- Re-running only the formatter when just the format type changes.
+- Memoized runtime errors, reported with the current template file name.
+- Misses when the config content, the config load options, the template or the undefined-variable mode change.
+- No memoization for directly assigned config dicts or out-of-range format types.
+- LRU eviction by entry count and by retained characters.
+- Consistent entries and character accounting when threads share one memo.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.core import AppCore
+from features.document_render import ContentFormatter, DocumentRender
+from features.render_memo import RenderMemo, RenderMemoEntry
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[bytes] = "hostname,vlan\nsw-東京-01,10\n\nsw-大阪-01,\n".encode()
+TEMPLATE: Final[bytes] = b"{% for row in csv_rows %}hostname {{ row.hostname }}\n\n\nvlan {{ row.vlan }}\n{% endfor %}"
+
+
+def _core(
+    make_upload: UploadFactory,
+    memo: RenderMemo,
+    config: bytes = CSV_CONFIG,
+    template: bytes = TEMPLATE,
+    template_name: str = "template.j2",
+    csv_rows_name: str = "csv_rows",
+) -> AppCore:
+    core = AppCore("config error", "template error", render_memo=memo)
+    core.load_config_file(make_upload(config, "config.csv"), csv_rows_name, enable_auto_transcoding=True, enable_fill_nan=True)
+    core.load_template_file(make_upload(template, template_name), enable_auto_transcoding=True)
+    return core
+
+
+@UNIT
+def test_apply_reuses_result_across_instances(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    memo = RenderMemo()
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+
+    first = _core(make_upload, memo).apply(1, True).formatted_text
+    second = _core(make_upload, memo).apply(1, True).formatted_text
+
+    assert first == second == "hostname sw-東京-01\n\nvlan 10\nhostname sw-大阪-01\n\nvlan #\n"
+    assert apply_context.call_count == 1
+    assert (memo.hits, memo.misses) == (1, 1)
+
+
+@UNIT
+@pytest.mark.parametrize("format_type", [0, 1, 2, 3, 4])
+def test_format_type_change_only_reformats(make_upload: UploadFactory, mocker: MockerFixture, format_type: int) -> None:
+    memo = RenderMemo()
+    core = _core(make_upload, memo).apply(0 if format_type else 4, True)
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+    formatter = mocker.spy(ContentFormatter, "format")
+
+    memoized = core.apply(format_type, True).formatted_text
+    core.apply(format_type, True)
+
+    assert apply_context.call_count == 0, "Changing only the format type must not render again"
+    assert formatter.call_count == 1, "The formatted output must be memoized per format type"
+    assert memoized == _core(make_upload, RenderMemo()).apply(format_type, True).formatted_text
+
+
+@UNIT
+def test_runtime_error_is_memoized(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    memo = RenderMemo()
+    template: Final[bytes] = b"{{ undefined_name }}"
+    first = _core(make_upload, memo, template=template, template_name="first.j2").apply(0, True)
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+
+    second = _core(make_upload, memo, template=template, template_name="second.j2").apply(2, True)
+
+    assert apply_context.call_count == 0
+    assert second.formatted_text is None
+    assert first.template_error_message == "template error: Template runtime error: 'undefined_name' is undefined in 'first.j2'"
+    assert second.template_error_message == "template error: Template runtime error: 'undefined_name' is undefined in 'second.j2'"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("changes", "is_strict_undefined"),
+    [
+        pytest.param({"config": CSV_CONFIG + "sw-名古屋-01,30\n".encode()}, True, id="config_content"),
+        pytest.param({"csv_rows_name": "rows"}, True, id="config_options"),
+        pytest.param({"template": TEMPLATE + b"!"}, True, id="template"),
+        pytest.param({}, False, id="undefined_mode"),
+    ],
+)
+def test_changed_inputs_render_again(
+    make_upload: UploadFactory, mocker: MockerFixture, changes: dict[str, object], is_strict_undefined: bool
+) -> None:
+    memo = RenderMemo()
+    _core(make_upload, memo).apply(0, True)
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+
+    _core(make_upload, memo, **changes).apply(0, is_strict_undefined)  # type: ignore[arg-type]
+
+    assert apply_context.call_count == 1
+
+
+@UNIT
+def test_unkeyed_inputs_are_not_memoized(make_upload: UploadFactory, mocker: MockerFixture) -> None:
+    memo = RenderMemo()
+    core = _core(make_upload, memo)
+    core.config_dict = {"csv_rows": [{"hostname": "sw-01", "vlan": 1}]}
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+
+    core.apply(0, True).apply(0, True)
+    assert apply_context.call_count == 2
+    assert core.formatted_text == "hostname sw-01\n\n\nvlan 1\n"
+
+    invalid = _core(make_upload, memo).apply(9, True)
+    assert invalid.template_error_message is not None
+    assert "Validation error" in invalid.template_error_message
+    assert _core(make_upload, memo).apply(0, True).template_error_message is None, "Validation errors must not be memoized"
+    assert len(memo) == 1
+
+
+@UNIT
+def test_memo_evicts_least_recently_used() -> None:
+    memo = RenderMemo(max_entries=2, max_text_chars=10)
+
+    memo.put("a", RenderMemoEntry(raw_text="aaa"))
+    memo.put("b", RenderMemoEntry(raw_text="bbb"))
+    assert memo.get("a") is not None
+    memo.put("c", RenderMemoEntry(raw_text="ccc"))
+    assert memo.get("b") is None, "The least recently used entry must be evicted"
+
+    memo.put_formatted("a", 0, "aaa")
+    memo.put_formatted("a", 4, "aa")
+    assert memo.get("c") is not None
+    memo.put_formatted("a", 1, "aaaaa")
+    assert memo.get("a") is None, "An entry over the character limit must be dropped"
+    memo.put("big", RenderMemoEntry(raw_text="x" * 11))
+    assert memo.get("big") is None
+    assert len(memo) == 1
+
+    memo.clear()
+    assert len(memo) == 0
+
+
+@UNIT
+def test_concurrent_apply_shares_memo(make_upload: UploadFactory) -> None:
+    memo = RenderMemo()
+    expected = {format_type: _core(make_upload, RenderMemo()).apply(format_type, True).formatted_text for format_type in range(5)}
+
+    def _apply(format_type: int) -> object:
+        return _core(make_upload, memo).apply(format_type, True).formatted_text
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(_apply, [i % 5 for i in range(40)]))
+
+    assert results == [expected[i % 5] for i in range(40)]
+    assert len(memo) == 1
+
+
+@UNIT
+def test_put_formatted_under_threads() -> None:
+    memo = RenderMemo(max_entries=2, max_text_chars=100)
+    memo.put("a", RenderMemoEntry(raw_text="r" * 10))
+    held = memo.get("a")
+
+    def _put(format_type: int) -> None:
+        for _ in range(200):
+            memo.put_formatted("a", format_type, str(format_type) * 10)
+            memo.get("a")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_put, range(8)))
+
+    entry = memo.get("a")
+    assert entry is not None
+    assert sorted(entry.formatted) == list(range(8))
+    assert held is not None
+    assert held.formatted == {}, "Entries handed out to readers must not be mutated"
+    memo.put("b", RenderMemoEntry(raw_text="b" * 10))
+    assert len(memo) == 2, "The retained character total must stay exact (90 + 10)"
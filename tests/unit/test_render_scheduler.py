@@ -0,0 +1,249 @@
+"""Unit tests for the cost-based fair scheduler of the render service.
+
+The tests cover:
+- Cost estimation from input sizes and the template's loop count and nesting depth.
+- Interactive requests running before batch work, and the slot reserved for them.
+- Per-client concurrency quotas and fairness between clients of the same class.
+- Batch capacity accounting, including requests larger than the whole capacity.
+- Shedding: per-client queue limits, the batch queue budget, and the queue timeout.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.render_scheduler import AdmissionRejectedError, RenderScheduler, RequestCost, estimate_cost
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+INTERACTIVE: Final[int] = 10
+BATCH: Final[int] = 1000
+
+
+def _cost(units: int) -> RequestCost:
+    return RequestCost(config_size=units, template_size=0, estimated_rows=0, loop_count=0, max_loop_depth=0, units=units)
+
+
+def _wait_until(predicate: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("condition was not reached")
+        time.sleep(0.005)
+
+
+class _Waiter:
+    """Runs scheduler.slot on a thread and holds the slot until released."""
+
+    def __init__(self, scheduler: RenderScheduler, client_id: str, units: int, started: List[str], name: str) -> None:
+        self.release = threading.Event()
+        self.errors: List[Exception] = []
+        self._thread = threading.Thread(target=self._run, args=(scheduler, client_id, units, started, name), daemon=True)
+        self._thread.start()
+
+    def _run(self, scheduler: RenderScheduler, client_id: str, units: int, started: List[str], name: str) -> None:
+        try:
+            with scheduler.slot(client_id, _cost(units)):
+                started.append(name)
+                self.release.wait(5)
+        except AdmissionRejectedError as e:
+            self.errors.append(e)
+
+    def finish(self) -> None:
+        self.release.set()
+        self._thread.join(5)
+
+
+@contextmanager
+def _waiters() -> Iterator[List[_Waiter]]:
+    created: List[_Waiter] = []
+    try:
+        yield created
+    finally:
+        for waiter in created:
+            waiter.finish()
+
+
+def _queued(scheduler: RenderScheduler) -> int:
+    snapshot = scheduler.snapshot()
+    return snapshot.queued_interactive + snapshot.queued_batch
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("template", "expected_loops", "expected_depth", "expected_units"),
+    [
+        pytest.param("hostname {{ name }}\n", 0, 0, 20 + 100, id="no_loop"),
+        pytest.param("{% for r in csv_rows %}{{ r.a }}{% endfor %}", 1, 1, 44 + 100 * 2, id="one_loop"),
+        pytest.param(
+            "{% for r in csv_rows %}{% for c in r %}{{ c }}{% endfor %}{% endfor %}",
+            2,
+            2,
+            70 + 100 * (1 + 1 + 2),
+            id="nested_loops",
+        ),
+        pytest.param("{% for r in csv_rows %}", 0, 0, 23 + 100, id="syntax_error"),
+    ],
+)
+def test_estimate_cost(template: str, expected_loops: int, expected_depth: int, expected_units: int) -> None:
+    config = "a,b\n" + "1,2\n" * 24
+
+    cost = estimate_cost(config, template)
+
+    assert cost.config_size == 100
+    assert cost.template_size == len(template)
+    assert cost.estimated_rows == 25
+    assert cost.loop_count == expected_loops
+    assert cost.max_loop_depth == expected_depth
+    assert cost.units == expected_units
+
+
+@UNIT
+def test_classify_by_estimated_cost() -> None:
+    scheduler = RenderScheduler(slots=1, interactive_max_units=100)
+
+    assert scheduler.classify(_cost(100)) == "interactive"
+    assert scheduler.classify(_cost(101)) == "batch"
+
+
+@UNIT
+def test_interactive_requests_run_before_batch() -> None:
+    scheduler = RenderScheduler(slots=3, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        holders = [_Waiter(scheduler, f"holder-{index}", INTERACTIVE, started, f"holder-{index}") for index in range(3)]
+        waiters.extend(holders)
+        _wait_until(lambda: len(started) == 3)
+        waiters.append(_Waiter(scheduler, "batch-user", BATCH, started, "batch"))
+        _wait_until(lambda: _queued(scheduler) == 1)
+        waiters.append(_Waiter(scheduler, "preview-user", INTERACTIVE, started, "interactive"))
+        _wait_until(lambda: _queued(scheduler) == 2)
+
+        holders[0].finish()
+        _wait_until(lambda: len(started) == 4)
+        holders[1].finish()
+        holders[2].finish()
+        _wait_until(lambda: len(started) == 5)
+
+    assert started[3:] == ["interactive", "batch"]
+
+
+@UNIT
+def test_batch_leaves_a_slot_for_interactive() -> None:
+    scheduler = RenderScheduler(slots=2, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        waiters.append(_Waiter(scheduler, "a", BATCH, started, "batch-1"))
+        _wait_until(lambda: started == ["batch-1"])
+        waiters.append(_Waiter(scheduler, "b", BATCH, started, "batch-2"))
+        _wait_until(lambda: scheduler.snapshot().queued_batch == 1)
+        waiters.append(_Waiter(scheduler, "c", INTERACTIVE, started, "interactive"))
+        _wait_until(lambda: len(started) == 2)
+
+        assert started == ["batch-1", "interactive"]
+        assert scheduler.snapshot().queued_batch == 1
+
+
+@UNIT
+def test_per_client_quota_and_fairness() -> None:
+    scheduler = RenderScheduler(slots=3, per_client_concurrency=2, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        waiters.extend(_Waiter(scheduler, "a", INTERACTIVE, started, f"a{index}") for index in range(2))
+        _wait_until(lambda: len(started) == 2)
+        waiters.append(_Waiter(scheduler, "a", INTERACTIVE, started, "a2"))
+        _wait_until(lambda: _queued(scheduler) == 1)
+        # a is at its quota, so a2 waits although a slot is free
+        time.sleep(0.05)
+        assert len(started) == 2
+
+        waiters.append(_Waiter(scheduler, "b", INTERACTIVE, started, "b0"))
+        _wait_until(lambda: len(started) == 3)
+        assert started[-1] == "b0"
+        waiters.append(_Waiter(scheduler, "c", INTERACTIVE, started, "c0"))
+        _wait_until(lambda: _queued(scheduler) == 2)
+
+        # a2 arrived first, but c has nothing running
+        waiters[0].finish()
+        _wait_until(lambda: len(started) == 4)
+        assert started[-1] == "c0"
+
+
+@UNIT
+def test_batch_capacity_is_shared() -> None:
+    scheduler = RenderScheduler(slots=4, capacity_units=BATCH + BATCH // 2, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        first = _Waiter(scheduler, "a", BATCH, started, "first")
+        waiters.append(first)
+        _wait_until(lambda: started == ["first"])
+        waiters.append(_Waiter(scheduler, "b", BATCH, started, "second"))
+        _wait_until(lambda: scheduler.snapshot().queued_batch == 1)
+        time.sleep(0.05)
+        assert started == ["first"]
+
+        first.finish()
+        _wait_until(lambda: started == ["first", "second"])
+
+
+@UNIT
+def test_oversized_batch_runs_alone() -> None:
+    scheduler = RenderScheduler(slots=2, capacity_units=BATCH, interactive_max_units=INTERACTIVE)
+
+    with scheduler.slot("a", _cost(BATCH * 50)) as ticket:
+        assert ticket.units == BATCH
+        assert scheduler.snapshot().running_batch_units == BATCH
+
+    assert scheduler.snapshot().running_batch_units == 0
+
+
+@UNIT
+def test_sheds_when_client_queue_is_full() -> None:
+    scheduler = RenderScheduler(slots=1, max_queued_per_client=1, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        waiters.append(_Waiter(scheduler, "holder", INTERACTIVE, started, "holder"))
+        _wait_until(lambda: started == ["holder"])
+        waiters.append(_Waiter(scheduler, "a", INTERACTIVE, started, "queued"))
+        _wait_until(lambda: _queued(scheduler) == 1)
+
+        with pytest.raises(AdmissionRejectedError, match="too many queued requests"), scheduler.slot("a", _cost(INTERACTIVE)):
+            pass
+        # other clients may still queue
+        waiters.append(_Waiter(scheduler, "b", INTERACTIVE, started, "other"))
+        _wait_until(lambda: _queued(scheduler) == 2)
+
+
+@UNIT
+def test_sheds_batch_beyond_queue_budget() -> None:
+    scheduler = RenderScheduler(slots=2, max_queue_units=BATCH, interactive_max_units=INTERACTIVE)
+    started: List[str] = []
+    with _waiters() as waiters:
+        waiters.append(_Waiter(scheduler, "a", BATCH, started, "running"))
+        _wait_until(lambda: started == ["running"])
+        waiters.append(_Waiter(scheduler, "b", BATCH, started, "queued"))
+        _wait_until(lambda: scheduler.snapshot().queued_batch_units == BATCH)
+
+        with pytest.raises(AdmissionRejectedError, match="batch queue is full") as info, scheduler.slot("c", _cost(BATCH)):
+            pass
+        assert info.value.retry_after_seconds > 0
+        # interactive work is never shed by the batch budget
+        with scheduler.slot("c", _cost(INTERACTIVE)):
+            pass
+
+
+@UNIT
+def test_sheds_after_queue_timeout() -> None:
+    scheduler = RenderScheduler(slots=1, queue_timeout_seconds=0.05, interactive_max_units=INTERACTIVE)
+
+    with scheduler.slot("a", _cost(INTERACTIVE)):
+        with pytest.raises(AdmissionRejectedError, match="not scheduled within"), scheduler.slot("b", _cost(INTERACTIVE)):
+            pass
+        assert _queued(scheduler) == 0
+
+    assert scheduler.snapshot().running == 0
@@ -0,0 +1,406 @@
+"""Unit tests for the local HTTP render service.
+
+The tests cover:
+- The generate function mirroring the web worker's request/response shape, including the debug view modes.
+- The /generate, /generate/stream (chunked) and /health endpoints of a single in-process server.
+- Rejected requests: invalid JSON, missing/invalid/oversized Content-Length, unknown paths and debug paths.
+- Unexpected generation exceptions answered with 500 and a JSON error, in both the in-process and scheduled modes.
+- The pre-forked pool: workers serve from the shared socket, crashed workers are replaced, and stop reaps them all.
+- The scheduled mode: the parent admits requests and runs them on the worker pool, shedding with 503 and Retry-After.
+- The stdlib load-test script's percentile/summary and a short run against a live server.
+"""
+
+import http.client
+import importlib.util
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Final, Optional, Set, Tuple
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pydantic import ValidationError
+
+from features.render_scheduler import RenderScheduler
+from features.render_service import (
+    CLIENT_ID_HEADER,
+    GENERATE_PATH,
+    HEALTH_PATH,
+    STREAM_PATH,
+    DebugViewRequest,
+    GenerateRequest,
+    GenerateResult,
+    PreforkServer,
+    RenderHTTPServer,
+    generate,
+    main,
+)
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+REPO_ROOT: Final[Path] = Path(__file__).resolve().parents[2]
+LOADTEST_SCRIPT: Final[Path] = REPO_ROOT / "scripts" / "render_service_loadtest.py"
+
+REQUEST: Final[dict[str, object]] = {
+    "configText": "hostname,vlan\nsw-東京-01,10\nsw-大阪-01,20\n",
+    "configName": "config.csv",
+    "templateText": "{% for row in csv_rows %}hostname {{ row.hostname }}\n{% endfor %}",
+    "templateName": "template.j2",
+    "settings": {
+        "csvRowsName": "csv_rows",
+        "enableAutoTranscoding": True,
+        "enableFillNan": True,
+        "fillNanWith": "#",
+        "formatType": 0,
+        "isStrictUndefined": True,
+    },
+}
+EXPECTED_TEXT: Final[str] = "hostname sw-東京-01\nhostname sw-大阪-01\n"
+MAX_TEST_REQUEST_BYTES: Final[int] = 1024 * 1024
+# a bare carriage return makes the csv module raise instead of reporting a parse error
+BROKEN_CSV_REQUEST: Final[dict[str, object]] = {**REQUEST, "configText": "a,b\nx\ry,2\n"}
+BROKEN_CSV_ERROR: Final[str] = "generation failed: Error: new-line character seen in unquoted field"
+
+
+def _post(address: Tuple[str, int], path: str, body: bytes) -> Tuple[int, dict[str, str], bytes]:
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request("POST", path, body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def _get_json(address: Tuple[str, int], path: str) -> Tuple[int, dict[str, object]]:
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def server() -> Iterator[RenderHTTPServer]:
+    render_server = RenderHTTPServer(("127.0.0.1", 0), max_request_bytes=MAX_TEST_REQUEST_BYTES)
+    thread = threading.Thread(target=render_server.serve_forever, daemon=True)
+    thread.start()
+    yield render_server
+    render_server.shutdown()
+    render_server.server_close()
+    thread.join(5)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("debug", "expected_debug"),
+    [
+        pytest.param({}, '"sw-東京-01"', id="omitted_full_dump"),
+        pytest.param({"debug": None}, None, id="null_skips_serialization"),
+        pytest.param({"debug": {"path": ["csv_rows", 1], "maxDepth": 1}}, "sw-大阪-01", id="paged_view"),
+    ],
+)
+def test_generate_mirrors_worker(debug: dict[str, object], expected_debug: Optional[str]) -> None:
+    result = generate(GenerateRequest.model_validate({**REQUEST, **debug}))
+
+    assert result.output == EXPECTED_TEXT
+    assert result.config_error is None
+    assert result.template_error is None
+    if expected_debug is None:
+        assert result.config_debug == ""
+    else:
+        assert expected_debug in result.config_debug
+    assert set(json.loads(result.to_json())) == {"output", "configError", "templateError", "configDebug"}
+
+
+@UNIT
+def test_generate_reports_errors_like_worker() -> None:
+    result = generate(GenerateRequest.model_validate({**REQUEST, "templateText": "{{ missing }}"}))
+
+    assert result.output is None
+    assert result.template_error is not None
+    assert result.template_error.startswith("template load failed")
+
+
+@UNIT
+def test_generate_rejects_unknown_debug_path() -> None:
+    request = GenerateRequest.model_validate(REQUEST).model_copy(update={"debug": DebugViewRequest(path=("nope",))})
+
+    with pytest.raises(KeyError):
+        generate(request)
+
+
+@UNIT
+def test_generate_endpoint_returns_worker_json(server: RenderHTTPServer) -> None:
+    status, headers, body = _post(server.address, GENERATE_PATH, json.dumps(REQUEST).encode())
+
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    result = GenerateResult.model_validate_json(body)
+    assert result.output == EXPECTED_TEXT
+    assert server.request_count == 1
+
+
+@UNIT
+def test_stream_endpoint_sends_chunks(server: RenderHTTPServer) -> None:
+    rows = "".join(f"sw-{index:05d},{index}\n" for index in range(20000))
+    request = {**REQUEST, "configText": "hostname,vlan\n" + rows, "debug": None}
+
+    status, headers, body = _post(server.address, STREAM_PATH, json.dumps(request).encode())
+
+    assert status == 200
+    assert headers["Transfer-Encoding"] == "chunked"
+    assert "Content-Length" not in headers
+    text = body.decode("utf-8")
+    assert text.startswith("hostname sw-00000\n")
+    assert text.count("\n") == 20000
+
+
+@UNIT
+def test_stream_endpoint_returns_errors_as_json(server: RenderHTTPServer) -> None:
+    status, _, body = _post(server.address, STREAM_PATH, json.dumps({**REQUEST, "templateText": "{{ x"}).encode())
+
+    assert status == 422
+    assert GenerateResult.model_validate_json(body).template_error is not None
+
+
+@UNIT
+@pytest.mark.parametrize("path", [GENERATE_PATH, STREAM_PATH])
+def test_unexpected_error_returns_500(server: RenderHTTPServer, path: str) -> None:
+    status, headers, body = _post(server.address, path, json.dumps(BROKEN_CSV_REQUEST).encode())
+
+    assert status == 500
+    assert headers["Content-Type"] == "application/json"
+    assert json.loads(body)["error"].startswith(BROKEN_CSV_ERROR)
+    assert _post(server.address, GENERATE_PATH, json.dumps(REQUEST).encode())[0] == 200
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("path", "body", "expected_status"),
+    [
+        pytest.param(GENERATE_PATH, b"{", 400, id="invalid_json"),
+        pytest.param(GENERATE_PATH, json.dumps({"configText": ""}).encode(), 400, id="missing_fields"),
+        pytest.param(GENERATE_PATH, json.dumps({**REQUEST, "debug": {"path": ["nope"]}}).encode(), 400, id="unknown_debug_path"),
+        pytest.param(GENERATE_PATH, json.dumps({**REQUEST, "debug": {"path": ["csv_rows", 5]}}).encode(), 400, id="debug_index_range"),
+        pytest.param("/unknown", b"{}", 404, id="unknown_path"),
+    ],
+)
+def test_rejected_requests(server: RenderHTTPServer, path: str, body: bytes, expected_status: int) -> None:
+    status, _, response_body = _post(server.address, path, body)
+
+    assert status == expected_status
+    assert "error" in json.loads(response_body)
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content_length", "expected_status"),
+    [
+        pytest.param(None, 411, id="missing"),
+        pytest.param("abc", 400, id="invalid"),
+        pytest.param(str(MAX_TEST_REQUEST_BYTES + 1), 413, id="too_large"),
+    ],
+)
+def test_content_length_is_checked_before_reading(server: RenderHTTPServer, content_length: Optional[str], expected_status: int) -> None:
+    connection = http.client.HTTPConnection(*server.address, timeout=10)
+    try:
+        connection.putrequest("POST", GENERATE_PATH)
+        if content_length is not None:
+            connection.putheader("Content-Length", content_length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == expected_status
+        assert "error" in json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@UNIT
+def test_health_endpoint(server: RenderHTTPServer) -> None:
+    assert _get_json(server.address, HEALTH_PATH) == (200, {"status": "ok", "pid": os.getpid(), "requests": 0})
+    assert _get_json(server.address, "/nope")[0] == 404
+
+
+def _wait_for_new_worker(service: PreforkServer, previous: Set[int]) -> Set[int]:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        current = set(service.worker_pids)
+        if len(current) == service.workers and current != previous:
+            return current
+        time.sleep(0.05)
+    pytest.fail("crashed worker was not replaced")
+
+
+@UNIT
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-forking requires os.fork")
+def test_prefork_pool_serves_and_respawns() -> None:
+    service = PreforkServer(host="127.0.0.1", port=0, workers=2, warm_requests=[GenerateRequest.model_validate(REQUEST)])
+    address = service.start()
+    supervisor = threading.Thread(target=service.supervise, daemon=True)
+    supervisor.start()
+    try:
+        workers = set(service.worker_pids)
+        assert len(workers) == 2
+        assert os.getpid() not in workers
+
+        for _ in range(4):
+            status, _, body = _post(address, GENERATE_PATH, json.dumps(REQUEST).encode())
+            assert status == 200
+            assert GenerateResult.model_validate_json(body).output == EXPECTED_TEXT
+        status, health = _get_json(address, HEALTH_PATH)
+        assert status == 200
+        assert health["pid"] in workers
+
+        crashed = service.worker_pids[0]
+        os.kill(crashed, signal.SIGKILL)
+        replaced = _wait_for_new_worker(service, workers)
+        assert crashed not in replaced
+        assert _post(address, GENERATE_PATH, json.dumps(REQUEST).encode())[0] == 200
+    finally:
+        service.stop()
+        supervisor.join(5)
+
+    assert service.worker_pids == []
+    assert not supervisor.is_alive()
+    for pid in replaced:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+@contextmanager
+def _running(service: PreforkServer) -> Iterator[Tuple[str, int]]:
+    address = service.start()
+    supervisor = threading.Thread(target=service.supervise, daemon=True)
+    supervisor.start()
+    try:
+        yield address
+    finally:
+        service.stop()
+        supervisor.join(5)
+    assert not supervisor.is_alive()
+
+
+@UNIT
+def test_scheduled_server_runs_requests_on_worker_pool() -> None:
+    service = PreforkServer(host="127.0.0.1", port=0, workers=2, scheduler=RenderScheduler(slots=2))
+
+    with _running(service) as address:
+        for _ in range(3):
+            status, _, body = _post(address, GENERATE_PATH, json.dumps(REQUEST).encode())
+            assert status == 200
+            assert GenerateResult.model_validate_json(body).output == EXPECTED_TEXT
+        status, headers, body = _post(address, STREAM_PATH, json.dumps(REQUEST).encode())
+        assert (status, headers["Transfer-Encoding"], body.decode()) == (200, "chunked", EXPECTED_TEXT)
+        status, health = _get_json(address, HEALTH_PATH)
+
+    assert status == 200
+    assert health["pid"] == os.getpid()
+    assert health["requests"] == 4
+    assert health["scheduler"] == {
+        "running": 0,
+        "running_batch_units": 0,
+        "queued_interactive": 0,
+        "queued_batch": 0,
+        "queued_batch_units": 0,
+    }
+
+
+@UNIT
+def test_scheduled_server_returns_500_on_unexpected_error() -> None:
+    service = PreforkServer(host="127.0.0.1", port=0, workers=1, scheduler=RenderScheduler(slots=1))
+
+    with _running(service) as address:
+        status, _, body = _post(address, GENERATE_PATH, json.dumps(BROKEN_CSV_REQUEST).encode())
+        assert status == 500
+        assert json.loads(body)["error"].startswith(BROKEN_CSV_ERROR)
+        assert _post(address, GENERATE_PATH, json.dumps(REQUEST).encode())[0] == 200
+
+
+@UNIT
+def test_scheduled_server_sheds_with_retry_after() -> None:
+    service = PreforkServer(host="127.0.0.1", port=0, workers=1, scheduler=RenderScheduler(slots=1, max_queued_per_client=0))
+
+    with _running(service) as address:
+        connection = http.client.HTTPConnection(*address, timeout=10)
+        try:
+            body = json.dumps(REQUEST).encode()
+            connection.request("POST", GENERATE_PATH, body, {"Content-Type": "application/json", CLIENT_ID_HEADER: "team-a"})
+            response = connection.getresponse()
+            status, retry_after, payload = response.status, response.getheader("Retry-After"), json.loads(response.read())
+        finally:
+            connection.close()
+
+    assert status == 503
+    assert retry_after is not None
+    assert int(retry_after) > 0
+    assert "team-a" in payload["error"]
+
+
+@UNIT
+def test_scheduler_slots_must_match_workers() -> None:
+    with pytest.raises(ValidationError, match="must equal workers"):
+        PreforkServer(workers=2, scheduler=RenderScheduler(slots=3))
+
+
+@UNIT
+def test_main_rejects_invalid_warm_request(tmp_path: Path) -> None:
+    warm = tmp_path / "warm.json"
+    warm.write_text("{}", encoding="utf-8")
+    stderr_path = tmp_path / "stderr.txt"
+
+    with stderr_path.open("w", encoding="utf-8") as stderr:
+        assert main(["--port", "0", "--warm", str(warm)], stderr=stderr) == 2
+
+    assert "error" in stderr_path.read_text(encoding="utf-8")
+
+
+def _load_loadtest() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("render_service_loadtest", LOADTEST_SCRIPT)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses resolve the string annotations through sys.modules
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("fraction", "expected"),
+    [
+        pytest.param(0.50, 50.0, id="p50"),
+        pytest.param(0.99, 99.0, id="p99"),
+        pytest.param(1.0, 100.0, id="max"),
+        pytest.param(0.0, 1.0, id="min"),
+    ],
+)
+def test_loadtest_percentile(fraction: float, expected: float) -> None:
+    loadtest = _load_loadtest()
+
+    assert loadtest.percentile([float(value) for value in range(1, 101)], fraction) == expected
+    assert loadtest.percentile([], fraction) == 0.0
+
+
+@UNIT
+def test_loadtest_reports_latency_and_throughput(server: RenderHTTPServer) -> None:
+    loadtest = _load_loadtest()
+    host, port = server.address
+
+    report = loadtest.run(f"http://{host}:{port}{GENERATE_PATH}", json.dumps(REQUEST).encode(), 12, 3, warmup=1)
+
+    assert report.requests == 12
+    assert report.errors == 0
+    assert report.throughput_rps > 0
+    assert 0 < report.p50_ms <= report.p99_ms <= report.max_ms
+    assert "p99" in loadtest.format_report(report)
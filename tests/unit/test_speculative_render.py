@@ -0,0 +1,150 @@
+"""Unit tests for speculative rendering alongside runtime security validation.
+
+The tests cover:
+- The same result and error message as sequential rendering, for valid contexts and every failure kind.
+- Validation errors taking precedence over errors raised by the speculative render.
+- The governor stopping a long speculative render once validation fails, and briefly waiting for its thread.
+- Only the speculative render checking for the stop request.
+- AppCore only speculating when allocations are not traced.
+- Render and validation stages still being recorded.
+- Benchmarks of sequential and speculative apply (run with `-n0 -m benchmark`).
+"""
+
+import threading
+import time
+from decimal import Decimal
+from io import BytesIO
+from typing import Any, Dict, Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_benchmark.fixture import BenchmarkFixture
+from pytest_mock import MockerFixture
+
+from features.core import AppCore
+from features.document_render import DocumentRender
+from tests.unit.conftest import UploadFactory
+
+UNIT: MarkDecorator = pytest.mark.unit
+BENCHMARK: MarkDecorator = pytest.mark.benchmark
+
+ROWS: Final[List[Dict[str, Any]]] = [{"x": i} for i in range(5000)]
+# 25 million attribute lookups; sequential rendering never starts it because validation fails
+SLOW_TEMPLATE: Final[bytes] = b"{% for r in rows %}{% for s in rows %}{{ s.x }}{% endfor %}{% endfor %}{{ 10 / zero }}"
+
+
+def _render(template: bytes) -> DocumentRender:
+    buffer = BytesIO(template)
+    buffer.name = "template.j2"
+    return DocumentRender(buffer)
+
+
+def _speculative_threads() -> List[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name == "speculative-render"]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("template", "context", "format_type", "is_strict_undefined"),
+    [
+        pytest.param(b"hostname {{ hostname }}\n\n\nend", {"hostname": "router-1"}, 1, True, id="success"),
+        pytest.param(b"{{ 10 / zero }}", {"zero": Decimal(0)}, 0, True, id="validation_error"),
+        pytest.param(b"{{ missing }}{{ 10 / zero }}", {"zero": Decimal(0)}, 0, True, id="validation_error_wins"),
+        pytest.param(b"{{ missing }}", {}, 0, True, id="undefined_variable"),
+        pytest.param(b"[{{ missing }}]", {}, 0, False, id="non_strict_undefined"),
+        pytest.param(b"{{ 10 / zero }}", {"zero": 0}, 0, True, id="runtime_error"),
+        pytest.param(b"{{ hostname }}", {"hostname": "router-1"}, 9, True, id="invalid_format_type"),
+        pytest.param(b"", {}, 0, True, id="empty"),
+    ],
+)
+def test_matches_sequential_rendering(template: bytes, context: Dict[str, Any], format_type: int, is_strict_undefined: bool) -> None:
+    expected = _render(template)
+    expected_is_applied = expected.apply_context(context, format_type, is_strict_undefined)
+
+    actual = _render(template)
+    actual_is_applied = actual.apply_context(context, format_type, is_strict_undefined, is_speculative=True)
+
+    assert actual_is_applied == expected_is_applied
+    assert actual.render_content == expected.render_content
+    assert actual.raw_content == expected.raw_content
+    assert actual.error_message == expected.error_message
+
+
+@UNIT
+def test_reapply_after_failed_validation() -> None:
+    render = _render(b"{{ 10 / divisor }}")
+
+    assert render.apply_context({"divisor": Decimal(0)}, 0, is_speculative=True) is False
+    assert render.apply_context({"divisor": Decimal(4)}, 0, is_speculative=True) is True
+    assert render.render_content == "2.5"
+    assert render.error_message is None
+
+
+@UNIT
+def test_governor_stops_speculative_render(mocker: MockerFixture) -> None:
+    join = mocker.spy(threading.Thread, "join")
+    render = _render(SLOW_TEMPLATE)
+    started = time.perf_counter()
+
+    is_applied = render.apply_context({"rows": ROWS, "zero": Decimal(0)}, 0, is_speculative=True)
+
+    assert is_applied is False
+    assert render.error_message == "Template security error: division by zero is not allowed"
+    # stop() waits a short, bounded time for the render thread instead of returning at once
+    assert [call.args[1:] for call in join.call_args_list if call.args[0].name == "speculative-render"] == [(0.1,)]
+    for thread in _speculative_threads():
+        thread.join(5)
+    assert _speculative_threads() == []
+    assert time.perf_counter() - started < 5
+
+
+@UNIT
+@pytest.mark.parametrize("is_speculative", [pytest.param(False, id="sequential"), pytest.param(True, id="speculative")])
+def test_only_speculative_render_checks_stop(mocker: MockerFixture, is_speculative: bool) -> None:
+    check_render_stop = mocker.patch("features.document_render._check_render_stop")
+    render = _render(b"hostname {{ host.name }}")
+
+    assert render.apply_context({"host": {"name": "router-1"}}, 0, is_speculative=is_speculative) is True
+    assert render.render_content == "hostname router-1"
+    assert check_render_stop.called is is_speculative
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("speculative_render", "trace_allocations", "expected"),
+    [
+        pytest.param(False, False, False, id="disabled"),
+        pytest.param(True, False, True, id="enabled"),
+        pytest.param(True, True, False, id="trace_allocations"),
+    ],
+)
+def test_app_core_speculation(
+    make_upload: UploadFactory, mocker: MockerFixture, speculative_render: bool, trace_allocations: bool, expected: bool
+) -> None:
+    apply_context = mocker.spy(DocumentRender, "apply_context")
+    core = AppCore(
+        "config error", "template error", render_memo=None, trace_allocations=trace_allocations, speculative_render=speculative_render
+    )
+
+    core.load_config_file(make_upload(b'hostname = "router-1"\n', "config.toml"), "csv_rows", True)
+    core.load_template_file(make_upload(b"hostname {{ hostname }}", "template.j2"), True).apply(0, True)
+
+    assert core.formatted_text == "hostname router-1"
+    assert apply_context.call_args.kwargs["is_speculative"] is expected
+    metrics = core.operation_metrics("apply")
+    assert metrics is not None
+    assert metrics.stage("runtime_validation") is not None
+    assert metrics.stage("render") is not None
+
+
+@BENCHMARK
+@pytest.mark.parametrize("speculative_render", [pytest.param(False, id="sequential"), pytest.param(True, id="speculative")])
+def test_benchmark_apply(make_upload: UploadFactory, benchmark: BenchmarkFixture, speculative_render: bool) -> None:
+    template = "".join(f"{{% set v{i} = [{i}, 'a'] %}}{{{{ v{i}|length }}}} {{{{ 100 / {i + 1} }}}}\n" for i in range(500))
+    core = AppCore("config error", "template error", render_memo=None, speculative_render=speculative_render)
+    core.load_config_file(make_upload(b'hostname = "router-1"\n', "config.toml"), "csv_rows", True)
+    core.load_template_file(make_upload(template.encode(), "template.j2"), True)
+
+    result = benchmark(core.apply, 0, True)
+
+    assert result.formatted_text is not None
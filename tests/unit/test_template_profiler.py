@@ -0,0 +1,113 @@
+"""Unit tests for the line-level template render profiler.
+
+The tests cover:
+- Attributing hits, time and output bytes to template source lines and blocks.
+- Identical output with and without profiling, and no profile unless requested.
+- The hottest lines ordered by time, hits or output bytes, and the text report.
+- Runtime errors reported the same way as without profiling, and restoring the previous trace function.
+"""
+
+import sys
+from io import BytesIO
+from typing import Any, Dict, Final
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+
+from features.document_render import DocumentRender
+from features.template_profiler import TemplateLineStats, TemplateProfile
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+TEMPLATE: Final[bytes] = b"""header
+{% for row in rows %}
+{{ row.name | upper }} {{ row.vlan }}
+{% endfor %}
+{% block tail %}end {{ rows | length }}{% endblock %}
+"""
+CONTEXT: Final[Dict[str, Any]] = {"rows": [{"name": f"sw-{i:03d}", "vlan": i} for i in range(50)]}
+
+
+def _profile(template: bytes = TEMPLATE, context: Dict[str, Any] = CONTEXT) -> TemplateProfile:
+    renderer = DocumentRender(BytesIO(template))
+    assert renderer.apply_context(context, 0, is_profiling=True), renderer.error_message
+    assert renderer.render_profile is not None
+    return renderer.render_profile
+
+
+@UNIT
+def test_profile_attributes_lines_and_blocks() -> None:
+    profile = _profile()
+    lines: Final[Dict[int, TemplateLineStats]] = {stats.lineno: stats for stats in profile.lines}
+
+    assert sorted(lines) == [1, 2, 3, 5]
+    assert lines[3].source == "{{ row.name | upper }} {{ row.vlan }}"
+    assert (lines[1].hits, lines[2].hits, lines[3].hits) == (1, 51, 51)
+    assert lines[1].output_bytes == len(b"header\n")
+    # Jinja maps the text after {% endfor %} to the last line with an expression before it
+    assert lines[3].output_bytes == sum(len(f"SW-{i:03d} {i}\n".encode()) for i in range(50)) + len(b"\n")
+    assert lines[5].output_bytes == len(b"end 50")
+    assert all(stats.elapsed_seconds >= 0 for stats in profile.lines)
+    assert [block.name for block in profile.blocks] == ["root", "block tail"]
+    assert profile.blocks[1].output_bytes == len(b"end 50")
+    assert profile.output_bytes == sum(stats.output_bytes for stats in profile.lines)
+
+
+@UNIT
+def test_profiling_keeps_output_identical() -> None:
+    profiled = DocumentRender(BytesIO(TEMPLATE))
+    plain = DocumentRender(BytesIO(TEMPLATE))
+
+    assert profiled.apply_context(CONTEXT, 1, is_profiling=True)
+    assert plain.apply_context(CONTEXT, 1)
+
+    assert profiled.render_content == plain.render_content
+    assert profiled.raw_content is not None
+    assert profiled.render_profile is not None
+    assert profiled.render_profile.output_bytes == len(profiled.raw_content.encode())
+    assert plain.render_profile is None
+    assert profiled.apply_context(CONTEXT, 1)
+    assert profiled.render_profile is None, "A later render without profiling must clear the profile"
+
+
+@UNIT
+def test_hottest_and_report() -> None:
+    profile = _profile()
+
+    assert [stats.lineno for stats in profile.hottest(2, key="hits")] == [2, 3]
+    assert [stats.lineno for stats in profile.hottest(1, key="output_bytes")] == [3]
+    assert len(profile.hottest(10)) == len(profile.lines)
+
+    report: Final[str] = profile.format_report(count=2, key="output_bytes")
+    header, first, second = report.splitlines()[:3]
+    assert header.split() == ["Line", "Hits", "Time", "ms", "%", "Bytes", "Source"]
+    assert first.split()[:2] == ["3", "51"]
+    assert first.endswith("{{ row.name | upper }} {{ row.vlan }}")
+    assert second.split()[0] == "2"
+    assert "block tail: " in report
+    assert report.endswith(f"{profile.output_bytes} bytes\n")
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("template", "expected_error"),
+    [
+        pytest.param(b"a\n{{ missing.name }}\n", "Template runtime error: 'missing' is undefined", id="undefined"),
+        pytest.param(
+            b"{% for row in rows %}{{ row.site.name }}{% endfor %}",
+            "Template runtime error: 'dict object' has no attribute 'site'",
+            id="attribute",
+        ),
+    ],
+)
+def test_runtime_error_matches_plain_render(template: bytes, expected_error: str) -> None:
+    previous_trace = sys.gettrace()
+    profiled = DocumentRender(BytesIO(template))
+    plain = DocumentRender(BytesIO(template))
+
+    assert profiled.apply_context(CONTEXT, 0, is_profiling=True) is False
+    assert plain.apply_context(CONTEXT, 0) is False
+
+    assert profiled.error_message == plain.error_message == expected_error
+    assert profiled.render_profile is None
+    assert sys.gettrace() is previous_trace
@@ -1,10 +1,12 @@
+import tracemalloc
 from io import BytesIO
-from typing import Callable, Final, Optional
+from typing import Callable, Final, Optional, Union
 
 import pytest
 from _pytest.mark.structures import MarkDecorator
 
-from features.transcoder import TextTranscoder
+from features.file_source import FileSource
+from features.transcoder import TextTranscoder, _transcode_chunks
 
 UNIT: MarkDecorator = pytest.mark.unit
 
@@ -438,3 +440,107 @@ def test_transcoder_missing_encoding(test_data: bytes, invalid_encoding: str, ex
         assert result_with_fallback.getvalue() == test_data, (
             f"Content mismatch with fallback.\nExpected: {test_data!r}\nGot: {result_with_fallback.getvalue()!r}"
         )
+
+
+STREAMING_TEXT: Final[str] = "".join(f"{i},東京サーバー{i:04d},第{i % 7}データセンター,これは日本語のテストです。\n" for i in range(200))
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("content", "encoding", "is_file_source"),
+    [
+        pytest.param("あいうえお", "utf-8", False, id="passthrough_utf8_bytesio"),
+        pytest.param("あいうえお", "utf-8", True, id="passthrough_utf8_file_source"),
+        pytest.param("ABCDEF", "ASCII", False, id="passthrough_ascii_bytesio"),
+        pytest.param("ABCDEF", "ASCII", True, id="passthrough_ascii_file_source"),
+    ],
+)
+def test_transcoder_passthrough(content: str, encoding: str, is_file_source: bool) -> None:
+    """UTF-8/ASCIIからUTF-8への変換で、元のファイルがコピーされずに返されることをテストする。
+
+    Args:
+        content: テスト用の文字列
+        encoding: 入力のエンコーディング
+        is_file_source: FileSourceとして渡すかどうか
+    """
+    # Arrange
+    data: Final[bytes] = content.encode(encoding)
+    import_file: Final[Union[BytesIO, FileSource]] = FileSource.open(data, 1024, name="example.txt") if is_file_source else BytesIO(data)
+    if isinstance(import_file, BytesIO):
+        import_file.seek(3)
+
+    # Act
+    transcoder: Final[TextTranscoder] = TextTranscoder(import_file)
+    result: Final[Optional[Union[BytesIO, FileSource]]] = (
+        transcoder.convert_source("utf-8", False) if is_file_source else transcoder.convert("utf-8", False)
+    )
+
+    # Assert
+    assert result is import_file, "Input that is already valid UTF-8 must be returned unchanged"
+    if isinstance(result, BytesIO):
+        assert result.tell() == 0
+        assert result.getvalue() == data
+
+
+@UNIT
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+@pytest.mark.parametrize(
+    ("source_encoding", "target_encoding"),
+    [
+        pytest.param("cp932", "utf-8", id="shift_jis_to_utf8"),
+        pytest.param("EUC-JP", "utf-8", id="euc_jp_to_utf8"),
+        pytest.param("ISO-2022-JP", "utf-8", id="iso_2022_jp_to_utf8"),
+        pytest.param("utf-8", "ISO-2022-JP-2", id="utf8_to_iso_2022_jp"),
+        pytest.param("utf-8", "cp932", id="utf8_to_shift_jis"),
+    ],
+)
+def test_transcode_chunks_matches_whole_file(source_encoding: str, target_encoding: str, chunk_size: int) -> None:
+    """チャンクの境界で分割されたマルチバイト文字を含めて、全体を一度に変換した結果と一致することをテストする。
+
+    Args:
+        source_encoding: 変換元のエンコーディング
+        target_encoding: 変換先のエンコーディング
+        chunk_size: 1回にデコードするバイト数
+    """
+    # Arrange
+    data: Final[bytes] = STREAMING_TEXT.encode(source_encoding)
+
+    # Act
+    result: Final[bytes] = _transcode_chunks(memoryview(data), source_encoding, target_encoding, chunk_size)
+
+    # Assert
+    assert result == STREAMING_TEXT.encode(target_encoding)
+
+
+@UNIT
+def test_transcode_chunks_rejects_truncated_tail() -> None:
+    """末尾で途切れたマルチバイト文字がUnicodeDecodeErrorになることをテストする。"""
+    # Arrange
+    data: Final[bytes] = "日本語".encode("Shift_JIS")[:-1]
+
+    # Act & Assert
+    with pytest.raises(UnicodeDecodeError):
+        _transcode_chunks(data, "Shift_JIS", "utf-8", 2)
+
+
+@UNIT
+def test_transcoder_streaming_peak_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    """変換時のピークメモリが、変換結果にチャンク数個分を加えた量に収まることをテストする。"""
+    # Arrange
+    monkeypatch.setattr(TextTranscoder, "CHUNK_SIZE", 16 * 1024)
+    expected: Final[bytes] = (STREAMING_TEXT * 50).encode("utf-8")
+    transcoder: Final[TextTranscoder] = TextTranscoder(BytesIO((STREAMING_TEXT * 50).encode("Shift_JIS")))
+    assert transcoder.detect_encoding() == "Shift_JIS"
+
+    # Act
+    tracemalloc.start()
+    try:
+        result: Final[Optional[Union[BytesIO, FileSource]]] = transcoder.convert("utf-8", False)
+        peak: Final[int] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # Assert
+    assert isinstance(result, BytesIO)
+    assert result.getvalue() == expected
+    assert peak < len(expected) + 8 * TextTranscoder.CHUNK_SIZE, f"Peak {peak} bytes for {len(expected)} bytes of output"
@@ -0,0 +1,231 @@
+"""Unit tests for the polling watch mode.
+
+The tests cover:
+- Change detection by stat and content hash: unchanged saves, deletions and re-creations are not rebuilds.
+- Re-reading only the side that changed, reusing the parsed config or the compiled template.
+- Incremental CSV re-parsing across config edits.
+- Recovery after config, template and runtime errors in the same session, including unexpected parser exceptions.
+- Per-stage latency reports, the polling loop and command line usage errors.
+"""
+
+import os
+from io import StringIO
+from pathlib import Path
+from typing import Final, List
+
+import pytest
+from _pytest.mark.structures import MarkDecorator
+from pytest_mock import MockerFixture
+
+from features.cli import EXIT_USAGE, BatchOptions
+from features.config_parser import ConfigParser
+from features.document_render import DocumentRender
+from features.watch import RebuildReport, WatchedFile, WatchSession, format_report, main, run_watch
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+CSV_CONFIG: Final[str] = "".join(["hostname,vlan\n", *(f"sw-東京-{i:03d},{i}\n" for i in range(200))])
+TEMPLATE: Final[str] = "{% for row in csv_rows %}hostname {{ row.hostname }} vlan {{ row.vlan }}\n{% endfor %}"
+
+
+def _write(path: Path, text: str) -> None:
+    """Write text and move the mtime forward, so that coarse file system clocks still see a change."""
+    previous_mtime_ns = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding="utf-8")
+    mtime_ns = max(path.stat().st_mtime_ns, previous_mtime_ns + 1_000_000)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def session(tmp_path: Path) -> WatchSession:
+    _write(tmp_path / "inventory.csv", CSV_CONFIG)
+    _write(tmp_path / "switch.j2", TEMPLATE)
+    return WatchSession(
+        config=WatchedFile(path=tmp_path / "inventory.csv"),
+        template=WatchedFile(path=tmp_path / "switch.j2"),
+        output_path=tmp_path / "out" / "switch.txt",
+        options=BatchOptions(format_type=4),
+    )
+
+
+@UNIT
+def test_watched_file_detects_content_changes(tmp_path: Path) -> None:
+    path: Final[Path] = tmp_path / "switch.j2"
+    _write(path, "v1")
+    watched = WatchedFile(path=path)
+
+    assert watched.poll() == b"v1"
+    assert watched.poll() is None
+    _write(path, "v1")
+    assert watched.poll() is None, "Saving the same content again must not trigger a rebuild"
+    path.unlink()
+    assert watched.poll() is None
+    _write(path, "v1")
+    assert watched.poll() is None, "Re-creating the same content must not trigger a rebuild"
+    _write(path, "v2")
+    assert watched.poll() == b"v2"
+
+
+@UNIT
+def test_session_rebuilds_only_changed_side(session: WatchSession, mocker: MockerFixture) -> None:
+    parse = mocker.spy(ConfigParser, "parse")
+    compile_template = mocker.spy(DocumentRender, "_create_environment")
+
+    initial = session.poll()
+    assert initial is not None
+    assert initial.error_message is None
+    assert initial.changed == ["config", "template"]
+    assert list(initial.stage_seconds) == ["poll", "config", "template", "render", "write"]
+    assert session.output_path.read_text(encoding="utf-8").startswith("hostname sw-東京-000 vlan 0\n")
+    assert session.poll() is None
+
+    _write(session.template.path, TEMPLATE.replace("hostname {{", "host {{"))
+    template_only = session.poll()
+    assert template_only is not None
+    assert list(template_only.stage_seconds) == ["poll", "template", "render", "write"]
+    assert parse.call_count == 1, "The parsed config must be reused"
+    assert session.output_path.read_text(encoding="utf-8").startswith("host sw-東京-000 vlan 0\n")
+
+    _write(session.config.path, CSV_CONFIG.replace("sw-東京-100,100", "sw-大阪-100,100"))
+    config_only = session.poll()
+    assert config_only is not None
+    assert list(config_only.stage_seconds) == ["poll", "config", "render", "write"]
+    assert compile_template.call_count == 2, "The compiled template must be reused"
+    assert "host sw-大阪-100 vlan 100\n" in session.output_path.read_text(encoding="utf-8")
+    assert session.csv_session.is_last_parse_incremental is True
+    assert session.csv_session.reparsed_record_count < 10
+    assert [initial.sequence, template_only.sequence, config_only.sequence] == [1, 2, 3]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("path_name", "broken_text", "expected_error"),
+    [
+        pytest.param("inventory.csv", 'hostname,vlan\n"sw-01,10\n', "Config file error", id="config_error"),
+        pytest.param("switch.j2", "{% for row in csv_rows %}", "Template file error", id="template_syntax_error"),
+        pytest.param("switch.j2", "{{ undefined_name }}", "undefined_name", id="template_runtime_error"),
+        # a bare carriage return makes the csv module raise instead of reporting a parse error
+        pytest.param("inventory.csv", "a,b\nx\ry,2\n", "Config file error: Error: new-line character seen", id="unexpected_parser_error"),
+    ],
+)
+def test_session_recovers_after_error(session: WatchSession, path_name: str, broken_text: str, expected_error: str) -> None:
+    path: Final[Path] = session.config.path.parent / path_name
+    original_text: Final[str] = path.read_text(encoding="utf-8")
+    session.poll()
+
+    _write(path, broken_text)
+    broken = session.poll()
+    assert broken is not None
+    assert broken.error_message is not None
+    assert expected_error in broken.error_message
+    assert "write" not in broken.stage_seconds
+
+    _write(path, original_text)
+    recovered = session.poll()
+    assert recovered is not None
+    assert recovered.error_message is None, recovered.error_message
+
+
+@UNIT
+def test_session_survives_unexpected_render_exception(session: WatchSession, mocker: MockerFixture) -> None:
+    mocker.patch.object(DocumentRender, "apply_context", side_effect=RecursionError("maximum recursion depth exceeded"))
+
+    broken = session.poll()
+
+    assert broken is not None
+    assert broken.error_message == "Template file error: RecursionError: maximum recursion depth exceeded"
+    mocker.stopall()
+    _write(session.template.path, TEMPLATE + "\n")
+    recovered = session.poll()
+    assert recovered is not None
+    assert recovered.error_message is None, recovered.error_message
+
+
+@UNIT
+def test_session_recovers_from_runtime_error_by_config_change(session: WatchSession) -> None:
+    _write(session.template.path, "{{ csv_rows[0].site }}")
+    first = session.poll()
+    assert first is not None
+    assert first.error_message is not None
+
+    _write(session.config.path, "site,vlan\n東京,10\n")
+    fixed = session.poll()
+
+    assert fixed is not None
+    assert fixed.changed == ["config"]
+    assert fixed.error_message is None, fixed.error_message
+    assert session.output_path.read_text(encoding="utf-8") == "東京"
+
+
+@UNIT
+def test_session_waits_for_missing_file(tmp_path: Path) -> None:
+    _write(tmp_path / "switch.j2", TEMPLATE)
+    session = WatchSession(
+        config=WatchedFile(path=tmp_path / "inventory.csv"),
+        template=WatchedFile(path=tmp_path / "switch.j2"),
+        output_path=tmp_path / "switch.txt",
+    )
+
+    waiting = session.poll()
+    assert waiting is not None
+    assert waiting.error_message == f"Waiting for '{tmp_path / 'inventory.csv'}'"
+
+    _write(tmp_path / "inventory.csv", CSV_CONFIG)
+    built = session.poll()
+    assert built is not None
+    assert built.changed == ["config"]
+    assert built.error_message is None
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("report", "expected_line"),
+    [
+        pytest.param(
+            RebuildReport(sequence=2, changed=["template"], stage_seconds={"poll": 0.0001, "render": 0.0123}, output_bytes=42),
+            "#2 template changed: poll 0.1ms, render 12.3ms, total 12.4ms -> out.txt (42 bytes)",
+            id="success",
+        ),
+        pytest.param(
+            RebuildReport(sequence=1, changed=["config", "template"], stage_seconds={"poll": 0.001}, error_message="bad\nline"),
+            "#1 config+template changed: poll 1.0ms, total 1.0ms error: bad line",
+            id="error",
+        ),
+    ],
+)
+def test_format_report(report: RebuildReport, expected_line: str) -> None:
+    assert format_report(report, Path("out.txt")) == expected_line
+
+
+@UNIT
+def test_run_watch_polls_until_stopped(session: WatchSession) -> None:
+    reports: List[RebuildReport] = []
+    polls: List[int] = []
+
+    def should_stop() -> bool:
+        polls.append(len(polls))
+        if len(polls) == 2:
+            _write(session.template.path, TEMPLATE + "!")
+        return len(polls) > 3
+
+    run_watch(session, reports.append, interval_seconds=0, should_stop=should_stop)
+
+    assert [report.changed for report in reports] == [["config", "template"], ["template"]]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param(["--output-encoding", "utf-9"], id="unknown_encoding"),
+        pytest.param(["--interval", "0"], id="zero_interval"),
+        pytest.param([], id="missing_output"),
+    ],
+)
+def test_main_usage_errors(tmp_path: Path, extra_args: List[str]) -> None:
+    output_args: Final[List[str]] = ["--output", str(tmp_path / "out.txt")] if extra_args else []
+    stderr = StringIO()
+
+    exit_code = main(["--config", "inventory.csv", "--template", "switch.j2", *output_args, *extra_args], StringIO(), stderr)
+
+    assert exit_code == EXIT_USAGE
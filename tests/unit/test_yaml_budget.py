@@ -0,0 +1,119 @@
+"""Unit tests for the YAML alias-expansion budget.
+
+The tests cover:
+- Expanded node counts for documents with and without aliases.
+- Rejection of billion-laughs documents, too many aliases and recursive aliases.
+- The budget applying to every YAML backend and to multi-document streams.
+- Legitimate anchor reuse and merge keys staying shared by reference.
+"""
+
+import re
+from io import BytesIO
+from typing import List, Optional
+
+import pytest
+import yaml
+from _pytest.mark.structures import MarkDecorator
+
+from features.config_parser import ConfigParser
+from features.parser_backends import PARSER_BACKENDS
+from features.yaml_budget import YAMLBudget, YAMLBudgetError, check_node_budget
+
+UNIT: MarkDecorator = pytest.mark.unit
+
+INVENTORY = """\
+defaults: &defaults
+  mtu: 1500
+  vlan: 10
+hosts:
+  - <<: *defaults
+    name: router-1
+  - name: router-2
+    settings: *defaults
+"""
+
+
+def _laughs(levels: int, width: int = 10) -> str:
+    lines = [f"a0: &a0 [{', '.join(['lol'] * width)}]"]
+    lines.extend(f"a{level}: &a{level} [{', '.join([f'*a{level - 1}'] * width)}]" for level in range(1, levels + 1))
+    return "\n".join(lines) + "\n"
+
+
+def _parse(name: str, text: str, backend_name: Optional[str] = None) -> ConfigParser:
+    buffer = BytesIO(text.encode())
+    buffer.name = name
+    parser = ConfigParser(buffer)
+    parser.parser_backend_name = backend_name
+    parser.parse()
+    return parser
+
+
+def _yaml_backends() -> List[str]:
+    return [backend.name for backend in PARSER_BACKENDS.backends("yaml")]
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        pytest.param("name: a\n", 3, id="flat"),
+        pytest.param("a: &x [1, 2]\nb: *x\n", 1 + 2 * (1 + 3), id="one_alias"),
+        pytest.param(_laughs(2, width=3), 1 + 3 + (1 + 3) + (1 + 3 * 4) + (1 + 3 * 13), id="nested_aliases"),
+    ],
+)
+def test_expanded_node_count(text: str, expected: int) -> None:
+    node = yaml.compose(text, Loader=yaml.SafeLoader)
+
+    assert check_node_budget(node) == expected
+
+
+@UNIT
+@pytest.mark.parametrize("backend_name", _yaml_backends())
+def test_rejects_billion_laughs(backend_name: str) -> None:
+    parser = _parse("config.yaml", _laughs(9), backend_name)
+
+    assert parser.parsed_dict is None
+    assert parser.error_message == "YAML document expands to more than 10000000 nodes through aliases (line 7)"
+
+
+@UNIT
+@pytest.mark.parametrize(
+    ("text", "budget", "message"),
+    [
+        pytest.param(
+            _laughs(3), YAMLBudget(max_expanded_nodes=1000), "expands to more than 1000 nodes through aliases (line 3)", id="nodes"
+        ),
+        pytest.param("a: &x 1\nb: [*x, *x, *x]\n", YAMLBudget(max_aliases=2), "uses more than 2 aliases (line 1)", id="aliases"),
+        pytest.param("a: &x [1, *x]\n", YAMLBudget(), "contains a recursive alias (line 1)", id="recursive"),
+    ],
+)
+def test_budget_errors(text: str, budget: YAMLBudget, message: str) -> None:
+    node = yaml.compose(text, Loader=yaml.SafeLoader)
+
+    with pytest.raises(YAMLBudgetError, match=re.escape(message)):
+        check_node_budget(node, budget)
+
+
+@UNIT
+@pytest.mark.parametrize("backend_name", _yaml_backends())
+def test_anchor_reuse_is_shared(backend_name: str) -> None:
+    parser = _parse("inventory.yaml", INVENTORY, backend_name)
+
+    parsed = parser.parsed_dict
+    assert parser.error_message is None
+    assert parsed is not None
+    hosts = parsed["hosts"]
+    assert isinstance(hosts, list)
+    assert hosts[0] == {"mtu": 1500, "vlan": 10, "name": "router-1"}
+    second = hosts[1]
+    assert isinstance(second, dict)
+    assert second["settings"] is parsed["defaults"]
+
+
+@UNIT
+def test_stream_reports_record_and_line() -> None:
+    parser = _parse("records.yaml", "---\nname: a\n---\n" + _laughs(9))
+
+    assert parser.error_message == (
+        "Failed to parse YAML stream: record 2 (line 10): YAML document expands to more than 10000000 nodes through aliases"
+    )
@@ -120,7 +120,7 @@ export function Editor({ initial, onBack, settings, onSettings, download, onDown
   };
 
   // recompute output / variables / validation from the actual input on every edit
-  const r = useGenerate(dataText, format, tplText, settings);
+  const r = useGenerate(dataText, format, tplText, settings, rightMode === 'debug');
   const blocked = !r.ok;
   const dataErrLine = computeDataErrLine(r);
   const enc = download.enc;
@@ -1,5 +1,5 @@
 import { describe, it, expect } from "vitest";
-import { shapeResult } from "./useGenerate";
+import { debugViewFor, shapeResult } from "./useGenerate";
 
 describe("shapeResult", () => {
   it("maps a successful worker result", () => {
@@ -21,4 +21,16 @@ describe("shapeResult", () => {
     const r = shapeResult({ output: "", configError: null, templateError: "undefined variable", configDebug: "" }, "a=1", "toml", "{{ x }}");
     expect(r.error?.pane).toBe("tpl");
   });
+  it("counts keys and interfaces from the depth-limited view", () => {
+    const r = shapeResult({ output: "", configError: null, templateError: null, configDebug: '{"global":{"a":1},"interfaces":{"x":"<dict: 3 keys>","y":"<dict: 2 keys>"}}' }, "a=1", "toml", "");
+    expect(r.keys).toBe(2);
+    expect(r.interfaces).toBe(2);
+  });
+});
+
+describe("debugViewFor", () => {
+  it("requests the full dump only while the debug pane is open", () => {
+    expect(debugViewFor(true)).toBeUndefined();
+    expect(debugViewFor(false)).toEqual({ maxDepth: 2 });
+  });
 });
@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useRef, useState } from "react";
 import GenerateWorker from "./worker/generate.worker?worker";
-import type { WorkerOutbound, GenerateSettings } from "./worker/types";
+import type { WorkerOutbound, GenerateSettings, DebugViewRequest } from "./worker/types";
 import { configFileName, type Format } from "./lib/format";
 import { extractVars, countConfig, suggestFormat } from "./lib/validate";
 
@@ -25,6 +25,15 @@ export interface GenResult {
   keys: number;
 }
 
+// While the debug pane is closed only the first two levels are serialized: enough
+// for countConfig's top-level keys and "interfaces" entries, without the full dump.
+const COUNTS_VIEW: DebugViewRequest = { maxDepth: 2 };
+
+// Debug view to request: the full JSON (field omitted) only while the pane shows it.
+export function debugViewFor(debugOpen: boolean): DebugViewRequest | undefined {
+  return debugOpen ? undefined : COUNTS_VIEW;
+}
+
 const EMPTY: GenResult = {
   ok: true, error: null, suggest: null, vars: [], output: "", json: "", interfaces: 0, keys: 0,
 };
@@ -61,6 +70,7 @@ export function useGenerate(
   format: Format,
   tplText: string,
   settings: GenerateSettings,
+  debugOpen = false,
 ): GenResult {
   const workerRef = useRef<Worker | null>(null);
   const idRef = useRef(0);
@@ -90,7 +100,7 @@ export function useGenerate(
   }, []);
 
   // Debounced dispatch. Input memoization: only re-post when inputs actually change.
-  const memoKey = JSON.stringify({ dataText, format, tplText, settings });
+  const memoKey = JSON.stringify({ dataText, format, tplText, settings, debugOpen });
   const lastKey = useRef<string>("");
   useEffect(() => {
     if (!ready) return;
@@ -107,11 +117,12 @@ export function useGenerate(
           templateText: tplText,
           templateName: "template.j2",
           settings,
+          debug: debugViewFor(debugOpen),
         },
       });
     }, DEBOUNCE_MS);
     return () => clearTimeout(handle);
-  }, [ready, memoKey, dataText, format, tplText, settings]);
+  }, [ready, memoKey, dataText, format, tplText, settings, debugOpen]);
 
   // Shape the worker result into what the Editor consumes.
   return useMemo<GenResult>(() => shapeResult(raw, dataText, format, tplText), [raw, tplText, dataText, format]);
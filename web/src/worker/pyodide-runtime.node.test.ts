@@ -80,4 +80,18 @@ describe("features/ render parity in Pyodide (Node)", () => {
     expect(result.configDebug).toContain('"name": "world"');
     expect(result.configDebug).toContain('"count": 3');
   });
+
+  it("keeps the output and reports the error when the debug path is invalid", async () => {
+    const result = await generate(pyodide, {
+      configText: 'name = "world"\n',
+      configName: "config.toml",
+      templateText: "{{ name }}",
+      templateName: "template.j2",
+      settings: DEFAULT_SETTINGS,
+      debug: { path: ["missing"] },
+    });
+    expect(result.output).toContain("world");
+    expect(result.configDebug).toBe("");
+    expect(result.configDebugError).toContain("missing");
+  });
 });
@@ -46,6 +46,10 @@ export async function bootstrapRuntime(
       '    sys.path.insert(0, "/")',
       "from io import BytesIO",
       "from features.core import AppCore  # fail loudly here if a dep or import is missing",
+      "from features.csv_incremental import IncrementalCSVParser",
+      "",
+      "# resident across calls so that live-preview edits of a CSV only re-parse the changed rows",
+      "_cg_csv_session = IncrementalCSVParser()",
       "",
       "def _cg_generate(payload):",
       "    req = json.loads(payload)",
@@ -55,9 +59,18 @@ export async function bootstrapRuntime(
       "    template_file = BytesIO(req['templateText'].encode('utf-8'))",
       "    template_file.name = req['templateName']",
       "    core = AppCore('config load failed', 'template load failed')",
-      "    core.load_config_file(config_file, s['csvRowsName'], s['enableAutoTranscoding'], s['enableFillNan'], s['fillNanWith']).load_template_file(template_file, s['enableAutoTranscoding']).apply(s['formatType'], s['isStrictUndefined'])",
-      "    config_debug = json.dumps(core.config_dict, indent=2, ensure_ascii=False, default=str) if core.config_dict is not None else ''",
-      "    return json.dumps({'output': core.formatted_text, 'configError': core.config_error_message, 'templateError': core.template_error_message, 'configDebug': config_debug})",
+      "    core.load_config_file(config_file, s['csvRowsName'], s['enableAutoTranscoding'], s['enableFillNan'], s['fillNanWith'], _cg_csv_session).load_template_file(template_file, s['enableAutoTranscoding']).apply(s['formatType'], s['isStrictUndefined'])",
+      "    # debug: omitted -> full JSON dump, null -> skip serialization, object -> truncated/paged view",
+      "    d = req.get('debug', {})",
+      "    view = core.config_debug_view",
+      "    config_debug, config_debug_error = '', None",
+      "    if view is not None and d is not None:",
+      "        # a bad path or page must not discard the generated output; ValidationError is a ValueError",
+      "        try:",
+      "            config_debug = view.render(tuple(d.get('path', ())), d.get('page', 0), d.get('pageSize'), d.get('maxDepth'), d.get('maxItems'))",
+      "        except (KeyError, ValueError, TypeError) as e:",
+      "            config_debug_error = f'debug view unavailable: {e}'",
+      "    return json.dumps({'output': core.formatted_text, 'configError': core.config_error_message, 'templateError': core.template_error_message, 'configDebug': config_debug, 'configDebugError': config_debug_error})",
     ].join("\n"),
   );
 
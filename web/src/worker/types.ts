@@ -7,12 +7,23 @@ export interface GenerateSettings {
   isStrictUndefined: boolean;
 }
 
+// Debug-pane view of the parsed config (features/config_debug.py). Only the
+// requested page/depth is serialized, so a collapsed pane costs nothing.
+export interface DebugViewRequest {
+  path?: (string | number)[];
+  page?: number;
+  pageSize?: number | null;
+  maxDepth?: number | null;
+  maxItems?: number | null;
+}
+
 export interface GenerateRequest {
   configText: string;
   configName: string; // e.g. "config.csv" -- extension drives parser selection
   templateText: string;
   templateName: string; // e.g. "template.j2"
   settings: GenerateSettings;
+  debug?: DebugViewRequest | null; // omitted -> full JSON; null -> configDebug is ""
 }
 
 export interface GenerateResult {
@@ -20,6 +31,7 @@ export interface GenerateResult {
   configError: string | null;
   templateError: string | null;
   configDebug: string;
+  configDebugError?: string | null; // set when the requested debug view could not be rendered; configDebug is ""
 }
 
 export const DEFAULT_SETTINGS: GenerateSettings = {